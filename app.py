@@ -138,11 +138,17 @@ from shift_suite.tasks.fatigue import train_fatigue
 from advanced_shortage_integration import display_advanced_shortage_tab
 from shift_suite.tasks.forecast import build_demand_series, forecast_need
 from shift_suite.tasks.h2hire import build_hire_plan as build_hire_plan_from_kpi
-from shift_suite.tasks.heatmap import build_heatmap
+from shift_suite.tasks.heatmap import build_heatmap, export_heatmap_excel
 from shift_suite.tasks.hire_plan import build_hire_plan as build_hire_plan_standard
 
 # ── Shift-Suite task modules ─────────────────────────────────────────────────
 from shift_suite.tasks.io_excel import SHEET_COL_ALIAS, _normalize, ingest_excel
+from shift_suite.tasks.workbook_session import open_workbook
+from shift_suite.tasks.kpi_cube import build_kpi_cube, load_kpi_cube, overview_kpis
+from shift_suite.tasks.heatmap_tiles import build_heatmap_tiles, downsample_wide
+from shift_suite.tasks.fingerprint import file_digest, files_digest, frame_digest
+from shift_suite.tasks.long_df_schema import write_long_df
+from shift_suite.tasks.shift_intervals import expand_intervals
 from shift_suite.tasks.leave_analyzer import (
     LEAVE_TYPE_PAID,
     LEAVE_TYPE_REQUESTED,
@@ -178,6 +184,8 @@ from shift_suite.tasks.optimal_hire_plan import create_optimal_hire_plan
 
 # ★新規インポート
 from shift_suite.tasks.gap_analyzer import analyze_standards_gap
+from shift_suite.pipeline import StageCache, default_cache_dir
+from shift_suite.pipeline.scenarios import run_scenarios
 
 # 12軸超高次元制約発見システムのインポート
 try:
@@ -538,6 +546,14 @@ def collect_data_overview(output_dir: Path) -> dict:
 def collect_main_kpis(output_dir: Path) -> dict:
     """主要KPI情報を収集"""
     try:
+        # 解析時に書かれた KPI キューブがあればファイル 1 つで済ませる
+        cube = load_kpi_cube(output_dir)
+        if cube is not None:
+            kpis = overview_kpis(cube)
+            kpis.setdefault('total_cost', 0)  # キューブのコストは不足・過剰の見積もりで人件費ではない
+            kpis.setdefault('optimization_score', 0)
+            return kpis
+
         kpis = {}
         
         # shortage_role_summary.parquetから不足・過剰時間
@@ -815,13 +831,26 @@ def log_and_display_error_enhanced(step: str, msg: str, exc: Exception) -> None:
 # ── 日本語ラベル辞書は resources/strings_ja.json で管理 ──
 
 
-def _file_mtime(path: Path) -> float:
-    """Return the modification time of a file for cache keys."""
+def _file_fingerprint(path: Path) -> str:
+    """Return the content hash of a file for cache keys ("" when missing)."""
     try:
-        return path.stat().st_mtime
+        return file_digest(path)
     except OSError:
-        return 0.0
+        return ""
+
 
+# st.cache_data の既定のハッシュは大きな DataFrame を標本化するため、内容ハッシュで置き換える
+_FRAME_HASH_FUNCS = {pd.DataFrame: frame_digest, pd.Series: frame_digest}
+
+
+def _ensure_heatmap_excel(out_dir: Path) -> None:
+    """Export the formatted heat_*.xlsx workbooks once, when results are saved."""
+    if not (out_dir / "heat_ALL.parquet").exists() or (out_dir / "heat_ALL.xlsx").exists():
+        return
+    try:
+        export_heatmap_excel(out_dir)
+    except Exception as e:
+        log.warning(f"ヒートマップExcelの出力に失敗しました: {e}")
 
 
 
@@ -840,7 +869,13 @@ def load_shortage_meta(data_dir: Path) -> tuple[list[str], list[str]]:
     return roles, employments
 
 
-@st.cache_data
+@st.cache_resource(show_spinner=False)
+def _get_stage_cache() -> StageCache:
+    """サイドバーの変更をまたいで共有する段キャッシュ (出力先 out_<key> とは別の場所)"""
+    return StageCache(default_cache_dir())
+
+
+@st.cache_data(hash_funcs=_FRAME_HASH_FUNCS)
 def calc_ratio_from_heatmap_simple(df: pd.DataFrame) -> pd.DataFrame:
     """Return shortage ratio DataFrame calculated from heatmap data (simple version)."""
     if df is None or df.empty or "need" not in df.columns:
@@ -861,7 +896,7 @@ def calc_ratio_from_heatmap_simple(df: pd.DataFrame) -> pd.DataFrame:
     return ratio_df
 
 
-@st.cache_data
+@st.cache_data(hash_funcs=_FRAME_HASH_FUNCS)
 def calc_opt_score_from_heatmap(
     df: pd.DataFrame, w_lack: float = 0.6, w_excess: float = 0.4
 ) -> pd.DataFrame:
@@ -915,10 +950,8 @@ def estimate_date_range_from_excel(excel_path: Path, sheet_name: str, header_row
     """📅 Excelファイルから参照期間を自動推定"""
     try:
         # ヘッダー行を読み込んで日付列を検出
-        df_header = pd.read_excel(excel_path, sheet_name=sheet_name, header=header_row, nrows=1)
-        
         date_columns = []
-        for col in df_header.columns:
+        for col in open_workbook(excel_path).columns(sheet_name, header_row):
             col_str = str(col)
             # 日付らしい列名を検出 (例: "1/1", "2024/1/1", "01/01"など)
             if re.search(r'\d{1,4}[/-]\d{1,2}([/-]\d{1,4})?', col_str):
@@ -964,7 +997,7 @@ def run_import_wizard() -> None:
         default_excel = os.getenv("SHIFT_SUITE_DEFAULT_EXCEL")
         if default_excel and not st.session_state.get("wizard_excel_path"):
             try:
-                xls = pd.ExcelFile(default_excel)
+                xls = open_workbook(default_excel)
             except Exception as e:  # noqa: BLE001
                 log_and_display_error(
                     "Excel\u30d5\u30a1\u30a4\u30eb\u306e\u81ea\u52d5\u8aad\u307f\u8fbc\u307f\u306b\u5931\u6557\u3057\u307e\u3057\u305f",
@@ -987,7 +1020,7 @@ def run_import_wizard() -> None:
                 st.session_state.wizard_excel_path = str(path)
                 st.session_state.wizard_file_size = uploaded.size
                 st.session_state.work_root_path_str = str(tmp)
-                xls = pd.ExcelFile(path)
+                xls = open_workbook(path)
                 st.session_state.wizard_sheet_names = xls.sheet_names
         if st.session_state.wizard_excel_path:
             master = st.selectbox(
@@ -1027,12 +1060,8 @@ def run_import_wizard() -> None:
             data_start = st.number_input(
                 "データ開始行番号", 1, 20, value=3, key=f"data_{sheet}", help="データが開始される行番号"
             )
-            df_prev = pd.read_excel(
-                st.session_state.wizard_excel_path,
-                sheet_name=sheet,
-                header=int(hdr) - 1,
-                nrows=10,
-            )
+            book = open_workbook(st.session_state.wizard_excel_path)
+            df_prev = book.read_sheet(sheet, header=int(hdr) - 1, nrows=10)
             st.dataframe(df_prev, use_container_width=True)
             
             # 📅 参照期間の自動推定を実行
@@ -1053,9 +1082,8 @@ def run_import_wizard() -> None:
             if rc is not None:
                 r, c = rc
                 try:
-                    cell_df = pd.read_excel(
-                        st.session_state.wizard_excel_path,
-                        sheet_name=sheet,
+                    cell_df = book.read_sheet(
+                        sheet,
                         header=None,
                         skiprows=r,
                         nrows=1,
@@ -1082,13 +1110,9 @@ def run_import_wizard() -> None:
         hdr = st.session_state.get(
             f"hdr_{first}", st.session_state.get("header_row_input_widget", 1)
         )
-        df_cols = pd.read_excel(
-            st.session_state.wizard_excel_path,
-            sheet_name=first,
-            header=int(hdr) - 1,
-            nrows=1,
+        cols = open_workbook(st.session_state.wizard_excel_path).columns(
+            first, int(hdr) - 1
         )
-        cols = list(df_cols.columns)
         guessed: dict[str, str] = {}
         for c in cols:
             canon = SHEET_COL_ALIAS.get(_normalize(str(c)))
@@ -1165,7 +1189,7 @@ def run_import_wizard() -> None:
 def load_data_cached(
     file_path: str,
     *,
-    file_mtime: float | None = None,
+    file_fingerprint: str | None = None,
     is_parquet: bool = False,
     **kwargs,
 ) -> pd.DataFrame:
@@ -1180,7 +1204,7 @@ def load_data_cached(
     return safe_read_excel(file_path, **kwargs)
 
 
-@st.cache_data(show_spinner=False, ttl=1800)
+@st.cache_data(show_spinner=False, ttl=1800, hash_funcs=_FRAME_HASH_FUNCS)
 def compute_heatmap_ratio_cached(
     heat_df: pd.DataFrame, need_series: pd.Series
 ) -> pd.DataFrame:
@@ -1195,7 +1219,7 @@ def compute_heatmap_ratio_cached(
     return clean_df.div(need_series_safe, axis=0).clip(lower=0, upper=2)
 
 
-@st.cache_data(show_spinner=False, ttl=1800)
+@st.cache_data(show_spinner=False, ttl=1800, hash_funcs=_FRAME_HASH_FUNCS)
 def prepare_heatmap_display_data(df_heat: pd.DataFrame, mode: str) -> pd.DataFrame:
     """Cache heatmap display data preparation."""
     if df_heat.empty:
@@ -1211,22 +1235,24 @@ def prepare_heatmap_display_data(df_heat: pd.DataFrame, mode: str) -> pd.DataFra
         )
 
 
-@st.cache_data(show_spinner=False, ttl=1800)
+@st.cache_data(show_spinner=False, ttl=1800, hash_funcs=_FRAME_HASH_FUNCS)
 def optimize_large_heatmap_display(
     df: pd.DataFrame, max_cells: int = 10000
 ) -> pd.DataFrame:
-    """Optimize large heatmap display by intelligent sampling."""
+    """Aggregate a large heatmap to a coarser time/date resolution (keeps the full period)."""
     if df.empty or df.shape[0] * df.shape[1] <= max_cells:
         return df
 
-    sample_step_rows = max(1, len(df) // 100)
-    sample_step_cols = max(1, len(df.columns) // 50)
-    return df.iloc[::sample_step_rows, ::sample_step_cols]
+    return downsample_wide(df, max_cells)[0]
 
 
 @st.cache_data(show_spinner=False, ttl=1800)
-def load_all_heatmap_files(data_dir: Path) -> dict:
-    """Load all available heatmap parquet files dynamically."""
+def load_all_heatmap_files(data_dir: Path, files_fingerprint: str = "") -> dict:
+    """Load all available heatmap parquet files dynamically.
+
+    ``files_fingerprint`` (content hash of the heat_*.parquet files) keys the
+    cache so a re-analysis into the same directory is not served stale frames.
+    """
     heatmap_data: dict[str, pd.DataFrame] = {}
 
     base_files = {"heat_all": "heat_ALL.parquet"}
@@ -1308,6 +1334,7 @@ def update_display_data_with_heatmaps(out_dir: Path) -> None:
         "fatigue_score": "fatigue_score.parquet",
         "fairness_before": "fairness_before.parquet",
         "fairness_after": "fairness_after.parquet",
+        "fairness_cube": "fairness_cube.parquet",
         "forecast": "forecast.parquet",
         "hire_plan": "hire_plan.parquet",
         "optimal_hire_plan": "optimal_hire_plan.parquet",
@@ -1339,7 +1366,7 @@ def update_display_data_with_heatmaps(out_dir: Path) -> None:
     # --- ヒートマップと派生データの事前計算を追加 ---
 
     # 1. 全てのヒートマップを一括で読み込む
-    heatmap_data = load_all_heatmap_files(out_dir)
+    heatmap_data = load_all_heatmap_files(out_dir, files_digest(out_dir.glob("heat_*.parquet")))
     st.session_state.display_data.update(heatmap_data)
 
     # 2. メタデータ（職種・雇用形態リスト）を読み込む
@@ -1389,7 +1416,7 @@ def update_display_data_with_heatmaps(out_dir: Path) -> None:
     )
 
 
-@st.cache_data(show_spinner=False, ttl=900)
+@st.cache_data(show_spinner=False, ttl=900, hash_funcs=_FRAME_HASH_FUNCS)
 def get_optimized_display_data(
     df_heat: pd.DataFrame, mode: str, max_display_cells: int = 15000
 ) -> pd.DataFrame:
@@ -1411,7 +1438,7 @@ def create_progress_indicator():
     return st.empty(), st.empty()
 
 
-@st.cache_data(show_spinner=False, ttl=3600)
+@st.cache_data(show_spinner=False, ttl=3600, hash_funcs=_FRAME_HASH_FUNCS)
 def generate_heatmap_figure(df_heat, mode, scope_info, max_display_cells=15000):
     """Generate and cache heatmap figure."""
     if not isinstance(df_heat, pd.DataFrame) or df_heat.empty:
@@ -1950,9 +1977,8 @@ if (
         first_file_path = next(iter(st.session_state.uploaded_files_info.values()))[
             "path"
         ]
-        preview_df_sidebar = pd.read_excel(
-            first_file_path,
-            sheet_name=st.session_state.shift_sheets_multiselect_widget[0],
+        preview_df_sidebar = open_workbook(first_file_path).read_sheet(
+            st.session_state.shift_sheets_multiselect_widget[0],
             nrows=5,
             header=None,
         )
@@ -2000,13 +2026,7 @@ if run_button_clicked:
         "p25_based": {"name": "25パーセンタイルベース", "need_stat_method": "25パーセンタイル"},
     }
 
-    # キャッシュクリア
-    try:
-        if hasattr(st, "cache_data"):
-            st.cache_data.clear()
-        log.info("キャッシュをクリアしました。")
-    except Exception as e:
-        log.warning(f"キャッシュクリアに失敗: {e}")
+    # st.cache_data のキーはデータとファイルの内容ハッシュなので、新しい分析でも破棄しない
 
     log.info("新しい分析を開始します。すべてのセッションデータをクリアしました。")
 
@@ -2136,9 +2156,8 @@ if run_button_clicked:
                 update_progress_exec_run("File Preview (first 8 rows)")
                 st.subheader(_("File Preview (first 8 rows)"))
                 try:
-                    preview_df_exec_run = pd.read_excel(
-                        excel_path_to_use,
-                        sheet_name=param_selected_sheets[0],
+                    preview_df_exec_run = open_workbook(excel_path_to_use).read_sheet(
+                        param_selected_sheets[0],
                         header=None,
                         nrows=8,
                     )
@@ -2160,15 +2179,22 @@ if run_button_clicked:
             long_df = None
             try:
                 update_progress_exec_run("Ingest: Reading Excel data...")
-                long_df, wt_df, unknown_codes = ingest_excel(
+                shift_intervals_df, wt_df, unknown_codes = ingest_excel(
                     excel_path_to_use,
                     shift_sheets=param_selected_sheets,
                     header_row=param_header_row,
                     slot_minutes=param_slot,
                     year_month_cell_location=param_year_month_cell,
+                    as_intervals=True,
+                )
+                # 日単位・区間単位の分析用に勤務区間テーブルも保存し、
+                # スロット単位の long_df は区間から展開する
+                shift_intervals_df.to_parquet(
+                    work_root_exec / "shift_intervals.parquet", index=False
                 )
+                long_df = expand_intervals(shift_intervals_df, param_slot)
                 intermediate_parquet_path = work_root_exec / "intermediate_data.parquet"
-                long_df.to_parquet(intermediate_parquet_path)
+                write_long_df(long_df, intermediate_parquet_path)
                 if wt_df is not None and not wt_df.empty:
                     wt_df.to_parquet(work_root_exec / "work_patterns.parquet", index=False)
                     log.info("勤務区分情報を work_patterns.parquet に保存しました。")
@@ -2206,8 +2232,12 @@ if run_button_clicked:
             if intermediate_parquet_path.exists():
                 shutil.copy(intermediate_parquet_path, base_out_dir / "intermediate_data.parquet")
                 log.info("intermediate_data.parquet を out ディレクトリにコピーしました")
+            shift_intervals_path = work_root_exec / "shift_intervals.parquet"
+            if shift_intervals_path.exists():
+                shutil.copy(shift_intervals_path, base_out_dir / "shift_intervals.parquet")
 
             # --- 共通分析をシナリオループの前に実行 ---
+            leave_bundle = None  # 休暇分析の全集計 (下の休暇分析タブ処理でも使う)
             try:
                 if "Fairness" in param_ext_opts:
                     run_fairness(long_df, base_out_dir)
@@ -2293,43 +2323,19 @@ if run_button_clicked:
                 #     except Exception as e_fatigue_copy:
                 #         log.warning(f"疲労度分析結果のコピー中にエラー: {e_fatigue_copy}")
                 if _("Leave Analysis") in param_ext_opts:
-                    daily_leave_df = leave_analyzer.get_daily_leave_counts(long_df, target_leave_types=param_leave_target_types)
-                    if not daily_leave_df.empty:
-                        staff_balance = (
-                            long_df[long_df["parsed_slots_count"] > 0]
-                            .assign(date=lambda df: pd.to_datetime(df["ds"]).dt.normalize())
-                            .groupby("date")["staff"]
-                            .nunique()
-                            .reset_index(name="total_staff")
-                        )
-                        leave_counts = (
-                            leave_analyzer.summarize_leave_by_day_count(daily_leave_df.copy(), period="date")
-                            .groupby("date")["total_leave_days"]
-                            .sum()
-                            .reset_index(name="leave_applicants_count")
-                        )
-                        staff_balance = staff_balance.merge(leave_counts, on="date", how="left")
-                        staff_balance["leave_applicants_count"] = staff_balance["leave_applicants_count"].fillna(0).astype(int)
-                        staff_balance["non_leave_staff"] = staff_balance["total_staff"] - staff_balance["leave_applicants_count"]
-                        staff_balance["leave_ratio"] = staff_balance["leave_applicants_count"] / staff_balance["total_staff"]
-                        staff_balance.to_csv(base_out_dir / "staff_balance_daily.csv", index=False)
-
-                        summary = leave_analyzer.summarize_leave_by_day_count(daily_leave_df.copy(), period="date")
-                        summary.to_csv(base_out_dir / "leave_analysis.csv", index=False)
-                        ratio_df = leave_analyzer.leave_ratio_by_period_and_weekday(summary.copy())
-                        ratio_df.to_csv(base_out_dir / "leave_ratio_breakdown.csv", index=False)
-
-                        if LEAVE_TYPE_REQUESTED in param_leave_target_types:
-                            req_daily = daily_leave_df[daily_leave_df["leave_type"] == LEAVE_TYPE_REQUESTED]
-                            if not req_daily.empty:
-                                applicants = leave_analyzer.summarize_leave_by_day_count(req_daily.copy(), period="date")
-                                conc = leave_analyzer.analyze_leave_concentration(
-                                    applicants,
-                                    leave_type_to_analyze=LEAVE_TYPE_REQUESTED,
-                                    concentration_threshold=param_leave_concentration_threshold,
-                                    daily_leave_df=req_daily.copy(),
-                                )
-                                conc.to_csv(base_out_dir / "concentration_requested.csv", index=False)
+                    leave_bundle = leave_analyzer.analyze_leave(
+                        long_df,
+                        target_leave_types=param_leave_target_types,
+                        concentration_threshold=param_leave_concentration_threshold,
+                    )
+                    if not leave_bundle.empty:
+                        leave_bundle.staff_balance_daily.to_csv(base_out_dir / "staff_balance_daily.csv", index=False)
+                        leave_bundle.daily_summary.to_csv(base_out_dir / "leave_analysis.csv", index=False)
+                        leave_bundle.leave_ratio_breakdown.to_csv(base_out_dir / "leave_ratio_breakdown.csv", index=False)
+                        if not leave_bundle.concentration_requested.empty:
+                            leave_bundle.concentration_requested.to_csv(
+                                base_out_dir / "concentration_requested.csv", index=False
+                            )
                 if "Cluster" in param_ext_opts:
                     cluster_staff(long_df, base_out_dir)
                 if "Skill" in param_ext_opts:
@@ -2338,50 +2344,147 @@ if run_button_clicked:
                 log.warning(f"common analysis failed: {e_common}")
 
             # Store scenario directories for file copying
-            st.session_state.current_scenario_dirs = {}
-            
-            for scenario_key, scenario_params in analysis_scenarios.items():
-                st.info(f"シナリオ '{scenario_params['name']}' の分析を開始...")
-                scenario_out_dir = base_out_dir / f"out_{scenario_key}"
-                scenario_out_dir.mkdir(parents=True, exist_ok=True)
-                
-                # Store scenario directory mapping
-                st.session_state.current_scenario_dirs[scenario_key] = scenario_out_dir
+            st.session_state.current_scenario_dirs = {
+                key: base_out_dir / f"out_{key}" for key in analysis_scenarios
+            }
+
+            # シナリオは互いに独立 (共有するのは long_df だけ) なので、
+            # heatmap → shortage をプロセスプールで並列に実行する
+            heatmap_opts = {
+                "include_zero_days": True,
+                "need_calc_method": param_need_calc_method,
+                "need_manual_values": param_need_manual,
+                "need_remove_outliers": param_need_remove_outliers,
+                "upper_calc_method": param_upper_method,
+                "upper_calc_param": param_upper_param,
+            }
+            if param_need_ref_start is not None:
+                heatmap_opts["ref_start_date_for_need"] = param_need_ref_start
+            if param_need_ref_end is not None:
+                heatmap_opts["ref_end_date_for_need"] = param_need_ref_end
+            scenario_wages = {
+                "wage_direct": param_wage_direct,
+                "wage_temp": param_wage_temp,
+                "penalty_per_lack": param_penalty_lack,
+            }
+            scenario_run_params = {
+                key: {
+                    "slot": param_slot,
+                    "heatmap": {**heatmap_opts, "need_stat_method": scenario_params["need_stat_method"]},
+                    "shortage": {
+                        "holidays": (holiday_dates_global_for_run or []) + (holiday_dates_local_for_run or []),
+                        "include_zero_days": True,
+                    },
+                    # 賃金は shortage_kpi / cost だけが参照する (変えても shortage は再計算しない)
+                    "wages": scenario_wages,
+                    "hire_plan": {
+                        "monthly_hours_fte": param_std_work_hours,
+                        "hourly_wage": param_wage_direct,
+                        "recruit_cost": param_hiring_cost,
+                        "safety_factor": param_safety_factor,
+                    },
+                }
+                for key, scenario_params in analysis_scenarios.items()
+            }
+            scenario_targets = ["shortage", "shortage_kpi"] + (["hire_plan"] if "Hire plan" in param_ext_opts else [])
 
+            def _on_scenario_progress(key: str, stage_name: str) -> None:
                 try:
-                    shutil.copy(intermediate_parquet_path, scenario_out_dir / "intermediate_data.parquet")
-                    log.info(f"Copied intermediate_data.parquet to {scenario_out_dir}")
-                    if (work_root_exec / "work_patterns.parquet").exists():
-                        shutil.copy(
-                            work_root_exec / "work_patterns.parquet",
-                            scenario_out_dir / "work_patterns.parquet",
+                    progress_status.write(f"{analysis_scenarios[key]['name']}: {stage_name}")
+                except Exception as e_prog_scenario:
+                    log.warning(f"進捗表示の更新中にエラー: {e_prog_scenario}")
+
+            st.info(f"{len(analysis_scenarios)} シナリオの分析を並列で開始...")
+            update_progress_exec_run("Heatmap: Generating heatmap...")
+            try:
+                scenario_outcomes = run_scenarios(
+                    long_df,
+                    scenario_run_params,
+                    base_out_dir,
+                    targets=scenario_targets,
+                    copy_files=[
+                        intermediate_parquet_path,
+                        work_root_exec / "work_patterns.parquet",
+                    ],
+                    cache=_get_stage_cache(),
+                    on_progress=_on_scenario_progress,
+                )
+            except Exception as e:
+                log_and_display_error("シナリオ分析の実行中にエラーが発生しました", e)
+                scenario_outcomes = {}
+            update_progress_exec_run("Shortage: Analyzing shortage...")
+
+            # 4. dash_app.py用の「中間サマリーテーブル」(long_df だけから決まるので全シナリオ共通)
+            # 全日付・時間帯・職種・雇用形態の組み合わせを網羅するベースデータを作成
+            # 🎯 重要：休日除外済みのデータのみから組み合わせを作成
+            working_long_df = long_df[
+                (long_df.get("parsed_slots_count", 0) > 0) & 
+                (long_df.get("holiday_type", "通常勤務") == "通常勤務")
+            ]
+            all_combinations_from_long_df = working_long_df[[
+                "ds",
+                "role",
+                "employment",
+            ]].drop_duplicates().copy()
+
+            all_combinations_from_long_df["date_lbl"] = all_combinations_from_long_df[
+                "ds"
+            ].dt.strftime("%Y-%m-%d")
+            all_combinations_from_long_df["time"] = all_combinations_from_long_df[
+                "ds"
+            ].dt.strftime("%H:%M")
+
+            # parsed_slots_count > 0 のスロットのみスタッフ数をカウント
+            working_staff_data = long_df[long_df.get("parsed_slots_count", 0) > 0].copy()
+            working_staff_data["date_lbl"] = working_staff_data["ds"].dt.strftime("%Y-%m-%d")
+            working_staff_data["time"] = working_staff_data["ds"].dt.strftime("%H:%M")
+
+            staff_counts_actual = (
+                working_staff_data.groupby([
+                    "date_lbl",
+                    "time",
+                    "role",
+                    "employment",
+                ])["staff"]
+                .nunique()
+                .reset_index()
+                .rename(columns={"staff": "staff_count"})
+            )
+
+            # すべての組み合わせに実際のスタッフ数を結合し、稼働がない場合は0で埋める
+            pre_aggregated_df = pd.merge(
+                all_combinations_from_long_df,
+                staff_counts_actual,
+                on=["date_lbl", "time", "role", "employment"],
+                how="left",
+            )
+            pre_aggregated_df["staff_count"] = pre_aggregated_df["staff_count"].fillna(0).astype(int)
+
+            for scenario_key, scenario_params in analysis_scenarios.items():
+                scenario_out_dir = st.session_state.current_scenario_dirs[scenario_key]
+                outcome = scenario_outcomes.get(scenario_key)
+                if outcome is None:
+                    continue
+                if not outcome.ok:
+                    if outcome.error_stage == "setup":
+                        log_and_display_error(
+                            f"Failed to copy intermediate files to {scenario_out_dir}",
+                            RuntimeError(outcome.error),
                         )
-                except Exception as e:
-                    log_and_display_error(
-                        f"Failed to copy intermediate files to {scenario_out_dir}",
-                        e,
-                    )
+                    elif outcome.error_stage == "heatmap":
+                        st.session_state.analysis_status["heatmap"] = "failure"
+                        log_and_display_error("Heatmapの生成中にエラーが発生しました", RuntimeError(outcome.error))
+                    else:
+                        st.session_state.analysis_status["heatmap"] = "success"
+                        st.session_state.analysis_status["shortage"] = "failure"
+                        log_and_display_error("不足分析の処理中にエラーが発生しました", RuntimeError(outcome.error))
+                        pre_aggregated_df.to_parquet(scenario_out_dir / "pre_aggregated_data.parquet", index=False)
                     continue
 
-                try:
-                    update_progress_exec_run("Heatmap: Generating heatmap...")
-                    build_heatmap(
-                        long_df,
-                        scenario_out_dir,
-                        param_slot,
-                        include_zero_days=True,
-                        need_calc_method=param_need_calc_method,
-                        ref_start_date_for_need=param_need_ref_start,
-                        ref_end_date_for_need=param_need_ref_end,
-                        need_stat_method=scenario_params["need_stat_method"],
-                        need_manual_values=param_need_manual,
-                        need_remove_outliers=param_need_remove_outliers,
-                        upper_calc_method=param_upper_method,
-                        upper_calc_param=param_upper_param,
-                    )
-                    if _("基準乖離分析") in param_ext_opts and param_need_calc_method == _(
-                        "人員配置基準に基づき設定する"
-                    ):
+                if _("基準乖離分析") in param_ext_opts and param_need_calc_method == _(
+                    "人員配置基準に基づき設定する"
+                ):
+                    try:
                         heat_all_df = pd.read_parquet(scenario_out_dir / "heat_ALL.parquet")
                         gap_results = analyze_standards_gap(heat_all_df, param_need_manual)
                         st.session_state.gap_analysis_results = gap_results
@@ -2391,28 +2494,16 @@ if run_button_clicked:
                         gap_results["gap_heatmap"].to_excel(
                             scenario_out_dir / "gap_heatmap.xlsx"
                         )
-                    st.session_state.analysis_status["heatmap"] = "success"
-                    st.success(f"✅ Heatmap生成完了 ({scenario_key})")
-                except Exception as e:
-                    st.session_state.analysis_status["heatmap"] = "failure"
-                    log_and_display_error("Heatmapの生成中にエラーが発生しました", e)
-                    continue
+                    except Exception as e:
+                        log_and_display_error("基準乖離分析の処理中にエラーが発生しました", e)
+                st.session_state.analysis_status["heatmap"] = "success"
+                st.success(f"✅ Heatmap生成完了 ({scenario_key})")
+                if "hire_plan" in outcome.failed:
+                    log.warning(f"hire_plan generation error: {outcome.failed['hire_plan']}")
 
                 try:
-                    update_progress_exec_run("Shortage: Analyzing shortage...")
-                    shortage_result_exec_run = shortage_and_brief(
-                        scenario_out_dir,
-                        param_slot,
-                        holidays=(holiday_dates_global_for_run or [])
-                        + (holiday_dates_local_for_run or []),
-                        include_zero_days=True,
-                        wage_direct=param_wage_direct,
-                        wage_temp=param_wage_temp,
-                        penalty_per_lack=param_penalty_lack,
-                    )
-                    
                     # 🎯 統一分析管理システムによる不足分析結果保存
-                    if shortage_result_exec_run and UNIFIED_ANALYSIS_AVAILABLE:
+                    if UNIFIED_ANALYSIS_AVAILABLE:
                         try:
                             role_summary_path = scenario_out_dir / "shortage_role_summary.parquet"
                             if role_summary_path.exists():
@@ -2455,8 +2546,6 @@ if run_button_clicked:
                                 "error_message": str(e)[:100]
                             }
                     
-                    st.session_state.analysis_status["shortage"] = "success"
-                    
                     # 🔧 修正: 統一システムへの不足分析結果登録
                     if UNIFIED_ANALYSIS_AVAILABLE and hasattr(st.session_state, 'unified_analysis_manager'):
                         try:
@@ -2475,73 +2564,12 @@ if run_button_clicked:
                                 log.warning("⚠️ shortage_role_summary.parquetが見つかりません")
                         except Exception as e:
                             log.error(f"統一システムへの結果登録エラー: {e}")
-                    if shortage_result_exec_run is None:
-                        st.warning(
-                            "Shortage (不足分析) の一部または全てが完了しませんでした。"
-                        )
-                    else:
-                        st.success(f"✅ Shortage (不足分析) 完了 ({scenario_key})")
-                        if "Hire plan" in param_ext_opts:
-                            try:
-                                build_hire_plan_from_kpi(
-                                    scenario_out_dir,
-                                    monthly_hours_fte=param_std_work_hours,
-                                    hourly_wage=param_wage_direct,
-                                    recruit_cost=param_hiring_cost,
-                                    safety_factor=param_safety_factor,
-                                )
-                            except Exception as e:
-                                log.warning(f"hire_plan generation error: {e}")
+                    st.session_state.analysis_status["shortage"] = "success"
+                    st.success(f"✅ Shortage (不足分析) 完了 ({scenario_key})")
                 except Exception as e:
                     st.session_state.analysis_status["shortage"] = "failure"
                     log_and_display_error("不足分析の処理中にエラーが発生しました", e)
 
-                # 4. dash_app.py用の「中間サマリーテーブル」を生成
-                # 全日付・時間帯・職種・雇用形態の組み合わせを網羅するベースデータを作成
-                # 🎯 重要：休日除外済みのデータのみから組み合わせを作成
-                working_long_df = long_df[
-                    (long_df.get("parsed_slots_count", 0) > 0) & 
-                    (long_df.get("holiday_type", "通常勤務") == "通常勤務")
-                ]
-                all_combinations_from_long_df = working_long_df[[
-                    "ds",
-                    "role",
-                    "employment",
-                ]].drop_duplicates().copy()
-
-                all_combinations_from_long_df["date_lbl"] = all_combinations_from_long_df[
-                    "ds"
-                ].dt.strftime("%Y-%m-%d")
-                all_combinations_from_long_df["time"] = all_combinations_from_long_df[
-                    "ds"
-                ].dt.strftime("%H:%M")
-
-                # parsed_slots_count > 0 のスロットのみスタッフ数をカウント
-                working_staff_data = long_df[long_df.get("parsed_slots_count", 0) > 0].copy()
-                working_staff_data["date_lbl"] = working_staff_data["ds"].dt.strftime("%Y-%m-%d")
-                working_staff_data["time"] = working_staff_data["ds"].dt.strftime("%H:%M")
-
-                staff_counts_actual = (
-                    working_staff_data.groupby([
-                        "date_lbl",
-                        "time",
-                        "role",
-                        "employment",
-                    ])["staff"]
-                    .nunique()
-                    .reset_index()
-                    .rename(columns={"staff": "staff_count"})
-                )
-
-                # すべての組み合わせに実際のスタッフ数を結合し、稼働がない場合は0で埋める
-                pre_aggregated_df = pd.merge(
-                    all_combinations_from_long_df,
-                    staff_counts_actual,
-                    on=["date_lbl", "time", "role", "employment"],
-                    how="left",
-                )
-                pre_aggregated_df["staff_count"] = pre_aggregated_df["staff_count"].fillna(0).astype(int)
-
                 pre_aggregated_df.to_parquet(
                     scenario_out_dir / "pre_aggregated_data.parquet",
                     index=False,
@@ -2557,151 +2585,30 @@ if run_button_clicked:
                 st.info(f"{_('Leave Analysis')} 処理中…")
                 try:
                     if "long_df" in locals() and not long_df.empty:
-                        # 1. 日次・職員別の休暇取得フラグデータを生成
-                        daily_leave_df = leave_analyzer.get_daily_leave_counts(
-                            long_df, target_leave_types=param_leave_target_types
-                        )
+                        # 希望休・有給の曜日別 / 月別 / 月内期間別集計、集中日、
+                        # 勤務予定人数との比較、職員別リストを long_df の 1 回の走査で作る
+                        # (共通分析で作成済みならそれを使う)
+                        if leave_bundle is None:
+                            leave_bundle = leave_analyzer.analyze_leave(
+                                long_df,
+                                target_leave_types=param_leave_target_types,
+                                concentration_threshold=param_leave_concentration_threshold,
+                            )
                         st.session_state.leave_analysis_results["daily_leave_df"] = (
-                            daily_leave_df
+                            leave_bundle.daily_leave_df
                         )
 
-                        if not daily_leave_df.empty:
-                            leave_results_temp = {}  # 一時的な結果格納用
-
-                            # 2. 希望休関連の集計と分析
-                            if LEAVE_TYPE_REQUESTED in param_leave_target_types:
-                                requested_leave_daily = daily_leave_df[
-                                    daily_leave_df["leave_type"] == LEAVE_TYPE_REQUESTED
-                                ]
-                                if not requested_leave_daily.empty:
-                                    leave_results_temp["summary_dow_requested"] = (
-                                        leave_analyzer.summarize_leave_by_day_count(
-                                            requested_leave_daily.copy(),
-                                            period="dayofweek",
-                                        )
-                                    )
-                                    leave_results_temp[
-                                        "summary_month_period_requested"
-                                    ] = leave_analyzer.summarize_leave_by_day_count(
-                                        requested_leave_daily.copy(),
-                                        period="month_period",
-                                    )
-                                    leave_results_temp["summary_month_requested"] = (
-                                        leave_analyzer.summarize_leave_by_day_count(
-                                            requested_leave_daily.copy(), period="month"
-                                        )
-                                    )
-
-                                    daily_requested_applicants_counts = (
-                                        leave_analyzer.summarize_leave_by_day_count(
-                                            requested_leave_daily.copy(), period="date"
-                                        )
-                                    )
-                                    leave_results_temp["concentration_requested"] = (
-                                        leave_analyzer.analyze_leave_concentration(
-                                            daily_requested_applicants_counts,
-                                            leave_type_to_analyze=LEAVE_TYPE_REQUESTED,
-                                            concentration_threshold=param_leave_concentration_threshold,
-                                            daily_leave_df=requested_leave_daily.copy(),
-                                        )
-                                    )
-                                else:
+                        if not leave_bundle.empty:
+                            leave_results_temp = leave_bundle.results()
+                            for leave_type in (LEAVE_TYPE_REQUESTED, LEAVE_TYPE_PAID):
+                                if (
+                                    leave_type in param_leave_target_types
+                                    and leave_bundle.summary(leave_type, "date").empty
+                                ):
                                     log.info(
-                                        f"{LEAVE_TYPE_REQUESTED} のデータが見つからなかったため、関連する集計・分析をスキップしました。"
-                                    )
-                                    leave_results_temp["summary_dow_requested"] = (
-                                        pd.DataFrame()
-                                    )
-                                    leave_results_temp[
-                                        "summary_month_period_requested"
-                                    ] = pd.DataFrame()
-                                    leave_results_temp["summary_month_requested"] = (
-                                        pd.DataFrame()
-                                    )
-                                    leave_results_temp["concentration_requested"] = (
-                                        pd.DataFrame()
+                                        f"{leave_type} のデータが見つからなかったため、関連する集計・分析をスキップしました。"
                                     )
 
-                            # 勤務予定人数との比較データ作成 (全休暇タイプ)
-                            try:
-                                total_staff_per_day = (
-                                    long_df[long_df["parsed_slots_count"] > 0]
-                                    .assign(
-                                        date=lambda df: pd.to_datetime(
-                                            df["ds"]
-                                        ).dt.normalize()
-                                    )
-                                    .groupby("date")["staff"]
-                                    .nunique()
-                                    .reset_index(name="total_staff")
-                                )
-                                all_leave_counts = (
-                                    leave_analyzer.summarize_leave_by_day_count(
-                                        daily_leave_df.copy(),
-                                        period="date",
-                                    )
-                                    .groupby("date")["total_leave_days"]
-                                    .sum()
-                                    .reset_index(name="leave_applicants_count")
-                                )
-                                staff_balance = total_staff_per_day.merge(
-                                    all_leave_counts,
-                                    on="date",
-                                    how="left",
-                                )
-                                staff_balance["leave_applicants_count"] = (
-                                    staff_balance["leave_applicants_count"]
-                                    .fillna(0)
-                                    .astype(int)
-                                )
-                                staff_balance["non_leave_staff"] = (
-                                    staff_balance["total_staff"]
-                                    - staff_balance["leave_applicants_count"]
-                                )
-                                staff_balance["leave_ratio"] = (
-                                    staff_balance["leave_applicants_count"]
-                                    / staff_balance["total_staff"]
-                                )
-                                leave_results_temp["staff_balance_daily"] = (
-                                    staff_balance
-                                )
-                            except Exception as e:
-                                log.error(f"勤務予定人数の計算中にエラー: {e}")
-
-                            # 3. 有給休暇関連の集計
-                            if LEAVE_TYPE_PAID in param_leave_target_types:
-                                paid_leave_daily = daily_leave_df[
-                                    daily_leave_df["leave_type"] == LEAVE_TYPE_PAID
-                                ]
-                                if not paid_leave_daily.empty:
-                                    leave_results_temp["summary_dow_paid"] = (
-                                        leave_analyzer.summarize_leave_by_day_count(
-                                            paid_leave_daily.copy(), period="dayofweek"
-                                        )
-                                    )
-                                    leave_results_temp["summary_month_paid"] = (
-                                        leave_analyzer.summarize_leave_by_day_count(
-                                            paid_leave_daily.copy(), period="month"
-                                        )
-                                    )
-                                else:
-                                    log.info(
-                                        f"{LEAVE_TYPE_PAID} のデータが見つからなかったため、関連する集計をスキップしました。"
-                                    )
-                                    leave_results_temp["summary_dow_paid"] = (
-                                        pd.DataFrame()
-                                    )
-                                    leave_results_temp["summary_month_paid"] = (
-                                        pd.DataFrame()
-                                    )
-
-                            # 4. 職員別休暇リスト (終日のみ)
-                            leave_results_temp["staff_leave_list"] = (
-                                leave_analyzer.get_staff_leave_list(
-                                    long_df, target_leave_types=param_leave_target_types
-                                )
-                            )
-
                             st.session_state.leave_analysis_results.update(
                                 leave_results_temp
                             )
@@ -2722,24 +2629,9 @@ if run_button_clicked:
 
                             # Save summary by date for external use
                             try:
-                                daily_summary = (
-                                    leave_analyzer.summarize_leave_by_day_count(
-                                        daily_leave_df.copy(), period="date"
-                                    )
-                                )
-                                st.session_state.leave_analysis_results[
-                                    "daily_summary"
-                                ] = daily_summary
-                                ratio_df = (
-                                    leave_analyzer.leave_ratio_by_period_and_weekday(
-                                        daily_summary.copy()
-                                    )
-                                )
-                                st.session_state.leave_analysis_results[
-                                    "leave_ratio_breakdown"
-                                ] = ratio_df
+                                daily_summary = leave_bundle.daily_summary
                                 try:
-                                    ratio_df.to_csv(
+                                    leave_bundle.leave_ratio_breakdown.to_csv(
                                         scenario_out_dir / "leave_ratio_breakdown.csv",
                                         index=False,
                                     )
@@ -2747,18 +2639,6 @@ if run_button_clicked:
                                     log.warning(
                                         f"leave_ratio_breakdown.csv write error: {e_ratio}"
                                     )
-                                try:
-                                    both_conc = leave_analyzer.analyze_both_leave_concentration(
-                                        daily_summary.copy(),
-                                        concentration_threshold=param_leave_concentration_threshold,
-                                    )
-                                    st.session_state.leave_analysis_results[
-                                        "concentration_both"
-                                    ] = both_conc
-                                except Exception as e_both:
-                                    log.warning(
-                                        f"concentration_both generation error: {e_both}"
-                                    )
                                 leave_csv = scenario_out_dir / "leave_analysis.csv"
                                 daily_summary.to_csv(leave_csv, index=False)
 
@@ -3356,6 +3236,25 @@ if run_button_clicked:
                 except Exception as e_cost:
                     log.warning(f"daily cost calculation failed: {e_cost}")
 
+            # --- 概要タブ用 KPI キューブ (追加モジュールの結果も取り込むため最後に作る) ---
+            for scenario_path in st.session_state.get("current_scenario_dirs", {}).values():
+                try:
+                    build_kpi_cube(
+                        scenario_path,
+                        long_df=long_df if not long_df.empty else None,
+                        slot_minutes=param_slot,
+                        wage_direct=param_wage_direct,
+                        wage_temp=param_wage_temp,
+                        penalty_per_lack=param_penalty_lack,
+                    )
+                except Exception as e_cube:
+                    log.warning(f"KPI cube build failed for {scenario_path}: {e_cube}")
+                # ダッシュボードのヒートマップ用 LOD タイル
+                try:
+                    build_heatmap_tiles(scenario_path)
+                except Exception as e_tiles:
+                    log.warning(f"heatmap tiles build failed for {scenario_path}: {e_tiles}")
+
             progress_bar_val.progress(100)
             progress_text_area.success("✨ 全工程完了！")
             st.balloons()
@@ -3860,7 +3759,7 @@ if run_button_clicked:
                                 st.session_state.long_df['end_time'] = '17:00'
                             
                             # 疲労度評価の実行
-                            fatigue_result = train_fatigue(st.session_state.long_df.copy(), Path(zip_base))
+                            fatigue_result = train_fatigue(st.session_state.long_df, Path(zip_base))
                             
                             if fatigue_result and Path(fatigue_result).exists():
                                 fatigue_df = pd.read_parquet(fatigue_result)
@@ -3998,7 +3897,7 @@ if run_button_clicked:
                             )
                             
                             # 特徴量抽出
-                            features_df = predictor.extract_turnover_features(st.session_state.long_df.copy())
+                            features_df = predictor.extract_turnover_features(st.session_state.long_df)
                             risk_scores = {}
                             
                             if not features_df.empty:
@@ -4202,6 +4101,7 @@ if run_button_clicked:
                     st.session_state.save_mode_selectbox_widget
                 )
                 if current_save_mode_exec_main_run == _("Save to folder"):
+                    _ensure_heatmap_excel(out_dir_to_save_exec_main_run)
                     st.info(_("Output folder") + f": `{out_dir_to_save_exec_main_run}`")
                     st.markdown(_("Open the above path in Explorer."))
                 else:  # ZIP Download
@@ -4230,6 +4130,7 @@ if run_button_clicked:
                                 if not scenario_dirs:
                                     scenario_dirs = [out_dir_to_save_exec_main_run]
                                 for s_dir in scenario_dirs:
+                                    _ensure_heatmap_excel(s_dir)
                                     for file_to_zip_dl_exec_main_run in s_dir.rglob("*"):
                                         if file_to_zip_dl_exec_main_run.is_file():
                                             zf_dl_exec_main_run.write(
@@ -4619,7 +4520,7 @@ def display_shortage_tab(tab_container, data_dir):
                         df_hire = load_data_cached(
                             str(fp_hire),
                             is_parquet=True,
-                            file_mtime=_file_mtime(fp_hire),
+                            file_fingerprint=_file_fingerprint(fp_hire),
                         )
                         if not _valid_df(df_hire):
                             st.info("Data not available")
@@ -4654,7 +4555,7 @@ def display_shortage_tab(tab_container, data_dir):
                     df_month = load_data_cached(
                         str(role_month_fp),
                         is_parquet=True,
-                        file_mtime=_file_mtime(role_month_fp),
+                        file_fingerprint=_file_fingerprint(role_month_fp),
                     )
                     if not _valid_df(df_month):
                         st.info("Data not available")
@@ -4695,7 +4596,7 @@ def display_shortage_tab(tab_container, data_dir):
                 df_s_emp = load_data_cached(
                     str(fp_s_emp),
                     is_parquet=True,
-                    file_mtime=_file_mtime(fp_s_emp),
+                    file_fingerprint=_file_fingerprint(fp_s_emp),
                 )
                 if _valid_df(df_s_emp):
                     display_emp_df = df_s_emp.rename(
@@ -4782,7 +4683,7 @@ def display_shortage_tab(tab_container, data_dir):
                     df_emp_month = load_data_cached(
                         str(emp_month_fp),
                         is_parquet=True,
-                        file_mtime=_file_mtime(emp_month_fp),
+                        file_fingerprint=_file_fingerprint(emp_month_fp),
                     )
                     if _valid_df(df_emp_month) and {
                         "month",
@@ -4828,7 +4729,7 @@ def display_shortage_tab(tab_container, data_dir):
                 df_s_time = load_data_cached(
                     str(fp_s_time),
                     is_parquet=True,
-                    file_mtime=_file_mtime(fp_s_time),
+                    file_fingerprint=_file_fingerprint(fp_s_time),
                 )
                 if not _valid_df(df_s_time):
                     st.info("Data not available")
@@ -4874,7 +4775,7 @@ def display_shortage_tab(tab_container, data_dir):
                 df_e_time = load_data_cached(
                     str(fp_e_time),
                     is_parquet=True,
-                    file_mtime=_file_mtime(fp_e_time),
+                    file_fingerprint=_file_fingerprint(fp_e_time),
                 )
                 if not _valid_df(df_e_time):
                     st.info("Data not available")
@@ -4985,7 +4886,7 @@ def display_shortage_tab(tab_container, data_dir):
                 df_e_ratio = load_data_cached(
                     str(fp_e_ratio),
                     is_parquet=True,
-                    file_mtime=_file_mtime(fp_e_ratio),
+                    file_fingerprint=_file_fingerprint(fp_e_ratio),
                 )
                 if not _valid_df(df_e_ratio):
                     st.info("Data not available")
@@ -5032,7 +4933,7 @@ def display_shortage_tab(tab_container, data_dir):
                 df_freq = load_data_cached(
                     str(fp_s_freq),
                     is_parquet=True,
-                    file_mtime=_file_mtime(fp_s_freq),
+                    file_fingerprint=_file_fingerprint(fp_s_freq),
                 )
                 if not _valid_df(df_freq):
                     st.info("Data not available")
@@ -5067,7 +4968,7 @@ def display_shortage_tab(tab_container, data_dir):
                 df_e_freq = load_data_cached(
                     str(fp_e_freq),
                     is_parquet=True,
-                    file_mtime=_file_mtime(fp_e_freq),
+                    file_fingerprint=_file_fingerprint(fp_e_freq),
                 )
                 if not _valid_df(df_e_freq):
                     st.info("Data not available")
@@ -5104,7 +5005,7 @@ def display_shortage_tab(tab_container, data_dir):
                 df_sl = load_data_cached(
                     str(fp_s_leave),
                     is_parquet=True,
-                    file_mtime=_file_mtime(fp_s_leave),
+                    file_fingerprint=_file_fingerprint(fp_s_leave),
                 )
                 if not _valid_df(df_sl):
                     st.info("Data not available")
@@ -5134,7 +5035,7 @@ def display_shortage_tab(tab_container, data_dir):
                 df_cost = load_data_cached(
                     str(fp_cost),
                     is_parquet=True,
-                    file_mtime=_file_mtime(fp_cost),
+                    file_fingerprint=_file_fingerprint(fp_cost),
                 )
                 if not _valid_df(df_cost):
                     st.info("Data not available")
@@ -5161,7 +5062,7 @@ def display_shortage_tab(tab_container, data_dir):
                 df_alerts = load_data_cached(
                     str(fp_stats),
                     is_parquet=True,
-                    file_mtime=_file_mtime(fp_stats),
+                    file_fingerprint=_file_fingerprint(fp_stats),
                 )
                 if not _valid_df(df_alerts):
                     st.info("Data not available")
@@ -5187,12 +5088,12 @@ def display_shortage_factor_section(data_dir: Path) -> None:
             heat_df = load_data_cached(
                 str(data_dir / "heat_ALL.parquet"),
                 is_parquet=True,
-                file_mtime=_file_mtime(data_dir / "heat_ALL.parquet"),
+                file_fingerprint=_file_fingerprint(data_dir / "heat_ALL.parquet"),
             )
             short_df = load_data_cached(
                 str(data_dir / "shortage_time.parquet"),
                 is_parquet=True,
-                file_mtime=_file_mtime(data_dir / "shortage_time.parquet"),
+                file_fingerprint=_file_fingerprint(data_dir / "shortage_time.parquet"),
             )
             leave_fp = data_dir / "leave_analysis.csv"
             leave_df = (
@@ -23,6 +23,11 @@ from io import BytesIO
 from datetime import datetime, timedelta
 from plotly.subplots import make_subplots
 
+from shift_suite.jobs import get_executor
+from shift_suite.tasks import heatmap_tiles, kpi_cube
+from shift_suite.tasks.fingerprint import files_digest
+from shift_suite.tasks.frame_cache import FRAME_CACHE
+
 # Global variable to store current scenario directory (dash_app依存を除去)
 CURRENT_SCENARIO_DIR = None
 
@@ -715,6 +720,11 @@ def collect_dashboard_overview_kpis(scenario_dir: Path) -> dict:
         dict: KPIデータの辞書
     """
     try:
+        # 解析時に書かれた KPI キューブがあればファイル 1 つで済ませる
+        cube = kpi_cube.load_kpi_cube(scenario_dir)
+        if cube is not None:
+            return _format_kpi_results(kpi_cube.overview_kpis(cube))
+
         # 各段階でメトリクスを収集
         kpis = _collect_basic_metrics_from_unified_system(scenario_dir)
         kpis = _calculate_shortage_metrics_from_files(scenario_dir, kpis)
@@ -1244,6 +1254,24 @@ def data_get(scenario_dir: Path, key: str, default=None):
 def calculate_overview_kpis(scenario_dir: Path):
     """Calculate KPIs from actual data for overview dashboard"""
     try:
+        cube = kpi_cube.load_kpi_cube(Path(scenario_dir))
+        if cube is not None:
+            cube_kpis = kpi_cube.overview_kpis(cube)
+            total_shortage = cube_kpis['total_shortage_hours']
+            total_staff = cube_kpis['total_staff']
+            avg_fatigue = cube_kpis['avg_fatigue_score']
+            return {
+                'total_shortage_hours': total_shortage,
+                'avg_daily_shortage': cube_kpis['avg_daily_shortage'],
+                'avg_fatigue_score': avg_fatigue,
+                'fairness_score': cube_kpis['fairness_score'] or (max(0, 1.0 - (avg_fatigue / 10)) if avg_fatigue > 0 else 0.8),
+                'total_staff': total_staff,
+                'efficiency_score': (
+                    max(0, 1.0 - (total_shortage / (total_staff * 40 * 30)))
+                    if total_staff > 0 and total_shortage > 0 else 0.8
+                ),
+            }
+
         kpis = {}
         
         # Load shortage data
@@ -1671,6 +1699,39 @@ def safe_figure_creation(func, *args, **kwargs):
         )
 
 # Overviewタブ強化用ヘルパー関数群
+def _fill_tabs_summary_from_cube(summary, kpis):
+    """KPI キューブの概要値から shortage / fatigue / fairness / cost のサマリーを埋める"""
+    total_shortage = kpis['total_shortage_hours']
+    summary['shortage'] = {
+        'status': '✅ 分析完了',
+        'key_metric': f"総不足: {total_shortage:.1f}時間",
+        'alert_level': 'high' if total_shortage > 100 else 'medium' if total_shortage > 50 else 'low'
+    }
+    avg_fatigue = kpis['avg_fatigue_score']
+    if avg_fatigue:
+        summary['fatigue'] = {
+            'status': '✅ 分析完了',
+            'key_metric': f"平均疲労度: {avg_fatigue:.1f}",
+            'high_risk_count': kpis['high_fatigue_count'],
+            'alert_level': 'high' if avg_fatigue > 70 else 'medium' if avg_fatigue > 50 else 'low'
+        }
+    avg_fairness = kpis['fairness_score']
+    if avg_fairness:
+        summary['fairness'] = {
+            'status': '✅ 分析完了',
+            'key_metric': f"公平性スコア: {avg_fairness:.2f}",
+            'alert_level': 'low' if avg_fairness > 0.8 else 'medium' if avg_fairness > 0.6 else 'high'
+        }
+    # 簡易コスト計算（勤務時間 × デフォルト時給）
+    total_cost = kpis['total_staff_hours'] * 1800
+    summary['cost'] = {
+        'status': '✅ 分析完了',
+        'key_metric': f"総コスト: ¥{total_cost:,.0f}",
+        'daily_avg': total_cost / (kpis['days'] or 30),
+        'alert_level': 'medium'
+    }
+
+
 def collect_all_tabs_summary(scenario_dir):
     """全タブのサマリー情報を収集"""
     try:
@@ -1684,59 +1745,64 @@ def collect_all_tabs_summary(scenario_dir):
             'blueprint': {'status': '未取得', 'key_metric': None}
         }
         
-        # Shortage分析サマリー
-        shortage_file = Path(scenario_dir) / "shortage_role_summary.parquet"
-        if shortage_file.exists():
-            df = pd.read_parquet(shortage_file)
-            if not df.empty and 'lack_h' in df.columns:
-                total_shortage = df['lack_h'].sum()
-                summary['shortage'] = {
-                    'status': '✅ 分析完了',
-                    'key_metric': f"総不足: {total_shortage:.1f}時間",
-                    'alert_level': 'high' if total_shortage > 100 else 'medium' if total_shortage > 50 else 'low'
-                }
+        cube = kpi_cube.load_kpi_cube(Path(scenario_dir))
+        if cube is not None:
+            # 解析時に書かれた KPI キューブがあればファイル 1 つで済ませる
+            _fill_tabs_summary_from_cube(summary, kpi_cube.overview_kpis(cube))
+        else:
+            # Shortage分析サマリー
+            shortage_file = Path(scenario_dir) / "shortage_role_summary.parquet"
+            if shortage_file.exists():
+                df = pd.read_parquet(shortage_file)
+                if not df.empty and 'lack_h' in df.columns:
+                    total_shortage = df['lack_h'].sum()
+                    summary['shortage'] = {
+                        'status': '✅ 分析完了',
+                        'key_metric': f"総不足: {total_shortage:.1f}時間",
+                        'alert_level': 'high' if total_shortage > 100 else 'medium' if total_shortage > 50 else 'low'
+                    }
         
-        # Fatigue分析サマリー
-        fatigue_file = Path(scenario_dir) / "fatigue_scores.parquet"
-        if fatigue_file.exists():
-            df = pd.read_parquet(fatigue_file)
-            if not df.empty and 'fatigue_score' in df.columns:
-                avg_fatigue = df['fatigue_score'].mean()
-                high_risk = len(df[df['fatigue_score'] > 80])
-                summary['fatigue'] = {
-                    'status': '✅ 分析完了',
-                    'key_metric': f"平均疲労度: {avg_fatigue:.1f}",
-                    'high_risk_count': high_risk,
-                    'alert_level': 'high' if avg_fatigue > 70 else 'medium' if avg_fatigue > 50 else 'low'
-                }
+            # Fatigue分析サマリー
+            fatigue_file = Path(scenario_dir) / "fatigue_scores.parquet"
+            if fatigue_file.exists():
+                df = pd.read_parquet(fatigue_file)
+                if not df.empty and 'fatigue_score' in df.columns:
+                    avg_fatigue = df['fatigue_score'].mean()
+                    high_risk = len(df[df['fatigue_score'] > 80])
+                    summary['fatigue'] = {
+                        'status': '✅ 分析完了',
+                        'key_metric': f"平均疲労度: {avg_fatigue:.1f}",
+                        'high_risk_count': high_risk,
+                        'alert_level': 'high' if avg_fatigue > 70 else 'medium' if avg_fatigue > 50 else 'low'
+                    }
         
-        # Fairness分析サマリー
-        fairness_file = Path(scenario_dir) / "fairness_after.parquet"
-        if fairness_file.exists():
-            df = pd.read_parquet(fairness_file)
-            if not df.empty and 'fairness_score' in df.columns:
-                avg_fairness = df['fairness_score'].mean()
-                summary['fairness'] = {
+            # Fairness分析サマリー
+            fairness_file = Path(scenario_dir) / "fairness_after.parquet"
+            if fairness_file.exists():
+                df = pd.read_parquet(fairness_file)
+                if not df.empty and 'fairness_score' in df.columns:
+                    avg_fairness = df['fairness_score'].mean()
+                    summary['fairness'] = {
+                        'status': '✅ 分析完了',
+                        'key_metric': f"公平性スコア: {avg_fairness:.2f}",
+                        'alert_level': 'low' if avg_fairness > 0.8 else 'medium' if avg_fairness > 0.6 else 'high'
+                    }
+        
+            # Cost分析サマリー（実データベース）
+            intermediate_file = Path(scenario_dir) / "intermediate_data.parquet"
+            if intermediate_file.exists():
+                df = pd.read_parquet(intermediate_file)
+                # 簡易コスト計算
+                total_hours = len(df) * 0.5  # 30分スロット
+                avg_hourly_rate = 1800  # デフォルト時給
+                total_cost = total_hours * avg_hourly_rate
+                summary['cost'] = {
                     'status': '✅ 分析完了',
-                    'key_metric': f"公平性スコア: {avg_fairness:.2f}",
-                    'alert_level': 'low' if avg_fairness > 0.8 else 'medium' if avg_fairness > 0.6 else 'high'
+                    'key_metric': f"総コスト: ¥{total_cost:,.0f}",
+                    'daily_avg': total_cost / 30,  # 30日想定
+                    'alert_level': 'medium'
                 }
         
-        # Cost分析サマリー（実データベース）
-        intermediate_file = Path(scenario_dir) / "intermediate_data.parquet"
-        if intermediate_file.exists():
-            df = pd.read_parquet(intermediate_file)
-            # 簡易コスト計算
-            total_hours = len(df) * 0.5  # 30分スロット
-            avg_hourly_rate = 1800  # デフォルト時給
-            total_cost = total_hours * avg_hourly_rate
-            summary['cost'] = {
-                'status': '✅ 分析完了',
-                'key_metric': f"総コスト: ¥{total_cost:,.0f}",
-                'daily_avg': total_cost / 30,  # 30日想定
-                'alert_level': 'medium'
-            }
-        
         # Leave分析サマリー
         leave_file = Path(scenario_dir) / "leave_analysis.csv"
         if leave_file.exists():
@@ -3915,7 +3981,28 @@ def register_additional_tab_callbacks(app):
         State('scenario-dir-store', 'data')
     )
     def update_heatmap_graph_callback(role_filter, emp_filter, scenario_dir):
-        return update_heatmap_graph(role_filter, emp_filter, scenario_dir)
+        area_index = dash.callback_context.outputs_list['id']['index']
+        return update_heatmap_graph(role_filter, emp_filter, scenario_dir, area_index)
+
+    # ズーム・パンに合わせて表示範囲の解像度で読み直す (LOD タイル)
+    @app.callback(
+        Output({'type': 'heatmap-tile-graph', 'index': MATCH}, 'figure'),
+        Input({'type': 'heatmap-tile-graph', 'index': MATCH}, 'relayoutData'),
+        [
+            State({'type': 'heatmap-filter-role', 'index': MATCH}, 'value'),
+            State({'type': 'heatmap-filter-employment', 'index': MATCH}, 'value'),
+            State('scenario-dir-store', 'data')
+        ],
+        prevent_initial_call=True
+    )
+    def update_heatmap_viewport_callback(relayout_data, role_filter, emp_filter, scenario_dir):
+        viewport = heatmap_tiles.viewport_from_relayout(relayout_data)
+        if viewport is None or not scenario_dir:
+            raise PreventUpdate
+        fig = create_tile_heatmap_figure(role_filter, emp_filter, scenario_dir, *viewport)
+        if fig is None:
+            raise PreventUpdate
+        return fig
     
     # ブループリント分析コールバック
     @app.callback(
@@ -3947,30 +4034,34 @@ def register_additional_tab_callbacks(app):
     def run_mind_reader_callback(n_clicks, scenario_dir):
         if not n_clicks or not scenario_dir:
             return html.Div()
-        
-        try:
-            from shift_suite.tasks.shift_mind_reader_lite import ShiftMindReaderLite
-            mind_reader = ShiftMindReaderLite()
-            
-            scenario_path = Path(scenario_dir)
-            long_file = scenario_path / 'long_df.parquet'
-            
-            if long_file.exists():
-                long_df = pd.read_parquet(long_file)
-                results = mind_reader.analyze(long_df)
-                
-                return html.Div([
-                    html.H4("Mind Reader分析結果"),
-                    html.Pre(json.dumps(results, ensure_ascii=False, indent=2))
-                ])
-            else:
-                return html.Div("分析用データがありません")
-        except Exception as e:
-            log.error(f"Mind Reader分析エラー: {e}")
-            return html.Div([
-                html.H4("エラー", style={'color': 'red'}),
-                html.P(str(e))
-            ])
+        return submit_analysis_job('mind_reader_lite', scenario_dir)
+
+    # バックグラウンドジョブの状態を poll して表示する (終了したら Interval を止める)
+    @app.callback(
+        [
+            Output({'type': 'job-status', 'index': MATCH}, 'children'),
+            Output({'type': 'job-poll', 'index': MATCH}, 'disabled')
+        ],
+        Input({'type': 'job-poll', 'index': MATCH}, 'n_intervals'),
+        State({'type': 'job-poll', 'index': MATCH}, 'id')
+    )
+    def poll_job_callback(n_intervals, poll_id):
+        job = _job_executor().poll(poll_id['index'])
+        if job is None:
+            return html.Div("ジョブが見つかりません", style={'color': 'gray'}), True
+        return render_job_status(job), job.is_final
+
+    @app.callback(
+        Output({'type': 'job-cancel', 'index': MATCH}, 'disabled'),
+        Input({'type': 'job-cancel', 'index': MATCH}, 'n_clicks'),
+        State({'type': 'job-cancel', 'index': MATCH}, 'id'),
+        prevent_initial_call=True
+    )
+    def cancel_job_callback(n_clicks, cancel_id):
+        if not n_clicks:
+            raise PreventUpdate
+        _job_executor().cancel(cancel_id['index'])
+        return True
 
 
 
@@ -5050,12 +5141,55 @@ def create_overview_tab(scenario_dir):
         ])
     ])
 
-def update_heatmap_graph(role_filter, emp_filter, scenario_dir):
+def _heatmap_key(role_filter, emp_filter, scenario_path):
+    """フィルターに対応するヒートマップのファイル名 (拡張子なし)。ファイルが無ければ全体"""
+    key = 'heat_ALL'
+    if role_filter and role_filter != 'all' and (scenario_path / f'heat_{role_filter}.parquet').exists():
+        key = f'heat_{role_filter}'
+    if emp_filter and emp_filter != 'all' and (scenario_path / f'heat_emp_{emp_filter}.parquet').exists():
+        key = f'heat_emp_{emp_filter}'
+    return key
+
+
+def create_tile_heatmap_figure(role_filter, emp_filter, scenario_dir, start=None, end=None):
+    """LOD タイルから ``[start, end]`` を表示用の解像度で描く (タイルが無ければ None)"""
+    key = _heatmap_key(role_filter, emp_filter, Path(scenario_dir))
+    tile = heatmap_tiles.read_heatmap_tile(scenario_dir, key, start=start, end=end, cache=FRAME_CACHE)
+    if tile is None:
+        return None
+    df, (t_level, d_level) = tile
+
+    fig = go.Figure(data=go.Heatmap(
+        z=df.values,
+        x=pd.to_datetime(df.columns),
+        y=df.index,
+        colorscale='RdBu_r',
+        zmid=0
+    ))
+    fig.update_layout(
+        title=f"ヒートマップ - {role_filter if role_filter != 'all' else '全体'} / {emp_filter if emp_filter != 'all' else '全体'}"
+              f" (表示単位: {t_level} × {d_level})",
+        height=500,
+        xaxis_title="日付",
+        yaxis_title="時間帯",
+        uirevision=key
+    )
+    if start is not None and end is not None:
+        fig.update_xaxes(range=[start, end])
+    return fig
+
+
+def update_heatmap_graph(role_filter, emp_filter, scenario_dir, area_index=0):
     """ヒートマップグラフを更新"""
     if not scenario_dir:
         return html.Div("データが読み込まれていません")
     
     try:
+        # 解析時に作った LOD タイルがあれば全期間を一定のセル数で表示する
+        fig = create_tile_heatmap_figure(role_filter, emp_filter, scenario_dir)
+        if fig is not None:
+            return dcc.Graph(id={'type': 'heatmap-tile-graph', 'index': area_index}, figure=fig)
+
         # データ読み込み
         scenario_path = Path(scenario_dir)
         heat_file = scenario_path / 'heat_ALL.parquet'
@@ -5103,74 +5237,88 @@ def update_heatmap_graph(role_filter, emp_filter, scenario_dir):
 
 # ========== ブループリント分析コールバック ==========
 
-def run_blueprint_analysis(n_clicks, scenario_dir):
-    """ブループリント分析を実行"""
-    if not n_clicks or not scenario_dir:
-        return html.Div()
-    
+JOB_RESULT_TITLES = {
+    'blueprint': "ブループリント分析結果",
+    'mind_reader_lite': "Mind Reader分析結果",
+    'mind_reader': "Mind Reader分析結果",
+}
+
+
+def _job_executor():
+    """共有のジョブ実行器 (processing_monitor があれば進捗を転送する)"""
     try:
-        # ブループリント分析モジュールをインポート
-        try:
-            from shift_suite.tasks.blueprint_integrated_system import BlueprintIntegratedSystem
-            analyzer = BlueprintIntegratedSystem()
-            
-            # データ読み込み
-            scenario_path = Path(scenario_dir)
-            long_file = scenario_path / 'long_df.parquet'
-            
-            if long_file.exists():
-                long_df = pd.read_parquet(long_file)
-                results = analyzer.analyze(long_df)
-                
-                return html.Div([
-                    html.H4("ブループリント分析結果"),
-                    html.Pre(json.dumps(results, ensure_ascii=False, indent=2))
-                ])
-            else:
-                return html.Div("分析用データがありません")
-                
-        except ImportError:
-            return html.Div("ブループリント分析モジュールが利用できません")
-            
+        from dash_components.processing_monitor import processing_monitor
+    except ImportError:
+        processing_monitor = None
+    return get_executor(monitor=processing_monitor)
+
+
+def submit_analysis_job(kind, scenario_dir):
+    """解析をバックグラウンドジョブとして投入し、状態表示エリアをすぐ返す
+
+    同じシナリオ・同じ long_df の内容で実行中または成功済みのジョブがあれば再利用する。
+    """
+    try:
+        scenario_path = Path(scenario_dir)
+        long_files = [d / name for d in (scenario_path, scenario_path.parent)
+                      for name in ('intermediate_data.parquet', 'long_df.parquet')]
+        dedupe_key = f"{kind}:{scenario_path.resolve()}:{files_digest(long_files)}"
+        job = _job_executor().submit(kind, {'scenario_dir': str(scenario_dir)}, dedupe_key=dedupe_key)
     except Exception as e:
-        log.error(f"ブループリント分析エラー: {e}")
+        log.error(f"ジョブ投入エラー ({kind}): {e}")
         return html.Div([
             html.H4("エラー", style={'color': 'red'}),
             html.P(str(e))
         ])
+    return html.Div([
+        html.Div(id={'type': 'job-status', 'index': job.id}, children=render_job_status(job)),
+        html.Button("取り消し", id={'type': 'job-cancel', 'index': job.id}, n_clicks=0,
+                    disabled=job.is_final, style={'marginTop': '10px'}),
+        dcc.Interval(id={'type': 'job-poll', 'index': job.id}, interval=2000, n_intervals=0,
+                     disabled=job.is_final)
+    ])
+
+
+def render_job_status(job):
+    """ジョブの状態 (進捗・結果・エラー) の表示"""
+    title = JOB_RESULT_TITLES.get(job.kind, job.kind)
+    if job.status == 'done':
+        return html.Div([
+            html.H4(title),
+            html.Pre(json.dumps(job.result, ensure_ascii=False, indent=2))
+        ])
+    if job.status == 'failed':
+        if job.error and job.error.startswith('FileNotFoundError'):
+            return html.Div("分析用データがありません")
+        return html.Div([
+            html.H4("エラー", style={'color': 'red'}),
+            html.P(job.error)
+        ])
+    if job.status == 'cancelled':
+        return html.Div("取り消されました", style={'color': 'gray'})
+    label = "待機中" if job.status == 'queued' else f"実行中 {job.progress}%"
+    return html.Div([
+        html.H5(f"⏳ {title}: {label}"),
+        html.P(job.message or "", style={'color': '#7f8c8d'})
+    ])
+
+
+def run_blueprint_analysis(n_clicks, scenario_dir):
+    """ブループリント分析をバックグラウンドで実行"""
+    if not n_clicks or not scenario_dir:
+        return html.Div()
+    return submit_analysis_job('blueprint', scenario_dir)
 
 
 # ========== AI分析コールバック ==========
 
 def run_ai_analysis(n_clicks, scenario_dir):
-    """マインドリーダーAI分析を実行"""
+    """マインドリーダーAI分析をバックグラウンドで実行"""
     if not n_clicks or not scenario_dir:
         return html.Div()
     
     try:
-        # Mind Readerモジュールをインポート
-        try:
-            from shift_suite.tasks.shift_mind_reader_lite import ShiftMindReaderLite
-            mind_reader = ShiftMindReaderLite()
-            
-            # データ読み込み
-            scenario_path = Path(scenario_dir)
-            long_file = scenario_path / 'long_df.parquet'
-            
-            if long_file.exists():
-                long_df = pd.read_parquet(long_file)
-                results = mind_reader.analyze(long_df)
-                
-                return html.Div([
-                    html.H4("Mind Reader AI分析結果"),
-                    html.Pre(json.dumps(results, ensure_ascii=False, indent=2))
-                ])
-            else:
-                return html.Div("分析用データがありません")
-                
-        except ImportError:
-            return html.Div("Mind Readerモジュールが利用できません")
-            
+        return submit_analysis_job('mind_reader_lite', scenario_dir)
     except Exception as e:
         log.error(f"AI分析エラー: {e}")
         return html.Div([
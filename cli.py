@@ -1,14 +1,24 @@
 """cli.py – コマンドライン一括実行"""
 import argparse, shutil
 from pathlib import Path
-from shift_suite import ingest_excel, build_heatmap, shortage_and_brief, summary
-from shift_suite.utils import safe_make_archive
+from shift_suite.pipeline import CORE_STAGES, EXTRA_STAGES, StageCache, default_pipeline
+from shift_suite.tasks.forecast_batch import FORECAST_CACHE_DIR
+from shift_suite.tasks.heatmap import export_heatmap_excel
+from shift_suite.tasks.utils import safe_make_archive
 
 def main():
     ap = argparse.ArgumentParser("shift‑suite CLI")
     ap.add_argument("excel")
     ap.add_argument("out")
+    ap.add_argument("--sheets", nargs="+", required=True, help="勤務表シート名")
+    ap.add_argument("--header", type=int, default=0, help="ヘッダー行 (ingest_excel の header_row)")
+    ap.add_argument("--ymcell", default=None, help="年月セル (例: A1)")
     ap.add_argument("--slot", type=int, default=30)
+    ap.add_argument("--extras", nargs="*", default=[], choices=EXTRA_STAGES)
+    ap.add_argument("--wage-direct", type=float, default=0.0)
+    ap.add_argument("--wage-temp", type=float, default=0.0)
+    ap.add_argument("--penalty", type=float, default=0.0, help="不足 1 時間あたりのペナルティ")
+    ap.add_argument("--cache", default=None, help="段キャッシュのディレクトリ (入力が同じ段を省略)")
     ap.add_argument("--zip", action="store_true")
     args = ap.parse_args()
 
@@ -16,13 +26,33 @@ def main():
     out   = Path(args.out).expanduser()
     shutil.rmtree(out, ignore_errors=True)
 
-    long, wt, _ = ingest_excel(excel, out, args.slot)
-    build_heatmap(long, wt, out, args.slot)
-    shortage_and_brief(out, args.slot)
-    summary_df = summary.daily_summary(out)
-    summary_df.to_csv(out / "summary.csv", index=False)
+    params = dict(
+        excel=excel,
+        shift_sheets=args.sheets,
+        header_row=args.header,
+        year_month_cell=args.ymcell,
+        slot=args.slot,
+        wages=dict(
+            wage_direct=args.wage_direct,
+            wage_temp=args.wage_temp,
+            penalty_per_lack=args.penalty,
+        ),
+    )
+    cache = StageCache(Path(args.cache).expanduser()) if args.cache else None
+    if cache is not None:
+        # 系列ごとの予測キャッシュも段キャッシュと同じ場所に置く (out は毎回消すため)
+        params["forecast_batch"] = dict(cache_dir=cache.cache_dir / FORECAST_CACHE_DIR)
+    result = default_pipeline().run(
+        out, params, targets=[*CORE_STAGES, *args.extras], cache=cache
+    )
+    for stage, sec in result.timings.items():
+        mark = " (cache)" if stage in result.cached else ""
+        print(f"  {stage:<12} {sec:6.2f}s{mark}")
+    for stage, err in result.failed.items():
+        print(f"  {stage:<12} 失敗: {err}")
 
     if args.zip:
+        export_heatmap_excel(out)
         safe_make_archive(out, out.with_suffix(".zip"))
 
     print("✔ CLI done →", out)
@@ -61,7 +61,7 @@ try:
     import psutil
 except ImportError:
     psutil = None  # psutilが利用できない場合はNoneに設定
-from functools import lru_cache, wraps
+from functools import wraps
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Any
 from collections import OrderedDict
@@ -78,7 +78,7 @@ import pyarrow.parquet as pq
 import plotly.express as px
 import plotly.graph_objects as go
 from dash import dash_table, dcc, html
-from dash.dependencies import Input, Output, State, ALL
+from dash.dependencies import Input, Output, State, ALL, MATCH
 from dash.exceptions import PreventUpdate
 from flask import jsonify
 import traceback
@@ -133,13 +133,25 @@ except ImportError:
 from improved_memory_guard import ImprovedMemoryGuard, ManagedCache, memory_guard, check_memory_usage, get_memory_report, with_memory_limit
 
 from shift_suite.tasks.utils import safe_read_excel, gen_labels, _valid_df
+from shift_suite.tasks.frame_cache import FRAME_CACHE
+from shift_suite.tasks.fingerprint import file_digest, frame_digest
+from shift_suite.tasks.parquet_query import query_long_df, read_wide_slice
+from shift_suite.tasks.kpi_cube import load_kpi_cube, overview_kpis
+from shift_suite.tasks.heatmap_tiles import (
+    DATE_LEVELS,
+    DEFAULT_MAX_CELLS,
+    aggregate_wide,
+    downsample_wide,
+    read_heatmap_tile,
+    viewport_from_relayout,
+)
 from shift_suite.tasks.shortage_factor_analyzer import ShortageFactorAnalyzer
 from shift_suite.tasks import over_shortage_log
 from shift_suite.tasks.daily_cost import calculate_daily_cost
 from shift_suite.tasks import leave_analyzer
 from shift_suite.tasks.shortage import shortage_and_brief  # 統一された計算メソッド
 from shift_suite.tasks.constants import SLOT_HOURS, WAGE_RATES, COST_PARAMETERS, DEFAULT_SLOT_MINUTES, STATISTICAL_THRESHOLDS, SUMMARY5
-from shift_suite.tasks.shift_mind_reader import ShiftMindReader
+from shift_suite.jobs import get_executor
 from shift_suite.tasks.advanced_blueprint_engine_v2 import AdvancedBlueprintEngineV2
 
 # ログ初期化（早期実行）
@@ -298,7 +310,9 @@ def create_dashboard_analysis_report(scenario_dir: Path, analysis_type: str = "D
             f.write(f"  平均疲労スコア: {overview_kpis.get('avg_fatigue_score', 0):.2f}\n")
             f.write(f"  公平性スコア: {overview_kpis.get('fairness_score', 0):.2f}\n")
             f.write(f"  休暇取得率: {overview_kpis.get('leave_ratio', 0):.2%}\n")
-            f.write(f"  推定人件費: ¥{overview_kpis.get('estimated_cost', 0):,.0f}\n\n")
+            f.write(f"  過剰コスト (推定): ¥{overview_kpis.get('estimated_excess_cost', 0):,.0f}\n")
+            f.write(f"  不足コスト (派遣で補う場合): ¥{overview_kpis.get('estimated_lack_cost_if_temporary_staff', 0):,.0f}\n")
+            f.write(f"  不足ペナルティ (推定): ¥{overview_kpis.get('estimated_lack_penalty_cost', 0):,.0f}\n\n")
             
             # 3. 職種別分析
             f.write("【3. 職種別分析】\n")
@@ -453,6 +467,13 @@ def collect_dashboard_basic_info(scenario_dir: Path) -> dict:
 def collect_dashboard_overview_kpis(scenario_dir: Path) -> dict:
     """ダッシュボードの概要KPIを収集"""
     try:
+        # 解析時に書かれた KPI キューブがあればファイル 1 つで済ませる
+        cube = load_kpi_cube(scenario_dir, cache=FRAME_CACHE)
+        if cube is not None:
+            kpis = overview_kpis(cube)
+            kpis.setdefault('leave_ratio', 0)
+            return kpis
+
         kpis = {}
         
         # 不足・過剰時間
@@ -1009,6 +1030,46 @@ def toggle_main_content(upload_data):
     return {'display': 'none'}
 
 
+# ヒートマップ比較エリアの描画
+@app.callback(
+    Output({'type': 'graph-output-heatmap', 'index': MATCH}, 'children'),
+    [Input({'type': 'heatmap-filter-role', 'index': MATCH}, 'value'),
+     Input({'type': 'heatmap-filter-employment', 'index': MATCH}, 'value')]
+)
+@safe_callback
+def update_heatmap_graph(role_filter, emp_filter):
+    """解析時に作った LOD タイルがあれば全期間を一定のセル数で表示する"""
+    area_index = dash.callback_context.outputs_list['id']['index']
+    fig = create_tile_heatmap_figure(role_filter, emp_filter)
+    if fig is not None:
+        return dcc.Graph(id={'type': 'heatmap-tile-graph', 'index': area_index}, figure=fig)
+
+    # タイルの無い古い結果は元の heat_*.parquet を読んでその場で集約する
+    heat_dir = _heat_dir()
+    if heat_dir is None:
+        return html.Div("ヒートマップデータがありません")
+    df_heat = session_aware_heat_slice(_heatmap_key(role_filter, emp_filter, heat_dir))
+    return dcc.Graph(figure=generate_heatmap_figure(df_heat, _heatmap_title(role_filter, emp_filter)))
+
+
+# ズーム・パンに合わせて表示範囲の解像度で読み直す (LOD タイル)
+@app.callback(
+    Output({'type': 'heatmap-tile-graph', 'index': MATCH}, 'figure'),
+    Input({'type': 'heatmap-tile-graph', 'index': MATCH}, 'relayoutData'),
+    [State({'type': 'heatmap-filter-role', 'index': MATCH}, 'value'),
+     State({'type': 'heatmap-filter-employment', 'index': MATCH}, 'value')],
+    prevent_initial_call=True
+)
+def update_heatmap_viewport(relayout_data, role_filter, emp_filter):
+    viewport = viewport_from_relayout(relayout_data)
+    if viewport is None:
+        raise PreventUpdate
+    fig = create_tile_heatmap_figure(role_filter, emp_filter, *viewport)
+    if fig is None:
+        raise PreventUpdate
+    return fig
+
+
 
 # メモリガードの開始
 memory_guard.start_monitoring()
@@ -1184,6 +1245,9 @@ class ImprovedUnifiedCacheManager:
             
             log.info(f"ManagedCacheを使用 (data:{data_size}, synergy:{synergy_size})")
         
+        # Parquet/CSV 読み込みキャッシュ (プロセス共有・バイト上限)
+        self.frame_cache = FRAME_CACHE
+
         # メモリ監視開始
         self.memory_guard.start_monitoring()
         
@@ -1197,6 +1261,7 @@ class ImprovedUnifiedCacheManager:
             self.data_cache.clear()
         if hasattr(self.synergy_cache, 'clear'):
             self.synergy_cache.clear()
+        self.frame_cache.clear()
         gc.collect()
     
     def get_memory_usage(self):
@@ -1218,6 +1283,7 @@ class ImprovedUnifiedCacheManager:
             'memory': memory_stats,
             'data_cache': data_stats,
             'synergy_cache': synergy_stats,
+            'frame_cache': self.frame_cache.get_stats(),
             'timestamp': datetime.now().isoformat()
         }
 
@@ -1320,7 +1386,8 @@ def detect_slot_intervals_from_data(temp_dir_path: Path, scenarios: List[str]) -
         long_df_path = scenario_path / "intermediate_data.parquet"
         
         if long_df_path.exists():
-            long_df = pd.read_parquet(long_df_path)
+            # スロット検出には ds 列だけあればよい
+            long_df = query_long_df(long_df_path, columns=['ds'], cache=FRAME_CACHE)
             if not long_df.empty and 'ds' in long_df.columns:
                 calculator = TimeAxisShortageCalculator()
                 calculator._detect_and_update_slot_interval(long_df['ds'])
@@ -1342,13 +1409,9 @@ def detect_slot_intervals_from_data(temp_dir_path: Path, scenarios: List[str]) -
         # エラーが発生してもデフォルト値を維持
 
 def get_synergy_cache_key(long_df: pd.DataFrame, shortage_df: pd.DataFrame) -> str:
-    """シナジー分析結果のキャッシュキーを生成"""
+    """シナジー分析結果のキャッシュキーを生成 (両データの内容ハッシュ)"""
     try:
-        # データのハッシュ値を計算してキャッシュキーとする
-        import hashlib
-        long_hash = hashlib.md5(str(long_df.shape).encode() + str(long_df.columns.tolist()).encode()).hexdigest()[:8]
-        shortage_hash = hashlib.md5(str(shortage_df.shape).encode() + str(shortage_df.columns.tolist()).encode()).hexdigest()[:8]
-        return f"synergy_{long_hash}_{shortage_hash}"
+        return f"synergy_{frame_digest(long_df)[:16]}_{frame_digest(shortage_df)[:16]}"
     except Exception as e:
         return "synergy_default"
 
@@ -1432,15 +1495,15 @@ initialize_default_scenario_dir()
 # Temporary directory object for uploaded scenarios
 TEMP_DIR_OBJ: tempfile.TemporaryDirectory | None = None
 
-# ``LOGIC_ANALYSIS_CACHE`` stores results keyed by dataframe hash
-LOGIC_ANALYSIS_CACHE: dict[int, dict[str, object]] = {}
+# ``LOGIC_ANALYSIS_CACHE`` stores results keyed by ``frame_digest`` of the analysed dataframe
+LOGIC_ANALYSIS_CACHE: dict[str, dict[str, object]] = {}
 
-def get_cached_analysis(df_hash: int):
+def get_cached_analysis(df_hash: str):
     """Return cached analysis results for the given hash."""
     return LOGIC_ANALYSIS_CACHE.get(df_hash)
 
 
-def cache_analysis(df_hash: int, results: dict) -> None:
+def cache_analysis(df_hash: str, results: dict) -> None:
     """Cache analysis results keeping at most 3 entries."""
     if len(LOGIC_ANALYSIS_CACHE) >= 3:
         oldest_key = next(iter(LOGIC_ANALYSIS_CACHE))
@@ -1617,9 +1680,12 @@ def date_with_weekday(date_str: str) -> str:
         return str(date_str)
 
 
-@lru_cache(maxsize=8)
-def safe_read_parquet(filepath: Path) -> pd.DataFrame:
-    """Parquetファイルを安全に読み込み結果をキャッシュ"""
+def safe_read_parquet(filepath: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Parquetファイルを安全に読み込み結果をキャッシュ
+
+    キャッシュは (パス, mtime, size, 列) をキーにした FRAME_CACHE (セッション間で共有)。
+    ``columns`` を渡すと必要な列だけを読む。
+    """
     try:
         if not filepath.exists():
             log.debug(f"File does not exist: {filepath}")
@@ -1629,7 +1695,7 @@ def safe_read_parquet(filepath: Path) -> pd.DataFrame:
             log.warning(f"Empty file detected: {filepath}")
             return pd.DataFrame()
             
-        df = pd.read_parquet(filepath)
+        df = FRAME_CACHE.read_parquet(filepath, columns=columns)
         log.debug(f"Successfully loaded {filepath}: shape={df.shape}")
         return df
     except FileNotFoundError:
@@ -1643,7 +1709,6 @@ def safe_read_parquet(filepath: Path) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-@lru_cache(maxsize=8)
 def safe_read_csv(filepath: Path) -> pd.DataFrame:
     """CSVファイルを安全に読み込み（Parquet優先）結果をキャッシュ"""
     try:
@@ -1651,9 +1716,9 @@ def safe_read_csv(filepath: Path) -> pd.DataFrame:
         parquet_path = filepath.with_suffix('.parquet')
         if parquet_path.exists():
             log.debug(f"[PARQUET OPTIMIZATION] Loading Parquet version instead: {parquet_path}")
-            return pd.read_parquet(parquet_path)
+            return FRAME_CACHE.read_parquet(parquet_path)
         
-        return pd.read_csv(filepath)  # type: ignore
+        return FRAME_CACHE.read_csv(filepath)  # type: ignore
     except Exception as e:
         log.warning(f"Failed to read {filepath}: {e}")
         return pd.DataFrame()
@@ -1672,8 +1737,7 @@ def clear_data_cache(session_id=None) -> None:
         # レガシーサポートのための警告のみ
         log.warning('Global cache clear attempted - use session-specific clear instead')
         # DATA_CACHE.clear()  # 無効化
-    safe_read_parquet.cache_clear()
-    safe_read_csv.cache_clear()
+    # FRAME_CACHE はファイル署名をキーにしているため、シナリオが変わっても破棄しない
     
     # 積極的なガベージコレクション
     gc.collect()
@@ -1725,12 +1789,9 @@ def emergency_cleanup():
     
     # メモリ圧迫が続く場合
     if check_memory_pressure():
-        # 段階2: 関数キャッシュをクリア
-        if 'safe_read_parquet' in globals():
-            safe_read_parquet.cache_clear()
-        if 'safe_read_csv' in globals():
-            safe_read_csv.cache_clear()
-        log.info("Stage 2: 関数キャッシュをクリア")
+        # 段階2: ファイル読み込みキャッシュをクリア
+        FRAME_CACHE.clear()
+        log.info("Stage 2: ファイル読み込みキャッシュをクリア")
     
     # それでもメモリ圧迫が続く場合
     if check_memory_pressure():
@@ -2022,6 +2083,7 @@ def session_aware_data_get(key: str, default=None, for_display: bool = False, se
         "shortage_employment_summary": ["shortage_employment_summary.parquet", "shortage_employment_summary.csv", "shortage_employment_summary.xlsx"],
         "fairness_before": ["fairness_before.parquet", "fairness_before.csv", "fairness_before.xlsx"],
         "fairness_after": ["fairness_after.parquet", "fairness_after.csv", "fairness_after.xlsx"],
+        "fairness_cube": ["fairness_cube.parquet"],
         "staff_stats": ["staff_stats.parquet", "staff_stats.csv", "staff_stats.xlsx"],
         "stats_alerts": ["stats_alerts.parquet", "stats_alerts.csv", "stats_alerts.xlsx"],
         "pre_aggregated_data": ["pre_aggregated_data.parquet", "pre_aggregated_data.csv"],
@@ -2307,96 +2369,45 @@ def session_aware_data_get(key: str, default=None, for_display: bool = False, se
     
     if key == "mind_reader_analysis":
         # Mind Reader分析結果をキャッシュから取得または実行
-        cache_key = f"mind_reader_{get_data_hash()}"
+        # 分析はジョブとしてプロセスプールで実行し、このリクエストでは待たない
+        long_df_path = next(
+            (d / "intermediate_data.parquet" for d in search_dirs if (d / "intermediate_data.parquet").exists()),
+            None,
+        )
+        if long_df_path is None:
+            return default
+        # ジョブが読む long_df の内容で識別し、セッションごとに別のジョブにする
+        cache_key = f"mind_reader_{session_id or 'global'}_{file_digest(long_df_path)}"
         # Phase 3: セッション対応
         if session_id:
-            cached_result =get_session_cache_item(session_id, cache_key)
+            cached_result = get_session_cache_item(session_id, cache_key)
         else:
-                    # Phase 3: セッション対応
-                    if session_id:
-                        cached_result = get_session_cache_item(session_id, cache_key)
-                    else:
-                        cached_result = DATA_CACHE.get(cache_key)
+            cached_result = DATA_CACHE.get(cache_key)
         if cached_result is not None:
             return cached_result
-        
-        # リアルタイム分析実行（タイムアウト付き）
-        long_df = session_aware_data_get('long_df', session_id=session_id)
-        if long_df is not None and not long_df.empty:
-            # メモリ使用量チェック
-            if psutil and psutil.virtual_memory().percent > 80:
-                log.warning("メモリ使用率が高いためMind Reader分析をスキップします")
-                return {'status': 'skipped', 'reason': 'high_memory_usage'}
-            
-            mind_reader = ShiftMindReader()
-            try:
-                # Windows/Unix両対応のタイムアウト設定
-                import platform
-                import threading
-                
-                def run_with_timeout(func, args=(), kwargs={}, timeout=30):
-                    """タイムアウト付き関数実行（Windows対応）"""
-                    result = [None]
-                    exception = [None]
-                    
-                    def target():
-                        try:
-                            result[0] = func(*args, **kwargs)
-                        except Exception as e:
-                            exception[0] = e
-                    
-                    thread = threading.Thread(target=target)
-                    thread.daemon = True
-                    thread.start()
-                    thread.join(timeout)
-                    
-                    if thread.is_alive():
-                        # タイムアウト
-                        return None, TimeoutError("Mind Reader analysis timed out")
-                    if exception[0]:
-                        return None, exception[0]
-                    return result[0], None
-                
-                # プラットフォーム判定
-                if platform.system() == 'Windows':
-                    # Windows: threadingを使用
-                    mind_results, error = run_with_timeout(
-                        mind_reader.read_creator_mind, 
-                        args=(long_df,), 
-                        timeout=30
-                    )
-                    if error:
-                        if isinstance(error, TimeoutError):
-                            log.warning("Mind Reader分析がタイムアウトしました")
-                            return {'status': 'timeout', 'reason': 'analysis_timeout'}
-                        else:
-                            raise error
-                else:
-                    # Unix系: signalを使用（既存コード）
-                    import signal
-                    def timeout_handler(signum, frame):
-                        raise TimeoutError("Mind Reader analysis timed out")
-                    
-                    signal.signal(signal.SIGALRM, timeout_handler)
-                    signal.alarm(30)
-                    try:
-                        mind_results = mind_reader.read_creator_mind(long_df)
-                        signal.alarm(0)
-                    finally:
-                        signal.alarm(0)
-                
-                # Phase 3: 内部関数からの外部session_id参照
-                if 'session_id' in locals() and session_id:
-                    set_session_cache_item(session_id, cache_key, mind_results)
-                else:
-                    DATA_CACHE.set(cache_key, mind_results)  # レガシーフォールバック
-                return mind_results
-            except TimeoutError:
-                log.warning("Mind Reader分析がタイムアウトしました")
-                return {'status': 'timeout', 'reason': 'analysis_timeout'}
-            except Exception as e:
-                log.warning(f"Mind Reader分析に失敗: {e}")
-                return {'status': 'error', 'reason': str(e)}
+
+        # メモリ使用量チェック
+        if psutil and psutil.virtual_memory().percent > 80:
+            log.warning("メモリ使用率が高いためMind Reader分析をスキップします")
+            return {'status': 'skipped', 'reason': 'high_memory_usage'}
+        try:
+            # 進捗は poll のたびに processing_monitor の分析ステップへ転送される
+            executor = get_executor(monitor=processing_monitor)
+            job = executor.submit("mind_reader", {"long_df_path": str(long_df_path)}, dedupe_key=cache_key)
+            job = executor.poll(job.id)
+        except Exception as e:
+            log.warning(f"Mind Reader分析に失敗: {e}")
+            return {'status': 'error', 'reason': str(e)}
+        if job.status == "done":
+            if session_id:
+                set_session_cache_item(session_id, cache_key, job.result)
+            else:
+                DATA_CACHE.set(cache_key, job.result)  # レガシーフォールバック
+            return job.result
+        if job.is_final:
+            log.warning(f"Mind Reader分析に失敗: {job.error or job.status}")
+            return {'status': 'error', 'reason': job.error or job.status}
+        return {'status': 'running', 'job_id': job.id, 'progress': job.progress, 'message': job.message}
     
     log.debug(f"データキー '{key}' に対応するファイルが見つかりませんでした。")
     # Phase 3: 内部関数からの外部session_id参照
@@ -2407,6 +2418,82 @@ def session_aware_data_get(key: str, default=None, for_display: bool = False, se
     return default
 
 
+def session_aware_heat_slice(key: str, start=None, end=None) -> pd.DataFrame:
+    """heat_* / need_per_date_slot* の期間内の日付列 (と集計列) だけを読む"""
+    if workspace is None:
+        return pd.DataFrame()
+    for directory in (workspace, workspace.parent):
+        fp = directory / f"{key}.parquet"
+        if fp.exists():
+            try:
+                return read_wide_slice(fp, start=start, end=end, cache=FRAME_CACHE)
+            except Exception as e:
+                log.warning(f"Failed to read {fp}: {type(e).__name__}: {e}")
+                return pd.DataFrame()
+    return pd.DataFrame()
+
+
+def _heat_dir() -> Optional[Path]:
+    """heat_ALL.parquet のあるディレクトリ (シナリオ直下か一つ上)"""
+    if workspace is None:
+        return None
+    for directory in (workspace, workspace.parent):
+        if (directory / "heat_ALL.parquet").exists():
+            return directory
+    return None
+
+
+def _heatmap_key(role_filter, emp_filter, heat_dir: Path) -> str:
+    """フィルターに対応するヒートマップのファイル名 (拡張子なし)。ファイルが無ければ全体"""
+    key = 'heat_ALL'
+    if role_filter and role_filter != 'all' and (heat_dir / f'heat_{role_filter}.parquet').exists():
+        key = f'heat_{role_filter}'
+    if emp_filter and emp_filter != 'all' and (heat_dir / f'heat_emp_{emp_filter}.parquet').exists():
+        key = f'heat_emp_{emp_filter}'
+    return key
+
+
+def _heatmap_title(role_filter, emp_filter) -> str:
+    role = role_filter if role_filter and role_filter != 'all' else '全体'
+    emp = emp_filter if emp_filter and emp_filter != 'all' else '全体'
+    return f"ヒートマップ - {role} / {emp}"
+
+
+def create_tile_heatmap_figure(role_filter, emp_filter, start=None, end=None) -> Optional[go.Figure]:
+    """LOD タイル (heat_tiles/) から ``[start, end]`` を表示用の解像度で描く (タイルが無ければ None)"""
+    heat_dir = _heat_dir()
+    if heat_dir is None:
+        return None
+    key = _heatmap_key(role_filter, emp_filter, heat_dir)
+    try:
+        tile = read_heatmap_tile(heat_dir, key, start=start, end=end, cache=FRAME_CACHE)
+    except Exception as e:
+        log.warning(f"Failed to read heat tile {key}: {type(e).__name__}: {e}")
+        return None
+    if tile is None:
+        return None
+    df, (t_level, d_level) = tile
+
+    fig = go.Figure(data=go.Heatmap(
+        z=df.values,
+        x=pd.to_datetime(df.columns),
+        y=df.index,
+        colorscale='Blues',
+        colorbar=dict(title='人数'),
+    ))
+    fig.update_layout(
+        title=f"{_heatmap_title(role_filter, emp_filter)} (表示単位: {t_level} × {d_level})",
+        height=500,
+        xaxis_title="日付",
+        yaxis_title="時間帯",
+        # ズーム後の再描画でも利用者の表示範囲を保つ
+        uirevision=key,
+    )
+    fig.update_yaxes(autorange='reversed')
+    if start is not None and end is not None:
+        fig.update_xaxes(range=[start, end])
+    return fig
+
 
 def load_advanced_analysis_results(scenario_dir: Path) -> Dict[str, Any]:
     """
@@ -2507,9 +2594,8 @@ def get_data_hash(session_id=None) -> str:
             long_df = (get_session_cache_item(session_id, 'long_df') if session_id else DATA_CACHE.get('long_df'))
 
         if long_df is not None and not long_df.empty:
-            # DataFrameのshapeとカラム名からハッシュを生成
-            hash_str = f"{long_df.shape}_{list(long_df.columns)}"
-            return str(hash(hash_str))
+            # 内容ハッシュ (形と列名が同じ別データでも衝突しない)
+            return frame_digest(long_df)
     except Exception as e:
         pass
     return f"default_{int(time.time())}"
@@ -2667,9 +2753,16 @@ def generate_heatmap_figure(df_heat: pd.DataFrame, title: str, device_type: str
     
     # データ型を数値に変換（エラー回避）
     display_df = display_df.apply(pd.to_numeric, errors='coerce').fillna(0)
-    
+
+    # セル数が多い場合は期間を切らずに時間帯・週/月単位の平均へ集約する (LOD)
+    display_df, (_, d_level) = downsample_wide(display_df, DEFAULT_MAX_CELLS)
+
     display_df_renamed = display_df.copy()
-    display_df_renamed.columns = [date_with_weekday(c) for c in display_df.columns]
+    if d_level == 'day':
+        display_df_renamed.columns = [date_with_weekday(c) for c in display_df.columns]
+    else:
+        suffix = '週' if d_level == 'week' else '月'
+        display_df_renamed.columns = [f"{c} ({suffix})" for c in display_df.columns]
 
     # 🎯 修正: 60日制限を削除（バックアップ版と同じ全期間表示）
     # 先程の60日制限を削除し、全ての日付を表示する
@@ -2821,16 +2914,16 @@ def optimize_heatmap_data(df: pd.DataFrame, max_days: int = 60, remove_zero_rows
     if not date_cols:
         return df
     
-    # 最新の日付から指定数だけを取得
+    # 期間は切り捨てず、列数が max_days 以内になるまで日付方向を週・月単位の平均に集約する
     if len(date_cols) > max_days:
-        log.info(f"[Heatmap最適化] {len(date_cols)}日 -> 直近{max_days}日に制限")
-        # 日付をソートして最新のものを取得
-        sorted_dates = sorted(date_cols, key=lambda x: pd.to_datetime(x, errors='coerce'))
-        recent_dates = sorted_dates[-max_days:]
-        
-        # 必要な列のみを取得
+        for d_level in DATE_LEVELS[1:]:
+            aggregated = aggregate_wide(df[date_cols], 'slot', d_level)
+            if len(aggregated.columns) <= max_days:
+                break
+        log.info(f"[Heatmap最適化] {len(date_cols)}日 -> {d_level}単位 {len(aggregated.columns)}列に集約")
+
         non_date_cols = [c for c in df.columns if c not in date_cols]
-        optimized_df = df[non_date_cols + recent_dates].copy()
+        optimized_df = pd.concat([df[non_date_cols], aggregated], axis=1)
     else:
         optimized_df = df.copy()
     
@@ -3097,9 +3190,22 @@ def create_overview_tab(selected_scenario: str = None, session_id: str = None) -
     # 正しい不足時間計算（元のshortage_timeから直接計算）
     lack_h = 0
     
+    # KPI キューブがあれば全体の不足時間・コストはそこから取る
+    cube_kpis = None
+    if workspace is not None:
+        cube = load_kpi_cube(workspace, cache=FRAME_CACHE)
+        if cube is not None:
+            cube_kpis = overview_kpis(cube)
+    
     # まず元のshortage_timeから正確な値を取得
-    shortage_time_df = session_aware_data_get('shortage_time', pd.DataFrame(), session_id=session_id)
-    if not shortage_time_df.empty:
+    shortage_time_df = (
+        pd.DataFrame() if cube_kpis is not None
+        else session_aware_data_get('shortage_time', pd.DataFrame(), session_id=session_id)
+    )
+    if cube_kpis is not None:
+        lack_h = cube_kpis['facility_lack_hours']
+        log.info(f"不足時間（KPIキューブより）: {lack_h:.2f}h")
+    elif not shortage_time_df.empty:
         try:
             # 数値列のみ取得してスロット数を計算
             numeric_cols = shortage_time_df.select_dtypes(include=[np.number])
@@ -3123,7 +3229,11 @@ def create_overview_tab(selected_scenario: str = None, session_id: str = None) -
     lack_temp_cost = 0
     lack_penalty_cost = 0
     
-    if not df_shortage_role.empty:
+    if cube_kpis is not None:
+        excess_cost = cube_kpis['estimated_excess_cost']
+        lack_temp_cost = cube_kpis['estimated_lack_cost_if_temporary_staff']
+        lack_penalty_cost = cube_kpis['estimated_lack_penalty_cost']
+    elif not df_shortage_role.empty:
         # 合計行があるかチェック
         total_rows = df_shortage_role[df_shortage_role['role'].isin(['全体', '合計', '総計'])]
         if not total_rows.empty:
@@ -3339,7 +3449,7 @@ def create_overview_tab(selected_scenario: str = None, session_id: str = None) -
     ] + (comprehensive_dashboard_content if comprehensive_dashboard_content else []))
 
 
-def create_heatmap_tab() -> html.Div:
+def create_heatmap_tab(session_id: str = None) -> html.Div:
     """ヒートマップタブのレイアウトを生成します。上下2つの比較エリアを持ちます。"""
     roles = session_aware_data_get('roles', [], session_id=session_id)
     employments = session_aware_data_get('employments', [], session_id=session_id)
@@ -3770,37 +3880,51 @@ def create_optimization_tab() -> html.Div:
 
 # Mind Reader分析を動的実行するコールバック
 @app.callback(
-    Output('mind-reader-results', 'children'),
-    [Input('ai-analysis-interval', 'n_intervals'),
-     Input('session-id-store', 'data')],
+    [Output('mind-reader-results', 'children'),
+     Output('ai-analysis-interval', 'disabled')],
+    [Input('main-tabs', 'value'),
+     Input('ai-analysis-interval', 'n_intervals')],
+    [State('session-id-store', 'data')],
     prevent_initial_call=True
 )
 @safe_callback
-def execute_mind_reader_analysis(n_intervals, session_id):
-    """Mind Reader分析をリアルタイム実行"""
-    if n_intervals == 0:
-        raise PreventUpdate
-    
+def execute_mind_reader_analysis(active_tab, n_intervals, session_id):
+    """AI分析タブを開くとジョブを投入し、完了するまで interval で状態を取りに行く"""
+    if active_tab != 'ai-tab':
+        # タブを離れたら問い合わせを止める (ジョブ自体は実行を続ける)
+        return dash.no_update, True
+
     try:
         # Mind Reader分析を実行
         mind_results = session_aware_data_get('mind_reader_analysis', {}, session_id=session_id)
-        
+
+        if isinstance(mind_results, dict) and mind_results.get('status') == 'running':
+            # バックグラウンドジョブの実行中: interval を有効のままにして次の周期で再取得する
+            return html.Div([
+                html.H4(f"⏳ AI分析を実行中... {mind_results.get('progress', 0)}%", style={'color': '#3498db'}),
+                html.P(mind_results.get('message') or "完了すると結果がここに表示されます。")
+            ]), False
+        if isinstance(mind_results, dict) and mind_results.get('status') in ('error', 'skipped'):
+            return html.Div([
+                html.H4("❌ 分析エラー", style={'color': '#e74c3c'}),
+                html.P(f"Error: {mind_results.get('reason')}")
+            ]), True
         if mind_results:
             return html.Div([
                 html.H4("✅ AI分析完了", style={'color': '#27ae60'}),
                 *create_mind_reader_display(mind_results)
-            ])
+            ]), True
         else:
             return html.Div([
                 html.H4("⚠️ 分析データが不足しています", style={'color': '#f39c12'}),
                 html.P("より詳細な分析を行うには、十分なシフトデータが必要です。")
-            ])
-    
+            ]), True
+
     except Exception as e:
         return html.Div([
             html.H4("❌ 分析エラー", style={'color': '#e74c3c'}),
             html.P(f"Error: {str(e)}")
-        ])
+        ]), True
 
 
 # --- アプリケーション起動 ---
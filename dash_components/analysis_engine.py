@@ -21,6 +21,7 @@ from shift_suite.tasks.time_axis_shortage_calculator import (
     calculate_time_axis_shortage,
 )
 from shift_suite.tasks.shortage import assign_shortage_to_individuals
+from shift_suite.tasks.fingerprint import frame_digest
 
 # ログ設定
 log = logging.getLogger(__name__)
@@ -66,7 +67,7 @@ class OptimizedAnalysisEngine:
         log.info(f"[最適化エンジン] 高速計算開始: {heat_key}")
         
         # キャッシュキー生成
-        cache_key = f"role_need_{heat_key}_{len(date_cols)}_{hash(tuple(date_cols))}"
+        cache_key = f"role_need_{heat_key}_{frame_digest(df_heat[date_cols])}"
         if cache_key in self._cache:
             log.info(f"[最適化エンジン] キャッシュヒット: {heat_key}")
             return self._cache[cache_key]
@@ -1,10 +1,15 @@
 """
-shift_suite 初期化（セーフモード）
-  * 問題のあるモジュールをスキップして安全にインポート
+shift_suite 初期化（遅延インポート）
+  * tasks 配下のモジュールは最初に参照されたときに import する
+    (``shift_suite.heatmap`` / ``from shift_suite import heatmap`` も従来どおり可)
+  * 主要関数 (ingest_excel / build_heatmap / ...) も参照時に解決する
+  * 読み込めないモジュールは警告を出して AttributeError とする
 """
 from importlib import import_module
+from importlib.abc import Loader, MetaPathFinder
+from importlib.util import spec_from_loader
 from pathlib import Path
-import pkgutil, sys, importlib
+import pkgutil, sys
 import logging
 
 log = logging.getLogger(__name__)
@@ -14,61 +19,77 @@ PROBLEMATIC_MODULES = {
     # これらのモジュールは現在Lightweightモードで動作中
 }
 
-# ────────────────────────────────────────────── tasks 安全読み込み
 _tasks_dir = Path(__file__).with_name("tasks")
-for modinfo in pkgutil.iter_modules([str(_tasks_dir)]):
-    dotted = f"shift_suite.tasks.{modinfo.name}"   # ex) shift_suite.tasks.heatmap
-    
-    # 問題のあるモジュールをスキップ
-    if modinfo.name in PROBLEMATIC_MODULES:
-        log.warning(f"Skipping problematic module: {modinfo.name}")
-        continue
-    
-    try:
-        mod = import_module(dotted)                 # 実体 import
-        # 旧: shift_suite.<name> でも参照可
-        sys.modules[f"shift_suite.{modinfo.name}"] = mod
-        globals()[modinfo.name] = mod                  # from shift_suite import heatmap
-    except Exception as e:
-        log.warning(f"Failed to import {dotted}: {e}")
-        continue
-
-# ────────────────────────────────────────────── util & 主要関数 re-export
-try:
-    utils = import_module("shift_suite.tasks.utils")
-    
-    excel_date = utils.excel_date
-    to_hhmm = utils.to_hhmm
-    
-    # 安全にインポートできるもののみ
-    safe_imports = [
-        ("io_excel", "ingest_excel"),
-        ("heatmap", "build_heatmap"),
-        ("shortage", "shortage_and_brief"),
-        ("build_stats", "build_stats"),
-        ("anomaly", "detect_anomaly"),
-        ("cluster", "cluster_staff"),
-        ("fairness", "run_fairness"),
-        ("forecast", "build_demand_series"),
-        ("forecast", "forecast_need")
-    ]
-    
-    for module_name, func_name in safe_imports:
+_TASK_MODULES = frozenset(
+    modinfo.name
+    for modinfo in pkgutil.iter_modules([str(_tasks_dir)])
+    if modinfo.name not in PROBLEMATIC_MODULES
+)
+
+# 主要関数 re-export: 名前 → tasks 配下のモジュール
+_EXPORTS = {
+    "excel_date": "utils",
+    "to_hhmm": "utils",
+    "ingest_excel": "io_excel",
+    "build_heatmap": "heatmap",
+    "shortage_and_brief": "shortage",
+    "build_stats": "build_stats",
+    "detect_anomaly": "anomaly",
+    "cluster_staff": "cluster",
+    "run_fairness": "fairness",
+    "build_demand_series": "forecast",
+    "forecast_need": "forecast",
+    # 軽量版の代替
+    "ShiftMindReaderLite": "shift_mind_reader_lite",
+}
+
+
+def _load_task(name: str):
+    """``shift_suite.tasks.<name>`` を import し、旧名 ``shift_suite.<name>`` も登録する"""
+    mod = import_module(f"shift_suite.tasks.{name}")
+    sys.modules.setdefault(f"{__name__}.{name}", mod)
+    return mod
+
+
+class _TaskAliasFinder(MetaPathFinder, Loader):
+    """旧: ``import shift_suite.<name>`` を ``shift_suite.tasks.<name>`` に振り向ける
+
+    実モジュールを create_module で返すと import 機構がその ``__spec__`` を
+    別名のものに書き換え、``importlib.reload`` が効かなくなる。
+    そのため別名用の空モジュールを作らせ、exec_module で sys.modules の
+    別名エントリを実モジュールに差し替える (import 文は sys.modules の値を返す)。
+    """
+
+    def find_spec(self, fullname, path=None, target=None):
+        pkg, _, name = fullname.rpartition(".")
+        if pkg == __name__ and name in _TASK_MODULES:
+            return spec_from_loader(fullname, self)
+        return None
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        sys.modules[module.__name__] = _load_task(module.__name__.rpartition(".")[2])
+
+
+if not any(isinstance(f, _TaskAliasFinder) for f in sys.meta_path):
+    sys.meta_path.append(_TaskAliasFinder())
+
+
+def __getattr__(name: str):
+    if name in _TASK_MODULES or name in _EXPORTS:
+        module_name = _EXPORTS.get(name, name)
         try:
-            if f"shift_suite.{module_name}" in sys.modules:
-                globals()[func_name] = getattr(sys.modules[f"shift_suite.{module_name}"], func_name)
-            elif f"shift_suite.tasks.{module_name}" in sys.modules:
-                globals()[func_name] = getattr(sys.modules[f"shift_suite.tasks.{module_name}"], func_name)
-        except (AttributeError, KeyError) as e:
-            log.warning(f"Could not import {func_name} from {module_name}: {e}")
-            
-except Exception as e:
-    log.error(f"Failed to setup basic utilities: {e}")
-
-# 軽量版の代替インポート
-try:
-    from .tasks.shift_mind_reader_lite import ShiftMindReaderLite
-    globals()['ShiftMindReaderLite'] = ShiftMindReaderLite
-    log.info("ShiftMindReaderLite available as fallback")
-except ImportError as e:
-    log.warning(f"ShiftMindReaderLite not available: {e}")
\ No newline at end of file
+            mod = _load_task(module_name)
+            value = mod if name == module_name else getattr(mod, name)
+        except Exception as e:
+            log.warning(f"Failed to import shift_suite.tasks.{module_name}: {e}")
+            raise AttributeError(f"module {__name__} has no attribute {name}") from e
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__} has no attribute {name}")
+
+
+def __dir__():
+    return sorted(set(globals()) | _TASK_MODULES | set(_EXPORTS))
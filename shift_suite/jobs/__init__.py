@@ -0,0 +1,29 @@
+"""shift_suite.jobs – 重い解析のバックグラウンド実行
+
+    from shift_suite.jobs import get_executor
+
+    job = get_executor().submit("blueprint", {"scenario_dir": str(out_dir)})
+    get_executor().poll(job.id).status   # queued / running / done / failed / cancelled
+
+ジョブはローカルのプロセスプールで動き、状態・進捗・結果は SQLite の
+ジョブ表に書かれる。Dash のコールバックはジョブ ID を返してすぐ終わり、
+結果は dcc.Interval で poll する。
+"""
+from .executor import JOB_KINDS, JobCancelled, JobContext, JobExecutor, get_executor, register_job
+from .store import CANCELLED, DONE, FAILED, QUEUED, RUNNING, Job, JobStore
+
+__all__ = [
+    "CANCELLED",
+    "DONE",
+    "FAILED",
+    "JOB_KINDS",
+    "Job",
+    "JobCancelled",
+    "JobContext",
+    "JobExecutor",
+    "JobStore",
+    "QUEUED",
+    "RUNNING",
+    "get_executor",
+    "register_job",
+]
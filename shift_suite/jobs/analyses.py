@@ -0,0 +1,69 @@
+# shift_suite / jobs / analyses.py
+"""
+shift_suite.jobs.analyses  v1.0.0
+────────────────────────────────────────────────────────
+* バックグラウンドジョブとして実行する重い解析 (``JOB_KINDS`` に登録済み)
+    - blueprint: ブループリント (暗黙の配置ルール) 分析
+    - mind_reader_lite / mind_reader: シフト作成者の思考パターン分析
+* いずれも ``scenario_dir`` (または ``long_df_path``) から long_df を読み、
+  JSON にできる dict を返す
+    - 解析器はカテゴリ列を前提にしないため、long_df は object 列に戻して渡す
+    - 結果中の dataclass (ShiftRule など) は dict にする
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any, Dict
+
+import pandas as pd
+
+from .executor import JobContext
+
+log = logging.getLogger(__name__)
+
+_LONG_DF_FILES = ("intermediate_data.parquet", "long_df.parquet")
+
+
+def _load_long_df(scenario_dir: str | None = None, long_df_path: str | None = None) -> pd.DataFrame:
+    """シナリオ (またはその親) の long_df を読む。無ければ FileNotFoundError"""
+    from ..tasks.long_df_schema import object_long_df, read_long_df
+
+    if long_df_path is not None:
+        candidates = [Path(long_df_path)]
+    else:
+        base = Path(scenario_dir)
+        candidates = [d / name for d in (base, base.parent) for name in _LONG_DF_FILES]
+    for fp in candidates:
+        if fp.exists():
+            df = read_long_df(fp) if fp.name == _LONG_DF_FILES[0] else pd.read_parquet(fp)
+            return object_long_df(df)
+    raise FileNotFoundError("分析用データがありません")
+
+
+def blueprint_analysis(ctx: JobContext, scenario_dir: str) -> Dict[str, Any]:
+    from ..tasks.blueprint_integrated_system import BlueprintIntegratedConstraintSystem
+
+    ctx.progress(5, "データ読み込み")
+    long_df = _load_long_df(scenario_dir)
+    ctx.progress(20, "ブループリント分析")
+    return BlueprintIntegratedConstraintSystem().execute_blueprint_analysis(long_df)
+
+
+def mind_reader_lite(ctx: JobContext, scenario_dir: str) -> Dict[str, Any]:
+    from ..tasks.shift_mind_reader_lite import ShiftMindReaderLite
+
+    ctx.progress(5, "データ読み込み")
+    long_df = _load_long_df(scenario_dir)
+    ctx.progress(20, "思考パターン分析 (軽量版)")
+    return ShiftMindReaderLite().read_creator_mind(long_df)
+
+
+def mind_reader(ctx: JobContext, scenario_dir: str | None = None, long_df_path: str | None = None) -> Dict[str, Any]:
+    from ..tasks.shift_mind_reader import ShiftMindReader
+
+    ctx.progress(5, "データ読み込み")
+    long_df = _load_long_df(scenario_dir, long_df_path)
+    ctx.progress(20, "思考パターン分析")
+    return ShiftMindReader().read_creator_mind(long_df)
@@ -0,0 +1,229 @@
+# shift_suite / jobs / executor.py
+"""
+shift_suite.jobs.executor  v1.0.0
+────────────────────────────────────────────────────────
+* 重い解析を Web のリクエストスレッドから外すジョブ実行器
+    - :meth:`JobExecutor.submit` はジョブを登録してすぐ :class:`Job` を返す。
+      実体はローカルのプロセスプール (spawn) で動き、状態・進捗・結果は
+      :class:`JobStore` (SQLite) に書かれる
+    - :meth:`poll` / :meth:`cancel` / :meth:`result` は ID でジョブ表を引くだけ
+      なので、どのワーカー・どのセッションからでも呼べる
+    - ``dedupe_key`` を渡すと、同じキーで実行中・成功済みのジョブを再利用する
+* ジョブ関数は ``fn(ctx: JobContext, **params)``。``ctx.progress(%, 文言)`` で
+  進捗を書き、取り消しが要求されていれば :class:`JobCancelled` が送出される
+  (実行中のプロセスは強制終了しない)
+* ``monitor`` (dash_components.processing_monitor の ProcessingMonitor など) を
+  渡すと、poll のたびに進捗を ``analysis`` ステップへ転送する
+* ジョブの種類は ``JOB_KINDS`` (種類 → ``"モジュール:関数"``) で登録する
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+from .store import CANCELLED, DONE, FAILED, RUNNING, Job, JobStore
+
+log = logging.getLogger(__name__)
+
+JOB_KINDS: Dict[str, str] = {
+    "blueprint": "shift_suite.jobs.analyses:blueprint_analysis",
+    "mind_reader_lite": "shift_suite.jobs.analyses:mind_reader_lite",
+    "mind_reader": "shift_suite.jobs.analyses:mind_reader",
+}
+
+MONITOR_STEP = "analysis"
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when cancellation has been requested."""
+
+
+@dataclass(frozen=True)
+class JobContext:
+    """What a job function sees: its id and a handle to report progress."""
+
+    job_id: str
+    db_path: str
+
+    def progress(self, progress: int, message: str = "") -> None:
+        store = JobStore(self.db_path)
+        if store.is_cancel_requested(self.job_id):
+            raise JobCancelled(self.job_id)
+        store.set_progress(self.job_id, progress, message)
+
+    def cancelled(self) -> bool:
+        return JobStore(self.db_path).is_cancel_requested(self.job_id)
+
+
+def register_job(kind: str, target: str | Callable[..., Any]) -> None:
+    """ジョブの種類を登録する (``target`` はモジュールレベルの関数か ``"module:func"``)"""
+    if callable(target):
+        target = f"{target.__module__}:{target.__qualname__}"
+    JOB_KINDS[kind] = target
+
+
+def _resolve(target: str) -> Callable[..., Any]:
+    module, _, name = target.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def _run_job(db_path: str, job_id: str, target: str, params: Dict[str, Any]) -> None:
+    """ジョブの子プロセス側 (例外は表に書き、プールへは投げない)"""
+    store = JobStore(db_path)
+    if not store.mark_running(job_id):
+        return
+    ctx = JobContext(job_id, db_path)
+    try:
+        result = _resolve(target)(ctx, **params)
+    except JobCancelled:
+        store.mark_cancelled(job_id)
+        log.info(f"[jobs] 取り消されました: {job_id}")
+    except Exception as e:  # noqa: BLE001 - ジョブの失敗は表に記録する
+        log.warning(f"[jobs] 失敗: {job_id} ({target}): {e}")
+        store.fail(job_id, f"{type(e).__name__}: {e}")
+    else:
+        store.finish(job_id, result)
+
+
+def _default_workers() -> int:
+    return max(1, int(os.getenv("SHIFT_SUITE_JOB_WORKERS", min(2, os.cpu_count() or 1))))
+
+
+class JobExecutor:
+    """Runs registered analyses in a process pool and tracks them in a :class:`JobStore`."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        *,
+        max_workers: int | None = None,
+        monitor: Any = None,
+        pool: Executor | None = None,
+    ) -> None:
+        self.store = store
+        self.max_workers = max_workers or _default_workers()
+        self.monitor = monitor
+        self._pool = pool
+        self._futures: Dict[str, Future] = {}
+        self._forwarded: Dict[str, Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+        store.recover_interrupted()
+
+    def _get_pool(self) -> Executor:
+        with self._lock:
+            if self._pool is None:
+                # Dash はマルチスレッドで動くため fork ではなく spawn で子プロセスを作る
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    # ── 投入・参照 ───────────────────────────────────────────────────
+    def submit(self, kind: str, params: Dict[str, Any] | None = None, *, dedupe_key: str | None = None) -> Job:
+        """ジョブを登録してすぐ返す (実行はプロセスプールで)"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"unknown job kind: {kind!r} (registered: {sorted(JOB_KINDS)})")
+        if dedupe_key is not None:
+            existing = self.store.find_reusable(dedupe_key)
+            if existing is not None:
+                return existing
+        job = self.store.create(kind, params, dedupe_key=dedupe_key)
+        future = self._get_pool().submit(_run_job, str(self.store.path), job.id, JOB_KINDS[kind], dict(params or {}))
+        with self._lock:
+            self._futures[job.id] = future
+        future.add_done_callback(lambda f, job_id=job.id: self._on_done(job_id, f))
+        log.info(f"[jobs] 投入: {kind} ({job.id})")
+        return job
+
+    def _on_done(self, job_id: str, future: Future) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+        if future.cancelled():
+            self.store.mark_cancelled(job_id)
+            return
+        exc = future.exception()
+        if exc is not None:
+            # プロセスの異常終了など、ジョブ関数の外での失敗
+            self.store.fail(job_id, f"{type(exc).__name__}: {exc}")
+
+    def poll(self, job_id: str) -> Job | None:
+        """ジョブの現在の状態 (``monitor`` があれば進捗を転送する)"""
+        job = self.store.get(job_id)
+        if job is not None and self.monitor is not None:
+            self._forward(job)
+        return job
+
+    def result(self, job_id: str) -> Any:
+        """成功したジョブの結果。未完了・失敗なら例外"""
+        job = self.store.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job.status == DONE:
+            return job.result
+        if job.status == FAILED:
+            raise RuntimeError(job.error)
+        raise RuntimeError(f"job {job_id} is {job.status}")
+
+    def cancel(self, job_id: str) -> Job | None:
+        """未開始のジョブは取り消し、実行中のジョブには取り消しを要求する"""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()
+        return self.store.request_cancel(job_id)
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    # ── 進捗の転送 ───────────────────────────────────────────────────
+    def _forward(self, job: Job) -> None:
+        state = (job.status, job.progress)
+        if self._forwarded.get(job.id) == state:
+            return
+        self._forwarded[job.id] = state
+        label = f"{job.kind}: {job.message}" if job.message else job.kind
+        try:
+            if job.status == RUNNING:
+                self.monitor.update_step_progress(MONITOR_STEP, job.progress, label)
+            elif job.status == DONE:
+                self.monitor.complete_step(MONITOR_STEP, f"{job.kind}: 完了")
+            elif job.status in (FAILED, CANCELLED):
+                self.monitor.fail_step(MONITOR_STEP, f"{job.kind}: {job.error or job.status}")
+        except Exception as e:  # noqa: BLE001 - 表示側の失敗でジョブを止めない
+            log.debug(f"[jobs] 進捗転送に失敗: {e}")
+
+
+_DEFAULT: JobExecutor | None = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_job_db() -> Path:
+    """既定のジョブ表 (``SHIFT_SUITE_JOB_DB``、無ければ一時ディレクトリ)"""
+    env = os.getenv("SHIFT_SUITE_JOB_DB")
+    if env:
+        return Path(env)
+    import tempfile
+
+    return Path(tempfile.gettempdir()) / "shift_suite_jobs.sqlite3"
+
+
+def get_executor(monitor: Any = None) -> JobExecutor:
+    """プロセス共有の :class:`JobExecutor` (初回呼び出し時に作る)"""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = JobExecutor(JobStore(default_job_db()), monitor=monitor)
+        elif monitor is not None and _DEFAULT.monitor is None:
+            _DEFAULT.monitor = monitor
+        return _DEFAULT
@@ -0,0 +1,252 @@
+# shift_suite / jobs / store.py
+"""
+shift_suite.jobs.store  v1.0.0
+────────────────────────────────────────────────────────
+* バックグラウンド解析ジョブの SQLite テーブル (1 ファイル)
+    - 状態: queued → running → done / failed / cancelled
+    - 進捗 (0-100 と文言)・結果 (JSON)・エラー文言・取り消し要求を持つ
+    - 接続は操作ごとに開くので、Dash のワーカープロセスとジョブの
+      子プロセスが同じファイルを同時に読み書きできる (WAL)
+* ``owner`` は投入したプロセスの pid。そのプロセスが消えたまま
+  queued / running で残ったジョブは :meth:`JobStore.recover_interrupted` で failed にする
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+import dataclasses
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+log = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+FINAL_STATUSES = (DONE, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    message TEXT NOT NULL DEFAULT '',
+    params TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    dedupe_key TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner INTEGER,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, created);
+"""
+
+
+@dataclass(frozen=True)
+class Job:
+    """One row of the job table."""
+
+    id: str
+    kind: str
+    status: str
+    progress: int
+    message: str
+    params: Dict[str, Any]
+    result: Any
+    error: Optional[str]
+    dedupe_key: Optional[str]
+    cancel_requested: bool
+    created: float
+    started: Optional[float]
+    finished: Optional[float]
+
+    @property
+    def is_final(self) -> bool:
+        return self.status in FINAL_STATUSES
+
+
+def _json_default(value: Any) -> Any:
+    """json.dumps が扱えない値: dataclass は dict、numpy / pandas は素の値にする"""
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "to_dict") and hasattr(value, "columns"):  # DataFrame
+        return value.to_dict(orient="records")
+    if hasattr(value, "tolist"):  # numpy 配列・スカラー、Series
+        return value.tolist()
+    if hasattr(value, "isoformat"):  # datetime / Timestamp
+        return value.isoformat()
+    return str(value)
+
+
+def _to_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def _row_to_job(row: sqlite3.Row) -> Job:
+    return Job(
+        id=row["id"],
+        kind=row["kind"],
+        status=row["status"],
+        progress=int(row["progress"]),
+        message=row["message"],
+        params=json.loads(row["params"]),
+        result=json.loads(row["result"]) if row["result"] is not None else None,
+        error=row["error"],
+        dedupe_key=row["dedupe_key"],
+        cancel_requested=bool(row["cancel_requested"]),
+        created=row["created"],
+        started=row["started"],
+        finished=row["finished"],
+    )
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        import psutil
+    except ImportError:  # pragma: no cover - psutil は requirements に含まれる
+        return True
+    return psutil.pid_exists(pid)
+
+
+class JobStore:
+    """SQLite-backed job table shared by the web workers and the job processes."""
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        con = sqlite3.connect(self.path, timeout=30)
+        con.row_factory = sqlite3.Row
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    # ── 登録・参照 ───────────────────────────────────────────────────
+    def create(self, kind: str, params: Dict[str, Any] | None = None, *, dedupe_key: str | None = None) -> Job:
+        job_id = uuid.uuid4().hex
+        with self._connect() as con:
+            con.execute(
+                "INSERT INTO jobs (id, kind, status, params, dedupe_key, owner, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, _to_json(params or {}), dedupe_key, os.getpid(), time.time()),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Job | None:
+        with self._connect() as con:
+            row = con.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row is not None else None
+
+    def find_reusable(self, dedupe_key: str) -> Job | None:
+        """同じ ``dedupe_key`` で実行中または成功済みの最新ジョブ"""
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT * FROM jobs WHERE dedupe_key = ? AND status IN (?, ?, ?) ORDER BY created DESC LIMIT 1",
+                (dedupe_key, QUEUED, RUNNING, DONE),
+            ).fetchone()
+        return _row_to_job(row) if row is not None else None
+
+    def list(self, *, status: str | None = None, limit: int = 50) -> List[Job]:
+        with self._connect() as con:
+            if status is None:
+                rows = con.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+            else:
+                rows = con.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY created DESC LIMIT ?", (status, limit)
+                ).fetchall()
+        return [_row_to_job(r) for r in rows]
+
+    # ── 状態遷移 ─────────────────────────────────────────────────────
+    def mark_running(self, job_id: str) -> bool:
+        """queued → running。取り消し済みなら False"""
+        with self._connect() as con:
+            cur = con.execute(
+                "UPDATE jobs SET status = ?, started = ? WHERE id = ? AND status = ? AND cancel_requested = 0",
+                (RUNNING, time.time(), job_id, QUEUED),
+            )
+        return cur.rowcount == 1
+
+    def set_progress(self, job_id: str, progress: int, message: str = "") -> None:
+        with self._connect() as con:
+            con.execute(
+                "UPDATE jobs SET progress = ?, message = ? WHERE id = ? AND status = ?",
+                (min(100, max(0, int(progress))), message, job_id, RUNNING),
+            )
+
+    def finish(self, job_id: str, result: Any) -> None:
+        self._finalize(job_id, DONE, result=_to_json(result), progress=100)
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._finalize(job_id, FAILED, error=error)
+
+    def mark_cancelled(self, job_id: str) -> None:
+        self._finalize(job_id, CANCELLED)
+
+    def _finalize(self, job_id: str, status: str, *, result: str | None = None, error: str | None = None,
+                  progress: int | None = None) -> None:
+        with self._connect() as con:
+            con.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ?, progress = COALESCE(?, progress) "
+                "WHERE id = ? AND status IN (?, ?)",
+                (status, result, error, time.time(), progress, job_id, QUEUED, RUNNING),
+            )
+
+    def request_cancel(self, job_id: str) -> Job | None:
+        """queued のジョブはその場で取り消し、running のジョブには取り消しを要求する"""
+        with self._connect() as con:
+            con.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status IN (?, ?)", (job_id, QUEUED, RUNNING))
+            con.execute(
+                "UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED),
+            )
+        return self.get(job_id)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._connect() as con:
+            row = con.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    # ── 保守 ─────────────────────────────────────────────────────────
+    def recover_interrupted(self) -> int:
+        """投入したプロセスが既に無い queued / running のジョブを failed にする"""
+        with self._connect() as con:
+            rows = con.execute(
+                "SELECT id, owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+        stale = [r["id"] for r in rows if r["owner"] is None or not _pid_alive(int(r["owner"]))]
+        for job_id in stale:
+            self.fail(job_id, "プロセスの再起動により中断されました")
+        if stale:
+            log.info(f"[jobs] 中断されたジョブ {len(stale)} 件を failed にしました")
+        return len(stale)
+
+    def prune(self, older_than_s: float = 7 * 24 * 3600) -> int:
+        """終了から ``older_than_s`` 秒を過ぎたジョブを削除する"""
+        with self._connect() as con:
+            cur = con.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished < ?",
+                (*FINAL_STATUSES, time.time() - older_than_s),
+            )
+        return cur.rowcount
@@ -0,0 +1,4 @@
+"""shift_suite.perf – 性能計測・回帰ベンチマーク用ツール群
+
+各モジュールは ``python -m shift_suite.perf.<name>`` で単体実行できる。
+"""
@@ -0,0 +1,152 @@
+"""ingest_excel エンジン比較ベンチマーク
+
+    python -m shift_suite.perf.ingest                       # 合成ブックで計測
+    python -m shift_suite.perf.ingest book.xlsx --sheets 6月 7月 --header 2 --ymcell A1
+
+legacy / columnar の両エンジンで同じブックを取り込み、所要時間と
+``long_df`` が行単位で一致するかを報告する。
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from ..tasks.io_excel import INGEST_ENGINES, ingest_excel
+
+_SYNTH_PATTERNS = [
+    ("日", "09:00", "18:00", ""),
+    ("早", "07:00", "16:00", ""),
+    ("遅", "12:00", "21:00", ""),
+    ("夜", "16:30", "09:30", ""),
+    ("明", "", "", "休暇"),
+    ("休", "", "", ""),
+    ("有", "", "", "有給"),
+    ("希", "", "", ""),
+]
+
+
+def make_synthetic_workbook(
+    path: Path, *, n_staff: int = 300, months: int = 3, seed: int = 0
+) -> List[str]:
+    """Write a multi-sheet shift workbook and return the shift sheet names.
+
+    Each sheet holds one month with the year-month in ``A1`` and the header on
+    row 2, i.e. ``header_row=1, year_month_cell_location="A1"``.
+    """
+    from openpyxl import Workbook
+
+    rng = random.Random(seed)
+    codes = [p[0] for p in _SYNTH_PATTERNS] + [""]
+    roles = ["介護", "看護", "事務", "リハビリ", "相談員"]
+    employments = ["常勤", "パート", "派遣"]
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "勤務区分"
+    ws.append(["記号", "開始", "終了", "備考"])
+    for row in _SYNTH_PATTERNS:
+        ws.append(list(row))
+
+    sheets: List[str] = []
+    first = dt.date(2024, 4, 1)
+    for m in range(months):
+        month_start = (pd.Timestamp(first) + pd.DateOffset(months=m)).date()
+        n_days = pd.Timestamp(month_start).days_in_month
+        name = f"{month_start.month}月"
+        sh = wb.create_sheet(name)
+        sh.append([f"{month_start.year}年{month_start.month}月"])
+        sh.append(["氏名", "職種", "雇用形態"] + [f"{d}日" for d in range(1, n_days + 1)])
+        for s in range(n_staff):
+            sh.append(
+                [f"職員{s:04d}", roles[s % len(roles)], employments[s % len(employments)]]
+                + [rng.choice(codes) for _ in range(n_days)]
+            )
+        sheets.append(name)
+    wb.save(path)
+    return sheets
+
+
+def benchmark_ingest(
+    excel_path: Path,
+    *,
+    shift_sheets: List[str],
+    header_row: int = 0,
+    year_month_cell_location: str | None = None,
+    repeat: int = 1,
+) -> Dict[str, Any]:
+    """Run every ingest engine on ``excel_path`` and compare their output."""
+    timings: Dict[str, float] = {}
+    outputs: Dict[str, tuple] = {}
+    for engine in INGEST_ENGINES:
+        best = float("inf")
+        for _ in range(max(1, repeat)):
+            t0 = time.perf_counter()
+            outputs[engine] = ingest_excel(
+                excel_path,
+                shift_sheets=shift_sheets,
+                header_row=header_row,
+                year_month_cell_location=year_month_cell_location,
+                engine=engine,
+            )
+            best = min(best, time.perf_counter() - t0)
+        timings[engine] = best
+
+    legacy_df, _, legacy_unknown = outputs["legacy"]
+    columnar_df, _, columnar_unknown = outputs["columnar"]
+    try:
+        pd.testing.assert_frame_equal(columnar_df, legacy_df)
+        identical = columnar_unknown == legacy_unknown
+    except AssertionError:
+        identical = False
+
+    return {
+        "rows": len(columnar_df),
+        "seconds": timings,
+        "speedup": timings["legacy"] / timings["columnar"] if timings["columnar"] else float("nan"),
+        "identical": identical,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="ingest_excel エンジン比較")
+    p.add_argument("xlsx", nargs="?", help="Excel シフト原本 (省略時は合成データ)")
+    p.add_argument("--sheets", nargs="+", help="対象シート名")
+    p.add_argument("--header", type=int, default=1, help="ヘッダー行 (0-indexed)")
+    p.add_argument("--ymcell", type=str, default=None, help="年月情報セル位置")
+    p.add_argument("--staff", type=int, default=300, help="合成データのスタッフ数")
+    p.add_argument("--months", type=int, default=3, help="合成データの月数")
+    p.add_argument("--repeat", type=int, default=1)
+    a = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if a.xlsx:
+            book, sheets, ymcell = Path(a.xlsx), a.sheets or [], a.ymcell
+        else:
+            book = Path(tmp) / "synthetic_shift.xlsx"
+            sheets = make_synthetic_workbook(book, n_staff=a.staff, months=a.months)
+            ymcell = a.ymcell or "A1"
+        result = benchmark_ingest(
+            book,
+            shift_sheets=sheets,
+            header_row=a.header,
+            year_month_cell_location=ymcell,
+            repeat=a.repeat,
+        )
+
+    print(f"rows      : {result['rows']:,}")
+    for engine, sec in result["seconds"].items():
+        print(f"{engine:<10}: {sec:.3f}s")
+    print(f"speedup   : x{result['speedup']:.1f}")
+    print(f"identical : {result['identical']}")
+    return 0 if result["identical"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,118 @@
+"""calculate_pattern_based_need エンジン比較ベンチマーク
+
+    python -m shift_suite.perf.need                 # 合成実績 (90 日 × 48 スロット)
+    python -m shift_suite.perf.need --days 365 --repeat 3
+
+numpy / legacy の両エンジンを統計手法・外れ値除去・ゼロ日扱いの
+全組合せで実行し、所要時間と結果が完全一致するかを報告する。
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import itertools
+import logging
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from ..tasks.heatmap import NEED_ENGINES, calculate_pattern_based_need
+from ..tasks.utils import gen_labels
+
+STATISTIC_METHODS = (
+    "10パーセンタイル",
+    "25パーセンタイル",
+    "中央値",
+    "平均値",
+    "75パーセンタイル",
+    "90パーセンタイル",
+)
+
+
+def make_synthetic_actuals(
+    *, days: int = 90, slot_minutes: int = 30, seed: int = 0, missing_ratio: float = 0.05
+) -> pd.DataFrame:
+    """Return a ``time × date`` staff-count frame shaped like build_heatmap's input.
+
+    A few cells are left as ``NaN`` so both ``include_zero_days`` branches are
+    exercised; Sundays are kept sparse to trigger the low-staff rules.
+    """
+    rng = np.random.default_rng(seed)
+    labels = gen_labels(slot_minutes)
+    dates = [dt.date(2024, 4, 1) + dt.timedelta(days=i) for i in range(days)]
+    base = 4 + 3 * np.sin(np.linspace(0, 2 * np.pi, len(labels)))[:, None]
+    counts = rng.poisson(np.clip(base, 0.5, None), size=(len(labels), days)).astype(float)
+    sundays = np.array([d.weekday() == 6 for d in dates])
+    counts[:, sundays] = rng.poisson(0.4, size=(len(labels), int(sundays.sum())))
+    counts[rng.random(counts.shape) < missing_ratio] = np.nan
+    return pd.DataFrame(counts, index=pd.Index(labels, name="time"), columns=dates)
+
+
+def benchmark_need(
+    actuals: pd.DataFrame, *, slot_minutes: int = 30, repeat: int = 1
+) -> Dict[str, Any]:
+    """Run both need engines over every option combination and compare."""
+    ref_start, ref_end = min(actuals.columns), max(actuals.columns)
+    timings = {engine: 0.0 for engine in NEED_ENGINES}
+    mismatches: List[tuple] = []
+    # legacy 版の時間帯ごとのログ出力を計測に含めない
+    logging.disable(logging.INFO)
+    try:
+        for method, remove_outliers, include_zero in itertools.product(
+            STATISTIC_METHODS, (True, False), (True, False)
+        ):
+            outputs = {}
+            for engine in NEED_ENGINES:
+                best = float("inf")
+                for _ in range(max(1, repeat)):
+                    t0 = time.perf_counter()
+                    outputs[engine] = calculate_pattern_based_need(
+                        actuals,
+                        ref_start,
+                        ref_end,
+                        method,
+                        remove_outliers,
+                        slot_minutes_for_empty=slot_minutes,
+                        include_zero_days=include_zero,
+                        engine=engine,
+                    )
+                    best = min(best, time.perf_counter() - t0)
+                timings[engine] += best
+            if not outputs["numpy"].equals(outputs["legacy"]):
+                mismatches.append((method, remove_outliers, include_zero))
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return {
+        "cells": actuals.size,
+        "seconds": timings,
+        "speedup": timings["legacy"] / timings["numpy"] if timings["numpy"] else float("nan"),
+        "identical": not mismatches,
+        "mismatches": mismatches,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="calculate_pattern_based_need エンジン比較")
+    p.add_argument("--days", type=int, default=90, help="合成実績の日数")
+    p.add_argument("--slot", type=int, default=30, help="スロット長 (分)")
+    p.add_argument("--repeat", type=int, default=1)
+    a = p.parse_args(argv)
+
+    actuals = make_synthetic_actuals(days=a.days, slot_minutes=a.slot)
+    result = benchmark_need(actuals, slot_minutes=a.slot, repeat=a.repeat)
+
+    print(f"cells     : {result['cells']:,} × {len(STATISTIC_METHODS) * 4} 組合せ")
+    for engine, sec in result["seconds"].items():
+        print(f"{engine:<10}: {sec:.3f}s")
+    print(f"speedup   : x{result['speedup']:.1f}")
+    print(f"identical : {result['identical']}")
+    for m in result["mismatches"]:
+        print(f"  mismatch: {m}")
+    return 0 if result["identical"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
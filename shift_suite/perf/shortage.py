@@ -0,0 +1,164 @@
+"""shortage_and_brief エンジン比較ベンチマーク
+
+    python -m shift_suite.perf.shortage                   # 職種 5 / 20 / 80 で計測
+    python -m shift_suite.perf.shortage --roles 10 40 160 --days 180
+
+合成ヒートマップ (heat_*.parquet / need_per_date_slot_*.parquet /
+heatmap.meta.json) を職種数を変えて作り、numpy / legacy の両エンジンで
+shortage_and_brief を実行して所要時間とサマリーが完全一致するかを報告する。
+"""
+from __future__ import annotations
+
+import argparse
+import datetime as dt
+import json
+import logging
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from ..tasks.constants import SUMMARY5
+from ..tasks.shortage import shortage_and_brief
+from ..tasks.shortage_kernel import SHORTAGE_ENGINES
+from ..tasks.utils import gen_labels
+
+SUMMARY_FILES = (
+    "shortage_role_summary.parquet",
+    "shortage_role_monthly.parquet",
+    "shortage_employment_summary.parquet",
+    "shortage_employment_monthly.parquet",
+)
+
+
+def _heat_frame(counts: np.ndarray, need: np.ndarray, upper: np.ndarray | None, labels, dates) -> pd.DataFrame:
+    df = pd.DataFrame(counts, index=pd.Index(labels, name="time"), columns=dates)
+    df["need"] = need
+    df["upper"] = upper if upper is not None else need
+    df["staff"] = df[dates].mean(axis=1)
+    df["lack"] = (df["need"] - df["staff"]).clip(lower=0)
+    df["excess"] = (df["staff"] - df["upper"]).clip(lower=0)
+    if upper is None:
+        df = df.drop(columns="upper")
+    return df
+
+
+def make_synthetic_heatmaps(
+    out_dir: Path,
+    *,
+    roles: int = 5,
+    employments: int = 3,
+    days: int = 61,
+    slot_minutes: int = 30,
+    seed: int = 0,
+) -> Path:
+    """Write build_heatmap-shaped outputs for ``roles`` roles into ``out_dir``.
+
+    Every 7th day is recorded as a holiday in ``heatmap.meta.json``; the last
+    role has no ``upper`` column and the last employment no need file, so the
+    holiday masking, excess skip and need fallback branches are all exercised.
+    """
+    rng = np.random.default_rng(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    labels = gen_labels(slot_minutes)
+    days_list = [dt.date(2024, 4, 1) + dt.timedelta(days=i) for i in range(days)]
+    dates = [d.isoformat() for d in days_list]
+    base = 2 + 1.5 * np.sin(np.linspace(0, 2 * np.pi, len(labels)))[:, None]
+
+    total = np.zeros((len(labels), days))
+    groups = [(f"role{i:03d}", "heat_", "need_per_date_slot_role_") for i in range(roles)]
+    groups += [(f"emp{i:02d}", "heat_emp_", "need_per_date_slot_emp_") for i in range(employments)]
+    for i, (name, heat_prefix, need_prefix) in enumerate(groups):
+        counts = rng.poisson(np.clip(base, 0.2, None), size=(len(labels), days))
+        need_by_day = rng.poisson(np.clip(base, 0.2, None), size=(len(labels), days))
+        need = need_by_day.mean(axis=1).round()
+        upper = None if name == f"role{roles - 1:03d}" else need + 1
+        _heat_frame(counts, need, upper, labels, dates).to_parquet(out_dir / f"{heat_prefix}{name}.parquet")
+        if name != f"emp{employments - 1:02d}":
+            pd.DataFrame(need_by_day, index=pd.Index(labels, name="time"), columns=dates).to_parquet(
+                out_dir / f"{need_prefix}{name}.parquet"
+            )
+        if heat_prefix == "heat_":
+            total += counts
+    all_need = np.full(len(labels), float(roles * 2))
+    _heat_frame(total, all_need, all_need + 2, labels, dates).to_parquet(out_dir / "heat_ALL.parquet")
+
+    meta = {
+        "slot": slot_minutes,
+        "dates": dates,
+        "summary_columns": SUMMARY5,
+        "estimated_holidays": [d.isoformat() for d in days_list[6::7]],
+    }
+    (out_dir / "heatmap.meta.json").write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+    return out_dir
+
+
+def benchmark_shortage(
+    heat_dir: Path, *, slot_minutes: int = 30, repeat: int = 1
+) -> Dict[str, Any]:
+    """Run shortage_and_brief with each engine on copies of ``heat_dir`` and compare."""
+    timings: Dict[str, float] = {}
+    outputs: Dict[str, Dict[str, pd.DataFrame]] = {}
+    logging.disable(logging.WARNING)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for engine in SHORTAGE_ENGINES:
+                best = float("inf")
+                for r in range(max(1, repeat)):
+                    work = Path(tmp) / f"{engine}{r}"
+                    shutil.copytree(heat_dir, work)
+                    t0 = time.perf_counter()
+                    shortage_and_brief(work, slot_minutes, engine=engine)
+                    best = min(best, time.perf_counter() - t0)
+                timings[engine] = best
+                outputs[engine] = {
+                    name: pd.read_parquet(work / name) for name in SUMMARY_FILES if (work / name).exists()
+                }
+    finally:
+        logging.disable(logging.NOTSET)
+
+    first, *others = SHORTAGE_ENGINES
+    mismatches = sorted(
+        name
+        for other in others
+        for name in set(outputs[first]) | set(outputs[other])
+        if name not in outputs[first]
+        or name not in outputs[other]
+        or not outputs[first][name].equals(outputs[other][name])
+    )
+    return {
+        "seconds": timings,
+        "speedup": timings["legacy"] / timings["numpy"] if timings["numpy"] else float("nan"),
+        "identical": not mismatches,
+        "mismatches": mismatches,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="shortage_and_brief エンジン比較")
+    p.add_argument("--roles", type=int, nargs="+", default=[5, 20, 80], help="職種数 (複数指定可)")
+    p.add_argument("--days", type=int, default=61, help="合成ヒートマップの日数")
+    p.add_argument("--slot", type=int, default=30, help="スロット長 (分)")
+    p.add_argument("--repeat", type=int, default=1)
+    a = p.parse_args(argv)
+
+    ok = True
+    print(f"{'roles':>6} " + " ".join(f"{e:>9}" for e in SHORTAGE_ENGINES) + "  speedup identical")
+    for n_roles in a.roles:
+        with tempfile.TemporaryDirectory() as tmp:
+            heat_dir = make_synthetic_heatmaps(Path(tmp) / "heat", roles=n_roles, days=a.days, slot_minutes=a.slot)
+            result = benchmark_shortage(heat_dir, slot_minutes=a.slot, repeat=a.repeat)
+        secs = " ".join(f"{result['seconds'][e]:8.3f}s" for e in SHORTAGE_ENGINES)
+        print(f"{n_roles:>6} {secs}  x{result['speedup']:5.1f}   {result['identical']}")
+        for m in result["mismatches"]:
+            print(f"  mismatch: {m}")
+        ok = ok and result["identical"]
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
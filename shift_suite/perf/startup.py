@@ -0,0 +1,220 @@
+"""起動時間プロファイラ (import コストと初回リクエストまでの時間)
+
+    python -m shift_suite.perf.startup                       # shift_suite / cli / dash_app / app
+    python -m shift_suite.perf.startup dash_app --top 30     # 上位 30 サブシステム
+    python -m shift_suite.perf.startup --no-request          # import のみ
+
+各ターゲットを新しいインタープリタで ``-X importtime`` 付きで import し、
+モジュールごとの自己時間をサブシステム (トップレベルパッケージ、
+shift_suite は ``shift_suite.tasks.heatmap`` の粒度、標準ライブラリは
+``(stdlib)``) ごとに集計する。dash_app / app は初回リクエスト
+(Dash: Flask テストクライアントで ``/`` とレイアウト取得、Streamlit:
+``AppTest`` で 1 回実行) までの時間も計測する。200 以外の応答や初回実行の
+例外はエラーとして扱い、予算内とは判定しない。
+"""
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# コールドスタート (インタープリタ起動から import 完了 / 初回リクエスト応答まで) の上限秒
+STARTUP_BUDGETS: Dict[str, float] = {
+    "shift_suite": 1.0,
+    "cli": 3.0,
+    "dash_app": 20.0,
+    "app": 20.0,
+}
+
+# 初回リクエストを計測できるアプリと必要なフレームワーク
+APP_FRAMEWORKS: Dict[str, str] = {"dash_app": "dash", "app": "streamlit"}
+
+_PROJECT_PACKAGES = {"shift_suite": 3}
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+_DASH_PROBE = """
+import json, os, time
+t0 = time.perf_counter()
+import dash_app
+t1 = time.perf_counter()
+client = dash_app.server.test_client()
+status = [client.get(p).status_code for p in ("/", "/_dash-layout", "/_dash-dependencies")]
+t2 = time.perf_counter()
+print("STARTUP " + json.dumps({"import": t1 - t0, "first_request": t2 - t1, "status": status}), flush=True)
+os._exit(0)
+"""
+
+_STREAMLIT_PROBE = """
+import json, os, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+at = AppTest.from_file("app.py", default_timeout=600).run()
+t2 = time.perf_counter()
+print("STARTUP " + json.dumps({"import": t1 - t0, "first_request": t2 - t1, "exceptions": len(at.exception)}), flush=True)
+os._exit(0)
+"""
+
+_PROBES = {"dash_app": _DASH_PROBE, "app": _STREAMLIT_PROBE}
+
+
+def _run(args: Sequence[str], *, timeout: float) -> tuple[subprocess.CompletedProcess, float]:
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, *args], cwd=ROOT, capture_output=True, text=True, timeout=timeout
+    )
+    return proc, time.perf_counter() - t0
+
+
+def _last_line(proc: subprocess.CompletedProcess) -> str:
+    lines = proc.stderr.strip().splitlines()
+    return lines[-1] if lines else f"exit {proc.returncode}"
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """``-X importtime`` の出力を ``[{module, self, cumulative, depth}]`` (秒) に変換"""
+    rows: List[Dict[str, Any]] = []
+    for line in stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            rows.append(
+                {
+                    "module": m.group(4),
+                    "self": int(m.group(1)) / 1e6,
+                    "cumulative": int(m.group(2)) / 1e6,
+                    "depth": len(m.group(3)) // 2,
+                }
+            )
+    return rows
+
+
+def subsystem(module: str) -> str:
+    """モジュール名を集計単位に丸める"""
+    top = module.split(".")[0]
+    if top in _PROJECT_PACKAGES:
+        return ".".join(module.split(".")[: _PROJECT_PACKAGES[top]])
+    if top in sys.stdlib_module_names or top.startswith("_"):
+        return "(stdlib)"
+    return top
+
+
+def by_subsystem(modules: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """自己時間をサブシステムごとに合計し、降順で返す"""
+    totals: Dict[str, Dict[str, Any]] = {}
+    for row in modules:
+        name = subsystem(row["module"])
+        entry = totals.setdefault(name, {"subsystem": name, "seconds": 0.0, "modules": 0})
+        entry["seconds"] += row["self"]
+        entry["modules"] += 1
+    return sorted(totals.values(), key=lambda e: e["seconds"], reverse=True)
+
+
+def import_profile(target: str, *, timeout: float = 600) -> Dict[str, Any]:
+    """新しいインタープリタで ``import target`` し、所要時間とモジュール別コストを返す"""
+    proc, wall = _run(["-X", "importtime", "-c", f"import {target}"], timeout=timeout)
+    modules = parse_importtime(proc.stderr)
+    top = next((m for m in modules if m["module"] == target and m["depth"] == 0), None)
+    result: Dict[str, Any] = {
+        "target": target,
+        "wall": wall,
+        "import": top["cumulative"] if top else None,
+        "modules": modules,
+        "subsystems": by_subsystem(modules),
+    }
+    if proc.returncode != 0:
+        result["error"] = _last_line(proc)
+    return result
+
+
+def first_request(app: str, *, timeout: float = 600) -> Dict[str, Any]:
+    """``app`` (dash_app / app) の import と初回リクエストまでの時間を計測する"""
+    if app not in _PROBES:
+        raise ValueError(f"未知のアプリです: {app} (選択肢: {sorted(_PROBES)})")
+    framework = APP_FRAMEWORKS[app]
+    if importlib.util.find_spec(framework) is None:
+        return {"target": app, "skipped": f"{framework} がインストールされていません"}
+    proc, wall = _run(["-c", _PROBES[app]], timeout=timeout)
+    line = next((ln for ln in reversed(proc.stdout.splitlines()) if ln.startswith("STARTUP ")), None)
+    if line is None:
+        return {"target": app, "wall": wall, "error": _last_line(proc)}
+    result = {"target": app, "wall": wall, **json.loads(line[len("STARTUP "):])}
+    # 応答が速くても失敗していれば予算内とは扱わない
+    if any(code != 200 for code in result.get("status", [])):
+        result["error"] = f"初回リクエストが失敗しました (status {result['status']})"
+    elif result.get("exceptions", 0):
+        result["error"] = f"初回実行で例外が {result['exceptions']} 件発生しました"
+    return result
+
+
+def cold_start(target: str, *, timeout: float = 600) -> Dict[str, Any]:
+    """予算と比較するコールドスタート時間 (アプリは初回リクエストまで、それ以外は import まで)"""
+    if target in _PROBES:
+        result = first_request(target, timeout=timeout)
+    else:
+        # -X importtime 自体のオーバーヘッドを含めないよう素の import で計る
+        proc, wall = _run(["-c", f"import {target}"], timeout=timeout)
+        result = {"target": target, "wall": wall}
+        if proc.returncode != 0:
+            result["error"] = _last_line(proc)
+    budget = STARTUP_BUDGETS.get(target)
+    if "wall" in result and "error" not in result and budget is not None:
+        result["budget"] = budget
+        result["within_budget"] = result["wall"] <= budget
+    return result
+
+
+def _print_profile(result: Dict[str, Any], top: int) -> None:
+    head = f"{result['target']}: wall {result['wall']:.2f}s"
+    if result.get("import") is not None:
+        head += f" / import {result['import']:.2f}s"
+    print(head)
+    if "error" in result:
+        print(f"  error: {result['error']}")
+    for entry in result["subsystems"][:top]:
+        print(f"  {entry['seconds']:8.3f}s  {entry['modules']:5d} mods  {entry['subsystem']}")
+
+
+def main(argv: List[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="shift_suite 起動時間プロファイラ")
+    p.add_argument("targets", nargs="*", default=list(STARTUP_BUDGETS), help="import するモジュール")
+    p.add_argument("--top", type=int, default=15, help="表示するサブシステム数")
+    p.add_argument("--no-request", action="store_true", help="初回リクエストを計測しない")
+    a = p.parse_args(argv)
+
+    ok = True
+    for target in a.targets:
+        _print_profile(import_profile(target), a.top)
+        if target in _PROBES and a.no_request:
+            print()
+            continue
+        cs = cold_start(target)
+        if "skipped" in cs:
+            print(f"  cold start: スキップ ({cs['skipped']})")
+        elif "error" in cs:
+            print(f"  cold start: error: {cs['error']}")
+            ok = False
+        else:
+            detail = (
+                f" = import {cs['import']:.2f}s + first request {cs['first_request']:.2f}s"
+                if "first_request" in cs
+                else ""
+            )
+            if "status" in cs:
+                detail += f" (status {cs['status']})"
+            budget = f" (budget {cs['budget']:.1f}s)" if "budget" in cs else ""
+            print(f"  cold start: {cs['wall']:.2f}s{budget}{detail}")
+            ok = ok and cs.get("within_budget", True)
+        print()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,33 @@
+"""shift_suite.pipeline – 解析段の DAG 実行
+
+    from shift_suite.pipeline import default_pipeline
+
+    result = default_pipeline().run(out_dir, params, targets=["shortage", "forecast"])
+
+段の間の成果物はメモリ上で受け渡し、ディスクへはバックグラウンドで保存する。
+``Pipeline.run_stage`` で 1 段だけ実行した場合は、入力を ``out_dir`` から読む。
+``run(..., cache=StageCache(dir))`` で入力・パラメータ・コードが同じ段を省略する。
+``run_scenarios`` は同じ long_df に対する複数シナリオをプロセスプールで並列に実行する。
+"""
+from .cache import StageCache, default_cache_dir
+from .graph import Artifact, ArtifactStore, Pipeline, RunResult, Stage, StageContext
+from .scenarios import ScenarioOutcome, run_scenarios
+from .stages import ARTIFACTS, CORE_STAGES, EXTRA_STAGES, STAGES, default_pipeline
+
+__all__ = [
+    "ARTIFACTS",
+    "Artifact",
+    "ArtifactStore",
+    "CORE_STAGES",
+    "EXTRA_STAGES",
+    "Pipeline",
+    "RunResult",
+    "STAGES",
+    "ScenarioOutcome",
+    "Stage",
+    "StageCache",
+    "StageContext",
+    "default_cache_dir",
+    "default_pipeline",
+    "run_scenarios",
+]
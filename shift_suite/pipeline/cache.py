@@ -0,0 +1,189 @@
+# shift_suite / pipeline / cache.py
+"""
+shift_suite.pipeline.cache  v1.0.0
+────────────────────────────────────────────────────────
+* 段ごとの内容アドレス型キャッシュ
+    - キー = 段名 + コード版 + 段が参照するパラメータ + 入力成果物のキー
+      (入力ファイルはパスではなく内容のハッシュ)
+    - 段が ``out_dir`` に書いたファイルと、メモリ上の出力をキー単位で保存する
+    - 同じキーで再実行すると段を実行せずにファイルと出力を復元する
+* 上流の段のキーが変わらない限り下流の段のキーも変わらないため、
+  例えば賃金だけを変えた場合は shortage_kpi とその下流の段だけが再実行される
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Mapping
+
+from ..tasks.fingerprint import _hash_file, value_digest
+
+log = logging.getLogger(__name__)
+
+_PACKAGE_DIR = Path(__file__).resolve().parents[1]
+_MANIFEST = "manifest.json"
+_OUTPUTS = "outputs.pkl"
+_FILES = "files"
+
+
+def default_cache_dir() -> Path:
+    """既定の段キャッシュ (``SHIFT_SUITE_CACHE_DIR``、無ければ一時ディレクトリ)
+
+    実行ごとに作り直す出力先とは別の場所に置き、実行をまたいで再利用する。
+    """
+    env = os.getenv("SHIFT_SUITE_CACHE_DIR")
+    if env:
+        return Path(env)
+    return Path(tempfile.gettempdir()) / "shift_suite_stage_cache"
+
+
+def code_version(root: Path = _PACKAGE_DIR) -> str:
+    """shift_suite 配下の全 .py の内容ハッシュ (コードが変われば全キーが変わる)"""
+    h = hashlib.sha256()
+    for fp in sorted(root.rglob("*.py")):
+        if "__pycache__" in fp.parts:
+            continue
+        h.update(str(fp.relative_to(root)).encode())
+        _hash_file(fp, h)
+    return h.hexdigest()[:16]
+
+
+def _snapshot(out_dir: Path) -> Dict[str, tuple[int, int]]:
+    """``out_dir`` 配下の各ファイルの (size, mtime_ns)"""
+    snap: Dict[str, tuple[int, int]] = {}
+    if out_dir.exists():
+        for fp in out_dir.rglob("*"):
+            if fp.is_file():
+                st = fp.stat()
+                snap[str(fp.relative_to(out_dir))] = (st.st_size, st.st_mtime_ns)
+    return snap
+
+
+class _OutPath:
+    """``out_dir`` 配下のパスを相対パスとして保存するための目印"""
+
+    def __init__(self, rel: str) -> None:
+        self.rel = rel
+
+
+def _relocate(value: Any, out_dir: Path, *, to_cache: bool) -> Any:
+    if to_cache and isinstance(value, Path):
+        try:
+            return _OutPath(str(value.resolve().relative_to(out_dir.resolve())))
+        except ValueError:
+            return value
+    if not to_cache and isinstance(value, _OutPath):
+        return out_dir / value.rel
+    if isinstance(value, tuple):
+        return tuple(_relocate(v, out_dir, to_cache=to_cache) for v in value)
+    if isinstance(value, list):
+        return [_relocate(v, out_dir, to_cache=to_cache) for v in value]
+    if isinstance(value, dict):
+        return {k: _relocate(v, out_dir, to_cache=to_cache) for k, v in value.items()}
+    return value
+
+
+class StageCache:
+    """Content-addressed store of stage outputs under ``cache_dir/<key>/``."""
+
+    def __init__(self, cache_dir: Path | str, *, version: str | None = None) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.version = version or code_version()
+
+    def key(self, stage, params: Mapping[str, Any], input_keys: Mapping[str, str]) -> str:
+        """Hash of stage name, code version, the stage's params and its input keys."""
+        payload = {
+            "stage": stage.name,
+            "version": self.version,
+            "params": {p: params.get(p) for p in stage.params},
+            "inputs": {i: input_keys[i] for i in (*stage.inputs, *stage.optional)},
+        }
+        return value_digest(payload)
+
+    def __contains__(self, key: str) -> bool:
+        return (self.cache_dir / key / _MANIFEST).exists()
+
+    def snapshot(self, out_dir: Path) -> Dict[str, tuple[int, int]]:
+        return _snapshot(out_dir)
+
+    def save(
+        self,
+        key: str,
+        stage,
+        out_dir: Path,
+        before: Mapping[str, tuple[int, int]],
+        outputs: Mapping[str, Any],
+        *,
+        exclude: Iterable[str] = (),
+    ) -> bool:
+        """Store the files ``stage`` created/changed in ``out_dir`` and its outputs."""
+        skip = set(exclude)
+        changed = [
+            rel
+            for rel, sig in _snapshot(out_dir).items()
+            if before.get(rel) != sig and rel not in skip
+        ]
+        try:
+            payload = pickle.dumps(
+                {k: _relocate(v, out_dir, to_cache=True) for k, v in outputs.items()},
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        except Exception as e:
+            log.warning(f"[pipeline.cache] 段 '{stage.name}' の出力を保存できません: {e}")
+            return False
+
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key[:12]}-", dir=self.cache_dir))
+        try:
+            for rel in changed:
+                dst = tmp / _FILES / rel
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(out_dir / rel, dst)
+            (tmp / _OUTPUTS).write_bytes(payload)
+            (tmp / _MANIFEST).write_text(
+                json.dumps(
+                    {
+                        "stage": stage.name,
+                        "version": self.version,
+                        "created": dt.datetime.now().isoformat(timespec="seconds"),
+                        "files": sorted(changed),
+                    },
+                    ensure_ascii=False,
+                    indent=2,
+                ),
+                encoding="utf-8",
+            )
+            final = self.cache_dir / key
+            if final.exists():
+                shutil.rmtree(final, ignore_errors=True)
+            os.replace(tmp, final)
+        except Exception as e:
+            shutil.rmtree(tmp, ignore_errors=True)
+            log.warning(f"[pipeline.cache] 段 '{stage.name}' のキャッシュ保存に失敗: {e}")
+            return False
+        log.debug(f"[pipeline.cache] 段 '{stage.name}' を保存: {key[:12]} ({len(changed)} files)")
+        return True
+
+    def restore(self, key: str, out_dir: Path) -> Dict[str, Any]:
+        """Copy the cached files back into ``out_dir`` and return the outputs."""
+        entry = self.cache_dir / key
+        manifest = json.loads((entry / _MANIFEST).read_text(encoding="utf-8"))
+        for rel in manifest["files"]:
+            dst = out_dir / rel
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(entry / _FILES / rel, dst)
+        outputs = pickle.loads((entry / _OUTPUTS).read_bytes())
+        return {k: _relocate(v, out_dir, to_cache=False) for k, v in outputs.items()}
+
+    def clear(self) -> None:
+        """キャッシュを全削除"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,376 @@
+# shift_suite / pipeline / graph.py
+"""
+shift_suite.pipeline.graph  v1.0.0
+────────────────────────────────────────────────────────
+* 解析段 (:class:`Stage`) と段の間で受け渡す成果物 (:class:`Artifact`) の DAG
+    - 各段は入力・出力の成果物名を宣言し、:class:`Pipeline` が依存順に実行する
+    - 1 回の実行中、成果物はメモリ上で次の段へ渡す。ディスク保存は
+      バックグラウンドスレッドで行い、実行の最後にまとめて待つ
+    - 段を単体で実行したときだけ、入力成果物を ``out_dir`` から読み込む
+    - ``optional`` の成果物は、同じ実行で作られるならその段の後に実行し、
+      作られなくても段は実行する (キャッシュのキーには内容か「無し」を含める)
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Mapping
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .cache import StageCache
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """Named output of a stage and how it is persisted under ``out_dir``.
+
+    ``save`` may be omitted when the producing stage writes its own files;
+    ``load`` may be omitted for values that only live in memory.
+    """
+
+    name: str
+    filename: str | None = None
+    load: Callable[[Path], Any] | None = None
+    save: Callable[[Any, Path], Any] | None = None
+
+    def target(self, out_dir: Path) -> Path:
+        return out_dir / self.filename if self.filename else out_dir
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One analysis step.
+
+    ``func`` receives a :class:`StageContext` and returns a mapping of output
+    artifact name → value.  ``params`` lists the run parameters the stage
+    depends on.  ``optional`` artifacts are used when present: their producers
+    run first if they are part of the same run, but are never pulled in, and
+    their absence does not skip the stage.  A stage with ``required=False``
+    may fail without aborting the run; stages depending on its outputs are
+    then skipped.
+    """
+
+    name: str
+    func: Callable[["StageContext"], Mapping[str, Any] | None]
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+    params: tuple[str, ...] = ()
+    required: bool = True
+    optional: tuple[str, ...] = ()
+
+
+class ArtifactStore:
+    """In-memory artifact values with write-behind persistence."""
+
+    def __init__(
+        self,
+        out_dir: Path | str,
+        artifacts: Mapping[str, Artifact],
+        *,
+        executor: Executor | None = None,
+    ) -> None:
+        self.out_dir = Path(out_dir)
+        self.artifacts = artifacts
+        self._values: Dict[str, Any] = {}
+        self._executor = executor
+        self._pending: Dict[str, Future] = {}
+        self.errors: Dict[str, BaseException] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._values
+
+    def put(self, name: str, value: Any, *, persist: bool = True) -> None:
+        """Keep ``value`` in memory and schedule its ``save`` (if any)."""
+        self._values[name] = value
+        artifact = self.artifacts.get(name)
+        if not persist or artifact is None or artifact.save is None or value is None:
+            return
+        target = artifact.target(self.out_dir)
+        if self._executor is None:
+            self._save(artifact, value, target)
+        else:
+            self._pending[name] = self._executor.submit(self._save, artifact, value, target)
+
+    def _save(self, artifact: Artifact, value: Any, target: Path) -> None:
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            artifact.save(value, target)
+            log.debug(f"[pipeline] 成果物 '{artifact.name}' を保存: {target.name}")
+        except Exception as e:
+            self.errors[artifact.name] = e
+            log.error(f"[pipeline] 成果物 '{artifact.name}' の保存に失敗: {e}", exc_info=True)
+
+    def get(self, name: str) -> Any:
+        """Return the in-memory value, loading it from ``out_dir`` if needed."""
+        if name in self._values:
+            return self._values[name]
+        artifact = self.artifacts.get(name)
+        if artifact is None or artifact.load is None:
+            raise KeyError(f"成果物 '{name}' はメモリ上になく、読み込み方法も未定義です")
+        target = artifact.target(self.out_dir)
+        if artifact.filename and not target.exists():
+            raise FileNotFoundError(f"成果物 '{name}' のファイルがありません: {target}")
+        log.info(f"[pipeline] 成果物 '{name}' をディスクから読み込みます: {target}")
+        value = artifact.load(target)
+        self._values[name] = value
+        return value
+
+    def flush(self) -> List[str]:
+        """Wait for pending writes; return the names whose save failed."""
+        for future in list(self._pending.values()):
+            future.result()
+        self._pending.clear()
+        return sorted(self.errors)
+
+
+@dataclass
+class StageContext:
+    """What a stage function sees: output directory, parameters and inputs."""
+
+    out_dir: Path
+    params: Mapping[str, Any]
+    store: ArtifactStore
+    stage: Stage
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.stage.inputs and name not in self.stage.optional:
+            raise KeyError(f"段 '{self.stage.name}' は成果物 '{name}' を入力に宣言していません")
+        return self.store.get(name)
+
+    def param(self, key: str, default: Any = None) -> Any:
+        return self.params.get(key, default)
+
+
+@dataclass
+class RunResult:
+    """Artifacts and per-stage status of one :meth:`Pipeline.run`."""
+
+    store: ArtifactStore
+    timings: Dict[str, float] = field(default_factory=dict)
+    failed: Dict[str, BaseException] = field(default_factory=dict)
+    skipped: List[str] = field(default_factory=list)
+    cached: List[str] = field(default_factory=list)
+
+    def __getitem__(self, name: str) -> Any:
+        return self.store.get(name)
+
+
+class Pipeline:
+    """Run :class:`Stage` objects in dependency order, passing artifacts in memory."""
+
+    def __init__(self, stages: Iterable[Stage], artifacts: Iterable[Artifact] = ()) -> None:
+        self.stages: Dict[str, Stage] = {}
+        self.producers: Dict[str, str] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"段 '{stage.name}' が重複しています")
+            self.stages[stage.name] = stage
+            for out in stage.outputs:
+                if out in self.producers:
+                    raise ValueError(
+                        f"成果物 '{out}' を '{self.producers[out]}' と '{stage.name}' の両方が出力します"
+                    )
+                self.producers[out] = stage.name
+        self.artifacts: Dict[str, Artifact] = {a.name: a for a in artifacts}
+
+    def _upstream(self, names: Iterable[str], have: set[str]) -> set[str]:
+        """``names`` と、その必須入力をたどって実行される段の名前"""
+        found: set[str] = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name in found:
+                continue
+            found.add(name)
+            for inp in self.stages[name].inputs:
+                producer = None if inp in have else self.producers.get(inp)
+                if producer is not None:
+                    stack.append(producer)
+        return found
+
+    def order(
+        self, targets: Iterable[str] | None = None, *, available: Iterable[str] = ()
+    ) -> List[Stage]:
+        """Stages needed for ``targets`` (default: all), upstream first.
+
+        Producers of ``available`` artifacts are not pulled in.  Independent
+        stages keep their declaration order.
+        """
+        have = set(available)
+        names = list(self.stages) if targets is None else list(targets)
+        unknown = [n for n in names if n not in self.stages]
+        if unknown:
+            raise ValueError(f"未定義の段: {unknown}")
+
+        ordered: List[Stage] = []
+        state: Dict[str, str] = {}
+        requested = self._upstream(names, have)
+
+        def visit(name: str) -> None:
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "active":
+                raise ValueError(f"段の依存関係が循環しています: {name}")
+            state[name] = "active"
+            for inp in self.stages[name].inputs:
+                producer = None if inp in have else self.producers.get(inp)
+                if producer is not None:
+                    visit(producer)
+            # 任意入力は、同じ実行の対象に含まれる段が作るときだけ先に実行する
+            for inp in self.stages[name].optional:
+                producer = None if inp in have else self.producers.get(inp)
+                if producer is not None and producer in requested:
+                    visit(producer)
+            state[name] = "done"
+            ordered.append(self.stages[name])
+
+        for name in sorted(names, key=list(self.stages).index):
+            visit(name)
+        return ordered
+
+    def run(
+        self,
+        out_dir: Path | str,
+        params: Mapping[str, Any] | None = None,
+        *,
+        targets: Iterable[str] | None = None,
+        initial: Mapping[str, Any] | None = None,
+        persist_async: bool = True,
+        cache: "StageCache | None" = None,
+        on_stage: Callable[[Stage], None] | None = None,
+    ) -> RunResult:
+        """Run ``targets`` and their upstream stages into ``out_dir``.
+
+        ``initial`` supplies artifacts already in memory (they are not
+        re-persisted); stages producing only those artifacts are skipped.
+        Inputs neither in memory nor produced in this run are loaded from disk.
+        With ``cache`` a stage whose key (params, input keys, code version) is
+        already cached is restored instead of executed.  ``on_stage`` is called
+        with each stage just before it runs (or is restored), for progress display.
+        """
+        out_dir_path = Path(out_dir)
+        out_dir_path.mkdir(parents=True, exist_ok=True)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pipeline-io") if persist_async else None
+        store = ArtifactStore(out_dir_path, self.artifacts, executor=executor)
+        for name, value in (initial or {}).items():
+            store.put(name, value, persist=False)
+
+        result = RunResult(store)
+        unavailable: set[str] = set()
+        input_keys: Dict[str, str] = {}
+        if cache is not None:
+            from ..tasks.fingerprint import value_digest
+
+            input_keys.update({n: "initial:" + value_digest(v) for n, v in (initial or {}).items()})
+        try:
+            for stage in self.order(targets, available=initial or ()):
+                if stage.outputs and all(o in store for o in stage.outputs):
+                    log.info(f"[pipeline] 段 '{stage.name}' の出力は与えられているためスキップ")
+                    continue
+                missing = [i for i in stage.inputs if i in unavailable]
+                if missing:
+                    log.warning(f"[pipeline] 入力 {missing} がないため段 '{stage.name}' をスキップ")
+                    result.skipped.append(stage.name)
+                    unavailable.update(stage.outputs)
+                    continue
+                if on_stage is not None:
+                    on_stage(stage)
+                try:
+                    if cache is None:
+                        result.timings[stage.name] = self._execute(stage, store, params or {})
+                    elif self._execute_cached(stage, store, params or {}, cache, input_keys, result):
+                        result.cached.append(stage.name)
+                except Exception as e:
+                    if stage.required:
+                        raise
+                    log.error(f"[pipeline] 段 '{stage.name}' でエラー: {e}", exc_info=True)
+                    result.failed[stage.name] = e
+                    unavailable.update(stage.outputs)
+                    for name in stage.outputs:
+                        input_keys.pop(name, None)
+        finally:
+            store.flush()
+            if executor is not None:
+                executor.shutdown(wait=True)
+        return result
+
+    def run_stage(
+        self, name: str, out_dir: Path | str, params: Mapping[str, Any] | None = None
+    ) -> Dict[str, Any]:
+        """Run one stage standalone; its inputs are loaded from ``out_dir``."""
+        if name not in self.stages:
+            raise ValueError(f"未定義の段: {name}")
+        store = ArtifactStore(out_dir, self.artifacts)
+        self._execute(self.stages[name], store, params or {})
+        return {o: store.get(o) for o in self.stages[name].outputs if o in store}
+
+    def _input_key(self, name: str, store: ArtifactStore, input_keys: Mapping[str, str]) -> str | None:
+        if name in input_keys:
+            return input_keys[name]
+        artifact = self.artifacts.get(name)
+        if artifact is None or not artifact.filename:
+            return None
+        target = artifact.target(store.out_dir)
+        if not target.is_file():
+            return None
+        from ..tasks.fingerprint import file_digest
+
+        return "file:" + file_digest(target)
+
+    def _execute_cached(
+        self,
+        stage: Stage,
+        store: ArtifactStore,
+        params: Mapping[str, Any],
+        cache: "StageCache",
+        input_keys: Dict[str, str],
+        result: RunResult,
+    ) -> bool:
+        """Restore ``stage`` from ``cache`` or execute and record it; True on a hit."""
+        keys = {i: self._input_key(i, store, input_keys) for i in stage.inputs}
+        if any(k is None for k in keys.values()):
+            log.info(f"[pipeline] 段 '{stage.name}' は入力のキーが決まらないためキャッシュを使いません")
+            result.timings[stage.name] = self._execute(stage, store, params)
+            return False
+        # 任意入力が無いことも「無し」としてキーに含める
+        keys.update({i: self._input_key(i, store, input_keys) or "absent" for i in stage.optional})
+
+        key = cache.key(stage, params, keys)
+        for name in stage.outputs:
+            input_keys[name] = f"{key}:{name}"
+        if key in cache:
+            t0 = time.perf_counter()
+            outputs = cache.restore(key, store.out_dir)
+            for name in stage.outputs:
+                if name in outputs:
+                    store.put(name, outputs[name])
+            result.timings[stage.name] = time.perf_counter() - t0
+            log.info(f"[pipeline] 段 '{stage.name}' をキャッシュから復元 ({key[:12]})")
+            return True
+
+        before = cache.snapshot(store.out_dir)
+        result.timings[stage.name] = self._execute(stage, store, params)
+        outputs = {o: store.get(o) for o in stage.outputs if o in store}
+        # 他の段の成果物 (非同期保存中のものを含む) はこの段のファイルとして扱わない
+        owned = {a.filename for a in self.artifacts.values() if a.filename and a.save is not None}
+        cache.save(key, stage, store.out_dir, before, outputs, exclude=owned)
+        return False
+
+    def _execute(self, stage: Stage, store: ArtifactStore, params: Mapping[str, Any]) -> float:
+        log.info(f"[pipeline] 段 '{stage.name}' 開始")
+        t0 = time.perf_counter()
+        outputs = stage.func(StageContext(store.out_dir, params, store, stage)) or {}
+        for name in stage.outputs:
+            if name in outputs:
+                store.put(name, outputs[name])
+            else:
+                log.warning(f"[pipeline] 段 '{stage.name}' が成果物 '{name}' を返しませんでした")
+        elapsed = time.perf_counter() - t0
+        log.info(f"[pipeline] 段 '{stage.name}' 完了 ({elapsed:.2f}s)")
+        return elapsed
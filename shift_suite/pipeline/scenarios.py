@@ -0,0 +1,234 @@
+# shift_suite / pipeline / scenarios.py
+"""
+shift_suite.pipeline.scenarios  v1.0.0
+────────────────────────────────────────────────────────
+* 同じ long_df に対する複数シナリオ (need 統計手法の違いなど) を
+  プロセスプールで並列に実行する
+    - long_df は非圧縮の Arrow IPC ファイルに 1 回だけ書き、各ワーカーは
+      memory-map で開く (タスクごとに pickle しない。ページはワーカー間で
+      OS のページキャッシュを共有する)
+    - 各シナリオは :func:`default_pipeline` を ``initial={"long_df": ...}`` で
+      実行する。段の開始は ``on_progress(シナリオ, 段名)`` として
+      呼び出し元のスレッドへ戻すので、Streamlit の進捗表示をそのまま更新できる
+* ``cache`` (:class:`StageCache`) を渡すと各シナリオの実行に使う。
+  シナリオ間・実行間で入力とパラメータが同じ段 (賃金だけを変えた場合の
+  heatmap / shortage など) は再計算せずに復元する
+* ワーカー数は ``max_workers`` (既定は ``SHIFT_SUITE_SCENARIO_WORKERS`` か
+  min(シナリオ数, CPU 数))。1 ならプロセスを作らずその場で順に実行する。
+  プールが壊れた場合 (子プロセスの異常終了) も残りのシナリオをその場で実行する
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Mapping, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+from ..tasks.fingerprint import FileSignature, file_signature
+from .cache import StageCache
+
+log = logging.getLogger(__name__)
+
+SHARED_LONG_DF = "long_df.arrow"
+
+ProgressCallback = Callable[[str, str], None]
+
+# ワーカープロセス内で開いた long_df (署名 → DataFrame)。同じワーカーが
+# 複数シナリオを受け持つときに開き直さない
+_OPENED: Dict[FileSignature, pd.DataFrame] = {}
+
+
+@dataclass
+class ScenarioOutcome:
+    """Result of one scenario run (small and picklable; frames stay on disk)."""
+
+    key: str
+    out_dir: Path
+    timings: Dict[str, float] = field(default_factory=dict)
+    cached: list[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    error: str | None = None
+    error_stage: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def share_long_df(long_df: pd.DataFrame, path: Path | str) -> Path:
+    """long_df を memory-map で開ける非圧縮の Arrow IPC ファイルに書く"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(long_df, preserve_index=False)
+    tmp = path.with_name(path.name + ".tmp")
+    with pa.OSFile(str(tmp), "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    return path
+
+
+def open_shared_long_df(path: Path | str) -> pd.DataFrame:
+    """:func:`share_long_df` で書いたファイルを memory-map で開く (プロセス内でメモ化)"""
+    sig = file_signature(path)
+    df = _OPENED.get(sig)
+    if df is None:
+        with pa.memory_map(str(path), "r") as source:
+            df = ipc.open_file(source).read_all().to_pandas()
+        _OPENED.clear()
+        _OPENED[sig] = df
+    return df
+
+
+def _default_workers(n_scenarios: int) -> int:
+    env = os.getenv("SHIFT_SUITE_SCENARIO_WORKERS")
+    if env:
+        return max(1, int(env))
+    return max(1, min(n_scenarios, os.cpu_count() or 1))
+
+
+def run_scenario(
+    key: str,
+    long_df_path: str,
+    out_dir: str,
+    params: Mapping[str, Any],
+    targets: Sequence[str],
+    copy_files: Sequence[str] = (),
+    cache: StageCache | None = None,
+    progress_queue: Any = None,
+) -> ScenarioOutcome:
+    """1 シナリオ分の実行 (ワーカープロセス側。例外は :class:`ScenarioOutcome` に入れて返す)"""
+    from .stages import default_pipeline
+
+    out = Path(out_dir)
+    outcome = ScenarioOutcome(key, out)
+    current = {"stage": "setup"}
+
+    def _on_stage(stage) -> None:
+        current["stage"] = stage.name
+        if progress_queue is not None:
+            progress_queue.put((key, stage.name))
+
+    try:
+        out.mkdir(parents=True, exist_ok=True)
+        for src in copy_files:
+            if Path(src).exists():
+                shutil.copy(src, out / Path(src).name)
+        long_df = open_shared_long_df(long_df_path)
+        result = default_pipeline().run(
+            out, params, targets=targets, initial={"long_df": long_df}, cache=cache, on_stage=_on_stage
+        )
+        outcome.timings = dict(result.timings)
+        outcome.cached = list(result.cached)
+        outcome.failed = {name: f"{type(e).__name__}: {e}" for name, e in result.failed.items()}
+    except Exception as e:  # noqa: BLE001 - シナリオの失敗は呼び出し元で表示する
+        log.error(f"[scenarios] シナリオ '{key}' の段 '{current['stage']}' でエラー: {e}", exc_info=True)
+        outcome.error = f"{type(e).__name__}: {e}"
+        outcome.error_stage = current["stage"]
+    return outcome
+
+
+def run_scenarios(
+    long_df: pd.DataFrame,
+    scenarios: Mapping[str, Mapping[str, Any]],
+    base_out_dir: Path | str,
+    *,
+    targets: Iterable[str] = ("shortage",),
+    copy_files: Iterable[Path | str] = (),
+    max_workers: int | None = None,
+    cache: StageCache | None = None,
+    on_progress: ProgressCallback | None = None,
+    out_dir_name: Callable[[str], str] = lambda key: f"out_{key}",
+) -> Dict[str, ScenarioOutcome]:
+    """``scenarios`` (キー → パイプラインの ``params``) を並列に実行する
+
+    各シナリオの出力は ``base_out_dir / out_dir_name(key)``。``copy_files`` は
+    実行前に各シナリオのディレクトリへコピーする (intermediate_data.parquet など)。
+    ``cache`` は全シナリオで共有する (キーに出力先は含まれない)。
+    戻り値は ``scenarios`` と同じ順の ``{キー: ScenarioOutcome}``。
+    """
+    base = Path(base_out_dir)
+    keys = list(scenarios)
+    if not keys:
+        return {}
+    targets = tuple(targets)
+    copies = tuple(str(p) for p in copy_files)
+    shared = share_long_df(long_df, base / SHARED_LONG_DF)
+    jobs = {
+        key: (key, str(shared), str(base / out_dir_name(key)), dict(scenarios[key]), targets, copies, cache)
+        for key in keys
+    }
+    workers = min(len(keys), max_workers or _default_workers(len(keys)))
+    t0 = time.perf_counter()
+    try:
+        if workers <= 1:
+            outcomes = {key: _run_inline(jobs[key], on_progress) for key in keys}
+        else:
+            outcomes = _run_pool(jobs, workers, on_progress)
+    finally:
+        shared.unlink(missing_ok=True)
+    log.info(f"[scenarios] {len(keys)} シナリオ完了 ({workers} 並列, {time.perf_counter() - t0:.2f}s)")
+    return {key: outcomes[key] for key in keys}
+
+
+class _CallbackQueue:
+    """その場実行用: put を進捗コールバックへそのまま渡す"""
+
+    def __init__(self, on_progress: ProgressCallback | None) -> None:
+        self.on_progress = on_progress
+
+    def put(self, item: tuple[str, str]) -> None:
+        if self.on_progress is not None:
+            self.on_progress(*item)
+
+
+def _run_inline(job: tuple, on_progress: ProgressCallback | None) -> ScenarioOutcome:
+    return run_scenario(*job, progress_queue=_CallbackQueue(on_progress))
+
+
+def _drain(progress_queue: Any, on_progress: ProgressCallback | None) -> None:
+    while True:
+        try:
+            item = progress_queue.get_nowait()
+        except queue.Empty:
+            return
+        if on_progress is not None:
+            on_progress(*item)
+
+
+def _run_pool(
+    jobs: Mapping[str, tuple], workers: int, on_progress: ProgressCallback | None
+) -> Dict[str, ScenarioOutcome]:
+    ctx = multiprocessing.get_context("spawn")
+    outcomes: Dict[str, ScenarioOutcome] = {}
+    with ctx.Manager() as manager:
+        progress_queue = manager.Queue()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                pending: Dict[Future, str] = {
+                    pool.submit(run_scenario, *job, progress_queue=progress_queue): key
+                    for key, job in jobs.items()
+                }
+                while pending:
+                    done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    _drain(progress_queue, on_progress)
+                    for future in done:
+                        outcomes[pending.pop(future)] = future.result()
+        except BrokenProcessPool as e:
+            log.warning(f"[scenarios] プロセスプールが停止したため残りをその場で実行します: {e}")
+        _drain(progress_queue, on_progress)
+    for key, job in jobs.items():
+        if key not in outcomes:
+            outcomes[key] = _run_inline(job, on_progress)
+    return outcomes
@@ -0,0 +1,282 @@
+# shift_suite / pipeline / stages.py
+"""
+shift_suite.pipeline.stages  v1.0.0
+────────────────────────────────────────────────────────
+* 標準の解析段: ingest → expand → heatmap → shortage → shortage_kpi と
+  追加モジュール (leave / fatigue / fairness / forecast / hire_plan / cost)、
+  最後に概要タブ用の KPI キューブ (kpi_cube)。kpi_cube は fatigue / fairness を
+  任意入力に宣言しているので、同じ実行にそれらがあれば後に実行して
+  結果ファイルを取り込み、キャッシュのキーもその内容で変わる
+* forecast_batch: 全体・職種別・雇用形態別・時間帯別の需要系列を一括予測
+  (``forecast_batch.parquet`` / ``forecast_batch_report.parquet``)
+* heat_tiles: ヒートマップの多段解像度タイル (``heat_tiles/``)。
+  Dash のヒートマップはズーム範囲に応じてここから読む
+* 実行パラメータ (``params``) のキー
+    - excel / shift_sheets / header_row / year_month_cell / slot
+    - wages: wage_direct / wage_temp / penalty_per_lack (shortage_kpi と
+      その下流 (hire_plan / cost) だけが参照するので、賃金の変更で
+      heatmap / shortage は再計算されない)
+    - 段ごとの追加キーワード引数: heatmap / shortage / fatigue / fairness /
+      leave / forecast / forecast_batch / hire_plan / cost (いずれも dict)
+* heatmap と shortage は従来どおり自分で ``out_dir`` にファイルを書く
+  (Dash 側が読むため)。後続の段へはメモリ上のフレームを渡す
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any, Dict
+
+import pandas as pd
+
+from ..tasks.constants import DEFAULT_SLOT_MINUTES
+from ..tasks.long_df_schema import read_long_df, write_long_df
+from .graph import Artifact, Pipeline, Stage, StageContext
+
+log = logging.getLogger(__name__)
+
+CORE_STAGES: tuple[str, ...] = ("ingest", "expand", "heatmap", "shortage", "shortage_kpi", "heat_tiles", "kpi_cube")
+EXTRA_STAGES: tuple[str, ...] = ("leave", "fatigue", "fairness", "forecast", "forecast_batch", "hire_plan", "cost")
+
+_HEATMAP_PATTERNS = ("heat_*.parquet", "need_per_date_slot*.parquet")
+
+
+def _write_parquet(df: pd.DataFrame, fp: Path) -> None:
+    if df is not None and not df.empty:
+        df.to_parquet(fp, index=False)
+
+
+def _load_heatmaps(out_dir: Path) -> Dict[str, pd.DataFrame]:
+    """build_heatmap が書いたフレームを ``{ファイル名: DataFrame}`` で読む"""
+    frames: Dict[str, pd.DataFrame] = {}
+    for pattern in _HEATMAP_PATTERNS:
+        for fp in sorted(out_dir.glob(pattern)):
+            frames[fp.name] = pd.read_parquet(fp)
+    if "heat_ALL.parquet" not in frames:
+        raise FileNotFoundError(f"heat_ALL.parquet がありません: {out_dir}")
+    return frames
+
+
+def _shortage_paths(fp_role: Path) -> tuple[Path, Path]:
+    """shortage_and_brief の戻り値と同じ ``(shortage_time, shortage_role_summary)``"""
+    return fp_role.parent / "shortage_time.parquet", fp_role
+
+
+def _slot(ctx: StageContext) -> int:
+    return int(ctx.param("slot", DEFAULT_SLOT_MINUTES))
+
+
+def _kwargs(ctx: StageContext, key: str) -> Dict[str, Any]:
+    return dict(ctx.param(key) or {})
+
+
+# ── stage functions ─────────────────────────────────────────────────────
+def _ingest(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks.io_excel import ingest_excel
+
+    intervals, wt_df, unknown_codes = ingest_excel(
+        Path(ctx.param("excel")),
+        shift_sheets=list(ctx.param("shift_sheets") or []),
+        header_row=int(ctx.param("header_row", 0)),
+        slot_minutes=_slot(ctx),
+        year_month_cell_location=ctx.param("year_month_cell"),
+        as_intervals=True,
+    )
+    if unknown_codes:
+        log.warning(f"[pipeline.ingest] 未知の勤務コード: {sorted(unknown_codes)}")
+    return {"intervals": intervals, "work_patterns": wt_df}
+
+
+def _expand(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks.shift_intervals import expand_intervals
+
+    return {"long_df": expand_intervals(ctx["intervals"], _slot(ctx))}
+
+
+def _heatmap(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks.heatmap import build_heatmap
+
+    long_df = ctx["long_df"]
+    opts = _kwargs(ctx, "heatmap")
+    if not long_df.empty:
+        # 参照期間の指定がなければデータ全期間を使う
+        days = pd.to_datetime(long_df["ds"]).dt.date
+        opts.setdefault("ref_start_date_for_need", days.min())
+        opts.setdefault("ref_end_date_for_need", days.max())
+    frames = build_heatmap(long_df, ctx.out_dir, _slot(ctx), **opts)
+    return {"heatmaps": frames}
+
+
+def _shortage(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks.shortage import shortage_and_brief
+
+    result = shortage_and_brief(
+        ctx.out_dir, _slot(ctx), heatmap_frames=ctx["heatmaps"], **_kwargs(ctx, "shortage")
+    )
+    if result is None:
+        raise RuntimeError("shortage_and_brief が結果を返しませんでした")
+    return {"shortage": result}
+
+
+def _shortage_kpi(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks.shortage import refresh_cost_estimates
+
+    ctx["shortage"]
+    return {"shortage_kpi": refresh_cost_estimates(ctx.out_dir, **_kwargs(ctx, "wages"))}
+
+
+def _leave(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks import leave_analyzer
+
+    opts = _kwargs(ctx, "leave")
+    daily = leave_analyzer.get_daily_leave_counts(
+        ctx["long_df"], target_leave_types=opts.get("target_leave_types")
+    )
+    if daily.empty:
+        return {"leave": pd.DataFrame()}
+    summary = leave_analyzer.summarize_leave_by_day_count(daily.copy(), period="date")
+    summary.to_csv(ctx.out_dir / "leave_analysis.csv", index=False)
+    return {"leave": summary}
+
+
+def _fatigue(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks.fatigue import train_fatigue
+
+    model = train_fatigue(ctx["long_df"], ctx.out_dir, slot_minutes=_slot(ctx), **_kwargs(ctx, "fatigue"))
+    return {"fatigue": model}
+
+
+def _fairness(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks.fairness import run_fairness
+
+    # 休日の負担は heatmap 段が heatmap.meta.json に記録する休日 (heatmap に渡した holidays) で数える
+    run_fairness(ctx["long_df"], ctx.out_dir, slot_minutes=_slot(ctx), **_kwargs(ctx, "fairness"))
+    return {"fairness": ctx.out_dir / "fairness_after.parquet"}
+
+
+def _forecast(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks.forecast import build_demand_series, forecast_need
+
+    ctx["heatmaps"]  # heat_ALL.parquet が書かれていることを保証する
+    opts = _kwargs(ctx, "forecast")
+    leave_csv = ctx.out_dir / "leave_analysis.csv"
+    leave_csv = leave_csv if not ctx["leave"].empty and leave_csv.exists() else None
+    demand_csv = build_demand_series(
+        ctx.out_dir / "heat_ALL.parquet", ctx.out_dir / "demand_series.csv", leave_csv=leave_csv
+    )
+    fc = forecast_need(
+        demand_csv,
+        ctx.out_dir / "forecast.parquet",
+        leave_csv=leave_csv,
+        log_csv=ctx.out_dir / "forecast_history.csv",
+        **opts,
+    )
+    return {"forecast": fc}
+
+
+def _forecast_batch(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks.forecast_batch import FORECAST_BATCH_FILE, run_batch_forecast
+
+    run_batch_forecast(ctx.out_dir, ctx["heatmaps"], **_kwargs(ctx, "forecast_batch"))
+    return {"forecast_batch": ctx.out_dir / FORECAST_BATCH_FILE}
+
+
+def _hire_plan(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks.h2hire import build_hire_plan
+
+    ctx["shortage_kpi"]  # サマリーのコスト列ごと複製するため KPI 更新後に読む
+    return {"hire_plan": build_hire_plan(ctx.out_dir, **_kwargs(ctx, "hire_plan"))}
+
+
+def _cost(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks.cost_benefit import analyze_cost_benefit
+
+    ctx["shortage_kpi"]
+    wages = _kwargs(ctx, "wages")
+    opts = {
+        k: v
+        for k, v in (
+            ("wage_direct", wages.get("wage_direct")),
+            ("wage_temp", wages.get("wage_temp")),
+            ("penalty_per_lack_h", wages.get("penalty_per_lack")),
+        )
+        if v is not None
+    }
+    opts.update(_kwargs(ctx, "cost"))
+    return {"cost": analyze_cost_benefit(ctx.out_dir, **opts)}
+
+
+def _kpi_cube(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks.kpi_cube import build_kpi_cube
+
+    ctx["shortage"]
+    fp = build_kpi_cube(
+        ctx.out_dir,
+        long_df=ctx["long_df"],
+        heatmap_frames=ctx["heatmaps"],
+        slot_minutes=_slot(ctx),
+        **_kwargs(ctx, "wages"),
+    )
+    return {"kpi_cube": fp}
+
+
+def _heat_tiles(ctx: StageContext) -> Dict[str, Any]:
+    from ..tasks.heatmap_tiles import build_heatmap_tiles
+
+    return {"heat_tiles": build_heatmap_tiles(ctx.out_dir, ctx["heatmaps"])}
+
+
+ARTIFACTS: tuple[Artifact, ...] = (
+    Artifact("intervals", "shift_intervals.parquet", load=pd.read_parquet, save=_write_parquet),
+    Artifact("work_patterns", "work_patterns.parquet", load=pd.read_parquet, save=_write_parquet),
+    Artifact("long_df", "intermediate_data.parquet", load=read_long_df, save=write_long_df),
+    Artifact("heatmaps", load=_load_heatmaps),
+    Artifact("shortage", "shortage_role_summary.parquet", load=_shortage_paths),
+    Artifact("leave", "leave_analysis.csv", load=pd.read_csv),
+    # 段が自分で書くファイル (kpi_cube の任意入力のキーに内容を使う)
+    Artifact("fatigue", "fatigue_score.parquet"),
+    Artifact("fairness", "fairness_after.parquet"),
+)
+
+STAGES: tuple[Stage, ...] = (
+    Stage(
+        "ingest",
+        _ingest,
+        outputs=("intervals", "work_patterns"),
+        params=("excel", "shift_sheets", "header_row", "year_month_cell", "slot"),
+    ),
+    Stage("expand", _expand, inputs=("intervals",), outputs=("long_df",), params=("slot",)),
+    Stage("heatmap", _heatmap, inputs=("long_df",), outputs=("heatmaps",), params=("slot", "heatmap")),
+    Stage("shortage", _shortage, inputs=("heatmaps",), outputs=("shortage",), params=("slot", "shortage")),
+    Stage("shortage_kpi", _shortage_kpi, inputs=("shortage",), outputs=("shortage_kpi",), params=("wages",)),
+    Stage("leave", _leave, inputs=("long_df",), outputs=("leave",), params=("leave",), required=False),
+    Stage("fatigue", _fatigue, inputs=("long_df",), outputs=("fatigue",), params=("slot", "fatigue"), required=False),
+    Stage("fairness", _fairness, inputs=("long_df", "heatmaps"), outputs=("fairness",), params=("slot", "fairness"), required=False),
+    Stage("forecast", _forecast, inputs=("heatmaps", "leave"), outputs=("forecast",), params=("forecast",), required=False),
+    Stage(
+        "forecast_batch",
+        _forecast_batch,
+        inputs=("heatmaps",),
+        outputs=("forecast_batch",),
+        params=("forecast_batch",),
+        required=False,
+    ),
+    Stage("hire_plan", _hire_plan, inputs=("shortage_kpi",), outputs=("hire_plan",), params=("hire_plan",), required=False),
+    Stage("cost", _cost, inputs=("shortage_kpi",), outputs=("cost",), params=("wages", "cost"), required=False),
+    Stage("heat_tiles", _heat_tiles, inputs=("heatmaps",), outputs=("heat_tiles",), required=False),
+    Stage(
+        "kpi_cube",
+        _kpi_cube,
+        inputs=("long_df", "heatmaps", "shortage"),
+        optional=("fatigue", "fairness"),
+        outputs=("kpi_cube",),
+        params=("slot", "wages"),
+        required=False,
+    ),
+)
+
+
+def default_pipeline() -> Pipeline:
+    """標準の段と成果物で構成した :class:`Pipeline`"""
+    return Pipeline(STAGES, ARTIFACTS)
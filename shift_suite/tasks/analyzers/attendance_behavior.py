@@ -26,9 +26,9 @@ class AttendanceBehaviorAnalyzer:
         df = df.copy()
 
         df["date"] = pd.to_datetime(df["ds"]).dt.date
-        daily = df.groupby(["staff", "date"])["parsed_slots_count"].sum().reset_index()
+        daily = df.groupby(["staff", "date"], observed=True)["parsed_slots_count"].sum().reset_index()
         daily["worked"] = daily["parsed_slots_count"] > 0
         summary = (
-            daily.groupby("staff")["worked"].mean().reset_index(name="attendance_rate")
+            daily.groupby("staff", observed=True)["worked"].mean().reset_index(name="attendance_rate")
         )
         return summary
@@ -16,7 +16,7 @@ class CombinedScoreCalculator:
             return pd.DataFrame()
 
         avg_rest = (
-            rest_df.groupby("staff")["rest_hours"].mean().reset_index()
+            rest_df.groupby("staff", observed=True)["rest_hours"].mean().reset_index()
             if not rest_df.empty
             else pd.DataFrame(columns=["staff", "rest_hours"])
         )
@@ -41,8 +41,8 @@ class LowStaffLoadAnalyzer:
         low_dates = daily_staff[daily_staff < thr_val].index
         low_work_df = work_df[work_df["date"].isin(low_dates)]
 
-        low_counts = low_work_df.groupby("staff")["date"].nunique()
-        total_days = work_df.groupby("staff")["date"].nunique()
+        low_counts = low_work_df.groupby("staff", observed=True)["date"].nunique()
+        total_days = work_df.groupby("staff", observed=True)["date"].nunique()
 
         result = pd.DataFrame({"staff": total_days.index})
         result["low_staff_days"] = low_counts.reindex(
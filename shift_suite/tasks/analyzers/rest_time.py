@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import pandas as pd
 
+from ..shift_intervals import interval_days, is_interval_table
+
 
 class RestTimeAnalyzer:
     """Analyze rest hours between working days and summarize results monthly.
@@ -10,10 +12,13 @@ class RestTimeAnalyzer:
     month.  The returned frame contains the ``staff`` identifier, a ``month``
     column in ``YYYY-MM`` format, and aggregated metrics such as
     ``rest_hours`` for that period.
+
+    ``analyze`` accepts either the per-slot ``long_df`` or the shift interval
+    table from :mod:`shift_suite.tasks.shift_intervals`.
     """
 
     def analyze(self, df: pd.DataFrame, slot_minutes: int = 30) -> pd.DataFrame:
-        if df.empty or "ds" not in df.columns:
+        if df.empty or not ("ds" in df.columns or is_interval_table(df)):
             return pd.DataFrame(columns=["staff", "date", "rest_hours"])
 
         if "parsed_slots_count" not in df.columns:
@@ -23,17 +28,27 @@ class RestTimeAnalyzer:
         if work_df.empty:
             return pd.DataFrame(columns=["staff", "date", "rest_hours"])
 
-        work_df["date"] = pd.to_datetime(work_df["ds"]).dt.date
-        daily = (
-            work_df.groupby(["staff", "date"])["ds"]
-            .agg(["min", "max"])
-            .rename(columns={"min": "start", "max": "end"})
-            .reset_index()
-        )
-        daily["end"] = daily["end"] + pd.to_timedelta(slot_minutes, unit="m")
+        if is_interval_table(work_df):
+            # 区間テーブル: 暦日で分割した区間の最小開始・最大終了がそのまま日次の勤務帯
+            days = interval_days(work_df)
+            days["date"] = days["day"].dt.date
+            daily = (
+                days.groupby(["staff", "date"], observed=True)
+                .agg(start=("day_start", "min"), end=("day_end", "max"))
+                .reset_index()
+            )
+        else:
+            work_df["date"] = pd.to_datetime(work_df["ds"]).dt.date
+            daily = (
+                work_df.groupby(["staff", "date"], observed=True)["ds"]
+                .agg(["min", "max"])
+                .rename(columns={"min": "start", "max": "end"})
+                .reset_index()
+            )
+            daily["end"] = daily["end"] + pd.to_timedelta(slot_minutes, unit="m")
         daily = daily.sort_values(["staff", "start"])
         daily["rest_hours"] = (
-            daily.groupby("staff")["start"].shift(-1) - daily["end"]
+            daily.groupby("staff", observed=True)["start"].shift(-1) - daily["end"]
         ).dt.total_seconds() / 3600.0
         return daily[["staff", "date", "rest_hours"]]
 
@@ -46,7 +61,7 @@ class RestTimeAnalyzer:
 
         df = daily_df.copy()
         df["month"] = pd.to_datetime(df["date"]).dt.to_period("M")
-        monthly = df.groupby(["staff", "month"])["rest_hours"].mean().reset_index()
+        monthly = df.groupby(["staff", "month"], observed=True)["rest_hours"].mean().reset_index()
         monthly["month"] = monthly["month"].astype(str)
         return monthly
 
@@ -59,4 +74,4 @@ class RestTimeAnalyzer:
 
         df = daily_df.copy()
         df["long_break"] = df["rest_hours"] >= threshold_hours
-        return df.groupby("staff")["long_break"].mean()
+        return df.groupby("staff", observed=True)["long_break"].mean()
@@ -21,7 +21,7 @@ class WorkPatternAnalyzer:
             return pd.DataFrame()
 
         # raw counts of each shift code per staff
-        counts = work_df.groupby(["staff", "code"]).size().unstack(fill_value=0)
+        counts = work_df.groupby(["staff", "code"], observed=True).size().unstack(fill_value=0)
 
         # calculate per-staff totals and ratios for each code
         totals = counts.sum(axis=1)
@@ -44,7 +44,7 @@ class WorkPatternAnalyzer:
 
         work_df["month"] = pd.to_datetime(work_df["ds"]).dt.to_period("M")
         counts = (
-            work_df.groupby(["staff", "month", "code"]).size().unstack(fill_value=0)
+            work_df.groupby(["staff", "month", "code"], observed=True).size().unstack(fill_value=0)
         )
 
         totals = counts.sum(axis=1)
@@ -24,6 +24,7 @@ import numpy as np
 import json
 
 from .constants import SLOT_HOURS, STATISTICAL_THRESHOLDS
+from .staff_days import staff_day_matrix
 
 log = logging.getLogger(__name__)
 
@@ -286,29 +287,29 @@ class StaffMECEFactExtractor:
             "疲労回避制約": []
         }
         
+        # 連続勤務日数の分析 (スタッフ × 日の行列の連勤から)
+        matrix = staff_day_matrix(long_df)
+        runs = matrix.streaks().groupby("staff", sort=False)["length"]
+        run_stats = pd.DataFrame({"max": runs.max(), "mean": runs.mean(), "count": runs.size()})
+        worked_slots = pd.Series(matrix.slots.sum(axis=1), index=matrix.staff)
+        
         for staff in eligible_staff:
-            staff_df = long_df[(long_df['staff'] == staff) & (long_df['parsed_slots_count'] > 0)]
-            
-            if len(staff_df) < self.sample_size_minimum:
+            if staff not in run_stats.index or worked_slots[staff] < self.sample_size_minimum:
                 continue
             
-            # 連続勤務日数の分析
-            work_dates = sorted(staff_df['ds'].dt.date.unique())
-            consecutive_periods = self._calculate_consecutive_periods(work_dates)
+            stats = run_stats.loc[staff]
+            max_consecutive = int(stats["max"])
+            avg_consecutive = float(stats["mean"])
             
-            if consecutive_periods:
-                max_consecutive = max(consecutive_periods)
-                avg_consecutive = np.mean(consecutive_periods)
-                
-                facts["連続勤務制約"].append({
-                    "スタッフ": staff,
-                    "制約種別": "連続勤務上限",
-                    "詳細": f"最大連続{max_consecutive}日、平均{avg_consecutive:.1f}日",
-                    "最大連続日数": max_consecutive,
-                    "平均連続日数": round(avg_consecutive, 1),
-                    "確信度": min(1.0, len(consecutive_periods) / 5),
-                    "事実性": "実績ベース推定"
-                })
+            facts["連続勤務制約"].append({
+                "スタッフ": staff,
+                "制約種別": "連続勤務上限",
+                "詳細": f"最大連続{max_consecutive}日、平均{avg_consecutive:.1f}日",
+                "最大連続日数": max_consecutive,
+                "平均連続日数": round(avg_consecutive, 1),
+                "確信度": min(1.0, int(stats["count"]) / 5),
+                "事実性": "実績ベース推定"
+            })
         
         return facts
     
@@ -486,25 +487,6 @@ class StaffMECEFactExtractor:
         
         return facts
     
-    def _calculate_consecutive_periods(self, dates: List) -> List[int]:
-        """連続勤務期間の計算"""
-        if not dates:
-            return []
-        
-        dates = sorted(dates)
-        consecutive_periods = []
-        current_period = 1
-        
-        for i in range(1, len(dates)):
-            if (dates[i] - dates[i-1]).days == 1:
-                current_period += 1
-            else:
-                consecutive_periods.append(current_period)
-                current_period = 1
-        
-        consecutive_periods.append(current_period)
-        return consecutive_periods
-    
     def _format_for_human_confirmation(self, staff_facts: Dict, eligible_staff: List[str]) -> Dict[str, Any]:
         """人間確認用のMECE構造化フォーマット"""
         formatted = {
@@ -15,6 +15,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from collections import defaultdict, Counter
 import json
+from .staff_days import staff_day_matrix
 
 log = logging.getLogger(__name__)
 
@@ -323,16 +324,10 @@ class CostEfficiencyMECEFactExtractor:
         try:
             # 連続勤務による残業リスク
             if 'staff' in long_df.columns and 'ds' in long_df.columns:
-                overtime_risks = []
-                
-                for staff_id in long_df['staff'].unique():
-                    staff_dates = pd.to_datetime(long_df[long_df['staff'] == staff_id]['ds']).sort_values()
-                    
-                    if len(staff_dates) > 1:
-                        # 連続勤務日数
-                        consecutive_days = self._calculate_max_consecutive_days(staff_dates)
-                        if consecutive_days >= 5:
-                            overtime_risks.append(consecutive_days)
+                # 連続勤務日数 (スタッフ別の最大連続日数)
+                streaks = staff_day_matrix(long_df).streaks()
+                max_streaks = streaks.groupby('staff')['length'].max()
+                overtime_risks = max_streaks[max_streaks >= 5].tolist()
                 
                 if overtime_risks:
                     avg_consecutive = np.mean(overtime_risks)
@@ -832,24 +827,6 @@ class CostEfficiencyMECEFactExtractor:
         
         return constraints if constraints else ["コスト削減に関する制約は検出されませんでした"]
     
-    def _calculate_max_consecutive_days(self, dates: pd.Series) -> int:
-        """最大連続勤務日数の計算"""
-        if len(dates) <= 1:
-            return len(dates)
-        
-        sorted_dates = sorted(dates)
-        max_consecutive = 1
-        current_consecutive = 1
-        
-        for i in range(1, len(sorted_dates)):
-            if (sorted_dates[i] - sorted_dates[i-1]).days == 1:
-                current_consecutive += 1
-                max_consecutive = max(max_consecutive, current_consecutive)
-            else:
-                current_consecutive = 1
-        
-        return max_consecutive
-    
     def _generate_human_readable_results(self, mece_facts: Dict[str, List[str]], long_df: pd.DataFrame) -> Dict[str, Any]:
         """人間可読形式の結果生成"""
         
@@ -17,10 +17,13 @@ def _meta(p: Path) -> dict:
     return {}
 
 def _kpi(out_dir: Path) -> dict:
-    heat_p = out_dir / 'heat_ALL.xlsx'
-    if not heat_p.exists():
+    heat_p = out_dir / 'heat_ALL.parquet'
+    if heat_p.exists():
+        heat = pd.read_parquet(heat_p)
+    elif (out_dir / 'heat_ALL.xlsx').exists():
+        heat = pd.read_excel(out_dir / 'heat_ALL.xlsx', index_col=0)
+    else:
         return {}
-    heat = pd.read_excel(heat_p, index_col=0)
     total_h  = heat.sum().sum()
     need     = derive_min_staff(heat, 'mean-1s')
     lack_h   = heat.sub(need, axis=0).clip(lower=0).sum().sum()
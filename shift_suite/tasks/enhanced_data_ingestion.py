@@ -25,6 +25,7 @@ from .constants import (
     QUALITY_SINGLE_SHEET_SCORE, QUALITY_STAFF_MISSING_SCORE, QUALITY_WEIGHTS
 )
 from .utils import log  # , write_meta  # write_meta は現在未使用
+from .workbook_session import WorkbookSession, open_workbook
 
 # Analysis logger
 analysis_logger = logging.getLogger('analysis')
@@ -96,13 +97,13 @@ class DynamicSchemaInferrer:
     def infer_structure(self, excel_path: Path) -> Dict[str, Any]:
         """Excel構造の自動推論"""
         try:
-            # 全シートを読み込んで構造分析
-            excel_file = pd.ExcelFile(excel_path)
+            # 全シートを読み込んで構造分析 (ingest と同じセッションを共有)
+            excel_file = open_workbook(excel_path)
             sheets_info = {}
             
             for sheet_name in excel_file.sheet_names:
                 try:
-                    df = pd.read_excel(excel_path, sheet_name=sheet_name, nrows=QUALITY_PREVIEW_ROWS)
+                    df = excel_file.read_sheet(sheet_name, nrows=QUALITY_PREVIEW_ROWS)
                     sheets_info[sheet_name] = {
                         "columns": list(df.columns),
                         "shape": df.shape,
@@ -172,7 +173,7 @@ class DataQualityChecker:
             result.file_format_score = self._check_file_format(excel_path)
             
             # Excel読み込み
-            excel_file = pd.ExcelFile(excel_path)
+            excel_file = open_workbook(excel_path)
             
             # 構造分析
             result.structure_score = self._analyze_structure(excel_file)
@@ -184,7 +185,7 @@ class DataQualityChecker:
                 return result
             
             # 主要データ読み込み
-            df = pd.read_excel(excel_path, sheet_name=primary_sheet)
+            df = excel_file.read_sheet(primary_sheet)
             
             # 各種品質チェック
             result.date_range_score, result.detected_date_range, result.missing_dates = self._check_date_range(df)
@@ -228,7 +229,7 @@ class DataQualityChecker:
         except Exception:
             return 0.0
     
-    def _analyze_structure(self, excel_file: pd.ExcelFile) -> float:
+    def _analyze_structure(self, excel_file: WorkbookSession) -> float:
         """構造分析"""
         try:
             sheet_count = len(excel_file.sheet_names)
@@ -241,7 +242,7 @@ class DataQualityChecker:
         except Exception:
             return 0.0
     
-    def _find_primary_sheet(self, excel_file: pd.ExcelFile) -> Optional[str]:
+    def _find_primary_sheet(self, excel_file: WorkbookSession) -> Optional[str]:
         """主要シート特定"""
         # Need fileを最優先
         for sheet_name in excel_file.sheet_names:
@@ -605,7 +606,7 @@ class TruthAssuredDataIngestion:
             if not primary_sheet:
                 raise ValueError("主要データシートが特定できませんでした")
             
-            data = pd.read_excel(excel_path, sheet_name=primary_sheet)
+            data = open_workbook(excel_path).read_sheet(primary_sheet)
             self.lineage_tracker.track_step("data_loading", {
                 "sheet": primary_sheet,
                 "shape": data.shape
@@ -1,13 +1,17 @@
 import datetime as dt
 import logging
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, Optional, Sequence
 
+import numpy as np
 import pandas as pd
 
 from .analyzers.rest_time import RestTimeAnalyzer
 from .leave_analyzer import approval_rate_by_staff
-from .constants import NIGHT_START_TIME, NIGHT_END_TIME, is_night_shift_time, FATIGUE_PARAMETERS
+from .constants import DEFAULT_SLOT_MINUTES, NIGHT_START_TIME, NIGHT_END_TIME
+from .holiday_detection import holiday_mask, load_meta_holidays
+from .staff_days import staff_day_matrix
 from .utils import calculate_jain_index
 
 log = logging.getLogger(__name__)
@@ -33,30 +37,183 @@ def _find_staff_column_name(df: pd.DataFrame, preference: Optional[str] = None)
     )
 
 
-def _extract_time_series(df: pd.DataFrame) -> pd.Series:
-    """
-    long_df から時刻情報を抽出する。
-    ds 列が datetime 型であることを前提とする。
-    """
-    if "ds" not in df.columns:
-        raise KeyError("'ds' 列が見つかりません。")
+# ── 負担の集計エンジン ─────────────────────────────────────────────
+# 勤務スロット (parsed_slots_count > 0 の行) ごとの負担フラグを整数配列で作り、
+# スタッフ別・次元 (職種 / 雇用形態 / 月 …) × スタッフ別の合計を bincount で
+# 1 回ずつ数える。行ごとの Python コールバックは使わない。
+BURDENS = ("night", "weekend", "holiday", "long_shift")
+FAIRNESS_DIMENSIONS = ("role", "employment", "month")
+DEFAULT_LONG_SHIFT_HOURS = 10.0
+ALL_GROUP = "全体"
 
-    time_series = pd.to_datetime(df["ds"]).dt.time
-    return time_series
 
+@dataclass(frozen=True)
+class _SlotBurdens:
+    """Work-slot rows with their staff number and per-burden 0/1 flags."""
 
-def _is_night(
-    time_obj: dt.time,
-    night_start: dt.time = NIGHT_START_TIME,
-    night_end: dt.time = NIGHT_END_TIME,
-) -> bool:
-    """
-    指定された時刻が夜勤時間帯かどうかを判定する。
-    統一された定数を使用: 22:00 - 05:59 (翌朝)。
-    """
-    return is_night_shift_time(time_obj)
+    staff: pd.Index
+    work: pd.DataFrame
+    staff_idx: np.ndarray
+    flags: Dict[str, np.ndarray]
+    long_shift_days: np.ndarray
+
+
+def _contains(values: pd.Series, keyword: str) -> np.ndarray:
+    """各行の値が ``keyword`` を含むか (判定はユニーク値ごとに 1 回)"""
+    idx, uniques = pd.factorize(values)
+    hit = np.append(pd.Index(uniques).astype(str).str.contains(keyword, regex=False), False)
+    return hit[idx]
+
+
+def _night_by_time(ds: pd.Series, night_start_time: dt.time, night_end_time: dt.time) -> np.ndarray:
+    minutes = ds.dt.hour.to_numpy() * 60 + ds.dt.minute.to_numpy()
+    lo = night_start_time.hour * 60 + night_start_time.minute
+    hi = night_end_time.hour * 60 + night_end_time.minute
+    if lo <= hi:
+        return (minutes >= lo) & (minutes <= hi)
+    return (minutes >= lo) | (minutes <= hi)
+
+
+def _slot_burdens(
+    long_df: pd.DataFrame,
+    staff_col: str,
+    *,
+    holidays: Iterable[dt.date] | None,
+    slot_minutes: int,
+    long_shift_hours: float,
+    night_start_time: dt.time,
+    night_end_time: dt.time,
+) -> _SlotBurdens:
+    staff_all, staff = pd.factorize(long_df[staff_col], sort=True)
+    if "parsed_slots_count" in long_df.columns:
+        mask = long_df["parsed_slots_count"].to_numpy() > 0
+    else:
+        mask = np.ones(len(long_df), dtype=bool)
+    work = long_df[mask]
+    staff_idx = staff_all[mask].astype(np.int64)
+    ds = pd.to_datetime(work["ds"])
+
+    use_code = "code" in long_df.columns and _contains(long_df["code"], "夜").any()
+    if use_code:
+        log.info("[fairness] 'code' 列から夜勤判定を行います。")
+        night = _contains(work["code"], "夜")
+    elif "parsed_slots_count" not in long_df.columns:
+        log.error(
+            "[fairness] long_dfに 'parsed_slots_count' 列が見つかりません。夜勤判定をスキップします。"
+        )
+        night = np.zeros(len(work), dtype=bool)
+    else:
+        log.info(
+            f"[fairness] 夜勤フラグ計算中 (夜勤帯: {night_start_time:%H:%M} - {night_end_time:%H:%M}) 対象レコード数: {len(work)}"
+        )
+        night = _night_by_time(ds, night_start_time, night_end_time)
+
+    # 長時間勤務: その日の勤務スロット合計が long_shift_hours 以上の日のスロット
+    day = ds.to_numpy().astype("datetime64[D]").astype(np.int64)
+    n_days = int(day.max() - day.min()) + 1 if len(day) else 1
+    day_key = staff_idx * n_days + (day - (day.min() if len(day) else 0))
+    day_slots = np.bincount(day_key, minlength=len(staff) * n_days)
+    long_day = day_slots * slot_minutes / 60.0 >= long_shift_hours
+    long_shift_days = np.bincount(np.flatnonzero(long_day) // n_days, minlength=len(staff))
+
+    flags = {
+        "night": night.astype(np.int8),
+        "weekend": (ds.dt.dayofweek.to_numpy() >= 5).astype(np.int8),
+        "holiday": holiday_mask(ds, holidays).astype(np.int8),
+        "long_shift": long_day[day_key].astype(np.int8),
+    }
+    return _SlotBurdens(staff, work, staff_idx, flags, long_shift_days)
+
+
+def _jain_gini(values: np.ndarray, present: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """行ごとの Jain 指数と Gini 係数 (``present`` が False の列は除く)"""
+    n = present.sum(axis=1)
+    x = np.where(present, values, 0.0)
+    total = x.sum(axis=1)
+    squares = (x**2).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        jain = np.where(squares > 0, total**2 / (n * squares), 1.0)
+        # 昇順に並べたときの順位で重み付け (存在しない列は末尾に回す)
+        ordered = np.sort(np.where(present, values, np.inf), axis=1)
+        rank = np.arange(1, values.shape[1] + 1)
+        weighted = np.where(np.isfinite(ordered), ordered * rank, 0.0).sum(axis=1)
+        gini = np.where(total > 0, 2 * weighted / (n * total) - (n + 1) / n, 0.0)
+    return jain.round(3), gini.round(3)
+
+
+def _dimension_codes(work: pd.DataFrame, dimension: str) -> tuple[np.ndarray, pd.Index] | None:
+    if dimension == "month":
+        idx, groups = pd.factorize(pd.to_datetime(work["ds"]).dt.to_period("M"), sort=True)
+        return idx, pd.Index(groups.astype(str))
+    if dimension not in work.columns:
+        log.debug(f"[fairness] 次元 '{dimension}' の列がないため省略します")
+        return None
+    idx, groups = pd.factorize(work[dimension], sort=True)
+    return idx, pd.Index(groups.astype(str))
+
+
+def _cube(burdens: _SlotBurdens, dimensions: Sequence[str]) -> pd.DataFrame:
+    n_staff = len(burdens.staff)
+    frames = []
+    coded = [("all", (np.zeros(len(burdens.work), dtype=np.int64), pd.Index([ALL_GROUP])))]
+    coded += [(d, c) for d in dimensions if (c := _dimension_codes(burdens.work, d)) is not None]
+    for dimension, (group_idx, groups) in coded:
+        valid = group_idx >= 0
+        key = group_idx[valid].astype(np.int64) * n_staff + burdens.staff_idx[valid]
+        shape = (len(groups), n_staff)
+        total = np.bincount(key, minlength=shape[0] * n_staff).reshape(shape)
+        present = total > 0
+        n_present = present.sum(axis=1)
+        for burden in BURDENS:
+            slots = np.bincount(key, weights=burdens.flags[burden][valid], minlength=total.size).reshape(shape)
+            ratio = np.divide(slots, total, out=np.zeros(shape), where=present)
+            jain, gini = _jain_gini(ratio, present)
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "dimension": dimension,
+                        "group": groups,
+                        "burden": burden,
+                        "n_staff": n_present,
+                        "total_slots": total.sum(axis=1),
+                        "burden_slots": slots.sum(axis=1).astype(np.int64),
+                        "mean_ratio": (ratio.sum(axis=1) / np.maximum(n_present, 1)).round(3),
+                        "jain": jain,
+                        "gini": gini,
+                    }
+                )
+            )
+    cube = pd.concat(frames, ignore_index=True)
+    return cube[cube["n_staff"] > 0].reset_index(drop=True)
 
 
+def fairness_cube(
+    long_df: pd.DataFrame,
+    *,
+    dimensions: Sequence[str] = FAIRNESS_DIMENSIONS,
+    staff_col_preference: Optional[str] = None,
+    holidays: Iterable[dt.date] | None = None,
+    slot_minutes: int = DEFAULT_SLOT_MINUTES,
+    long_shift_hours: float = DEFAULT_LONG_SHIFT_HOURS,
+    night_start_time: dt.time = NIGHT_START_TIME,
+    night_end_time: dt.time = NIGHT_END_TIME,
+) -> pd.DataFrame:
+    """次元 × グループ × 負担ごとの公平性 (スタッフ間の負担比率の Jain 指数 / Gini 係数)
+
+    列: dimension / group / burden / n_staff / total_slots / burden_slots /
+    mean_ratio / jain / gini。``dimension == "all"`` の行は全体。
+    """
+    burdens = _slot_burdens(
+        long_df,
+        _find_staff_column_name(long_df, staff_col_preference),
+        holidays=holidays,
+        slot_minutes=slot_minutes,
+        long_shift_hours=long_shift_hours,
+        night_start_time=night_start_time,
+        night_end_time=night_end_time,
+    )
+    return _cube(burdens, dimensions)
+
 
 def run_fairness(
     long_df: pd.DataFrame,
@@ -65,7 +222,17 @@ def run_fairness(
     staff_col_preference: Optional[str] = None,
     night_start_time: dt.time = dt.time(22, 0),
     night_end_time: dt.time = dt.time(5, 59),  # 翌朝の5:59まで
-) -> None:
+    dimensions: Sequence[str] = FAIRNESS_DIMENSIONS,
+    holidays: Iterable[dt.date] | None = None,
+    slot_minutes: int = DEFAULT_SLOT_MINUTES,
+    long_shift_hours: float = DEFAULT_LONG_SHIFT_HOURS,
+) -> Path | None:
+    """スタッフ別の負担と公平性を fairness_before / fairness_after / fairness_cube に書く
+
+    ``holidays`` を省略すると ``out_dir`` の heatmap.meta.json の ``estimated_holidays``
+    (build_heatmap に渡された休日) を使う。heatmap が推定する休業日は通常勤務の無い日
+    なので、負担の対象にならず読み込まない。
+    """
     out_dir_path = Path(out_dir)
     out_dir_path.mkdir(parents=True, exist_ok=True)
 
@@ -73,23 +240,10 @@ def run_fairness(
     log.info(f"[fairness] long_df shape: {long_df.shape}")
     log.info(f"[fairness] out_dir_path: {out_dir_path}")
     log.debug(f"[fairness] long_df columns: {list(long_df.columns)}")
-    log.debug(f"[fairness] long_df sample data:\n{long_df.head()}")
-    log.debug(
-        f"[fairness] unique staff members: {long_df['staff'].nunique() if 'staff' in long_df.columns else 'N/A'}"
-    )
 
     if long_df.empty:
         log.warning("[fairness] 入力DataFrame (long_df) が空。スキップ。")
-        empty_summary = pd.DataFrame(
-            columns=[
-                _find_staff_column_name(long_df, staff_col_preference)
-                if not long_df.empty
-                else "staff",
-                "night_slots",
-                "total_slots",
-                "night_ratio",
-            ]
-        )
+        empty_summary = pd.DataFrame(columns=["staff", "night_slots", "total_slots", "night_ratio"])
         pd.DataFrame({"metric": ["jain_index"], "value": [1.0]}).to_parquet(
             out_dir_path / "fairness_before.parquet",
             index=False,
@@ -98,142 +252,43 @@ def run_fairness(
             out_dir_path / "fairness_after.parquet",
             index=False,
         )
-        return
+        return None
 
-    df_for_fairness = long_df.copy()
     try:
-        actual_staff_col_name = _find_staff_column_name(
-            df_for_fairness, staff_col_preference
-        )
+        actual_staff_col_name = _find_staff_column_name(long_df, staff_col_preference)
         log.info(f"[fairness] スタッフ識別列: '{actual_staff_col_name}'")
     except KeyError as e:
         log.error(f"[fairness] {e} スキップ。")
-        return
+        return None
 
-    use_code = (
-        "code" in df_for_fairness.columns
-        and df_for_fairness["code"].astype(str).str.contains("夜", na=False).any()
+    if holidays is None:
+        holidays = load_meta_holidays(out_dir_path)
+    burdens = _slot_burdens(
+        long_df,
+        actual_staff_col_name,
+        holidays=holidays,
+        slot_minutes=slot_minutes,
+        long_shift_hours=long_shift_hours,
+        night_start_time=night_start_time,
+        night_end_time=night_end_time,
     )
+    n_staff = len(burdens.staff)
 
-    if use_code:
-        log.info("[fairness] 'code' 列から夜勤判定を行います。")
-        if "parsed_slots_count" in df_for_fairness.columns:
-            working_slots_df = df_for_fairness[
-                df_for_fairness["parsed_slots_count"] > 0
-            ].copy()
-        else:
-            working_slots_df = df_for_fairness.copy()
-
-        if not working_slots_df.empty:
-            working_slots_df["is_night_shift"] = (
-                working_slots_df["code"]
-                .astype(str)
-                .str.contains("夜", na=False)
-                .astype(int)
-            )
-            df_for_fairness = df_for_fairness.merge(
-                working_slots_df[["is_night_shift"]],
-                left_index=True,
-                right_index=True,
-                how="left",
-            ).fillna({"is_night_shift": 0})
-            df_for_fairness["is_night_shift"] = df_for_fairness[
-                "is_night_shift"
-            ].astype(int)
-        else:
-            df_for_fairness["is_night_shift"] = 0
-    elif "parsed_slots_count" not in df_for_fairness.columns:
-        log.error(
-            "[fairness] long_dfに 'parsed_slots_count' 列が見つかりません。夜勤判定をスキップします。"
-        )
-        df_for_fairness["is_night_shift"] = 0
-    else:
-        working_slots_df = df_for_fairness[
-            df_for_fairness["parsed_slots_count"] > 0
-        ].copy()
-        if not working_slots_df.empty:
-            time_series_working = _extract_time_series(working_slots_df)
-            log.info(
-                f"[fairness] 夜勤フラグ計算中 (夜勤帯: {night_start_time:%H:%M} - {night_end_time:%H:%M}) 対象レコード数: {len(working_slots_df)}"
-            )
-            working_slots_df["is_night_shift"] = time_series_working.apply(
-                lambda t: int(_is_night(t, night_start_time, night_end_time))
-            )
-            df_for_fairness = df_for_fairness.merge(
-                working_slots_df[["is_night_shift"]],
-                left_index=True,
-                right_index=True,
-                how="left",
-            ).fillna({"is_night_shift": 0})
-            df_for_fairness["is_night_shift"] = df_for_fairness[
-                "is_night_shift"
-            ].astype(int)
-        else:
-            log.info(
-                "[fairness] parsed_slots_count > 0 の勤務記録がないため、夜勤シフトはありません。"
-            )
-            df_for_fairness["is_night_shift"] = 0
-
-    if df_for_fairness.empty or not df_for_fairness["is_night_shift"].any():
-        log.info("[fairness] 夜勤シフト無しかデータ無。Jain指数1.0で処理。")
-        unique_staff_list = (
-            df_for_fairness[actual_staff_col_name].unique()
-            if actual_staff_col_name in df_for_fairness
-            else []
-        )
-
-        if "parsed_slots_count" in df_for_fairness.columns:
-            total_slots_series = (
-                df_for_fairness[df_for_fairness["parsed_slots_count"] > 0]
-                .groupby(actual_staff_col_name)["ds"]
-                .count()
-            )
-        else:
-            total_slots_series = df_for_fairness.groupby(actual_staff_col_name)[
-                "ds"
-            ].count()
+    def _per_staff(weights: np.ndarray | None = None) -> np.ndarray:
+        return np.bincount(burdens.staff_idx, weights=weights, minlength=n_staff)
 
-        summary_df = pd.DataFrame(
-            {
-                actual_staff_col_name: unique_staff_list,
-                "night_slots": 0,
-            }
-        ).set_index(actual_staff_col_name)
-        summary_df["total_slots"] = total_slots_series
-        summary_df = summary_df.fillna({"total_slots": 0}).reset_index()
-        summary_df["night_ratio"] = 0.0
-        jain_index_val = 1.0
-    else:
-        night_slots_series = df_for_fairness.groupby(actual_staff_col_name)[
-            "is_night_shift"
-        ].sum()
-
-        if "parsed_slots_count" in df_for_fairness.columns:
-            total_slots_for_fairness_series = (
-                df_for_fairness[df_for_fairness["parsed_slots_count"] > 0]
-                .groupby(actual_staff_col_name)["ds"]
-                .count()
-            )
-        else:
-            total_slots_for_fairness_series = df_for_fairness.groupby(
-                actual_staff_col_name
-            )["ds"].count()
+    total_slots = _per_staff().astype(np.int64)
 
-        summary_df = pd.DataFrame(night_slots_series).rename(
-            columns={"is_night_shift": "night_slots"}
-        )
-        summary_df["total_slots"] = total_slots_for_fairness_series
-        summary_df = summary_df.fillna(
-            {"night_slots": 0, "total_slots": 0}
-        ).reset_index()
-
-        summary_df["night_ratio"] = (
-            (summary_df["night_slots"] / summary_df["total_slots"].replace(0, pd.NA))
-            .fillna(0)
-            .round(3)
-        )
+    def _ratio(slots: np.ndarray) -> np.ndarray:
+        return np.divide(slots, total_slots, out=np.zeros(n_staff), where=total_slots > 0).round(3)
 
-        jain_index_val = calculate_jain_index(summary_df["night_ratio"])
+    summary_df = pd.DataFrame({actual_staff_col_name: np.asarray(burdens.staff)})
+    night_slots = _per_staff(burdens.flags["night"]).astype(np.int64)
+    summary_df["night_slots"] = night_slots
+    summary_df["total_slots"] = total_slots
+    summary_df["night_ratio"] = _ratio(night_slots)
+    if not night_slots.any():
+        log.info("[fairness] 夜勤シフト無しかデータ無。Jain指数1.0で処理。")
 
     mean_ratio = (
         float(summary_df["night_ratio"].mean()) if not summary_df.empty else 0.0
@@ -247,20 +302,29 @@ def run_fairness(
     summary_df["fairness_score"] = summary_df["fairness_score"].clip(0, 1).round(3)
 
     # -- Additional metrics -------------------------------------------------
-    work_slots_series = (
-        df_for_fairness[df_for_fairness.get("parsed_slots_count", 0) > 0]
-        .groupby(actual_staff_col_name)["parsed_slots_count"]
-        .sum()
-    )
-    summary_df["total_work_slots"] = summary_df[actual_staff_col_name].map(work_slots_series).fillna(0)
+    if "parsed_slots_count" in burdens.work.columns:
+        work_slots = _per_staff(burdens.work["parsed_slots_count"].to_numpy(dtype=float))
+    else:
+        work_slots = total_slots
+    summary_df["total_work_slots"] = work_slots.astype("int64")
 
+    staff_keys = summary_df[actual_staff_col_name]
     leave_rate_series = approval_rate_by_staff(long_df)
-    summary_df["approval_rate"] = summary_df[actual_staff_col_name].map(leave_rate_series).fillna(0)
+    summary_df["approval_rate"] = staff_keys.map(leave_rate_series).fillna(0)
+
+    if "parsed_slots_count" in long_df.columns:
+        rest_daily = staff_day_matrix(long_df, slot_minutes, actual_staff_col_name).rest_hours()
+        consec_series = RestTimeAnalyzer().consecutive_leave_frequency(rest_daily)
+    else:
+        consec_series = pd.Series(dtype=float)
+    summary_df["consecutive_leave_freq"] = staff_keys.map(consec_series).fillna(0)
 
-    rta = RestTimeAnalyzer()
-    rest_daily = rta.analyze(long_df)
-    consec_series = rta.consecutive_leave_frequency(rest_daily)
-    summary_df["consecutive_leave_freq"] = summary_df[actual_staff_col_name].map(consec_series).fillna(0)
+    # -- 夜勤以外の負担 (土日・休業日・長時間勤務) -----------------------------
+    for burden in BURDENS[1:]:
+        slots = _per_staff(burdens.flags[burden]).astype(np.int64)
+        summary_df[f"{burden}_slots"] = slots
+        summary_df[f"{burden}_ratio"] = _ratio(slots)
+    summary_df["long_shift_days"] = burdens.long_shift_days.astype(np.int64)
 
     # -- deviation from mean -----------------------------------------------
     def _dev(s: pd.Series, mean_val: float) -> pd.Series:
@@ -276,38 +340,49 @@ def run_fairness(
         summary_df[["dev_night_ratio", "dev_work_slots", "dev_approval_rate", "dev_consecutive"]].mean(axis=1)
     )
     summary_df["unfairness_rank"] = summary_df["unfairness_score"].rank(method="min", ascending=False).astype(int)
-    summary_df = summary_df.sort_values("unfairness_rank").reset_index(drop=True)
+    summary_df = summary_df.sort_values("unfairness_rank", kind="stable").reset_index(drop=True)
 
     jain_night_ratio = calculate_jain_index(summary_df["night_ratio"])
     jain_night_slots = calculate_jain_index(summary_df["night_slots"])
     jain_total_slots = calculate_jain_index(summary_df["total_slots"])
     jain_index_val = jain_night_ratio
 
+    # 負担ごとのスタッフ間 Jain / Gini (勤務のあるスタッフのみ)
+    ratios = np.vstack([summary_df[f"{b}_ratio"].to_numpy(dtype=float) for b in BURDENS])
+    present = np.broadcast_to(summary_df["total_slots"].to_numpy() > 0, ratios.shape)
+    jain_by_burden, gini_by_burden = _jain_gini(ratios, present)
+
     log.debug(
         f"[fairness] Jain指数詳細 - night_ratio: {jain_night_ratio:.3f}, night_slots: {jain_night_slots:.3f}, total_slots: {jain_total_slots:.3f}"
     )
     log.debug(f"[fairness] summary_df shape: {summary_df.shape}")
-    log.debug(f"[fairness] summary_df sample:\n{summary_df.head()}")
 
     summary_df.attrs["jain_index"] = jain_index_val
     before_fp_path = out_dir_path / "fairness_before.parquet"
     after_fp_path = out_dir_path / "fairness_after.parquet"
+    cube_fp_path = out_dir_path / "fairness_cube.parquet"
 
     try:
         meta_df = pd.DataFrame(
             {
                 "metric": [
+                    "jain_index",
                     "jain_night_ratio",
                     "jain_night_slots",
                     "jain_total_slots",
-                ],
-                "value": [jain_night_ratio, jain_night_slots, jain_total_slots],
+                ]
+                + [f"jain_{b}_ratio" for b in BURDENS[1:]]
+                + [f"gini_{b}_ratio" for b in BURDENS],
+                "value": [jain_index_val, jain_night_ratio, jain_night_slots, jain_total_slots]
+                + [float(v) for v in jain_by_burden[1:]]
+                + [float(v) for v in gini_by_burden],
             }
         )
         meta_df.to_parquet(before_fp_path, index=False)
         summary_df.to_parquet(after_fp_path, index=False)
+        _cube(burdens, dimensions).to_parquet(cube_fp_path, index=False)
         log.info(
-            f"[fairness] fairness_before.parquet / fairness_after.parquet 保存 (Jain: {jain_index_val:.3f})"
+            f"[fairness] fairness_before / fairness_after / fairness_cube 保存 (Jain: {jain_index_val:.3f})"
         )
         return after_fp_path  # Return the result file path
     except Exception as e:
@@ -5,7 +5,7 @@ import numpy as np
 from pathlib import Path
 from .utils import save_df_xlsx, save_df_parquet, log
 from .constants import FATIGUE_PARAMETERS
-from .analyzers.rest_time import RestTimeAnalyzer
+from .staff_days import StaffDayMatrix, staff_day_matrix, time_category
 
 # PyTorch LSTM疲労予測モデルのインポート（利用可能な場合）
 try:
@@ -19,167 +19,90 @@ except ImportError:
 
 def _get_time_category(code_str: str) -> str:
     """勤務コードから時間帯カテゴリを判定"""
-    if pd.isna(code_str):
-        return "other"
-    code_str = str(code_str).lower()
-    
-    # 夜勤の判定
-    night_keywords = ["夜", "夜勤", "night", "準夜", "深夜"]
-    if any(keyword in code_str for keyword in night_keywords):
-        return "night"
-    
-    # 日勤の判定
-    day_keywords = ["日", "日勤", "day", "早番", "朝"]
-    if any(keyword in code_str for keyword in day_keywords):
-        return "day"
-    
-    # 遅番の判定
-    late_keywords = ["遅", "遅番", "late", "夕"]
-    if any(keyword in code_str for keyword in late_keywords):
-        return "late"
-    
-    return "other"
+    return time_category(code_str)
 
 
-def _analyze_consecutive_days(long_df: pd.DataFrame) -> list:
-    """連続勤務日数の分析"""
-    consecutive_metrics = []
-    
-    # スタッフごとの連続勤務を分析
-    for staff in long_df["staff"].unique():
-        staff_df = long_df[long_df["staff"] == staff].copy()
-        staff_df["date"] = pd.to_datetime(staff_df["ds"]).dt.date
-        work_dates = sorted(staff_df["date"].unique())
-        
-        if len(work_dates) < 2:
-            consecutive_metrics.append({
-                "staff": staff,
-                "consec3_ratio": 0,
-                "consec4_ratio": 0,
-                "consec5_ratio": 0
-            })
-            continue
-        
-        # 連続勤務パターンの検出
-        consecutive_groups = []
-        current_group = [work_dates[0]]
-        
-        for i in range(1, len(work_dates)):
-            prev_date = work_dates[i-1]
-            curr_date = work_dates[i]
-            
-            # 1日の差があるかチェック
-            if (curr_date - prev_date).days == 1:
-                current_group.append(curr_date)
-            else:
-                if len(current_group) >= 3:  # 3日以上の連勤のみ記録
-                    consecutive_groups.append(len(current_group))
-                current_group = [curr_date]
-        
-        # 最後のグループもチェック
-        if len(current_group) >= 3:
-            consecutive_groups.append(len(current_group))
-        
-        # 連勤パターンの比率計算
-        total_work_days = len(work_dates)
-        consec3_days = sum(1 for x in consecutive_groups if x >= 3)
-        consec4_days = sum(1 for x in consecutive_groups if x >= 4)
-        consec5_days = sum(1 for x in consecutive_groups if x >= 5)
-        
-        consecutive_metrics.append({
-            "staff": staff,
-            "consec3_ratio": consec3_days / max(total_work_days, 1),
-            "consec4_ratio": consec4_days / max(total_work_days, 1),
-            "consec5_ratio": consec5_days / max(total_work_days, 1)
-        })
-    
-    return consecutive_metrics
+def _analyze_consecutive_days(long_df: pd.DataFrame, slot_minutes: int = 30) -> list:
+    """連続勤務日数の分析 (long_df / 勤務区間テーブルの両方に対応)
+
+    3 / 4 / 5 日以上の連勤の回数を勤務日数で割った比率を返す。
+    """
+    matrix = staff_day_matrix(long_df, slot_minutes)
+    return _consecutive_ratios(matrix).reset_index().to_dict("records")
+
+
+def _consecutive_ratios(matrix: StaffDayMatrix) -> pd.DataFrame:
+    streaks = matrix.streaks()
+    total_days = pd.Series(matrix.worked.sum(axis=1), index=matrix.staff)
+    counts = {
+        f"consec{n}_ratio": streaks[streaks["length"] >= n].groupby("staff").size().reindex(matrix.staff, fill_value=0)
+        for n in (3, 4, 5)
+    }
+    ratios = pd.DataFrame(counts).div(total_days.clip(lower=1), axis=0)
+    # 勤務日が 1 日以下のスタッフは連勤なし
+    ratios[total_days < 2] = 0
+    return ratios[total_days > 0]
 
 
 def _features(long_df: pd.DataFrame, slot_minutes: int = 30) -> pd.DataFrame:
-    """疲労分析用の特徴量を生成"""
+    """疲労分析用の特徴量を生成 (スタッフ × 日の行列から)"""
     
     # Check if 'name' column exists, fallback to 'staff' if not
-    groupby_col = "name" if "name" in long_df.columns else "staff"
+    staff_col = "name" if "name" in long_df.columns else "staff"
+    matrix = staff_day_matrix(long_df, slot_minutes, staff_col)
+    worked = matrix.worked
+    staff = matrix.staff
     
-    # データのコピーと前処理
-    work_df = long_df[long_df["parsed_slots_count"] > 0].copy()
-    work_df["staff"] = work_df[groupby_col]
+    def _masked_std(values: np.ndarray) -> pd.Series:
+        masked = np.where(worked, values, np.nan)
+        with np.errstate(invalid="ignore"):
+            std = np.nanstd(masked, axis=1) if masked.size else np.zeros(len(staff))
+        return pd.Series(std, index=staff).fillna(0)
     
-    # 日付と時間の処理
-    work_df["date"] = pd.to_datetime(work_df["ds"]).dt.date
-    
-    # start_time列のチェック
-    if "start_time" in work_df.columns:
-        work_df["start_hour"] = pd.to_datetime(work_df["start_time"]).dt.hour
-    else:
-        log.warning("start_time列が見つかりません。デフォルト値（9時）を使用します")
-        work_df["start_hour"] = 9  # デフォルト値
-    
-    work_df["slots"] = work_df["parsed_slots_count"]
-    work_df["time_category"] = work_df["code"].apply(_get_time_category)
-    
-    # 日次データの生成
-    daily = (
-        work_df.groupby(["staff", "date"])
-        .agg({
-            "start_hour": "mean",
-            "slots": "sum",
-            "time_category": lambda x: x.mode().iloc[0] if not x.empty else "other"
-        })
-        .reset_index()
-    )
-    
-    # 基本メトリクス
-    basic = (
-        daily.groupby("staff")
-        .agg({
-            "date": "count",  # total_days
-            "time_category": lambda x: sum(1 for cat in x if cat == "night")  # night_days
-        })
-        .rename(columns={"date": "total_days", "time_category": "night_days"})
-    )
+    total_days = worked.sum(axis=1)
     
     # ① 勤務開始時刻のばらつき
-    start_std = daily.groupby("staff")["start_hour"].std(ddof=0).fillna(0)
+    start_std = _masked_std(matrix.start)
     
-    # ② 業務コードの多様性
-    code_diversity = work_df.groupby("staff")["code"].nunique()
+    # ② 業務コードの多様性 (勤務日のコードの種類数)
+    s_idx, d_idx = np.nonzero(worked)
+    code_pairs = np.unique(s_idx.astype(np.int64) * (len(matrix.codes) + 1) + matrix.code[s_idx, d_idx] + 1)
+    code_diversity = pd.Series(
+        np.bincount(code_pairs // (len(matrix.codes) + 1), minlength=len(staff)), index=staff
+    )
     
     # ③ 労働時間のばらつき
-    daily["work_hours"] = daily["slots"] * slot_minutes / 60.0
-    worktime_std = daily.groupby("staff")["work_hours"].std(ddof=0).fillna(0)
+    worktime_std = _masked_std(matrix.hours)
     
     # ④ 休息時間ペナルティ
     try:
-        rest_df = RestTimeAnalyzer().analyze(long_df, slot_minutes=slot_minutes)
+        rest_df = matrix.rest_hours()
         min_rest_hours = FATIGUE_PARAMETERS.get("min_rest_hours", 11)
         rest_df["penalty"] = (min_rest_hours - rest_df["rest_hours"]).clip(lower=0)
-        rest_penalty = rest_df.groupby("staff")["penalty"].mean() / min_rest_hours
+        rest_penalty = rest_df.groupby("staff", observed=True)["penalty"].mean() / min_rest_hours
     except Exception as e:
         log.warning(f"Rest time analysis failed: {e}")
         # フォールバック: 全スタッフに0を設定
-        all_staff = work_df["staff"].unique()
-        rest_penalty = pd.Series(index=all_staff, data=0.0)
-        rest_penalty.index.name = "staff"
+        rest_penalty = pd.Series(index=staff, data=0.0)
     
     # ⑤ 連続勤務日数
-    consec_metrics = _analyze_consecutive_days(work_df)
-    consec_df = pd.DataFrame(consec_metrics).set_index("staff")
+    consec_df = _consecutive_ratios(matrix)
     
     # ⑥ 夜勤比率（調整済み）
-    basic["night_ratio"] = (basic["night_days"] / basic["total_days"].replace(0, pd.NA)).fillna(0)
-    basic["night_ratio_adj"] = np.clip(basic["night_ratio"], 0, 0.8) / 0.8
+    night_days = (matrix.night & worked).sum(axis=1)
+    night_ratio = pd.Series(night_days / np.maximum(total_days, 1), index=staff)
+    night_ratio_adj = np.clip(night_ratio, 0, 0.8) / 0.8
     
-    # 特徴量を結合
+    # 特徴量を結合 (勤務日のあるスタッフのみ)
     feats = pd.concat([
         start_std.rename("start_std"),
         code_diversity.rename("code_diversity"),
         worktime_std.rename("worktime_std"),
         rest_penalty.rename("rest_penalty"),
         consec_df,
-        basic[["night_ratio_adj"]],
-    ], axis=1).fillna(0)
+        night_ratio_adj.rename("night_ratio_adj"),
+    ], axis=1).reindex(staff[total_days > 0]).fillna(0)
+    feats.index.name = "staff"
     
     return feats
 
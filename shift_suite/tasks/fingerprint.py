@@ -0,0 +1,121 @@
+# shift_suite / tasks / fingerprint.py
+"""
+shift_suite.tasks.fingerprint  v1.0.0
+────────────────────────────────────────────────────────
+* キャッシュキー用の内容ハッシュ (sha256) を一か所にまとめたもの
+    - :func:`frame_digest`: DataFrame / Series の値・index・列名・dtype。
+      列ごとに ``hash_pandas_object`` を取るので形と列名が同じでも
+      値が違えば別のキーになる
+    - :func:`file_digest`: ファイル内容。``(パス, mtime_ns, size)`` ごとに
+      メモ化するので、書き換わっていない成果物は再ハッシュしない
+    - :func:`files_digest`: 複数ファイル (ヒートマップ一式など) をまとめたもの
+    - :func:`value_digest`: パラメータや成果物を含む任意の値 (JSON 化して)
+* 段キャッシュ (pipeline.cache)・FrameCache・Dash / Streamlit の結果キャッシュが
+  共通で使う。内容が同じならアップロードし直してもキーが変わらないため、
+  キャッシュをアップロードのたびに破棄する必要がない
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+FileSignature = Tuple[str, int, int]
+
+_MAX_MEMO = 4096
+_FILE_DIGESTS: "OrderedDict[FileSignature, str]" = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def file_signature(fp: Path | str) -> FileSignature:
+    """``(解決済みパス, mtime_ns, size)``: ファイルが書き換わると変わる安価な識別子"""
+    fp = Path(fp)
+    st = fp.stat()
+    return str(fp.resolve()), st.st_mtime_ns, st.st_size
+
+
+def _hash_file(fp: Path, h: "hashlib._Hash") -> None:
+    with open(fp, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+
+def file_digest(fp: Path | str) -> str:
+    """ファイル内容の sha256 (署名が変わらない間はメモ化した値を返す)"""
+    sig = file_signature(fp)
+    with _LOCK:
+        hit = _FILE_DIGESTS.get(sig)
+        if hit is not None:
+            _FILE_DIGESTS.move_to_end(sig)
+            return hit
+    h = hashlib.sha256()
+    _hash_file(Path(fp), h)
+    digest = h.hexdigest()
+    with _LOCK:
+        _FILE_DIGESTS[sig] = digest
+        while len(_FILE_DIGESTS) > _MAX_MEMO:
+            _FILE_DIGESTS.popitem(last=False)
+    return digest
+
+
+def files_digest(paths: Iterable[Path | str]) -> str:
+    """複数ファイルの (ファイル名, 内容) をまとめたハッシュ。存在しないファイルは名前だけ"""
+    h = hashlib.sha256()
+    for fp in sorted(Path(p) for p in paths):
+        h.update(fp.name.encode())
+        h.update(file_digest(fp).encode() if fp.is_file() else b"-")
+    return h.hexdigest()
+
+
+def _column_hash(col: pd.Series | pd.Index) -> bytes:
+    try:
+        return pd.util.hash_pandas_object(col, index=False).to_numpy().tobytes()
+    except TypeError:
+        # list / dict などハッシュできない値を含む object 列
+        return pd.util.hash_pandas_object(col.astype(str), index=False).to_numpy().tobytes()
+
+
+def frame_digest(df: pd.DataFrame | pd.Series) -> str:
+    """DataFrame (または Series) の内容 (値・index・列名・dtype) の sha256"""
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+    h = hashlib.sha256()
+    h.update(repr(list(df.columns)).encode())
+    h.update(repr([str(t) for t in df.dtypes]).encode())
+    h.update(_column_hash(df.index))
+    for i in range(df.shape[1]):
+        h.update(_column_hash(df.iloc[:, i]))
+    return h.hexdigest()
+
+
+def value_digest(value: Any) -> str:
+    """パラメータ・成果物の値を安定したハッシュに変換 (ファイルパスは内容で)"""
+
+    def _default(obj: Any) -> Any:
+        if isinstance(obj, Path):
+            return {"file": file_digest(obj)} if obj.is_file() else {"path": str(obj)}
+        if isinstance(obj, (dt.date, dt.datetime, dt.time)):
+            return obj.isoformat()
+        if isinstance(obj, (set, frozenset)):
+            return sorted(obj, key=repr)
+        if isinstance(obj, (pd.DataFrame, pd.Series)):
+            return {"frame": frame_digest(obj)}
+        if isinstance(obj, np.generic):
+            return obj.item()
+        if isinstance(obj, np.ndarray):
+            return {"array": hashlib.sha256(obj.tobytes()).hexdigest(), "dtype": str(obj.dtype)}
+        return repr(obj)
+
+    payload = json.dumps(value, sort_keys=True, default=_default, ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
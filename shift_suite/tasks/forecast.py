@@ -10,6 +10,10 @@ shift_suite.tasks.forecast  v1.5.0 – 休暇・履歴対応
   6. forecast_need() 実行履歴を ``forecast_history.csv`` に追記
   7. 直近の履歴 MAPE が閾値を超える場合はモデル選択と
      seasonal パラメータを自動調整
+  8. モデルの適合・選択を :func:`fit_forecast` に分離
+     (多系列の一括予測 :mod:`shift_suite.tasks.forecast_batch` と共有)
+  9. ETS / ARIMA の設定を ``_fit_ets`` / ``_fit_arima`` にまとめ、
+     :mod:`shift_suite.tasks.forecast_backtest` のバックテストと共有
 """
 
 from __future__ import annotations
@@ -18,6 +22,7 @@ import datetime as dt
 import logging
 import re
 import warnings
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, Optional, Sequence
 
@@ -27,6 +32,7 @@ import statsmodels.api as sm
 
 from shift_suite.config import get as get_config
 
+from .holiday_detection import holiday_mask
 from .utils import log, save_df_parquet, write_meta
 
 # ────────────────── pmdarima (optional) ──────────────────
@@ -114,6 +120,119 @@ def _extract_date_columns(
     return date_map
 
 
+def _fit_ets(y: pd.Series, seasonal: str = "add"):
+    """forecast_need と同じ設定の ETS (加法トレンド・週周期)"""
+    return sm.tsa.ExponentialSmoothing(
+        y, trend="add", seasonal=seasonal, seasonal_periods=7
+    ).fit(optimized=True)
+
+
+def _fit_arima(y: pd.Series, exog: pd.DataFrame | None = None):
+    """forecast_need と同じ設定の auto_arima (pmdarima が必要)"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return pm.auto_arima(
+            y,
+            exogenous=exog,
+            seasonal=False,
+            stepwise=True,
+            suppress_warnings=True,
+            error_action="ignore",
+        )
+
+
+@dataclass
+class ForecastFit:
+    """Selected model and forecast for one demand series."""
+
+    model: str
+    ds: pd.DatetimeIndex
+    yhat: np.ndarray
+    mape: float
+    ets_mape: float = np.nan
+    arima_mape: float = np.nan
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame({"ds": self.ds, "yhat": self.yhat, "model": self.model})
+
+
+def fit_forecast(
+    df: pd.DataFrame,
+    periods: int,
+    *,
+    choose: str = "auto",
+    seasonal: str = "add",
+    holidays: Sequence[dt.date] | None = None,
+) -> ForecastFit:
+    """需要系列 (ds, y, 任意の説明変数列) に ETS / ARIMA を適合し、MAPE で選ぶ
+
+    実績が 2 点未満 (または合計 2 未満) のときは直近値を延ばす Naive 予測。
+    ``holidays`` の ``holiday`` 列は ARIMA の説明変数として将来日にも付ける。
+    """
+    if choose not in ("auto", "arima", "ets"):
+        raise ValueError(f"未知のモデル選択です: {choose} (auto / arima / ets)")
+    holiday_set = {pd.to_datetime(d).date() for d in holidays} if holidays else set()
+
+    # ───── データ不足 → Naive ─────
+    if len(df) < 2 or df["y"].sum() < 2:
+        warnings.warn("実績データが不足しているため Naive 予測で継続", stacklevel=2)
+        last_val = df["y"].iloc[-1] if not df.empty else 0
+        future_dates = pd.date_range(
+            df["ds"].max() + dt.timedelta(days=1) if not df.empty else dt.date.today(),
+            periods=periods,
+        )
+        return ForecastFit("Naive", future_dates, np.full(periods, last_val, dtype=float), np.nan)
+
+    future_dates = pd.date_range(df["ds"].max() + dt.timedelta(days=1), periods=periods)
+
+    # ───── ETS モデル ─────
+    ets_mod = _fit_ets(df["y"], seasonal)
+    ets_fc = ets_mod.forecast(periods)
+    denom = np.where(df["y"] != 0, df["y"], np.nan)
+    ets_mape = np.nanmean(np.abs((ets_mod.fittedvalues - df["y"]) / denom))
+
+    # ───── ARIMA (pmdarima) ─────
+    arima_mape = np.inf
+    arima_fc = None
+    exog_cols = [c for c in df.columns if c not in {"ds", "y"}]
+    if _HAS_PMDARIMA:
+        arima_mod = _fit_arima(df["y"], df[exog_cols] if exog_cols else None)
+        future_exog = (
+            pd.DataFrame([df[exog_cols].iloc[-1]] * periods) if exog_cols else None
+        )
+        if future_exog is not None:
+            if "holiday" in exog_cols:
+                future_exog["holiday"] = holiday_mask(future_dates, holiday_set).astype(int)
+        arima_fc = arima_mod.predict(n_periods=periods, exogenous=future_exog)
+        try:
+            train_y = getattr(arima_mod, "y", arima_mod.arima_res_.data.endog)
+        except Exception:
+            train_y = df["y"].to_numpy()
+        denom_a = np.where(train_y != 0, train_y, np.nan)
+        arima_mape = np.nanmean(
+            np.abs((train_y - arima_mod.predict_in_sample()) / denom_a)
+        )
+    elif choose in ("auto", "arima"):
+        log.warning("[forecast] ARIMA 指定ですが pmdarima が無いため ETS を使用")
+
+    # ───── モデル選択 ─────
+    if choose == "ets" or (choose == "auto" and ets_mape <= arima_mape):
+        sel, forecast, sel_mape = "ETS", ets_fc, ets_mape
+    elif choose == "arima" and arima_fc is not None:
+        sel, forecast, sel_mape = "ARIMA", arima_fc, arima_mape
+    else:
+        sel, forecast, sel_mape = "ETS", ets_fc, ets_mape  # fallback
+
+    return ForecastFit(
+        sel,
+        future_dates,
+        np.asarray(forecast, dtype=float),
+        float(sel_mape),
+        ets_mape=float(ets_mape),
+        arima_mape=float(arima_mape),
+    )
+
+
 # ═══════════════════╗ Public API ║══════════════════
 def build_demand_series(
     heat_xlsx: Path,
@@ -238,7 +357,7 @@ def forecast_need(
 
     if holidays:
         holiday_set = {pd.to_datetime(d).date() for d in holidays}
-        df["holiday"] = df["ds"].dt.date.map(lambda d: 1 if d in holiday_set else 0)
+        df["holiday"] = holiday_mask(df["ds"], holiday_set).astype(int)
     else:
         holiday_set = set()
 
@@ -281,15 +400,11 @@ def forecast_need(
         except Exception as e:
             log.warning(f"[forecast] leave_csv load failed: {e}")
 
+    fit = fit_forecast(df, periods, choose=choose, seasonal=seasonal, holidays=holiday_set)
+
     # ───── データ不足 → Naive ─────
-    if len(df) < 2 or df["y"].sum() < 2:
-        warnings.warn("実績データが不足しているため Naive 予測で継続", stacklevel=2)
-        last_val = df["y"].iloc[-1] if not df.empty else 0
-        future_dates = pd.date_range(
-            df["ds"].max() + dt.timedelta(days=1) if not df.empty else dt.date.today(),
-            periods=periods,
-        )
-        out_df = pd.DataFrame({"ds": future_dates, "yhat": last_val, "model": "Naive"})
+    if fit.model == "Naive":
+        out_df = fit.frame()
         save_df_parquet(out_df, excel_out)
         write_meta(
             excel_out.with_suffix(".json"),
@@ -299,62 +414,10 @@ def forecast_need(
         )
         return excel_out
 
-    future_dates = pd.date_range(df["ds"].max() + dt.timedelta(days=1), periods=periods)
-
-    # ───── ETS モデル ─────
-    ets_mod = sm.tsa.ExponentialSmoothing(
-        df["y"], trend="add", seasonal=seasonal, seasonal_periods=7
-    ).fit(optimized=True)
-    ets_fc = ets_mod.forecast(periods)
-    denom = np.where(df["y"] != 0, df["y"], np.nan)
-    ets_mape = np.nanmean(np.abs((ets_mod.fittedvalues - df["y"]) / denom))
-
-    # ───── ARIMA (pmdarima) ─────
-    arima_mape = np.inf
-    arima_fc = None
-    exog_cols = [c for c in df.columns if c not in {"ds", "y"}]
-    if _HAS_PMDARIMA:
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            arima_mod = pm.auto_arima(
-                df["y"],
-                exogenous=df[exog_cols] if exog_cols else None,
-                seasonal=False,
-                stepwise=True,
-                suppress_warnings=True,
-                error_action="ignore",
-            )
-        future_exog = (
-            pd.DataFrame([df[exog_cols].iloc[-1]] * periods) if exog_cols else None
-        )
-        if future_exog is not None:
-            if "holiday" in exog_cols:
-                future_exog["holiday"] = [
-                    1 if d.date() in holiday_set else 0 for d in future_dates
-                ]
-        arima_fc = arima_mod.predict(n_periods=periods, exogenous=future_exog)
-        try:
-            train_y = getattr(arima_mod, "y", arima_mod.arima_res_.data.endog)
-        except Exception:
-            train_y = df["y"].to_numpy()
-        denom_a = np.where(train_y != 0, train_y, np.nan)
-        arima_mape = np.nanmean(
-            np.abs((train_y - arima_mod.predict_in_sample()) / denom_a)
-        )
-    elif choose in ("auto", "arima"):
-        log.warning("[forecast] ARIMA 指定ですが pmdarima が無いため ETS を使用")
-
-    # ───── モデル選択 ─────
-    if choose == "ets" or (choose == "auto" and ets_mape <= arima_mape):
-        sel, forecast, sel_mape = "ETS", ets_fc, ets_mape
-    elif choose == "arima" and arima_fc is not None:
-        sel, forecast, sel_mape = "ARIMA", arima_fc, arima_mape
-    else:
-        sel, forecast, sel_mape = "ETS", ets_fc, ets_mape  # fallback
+    sel, sel_mape = fit.model, fit.mape
 
     # ───── 予測結果組立 ─────
-    out_df = pd.DataFrame({"ds": future_dates, "yhat": forecast})
-    out_df["model"] = sel  #  追加: 常に model 列を付与
+    out_df = fit.frame()  # 常に model 列を付与
 
     save_df_parquet(out_df, excel_out)
 
@@ -389,4 +452,4 @@ def forecast_need(
     return excel_out
 
 
-__all__ = ["build_demand_series", "forecast_need"]
+__all__ = ["ForecastFit", "build_demand_series", "fit_forecast", "forecast_need"]
@@ -0,0 +1,444 @@
+# shift_suite / tasks / forecast_backtest.py
+"""
+shift_suite.tasks.forecast_backtest  v1.0.0
+────────────────────────────────────────────────────────
+* 需要予測のローリングオリジン・バックテスト
+    - 複数の出力ディレクトリ (施設・シナリオ) の demand_series.csv /
+      demand_series.parquet を集め、各系列を「学習期間の末尾 (origin) を
+      ``step`` 日ずつ進めて ``horizon`` 日先を予測」する fold に分ける
+    - fold ごとに各モデルを学習期間だけで適合し、予測と実績を比べる。
+      fold はプロセスプールで並列に実行する (ワーカー数は ``max_workers``、
+      既定は ``SHIFT_SUITE_BACKTEST_WORKERS`` か min(fold 数, CPU 数))
+* モデル: ``auto`` (forecast_need と同じ選択、:func:`forecast.fit_forecast`) /
+  ``ETS`` / ``ARIMA`` (pmdarima がある場合) / ``SeasonalNaive`` (7 日前) /
+  ``Naive`` (直近値)
+* 指標はモデル × 予測先日数 (horizon) ごとの MAPE / sMAPE / MASE と
+  適合・予測の所要時間 (秒)。MASE の尺度は各 fold の学習期間の
+  7 日差分の平均絶対値
+* :func:`run_backtest` は ``forecast_benchmark.parquet`` に実行 ID 付きで
+  追記する。:func:`compare_runs` で 2 回の実行を比べて精度・速度の悪化を拾い、
+  :func:`recommended_choice` で forecast_need の ``choose`` を選べる
+* コマンドライン: ``python -m shift_suite.tasks.forecast_backtest out_A out_B``
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import multiprocessing
+import os
+import time
+import warnings
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+BENCHMARK_FILE = "forecast_benchmark.parquet"
+DEMAND_SERIES_FILES = ("demand_series.parquet", "demand_series.csv")
+MODELS = ("auto", "ETS", "ARIMA", "SeasonalNaive", "Naive")
+SEASON = 7
+
+ERROR_COLUMNS = [
+    "source", "model", "fold", "origin", "horizon", "ds", "y", "yhat",
+    "fit_seconds", "predict_seconds", "error", "scale",
+]
+SUMMARY_COLUMNS = [
+    "source", "model", "horizon", "n_folds", "n_failed",
+    "mape", "smape", "mase", "fit_seconds", "predict_seconds",
+]
+# forecast_need の choose に対応するモデル
+_CHOICES = {"auto": "auto", "ETS": "ets", "ARIMA": "arima"}
+
+
+# ────────────────── 系列の読み込み ──────────────────
+def load_demand_series(path: Path | str) -> pd.DataFrame:
+    """demand_series.csv / .parquet → ``ds`` (datetime) と ``y`` の 2 列 (日付順)"""
+    path = Path(path)
+    df = pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+    if not {"ds", "y"} <= set(df.columns):
+        raise ValueError(f"ds / y 列がありません: {path}")
+    df = df[["ds", "y"]].copy()
+    df["ds"] = pd.to_datetime(df["ds"])
+    df["y"] = pd.to_numeric(df["y"], errors="coerce").fillna(0.0).astype(float)
+    return df.sort_values("ds").reset_index(drop=True)
+
+
+def discover_series(roots: Iterable[Path | str]) -> Dict[str, Path]:
+    """各ディレクトリ配下の需要系列ファイル → ``{系列名: パス}``
+
+    系列名は root 群の共通の親ディレクトリからの相対パス (root が 1 つなら
+    ``root`` の名前から始まる)。シナリオの出力先はどれも ``out_<key>`` のように
+    同じ名前になりうるので、名前だけでなく親ディレクトリまで含めて区別する。
+    同じディレクトリに parquet と csv の両方があれば parquet を使う。
+    """
+    roots = [Path(r).resolve() for r in roots]
+    if not roots:
+        return {}
+    try:
+        base = Path(os.path.commonpath([r.parent for r in roots]))
+    except ValueError:  # ドライブが異なる (Windows) など
+        base = None
+    found: Dict[str, Path] = {}
+    for i, root in enumerate(roots):
+        # 共通の親が無い場合は root の順番で区別する
+        prefix = Path(root.name) if base is None else root.relative_to(base)
+        if base is None and i:
+            prefix = Path(f"{root.name}~{i}")
+        for name in DEMAND_SERIES_FILES:
+            for fp in sorted(root.rglob(name)):
+                rel = fp.parent.relative_to(root)
+                key = (prefix / rel).as_posix()
+                found.setdefault(key, fp)
+    return dict(sorted(found.items()))
+
+
+def rolling_origins(n: int, *, horizon: int, initial: int, step: int, max_folds: int | None = None) -> List[int]:
+    """学習期間の長さ (= origin の位置) の一覧。末尾の fold が系列の最後に揃う"""
+    if horizon < 1 or step < 1:
+        raise ValueError("horizon と step は 1 以上にしてください")
+    last = n - horizon
+    if last < initial:
+        return []
+    origins = list(range(last, initial - 1, -step))[::-1]
+    if max_folds is not None:
+        origins = origins[-max_folds:]
+    return origins
+
+
+# ────────────────── モデル ──────────────────
+def _fit_predict(model: str, train: pd.DataFrame, horizon: int, seasonal: str) -> tuple[np.ndarray, float, float]:
+    """``(予測, 適合秒, 予測秒)``。auto は選択まで含めて適合秒に入れる"""
+    from .forecast import _fit_arima, _fit_ets, fit_forecast
+
+    y = train["y"].reset_index(drop=True)
+    t0 = time.perf_counter()
+    if model == "auto":
+        fit = fit_forecast(train, horizon, seasonal=seasonal)
+        return np.asarray(fit.yhat, dtype=float), time.perf_counter() - t0, 0.0
+    if model == "ETS":
+        mod = _fit_ets(y, seasonal)
+        t1 = time.perf_counter()
+        yhat = np.asarray(mod.forecast(horizon), dtype=float)
+    elif model == "ARIMA":
+        mod = _fit_arima(y)
+        t1 = time.perf_counter()
+        yhat = np.asarray(mod.predict(n_periods=horizon), dtype=float)
+    elif model == "SeasonalNaive":
+        t1 = time.perf_counter()
+        last = y.to_numpy()[-SEASON:]
+        yhat = np.resize(last, horizon).astype(float)
+    elif model == "Naive":
+        t1 = time.perf_counter()
+        yhat = np.full(horizon, float(y.iloc[-1]))
+    else:
+        raise ValueError(f"未知のモデルです: {model} ({' / '.join(MODELS)})")
+    return yhat, t1 - t0, time.perf_counter() - t1
+
+
+def _available_models(models: Sequence[str]) -> List[str]:
+    from .forecast import _HAS_PMDARIMA
+
+    unknown = [m for m in models if m not in MODELS]
+    if unknown:
+        raise ValueError(f"未知のモデルです: {unknown} ({' / '.join(MODELS)})")
+    if "ARIMA" in models and not _HAS_PMDARIMA:
+        log.warning("[backtest] pmdarima が無いため ARIMA を除外します")
+    return [m for m in models if m != "ARIMA" or _HAS_PMDARIMA]
+
+
+def run_fold(
+    source: str,
+    fold: int,
+    ds: np.ndarray,
+    y: np.ndarray,
+    origin: int,
+    params: Mapping[str, Any],
+) -> List[Dict[str, Any]]:
+    """1 fold 分 (ワーカー側)。モデルの失敗は行の ``error`` に入れる"""
+    horizon = int(params["horizon"])
+    train = pd.DataFrame({"ds": pd.to_datetime(ds[:origin]), "y": y[:origin]})
+    actual = y[origin : origin + horizon]
+    scale = _mase_scale(y[:origin])
+    rows: List[Dict[str, Any]] = []
+    for model in params["models"]:
+        error = None
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            try:
+                yhat, fit_s, pred_s = _fit_predict(model, train, horizon, params["seasonal"])
+            except Exception as e:  # noqa: BLE001 - 失敗した fold は n_failed に数える
+                error = f"{type(e).__name__}: {e}"
+                yhat, fit_s, pred_s = np.full(horizon, np.nan), np.nan, np.nan
+        for h in range(horizon):
+            rows.append(
+                {
+                    "source": source,
+                    "model": model,
+                    "fold": fold,
+                    "origin": pd.Timestamp(ds[origin - 1]),
+                    "horizon": h + 1,
+                    "ds": pd.Timestamp(ds[origin + h]),
+                    "y": float(actual[h]),
+                    "yhat": float(yhat[h]),
+                    "fit_seconds": fit_s,
+                    "predict_seconds": pred_s,
+                    "error": error,
+                    "scale": scale,
+                }
+            )
+    return rows
+
+
+def _mase_scale(train_y: np.ndarray) -> float:
+    """学習期間の季節 (7 日) 差分の平均絶対値。短い系列は 1 日差分"""
+    lag = SEASON if len(train_y) > SEASON else 1
+    if len(train_y) <= lag:
+        return np.nan
+    scale = float(np.mean(np.abs(train_y[lag:] - train_y[:-lag])))
+    return scale if scale > 0 else np.nan
+
+
+# ────────────────── 集計 ──────────────────
+def summarize_errors(errors: pd.DataFrame) -> pd.DataFrame:
+    """fold × horizon の誤差 → source × model × horizon の指標
+
+    MAPE は実績 0 の日を除く。sMAPE は実績・予測とも 0 の日を 0 とする。
+    所要時間は fold ごとの値の平均。
+    """
+    if errors.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    err = errors.copy()
+    abs_err = (err["yhat"] - err["y"]).abs()
+    denom = err["y"].abs() + err["yhat"].abs()
+    err["ape"] = abs_err / err["y"].where(err["y"] != 0).abs()
+    err["sape"] = np.where(denom > 0, 2 * abs_err / denom.where(denom > 0), 0.0)
+    err.loc[err["yhat"].isna(), "sape"] = np.nan
+    err["ase"] = abs_err / err["scale"]
+    err["failed"] = err["error"].notna()
+
+    keys = ["source", "model", "horizon"]
+    grouped = err.groupby(keys, sort=True)
+    summary = grouped.agg(
+        n_folds=("fold", "nunique"),
+        mape=("ape", "mean"),
+        smape=("sape", "mean"),
+        mase=("ase", "mean"),
+    )
+    failed = err[err["failed"]].groupby(keys)["fold"].nunique()
+    summary["n_failed"] = failed.reindex(summary.index, fill_value=0).astype(int)
+    # 所要時間は fold 単位 (horizon ごとに同じ値が並ぶので先頭だけ使う)
+    per_fold = err.drop_duplicates(["source", "model", "fold"])
+    timing = per_fold.groupby(["source", "model"])[["fit_seconds", "predict_seconds"]].mean()
+    summary = summary.reset_index().merge(timing.reset_index(), on=["source", "model"], how="left")
+    return summary[SUMMARY_COLUMNS]
+
+
+@dataclass
+class BacktestResult:
+    """Rolling-origin backtest: per-point ``errors`` and the per-model/horizon ``summary``."""
+
+    run_id: str
+    errors: pd.DataFrame
+    summary: pd.DataFrame
+
+    def leaderboard(self) -> pd.DataFrame:
+        """モデルごとの全系列・全 horizon 平均 (MASE の小さい順)"""
+        if self.summary.empty:
+            return pd.DataFrame(columns=["model", "mape", "smape", "mase", "fit_seconds", "predict_seconds"])
+        board = self.summary.groupby("model")[["mape", "smape", "mase", "fit_seconds", "predict_seconds"]].mean()
+        return board.sort_values(["mase", "smape"]).reset_index()
+
+
+def recommended_choice(summary: pd.DataFrame, *, metric: str = "mase") -> str:
+    """forecast_need の ``choose`` に渡せるモデル (auto / ets / arima) のうち指標が最良のもの"""
+    cand = summary[summary["model"].isin(list(_CHOICES))]
+    if cand.empty or cand[metric].isna().all():
+        return "auto"
+    # 同点なら既定の auto を残す
+    best = cand.groupby("model")[metric].mean().reindex(list(_CHOICES)).idxmin()
+    return _CHOICES[best]
+
+
+# ────────────────── 実行 ──────────────────
+def _default_workers(n_folds: int) -> int:
+    env = os.getenv("SHIFT_SUITE_BACKTEST_WORKERS")
+    if env:
+        return max(1, int(env))
+    return max(1, min(n_folds, os.cpu_count() or 1))
+
+
+def backtest(
+    series: Mapping[str, pd.DataFrame],
+    *,
+    horizon: int = 14,
+    initial: int = 28,
+    step: int = 7,
+    max_folds: int | None = None,
+    models: Sequence[str] = MODELS,
+    seasonal: str = "add",
+    max_workers: int | None = None,
+) -> BacktestResult:
+    """``series`` (``{系列名: ds / y の DataFrame}``) をローリングオリジンで評価する
+
+    ``initial`` は最初の fold の学習日数 (ETS の週周期には 14 日以上が必要)。
+    学習期間が ``initial`` に満たない系列は飛ばす。
+    """
+    params = {"horizon": int(horizon), "models": _available_models(models), "seasonal": seasonal}
+    jobs: List[tuple] = []
+    for source, df in series.items():
+        ds, y = df["ds"].to_numpy(), df["y"].to_numpy(dtype=float)
+        origins = rolling_origins(len(df), horizon=horizon, initial=initial, step=step, max_folds=max_folds)
+        if not origins:
+            log.warning(f"[backtest] {source}: {len(df)} 日では fold を作れないため除外 (initial={initial}, horizon={horizon})")
+        jobs.extend((source, i, ds, y, origin, params) for i, origin in enumerate(origins))
+
+    t0 = time.perf_counter()
+    workers = min(len(jobs), max_workers or _default_workers(len(jobs))) if jobs else 0
+    if workers <= 1:
+        rows = [row for job in jobs for row in run_fold(*job)]
+    else:
+        rows = _run_pool(jobs, workers)
+    log.info(f"[backtest] {len(series)} 系列 / {len(jobs)} fold 完了 ({max(workers, 1)} 並列, {time.perf_counter() - t0:.2f}s)")
+
+    errors = pd.DataFrame(rows, columns=ERROR_COLUMNS)
+    errors = errors.sort_values(["source", "model", "fold", "horizon"], ignore_index=True)
+    run_id = dt.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    return BacktestResult(run_id, errors, summarize_errors(errors))
+
+
+def _run_pool(jobs: Sequence[tuple], workers: int) -> List[Dict[str, Any]]:
+    ctx = multiprocessing.get_context("spawn")
+    done: Dict[int, List[Dict[str, Any]]] = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = {pool.submit(run_fold, *job): i for i, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                done[futures[future]] = future.result()
+    except BrokenProcessPool as e:
+        log.warning(f"[backtest] プロセスプールが停止したため残りをその場で実行します: {e}")
+    for i, job in enumerate(jobs):
+        if i not in done:
+            done[i] = run_fold(*job)
+    return [row for i in range(len(jobs)) for row in done[i]]
+
+
+def run_backtest(
+    roots: Iterable[Path | str],
+    benchmark_path: Path | str,
+    *,
+    label: str = "",
+    **options: Any,
+) -> BacktestResult:
+    """出力ディレクトリ群の需要系列をバックテストし、ベンチマーク表に追記する
+
+    表は ``summary`` に ``run_id`` / ``label`` / ``run_at`` / 評価設定の列を
+    付けたもの。同じ表に実行を重ねていくので :func:`compare_runs` で比べられる。
+    """
+    from .forecast import _HAS_PMDARIMA
+
+    sources = discover_series(roots)
+    if not sources:
+        raise FileNotFoundError(f"需要系列ファイル ({' / '.join(DEMAND_SERIES_FILES)}) が見つかりません")
+    series = {key: load_demand_series(fp) for key, fp in sources.items()}
+    result = backtest(series, **options)
+
+    bench_path = Path(benchmark_path)
+    if bench_path.is_dir():
+        bench_path = bench_path / BENCHMARK_FILE
+    table = result.summary.assign(
+        run_id=result.run_id,
+        label=label,
+        run_at=pd.Timestamp.now(),
+        horizon_days=options.get("horizon", 14),
+        step=options.get("step", 7),
+        initial=options.get("initial", 28),
+        pmdarima=_HAS_PMDARIMA,
+    )
+    if bench_path.exists():
+        table = pd.concat([pd.read_parquet(bench_path), table], ignore_index=True)
+    bench_path.parent.mkdir(parents=True, exist_ok=True)
+    table.to_parquet(bench_path, index=False)
+    log.info(f"[backtest] ベンチマーク表に追記 → {bench_path} (run_id={result.run_id})")
+    return result
+
+
+def compare_runs(
+    table: pd.DataFrame,
+    baseline: str,
+    current: str,
+    *,
+    metric: str = "mase",
+    tolerance: float = 0.05,
+    latency_tolerance: float = 0.5,
+) -> pd.DataFrame:
+    """ベンチマーク表の 2 実行 (run_id) を source × model × horizon で突き合わせる
+
+    ``metric`` が ``tolerance`` (相対) を超えて悪化した行、または適合時間が
+    ``latency_tolerance`` (相対) を超えて遅くなった行に ``regressed`` を立てる。
+    """
+    keys = ["source", "model", "horizon"]
+    cols = [*keys, metric, "fit_seconds"]
+    base = table.loc[table["run_id"] == baseline, cols]
+    cur = table.loc[table["run_id"] == current, cols]
+    merged = base.merge(cur, on=keys, suffixes=("_baseline", "_current"))
+    merged[f"{metric}_change"] = merged[f"{metric}_current"] / merged[f"{metric}_baseline"] - 1
+    merged["fit_seconds_change"] = merged["fit_seconds_current"] / merged["fit_seconds_baseline"] - 1
+    merged["regressed"] = (merged[f"{metric}_change"] > tolerance) | (
+        merged["fit_seconds_change"] > latency_tolerance
+    )
+    return merged
+
+
+def main(argv: list[str] | None = None) -> BacktestResult:
+    parser = ArgumentParser("shift_suite forecast backtest")
+    parser.add_argument("roots", nargs="+", help="demand_series を含む出力ディレクトリ")
+    parser.add_argument("--benchmark", default=BENCHMARK_FILE, help="追記するベンチマーク表")
+    parser.add_argument("--label", default="", help="実行のラベル (例: コミット)")
+    parser.add_argument("--horizon", type=int, default=14)
+    parser.add_argument("--initial", type=int, default=28)
+    parser.add_argument("--step", type=int, default=7)
+    parser.add_argument("--max-folds", type=int, default=None)
+    parser.add_argument("--models", nargs="+", default=list(MODELS), choices=MODELS)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    result = run_backtest(
+        args.roots,
+        args.benchmark,
+        label=args.label,
+        horizon=args.horizon,
+        initial=args.initial,
+        step=args.step,
+        max_folds=args.max_folds,
+        models=args.models,
+        max_workers=args.workers,
+    )
+    print(result.leaderboard().to_string(index=False))
+    print(f"推奨 choose: {recommended_choice(result.summary)}")
+    return result
+
+
+__all__ = [
+    "BENCHMARK_FILE",
+    "BacktestResult",
+    "backtest",
+    "compare_runs",
+    "discover_series",
+    "load_demand_series",
+    "recommended_choice",
+    "rolling_origins",
+    "run_backtest",
+    "summarize_errors",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+# shift_suite / tasks / forecast_batch.py
+"""
+shift_suite.tasks.forecast_batch  v1.0.0
+────────────────────────────────────────────────────────
+* 多系列の需要予測を一括で行う (職種別・雇用形態別・時間帯別など)
+    - :func:`demand_series_from_heatmaps`: heat_ALL / heat_<職種> /
+      heat_emp_<雇用形態> の日次合計と、heat_ALL の時間帯 (3 時間幅) ごとの
+      日次合計を 1 つの表 (index = ds, 列 = 系列キー) にする
+    - :func:`forecast_many`: 各列を :func:`forecast.fit_forecast` で
+      プロセスプール並列に予測する (モデルの選択・MAPE は単系列と同じ)
+* 予測結果は系列の内容とパラメータのフィンガープリントをキーに
+  ``cache_dir`` に保存し、変わっていない系列は再適合しない。
+  :func:`run_batch_forecast` の既定は段キャッシュ (pipeline.default_cache_dir)
+  の下で、実行ごとに作り直す出力先とは別の場所 (実行をまたいで効く)
+* 系列ごとの選択モデル・MAPE・キャッシュ利用・所要時間を ``report`` に返す。
+  :func:`run_batch_forecast` は forecast_batch.parquet /
+  forecast_batch_report.parquet を書く
+* ワーカー数は ``max_workers`` (既定は ``SHIFT_SUITE_FORECAST_WORKERS`` か、
+  ARIMA を適合する場合だけ min(系列数, CPU 数))。1 ならプロセスを作らず
+  その場で順に実行する。ETS だけの適合は 1 系列数十ミリ秒で、spawn した
+  ワーカーが shift_suite / statsmodels を import し直すほうが遅いため
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .fingerprint import value_digest
+from .kpi_cube import slot_band
+from .utils import save_df_parquet
+
+log = logging.getLogger(__name__)
+
+FORECAST_BATCH_FILE = "forecast_batch.parquet"
+FORECAST_REPORT_FILE = "forecast_batch_report.parquet"
+FORECAST_CACHE_DIR = "forecast_cache"
+# 予測ロジックを変えたら上げる (古いキャッシュを使わない)
+_CACHE_VERSION = 1
+
+REPORT_COLUMNS = ["series", "model", "mape", "ets_mape", "arima_mape", "n_obs", "cached", "seconds", "error"]
+
+
+# ────────────────── 系列の作成 ──────────────────
+def _heat_key(name: str) -> str | None:
+    """heatmap のファイル名 → 系列キー (対象外は None)"""
+    stem = Path(name).stem
+    if stem == "heat_ALL":
+        return "ALL"
+    if stem.startswith("heat_emp_"):
+        return f"employment:{stem[len('heat_emp_'):]}"
+    if stem.startswith("heat_"):
+        return f"role:{stem[len('heat_'):]}"
+    return None
+
+
+def demand_series_from_heatmaps(
+    frames: Mapping[str, pd.DataFrame], *, bands: bool = True
+) -> pd.DataFrame:
+    """heatmap フレーム (``{ファイル名: DataFrame}``) → 日次需要系列の表
+
+    値は :func:`forecast.build_demand_series` と同じ日ごとの列合計。
+    ``bands`` が真なら heat_ALL を時間帯 (``band:06-09`` など) にも分ける。
+    """
+    from .forecast import _extract_date_columns
+
+    columns: Dict[str, pd.Series] = {}
+    for name, heat in frames.items():
+        key = _heat_key(name)
+        if key is None or heat is None or heat.empty:
+            continue
+        date_map = _extract_date_columns(heat)
+        if not date_map:
+            continue
+        dates = sorted(date_map)
+        block = heat[[date_map[d] for d in dates]].apply(pd.to_numeric, errors="coerce").fillna(0)
+        index = pd.DatetimeIndex(pd.to_datetime(dates), name="ds")
+        columns[key] = pd.Series(block.sum(axis=0).to_numpy(), index=index)
+        if bands and key == "ALL":
+            labels = block.index.astype(str)
+            valid = labels.str.match(r"^\d{1,2}:\d{2}")
+            band_labels = [slot_band(t.split(":")[0]) for t in labels[valid]]
+            per_band = block[valid].groupby(band_labels).sum()
+            for band, row in per_band.iterrows():
+                columns[f"band:{band}"] = pd.Series(row.to_numpy(), index=index)
+    if not columns:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name="ds"))
+    return pd.DataFrame(columns).sort_index().fillna(0)
+
+
+# ────────────────── 予測 ──────────────────
+@dataclass
+class BatchForecast:
+    """Forecasts for many series: ``forecasts`` (series, ds, yhat, model) and one report row per series."""
+
+    forecasts: pd.DataFrame
+    report: pd.DataFrame
+
+    def wide(self) -> pd.DataFrame:
+        """index = ds, 列 = 系列の予測値"""
+        if self.forecasts.empty:
+            return pd.DataFrame()
+        return self.forecasts.pivot(index="ds", columns="series", values="yhat")
+
+
+def _default_workers(n_series: int, choose: str = "auto") -> int:
+    env = os.getenv("SHIFT_SUITE_FORECAST_WORKERS")
+    if env:
+        return max(1, int(env))
+    from .forecast import _HAS_PMDARIMA
+
+    if choose == "ets" or not _HAS_PMDARIMA:
+        return 1
+    return max(1, min(n_series, os.cpu_count() or 1))
+
+
+def _naive_fit(ds: np.ndarray, y: np.ndarray, periods: int):
+    """適合に失敗した系列の代替: 直近値を延ばす"""
+    from .forecast import ForecastFit
+
+    last = pd.Timestamp(ds[-1]) if len(ds) else pd.Timestamp(dt.date.today())
+    future = pd.date_range(last + pd.Timedelta(days=1), periods=periods)
+    last_val = float(y[-1]) if len(y) else 0.0
+    return ForecastFit("Naive", future, np.full(periods, last_val), np.nan)
+
+
+def _fit_one(key: str, ds: np.ndarray, y: np.ndarray, params: Mapping[str, Any]) -> Dict[str, Any]:
+    """1 系列の適合 (ワーカー側。例外は結果の ``error`` に入れて返す)"""
+    from .forecast import fit_forecast
+    from .holiday_detection import holiday_mask
+
+    t0 = time.perf_counter()
+    periods = int(params["periods"])
+    holidays = {pd.to_datetime(d).date() for d in params.get("holidays") or ()}
+    df = pd.DataFrame({"ds": pd.to_datetime(ds), "y": np.asarray(y, dtype=float)})
+    if holidays:
+        df["holiday"] = holiday_mask(df["ds"], holidays).astype(int)
+    error = None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            fit = fit_forecast(
+                df, periods, choose=params["choose"], seasonal=params["seasonal"], holidays=holidays
+            )
+        except Exception as e:  # noqa: BLE001 - 系列ごとの失敗は Naive で継続しレポートに残す
+            error = f"{type(e).__name__}: {e}"
+            fit = _naive_fit(ds, y, periods)
+    return {
+        "series": key,
+        "ds": fit.ds.to_numpy(),
+        "yhat": np.asarray(fit.yhat, dtype=float),
+        "model": fit.model,
+        "mape": fit.mape,
+        "ets_mape": fit.ets_mape,
+        "arima_mape": fit.arima_mape,
+        "n_obs": int(len(y)),
+        "seconds": time.perf_counter() - t0,
+        "error": error,
+    }
+
+
+def _series_digest(ds: np.ndarray, y: np.ndarray, params: Mapping[str, Any]) -> str:
+    from .forecast import _HAS_PMDARIMA
+
+    return value_digest(
+        {
+            "version": _CACHE_VERSION,
+            "ds": [str(d) for d in pd.DatetimeIndex(ds).date],
+            "y": np.asarray(y, dtype=float).round(9).tolist(),
+            "params": {k: params[k] for k in sorted(params)},
+            "pmdarima": _HAS_PMDARIMA,
+        }
+    )
+
+
+def _cache_load(cache_dir: Path | None, digest: str) -> Dict[str, Any] | None:
+    if cache_dir is None:
+        return None
+    path = cache_dir / f"{digest}.pkl"
+    if not path.exists():
+        return None
+    try:
+        with path.open("rb") as f:
+            return pickle.load(f)
+    except Exception as e:  # noqa: BLE001 - 壊れたキャッシュは作り直す
+        log.warning(f"[forecast_batch] キャッシュを読めないため再計算します: {path.name}: {e}")
+        return None
+
+
+def _cache_store(cache_dir: Path | None, digest: str, result: Mapping[str, Any]) -> None:
+    if cache_dir is None or result.get("error"):
+        return
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / f"{digest}.pkl"
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as f:
+        pickle.dump(dict(result), f)
+    os.replace(tmp, path)
+
+
+def forecast_many(
+    series: pd.DataFrame,
+    *,
+    periods: int = 30,
+    choose: str = "auto",
+    seasonal: str = "add",
+    holidays: Sequence[dt.date] | None = None,
+    max_workers: int | None = None,
+    cache_dir: Path | str | None = None,
+) -> BatchForecast:
+    """``series`` (index = 日付, 列 = 系列) の各列を予測する
+
+    ``cache_dir`` を与えると、系列の値・日付・パラメータが同じものは保存済みの
+    結果を使う (report の ``cached`` が True)。
+    """
+    if choose not in ("auto", "arima", "ets"):
+        raise ValueError(f"未知のモデル選択です: {choose} (auto / arima / ets)")
+    params = {
+        "periods": int(periods),
+        "choose": choose,
+        "seasonal": seasonal,
+        "holidays": sorted(str(pd.to_datetime(d).date()) for d in holidays) if holidays else [],
+    }
+    cache = Path(cache_dir) if cache_dir is not None else None
+    ds = pd.DatetimeIndex(pd.to_datetime(series.index)).to_numpy()
+    keys = [str(c) for c in series.columns]
+
+    results: Dict[str, Dict[str, Any]] = {}
+    jobs: Dict[str, tuple] = {}
+    digests: Dict[str, str] = {}
+    for key, col in zip(keys, series.columns):
+        y = pd.to_numeric(series[col], errors="coerce").fillna(0).to_numpy(dtype=float)
+        digest = digests[key] = _series_digest(ds, y, params)
+        hit = _cache_load(cache, digest)
+        if hit is not None:
+            results[key] = {**hit, "series": key, "cached": True}
+        else:
+            jobs[key] = (key, ds, y, params)
+
+    t0 = time.perf_counter()
+    workers = min(len(jobs), max_workers or _default_workers(len(jobs), choose)) if jobs else 0
+    if workers <= 1:
+        fitted = {key: _fit_one(*job) for key, job in jobs.items()}
+    else:
+        fitted = _run_pool(jobs, workers)
+    for key, result in fitted.items():
+        _cache_store(cache, digests[key], result)
+        results[key] = {**result, "cached": False}
+    log.info(
+        f"[forecast_batch] {len(keys)} 系列 (適合 {len(jobs)}, キャッシュ {len(keys) - len(jobs)}, "
+        f"{max(workers, 1)} 並列, {time.perf_counter() - t0:.2f}s)"
+    )
+
+    parts = [
+        pd.DataFrame({"series": key, "ds": results[key]["ds"], "yhat": results[key]["yhat"], "model": results[key]["model"]})
+        for key in keys
+    ]
+    forecasts = (
+        pd.concat(parts, ignore_index=True)
+        if parts
+        else pd.DataFrame(columns=["series", "ds", "yhat", "model"])
+    )
+    report = pd.DataFrame([{c: results[key][c] for c in REPORT_COLUMNS} for key in keys], columns=REPORT_COLUMNS)
+    return BatchForecast(forecasts, report)
+
+
+def _run_pool(jobs: Mapping[str, tuple], workers: int) -> Dict[str, Dict[str, Any]]:
+    ctx = multiprocessing.get_context("spawn")
+    fitted: Dict[str, Dict[str, Any]] = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = {pool.submit(_fit_one, *job): key for key, job in jobs.items()}
+            for future in as_completed(futures):
+                fitted[futures[future]] = future.result()
+    except BrokenProcessPool as e:
+        log.warning(f"[forecast_batch] プロセスプールが停止したため残りをその場で実行します: {e}")
+    for key, job in jobs.items():
+        if key not in fitted:
+            fitted[key] = _fit_one(*job)
+    return fitted
+
+
+def run_batch_forecast(
+    out_dir: Path | str,
+    heatmap_frames: Mapping[str, pd.DataFrame] | None = None,
+    *,
+    bands: bool = True,
+    **options: Any,
+) -> BatchForecast:
+    """heatmap から系列を作って一括予測し、結果とレポートを ``out_dir`` に書く
+
+    ``heatmap_frames`` を省略すると ``out_dir`` の heat_*.parquet を読む。
+    ``options`` は :func:`forecast_many` へ渡す (``cache_dir`` の既定は
+    ``pipeline.default_cache_dir() / forecast_cache``。出力先の中に置くと、
+    出力先を毎回作り直す CLI / アプリの実行では再利用されない)。
+    """
+    out = Path(out_dir)
+    if heatmap_frames is None:
+        heatmap_frames = {p.name: pd.read_parquet(p) for p in sorted(out.glob("heat_*.parquet"))}
+    series = demand_series_from_heatmaps(heatmap_frames, bands=bands)
+    if "cache_dir" not in options:
+        from ..pipeline.cache import default_cache_dir
+
+        options["cache_dir"] = default_cache_dir() / FORECAST_CACHE_DIR
+    batch = forecast_many(series, **options)
+    save_df_parquet(batch.forecasts, out / FORECAST_BATCH_FILE, index=False)
+    save_df_parquet(batch.report, out / FORECAST_REPORT_FILE, index=False)
+    return batch
+
+
+__all__ = [
+    "BatchForecast",
+    "FORECAST_BATCH_FILE",
+    "FORECAST_REPORT_FILE",
+    "demand_series_from_heatmaps",
+    "forecast_many",
+    "run_batch_forecast",
+]
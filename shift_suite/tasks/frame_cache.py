@@ -0,0 +1,171 @@
+# shift_suite / tasks / frame_cache.py
+"""
+shift_suite.tasks.frame_cache  v1.0.0
+────────────────────────────────────────────────────────
+* 解析成果物 (Parquet / CSV) を読み込んだ DataFrame のプロセス内キャッシュ
+    - キー = (解決済みパス, mtime_ns, size, 列)。再解析でファイルが書き換わると
+      キーが変わるので古いフレームは返らない (古い版はその場で破棄)
+    - 上限はエントリ数ではなくメモリ使用量 (バイト) で、超えたら LRU で追い出す
+    - 同じシナリオを開いた複数セッションは同じパスなので同じエントリを共有する
+    - ``columns`` を指定すると必要な列だけを読む。全列が既にあればそこから切り出す
+* ``FRAME_CACHE`` がプロセス共有のインスタンス
+  (上限は環境変数 ``SHIFT_SUITE_FRAME_CACHE_MB``、既定 256MB)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .fingerprint import FileSignature, file_signature
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_MB = 256
+
+_Key = Tuple[str, int, int, Optional[Tuple[str, ...]], str]
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """DataFrame のメモリ使用量 (object 列の中身を含む)"""
+    try:
+        return int(df.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return int(df.size * 8)
+
+
+class FrameCache:
+    """Byte-bounded LRU cache of frames read from files, keyed by file signature."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024) -> None:
+        self.max_bytes = int(max_bytes)
+        self._entries: "OrderedDict[_Key, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._current: Dict[str, FileSignature] = {}
+        self._lock = threading.RLock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    # ── 読み込み ─────────────────────────────────────────────────────
+    def read_parquet(self, path: Path | str, columns: Sequence[str] | None = None) -> pd.DataFrame:
+        """``pd.read_parquet`` のキャッシュ版 (``columns`` で列を絞り込める)"""
+        cols = tuple(columns) if columns is not None else None
+        return self._get(Path(path), cols, "parquet", lambda fp: pd.read_parquet(fp, columns=list(cols) if cols else None))
+
+    def read_csv(self, path: Path | str, **kwargs: Any) -> pd.DataFrame:
+        """``pd.read_csv`` のキャッシュ版 (``kwargs`` もキーに含める)"""
+        variant = "csv:" + repr(sorted(kwargs.items()))
+        return self._get(Path(path), None, variant, lambda fp: pd.read_csv(fp, **kwargs))
+
+    def get_or_read(
+        self, path: Path | str, variant: str, reader: Callable[[Path], pd.DataFrame]
+    ) -> pd.DataFrame:
+        """任意の読み込み関数の結果を ``variant`` (絞り込み条件など) ごとにキャッシュする"""
+        return self._get(Path(path), None, variant, reader)
+
+    def _get(
+        self,
+        fp: Path,
+        cols: Optional[Tuple[str, ...]],
+        variant: str,
+        reader: Callable[[Path], pd.DataFrame],
+    ) -> pd.DataFrame:
+        sig = file_signature(fp)
+        key: _Key = (*sig, cols, variant)
+        with self._lock:
+            self._invalidate_stale(sig)
+            hit = self._entries.get(key)
+            if hit is None and cols is not None:
+                full = self._entries.get((*sig, None, variant))
+                if full is not None and all(c in full[0].columns for c in cols):
+                    self._entries.move_to_end((*sig, None, variant))
+                    self._hits += 1
+                    return full[0][list(cols)]
+            if hit is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return hit[0].copy(deep=False)
+            self._misses += 1
+
+        df = reader(fp)
+        nbytes = frame_nbytes(df)
+        with self._lock:
+            # 読み込み中に別スレッドが書き換え検知した場合は最新版のみ残す
+            if self._current.get(sig[0], sig) != sig:
+                return df
+            if nbytes <= self.max_bytes:
+                old = self._entries.pop(key, None)
+                if old is not None:
+                    self._bytes -= old[1]
+                self._entries[key] = (df, nbytes)
+                self._bytes += nbytes
+                self._evict()
+            else:
+                log.debug(f"[frame_cache] 上限超過のためキャッシュしません: {fp.name} ({nbytes:,} bytes)")
+        return df.copy(deep=False)
+
+    # ── 管理 ─────────────────────────────────────────────────────────
+    def _invalidate_stale(self, sig: FileSignature) -> None:
+        path = sig[0]
+        if self._current.get(path) == sig:
+            return
+        if path in self._current:
+            stale = [k for k in self._entries if k[0] == path and k[:3] != sig]
+            for k in stale:
+                self._bytes -= self._entries.pop(k)[1]
+            if stale:
+                self._invalidations += 1
+                log.debug(f"[frame_cache] 更新を検知して破棄: {path} ({len(stale)} 件)")
+        self._current[path] = sig
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            key, (_, nbytes) = self._entries.popitem(last=False)
+            self._bytes -= nbytes
+            self._evictions += 1
+            log.debug(f"[frame_cache] 追い出し: {Path(key[0]).name}")
+
+    def invalidate(self, path: Path | str | None = None) -> None:
+        """``path`` (省略時は全体、ディレクトリなら配下すべて) のエントリを破棄する"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._current.clear()
+                self._bytes = 0
+                return
+            prefix = str(Path(path).resolve())
+            for k in [k for k in self._entries if k[0] == prefix or k[0].startswith(prefix + os.sep)]:
+                self._bytes -= self._entries.pop(k)[1]
+            for p in [p for p in self._current if p == prefix or p.startswith(prefix + os.sep)]:
+                del self._current[p]
+
+    def clear(self) -> None:
+        """全エントリと統計をリセットする"""
+        with self._lock:
+            self.invalidate()
+            self._hits = self._misses = self._evictions = self._invalidations = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / total if total else 0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+
+FRAME_CACHE = FrameCache(int(float(os.getenv("SHIFT_SUITE_FRAME_CACHE_MB", DEFAULT_MAX_MB)) * 1024 * 1024))
@@ -5,7 +5,7 @@ from __future__ import annotations
 import datetime as dt
 from datetime import time
 from pathlib import Path
-from typing import List, Set
+from typing import Dict, List, Set
 
 import numpy as np
 import openpyxl
@@ -16,6 +16,8 @@ from openpyxl.styles import PatternFill
 from openpyxl.utils import get_column_letter
 
 from .constants import SUMMARY5, DEFAULT_SLOT_MINUTES
+from .holiday_detection import estimate_closed_days, load_meta_holidays
+from .occupancy_cube import ALL_GROUP, build_occupancy_cube
 from shift_suite.i18n import translate as _
 
 # 'log' という名前でロガーを取得 (utils.pyからインポートされるlogと同じ)
@@ -524,6 +526,53 @@ def _apply_holiday_column_styling(
                 worksheet[f"{col_letter}{row_idx}"].fill = holiday_fill
 
 
+def _write_heatmap_xlsx(
+    heat_df: pd.DataFrame, fp_xlsx: Path, holidays_set: Set[dt.date]
+) -> Path | None:
+    """ヒートマップ 1 枚を書式付き Excel (シート名 = ファイル名) に保存"""
+    try:
+        save_df_xlsx(heat_df, fp_xlsx, sheet_name=fp_xlsx.stem)
+    except Exception as e_xlsx:
+        log.error(f"[heatmap.export] {fp_xlsx.name} 作成エラー: {e_xlsx}", exc_info=True)
+        return None
+
+    try:
+        wb = openpyxl.load_workbook(fp_xlsx)
+        ws = wb.active
+        data_columns = heat_df.columns.drop(SUMMARY5, errors="ignore")
+        _apply_conditional_formatting_to_worksheet(ws, data_columns)
+        _apply_holiday_column_styling(ws, data_columns, holidays_set, _parse_as_date)
+        wb.save(fp_xlsx)
+    except Exception as e:
+        log.error(f"{fp_xlsx.name} への書式設定中にエラー: {e}", exc_info=True)
+    return fp_xlsx
+
+
+def export_heatmap_excel(
+    out_dir: str | Path, holidays: Set[dt.date] | None = None
+) -> List[Path]:
+    """Write formatted ``heat_*.xlsx`` workbooks from the ``heat_*.parquet`` files.
+
+    Pipeline stages exchange heatmaps as Parquet only; this export stage is
+    run when the Excel bundle is actually downloaded.  ``holidays`` defaults
+    to the ones recorded in ``heatmap.meta.json``.
+    """
+    out_dir_path = Path(out_dir)
+    holidays_set = set(holidays) if holidays is not None else load_meta_holidays(out_dir_path)
+    written: List[Path] = []
+    for fp_parquet in sorted(out_dir_path.glob("heat_*.parquet")):
+        try:
+            heat_df = pd.read_parquet(fp_parquet)
+        except Exception as e:
+            log.warning(f"[heatmap.export] {fp_parquet.name} の読み込みエラー: {e}")
+            continue
+        fp_xlsx = _write_heatmap_xlsx(heat_df, fp_parquet.with_suffix(".xlsx"), holidays_set)
+        if fp_xlsx is not None:
+            written.append(fp_xlsx)
+    log.info(f"[heatmap.export] Excel ヒートマップを {len(written)} 件出力しました: {out_dir_path}")
+    return written
+
+
 def calculate_monthly_baseline_need(
     actual_staff_by_slot_and_date: pd.DataFrame,
     ref_start_date: dt.date,
@@ -561,6 +610,205 @@ def calculate_monthly_baseline_need(
     )
 
 
+NEED_ENGINES = ("numpy", "legacy")
+_NEED_PERCENTILES = {
+    "10パーセンタイル": 10,
+    "25パーセンタイル": 25,
+    "75パーセンタイル": 75,
+    "90パーセンタイル": 90,
+}
+
+
+def _reduce_by_count(values: np.ndarray, keep: np.ndarray, func) -> np.ndarray:
+    """行ごとに ``keep`` された値 (列順のまま) へ ``func`` を適用する。
+
+    要素数が同じ行をまとめて 2 次元配列にし ``axis=1`` で集計するため、
+    1 行ずつリストで計算した場合と同じ値 (ビット単位) になる。
+    """
+    counts = keep.sum(axis=1)
+    out = np.zeros(len(values), dtype=float)
+    for k in np.unique(counts):
+        if k == 0:
+            continue
+        rows = np.flatnonzero(counts == k)
+        dense = values[rows][keep[rows]].reshape(len(rows), int(k))
+        out[rows] = func(dense)
+    return out
+
+
+def _dow_need_numpy(
+    values: np.ndarray,
+    current_statistic_method: str,
+    is_significant_holiday: bool,
+    *,
+    remove_outliers: bool,
+    iqr_multiplier: float,
+    adjustment_factor: float,
+    include_zero_days: bool,
+) -> np.ndarray:
+    """1 曜日分 (時間帯 × 日付) の need を全時間帯まとめて計算する"""
+    if include_zero_days:
+        values = np.where(np.isnan(values), 0.0, values)
+        present = np.ones(values.shape, dtype=bool)
+    else:
+        present = ~np.isnan(values)
+    n_present = present.sum(axis=1)
+
+    # IQR による外れ値除去 (4 点以上の時間帯のみ。全点除外なら元の値を使う)
+    used = present
+    if remove_outliers:
+        q1 = _reduce_by_count(values, present, lambda a: np.percentile(a, 25, axis=1))
+        q3 = _reduce_by_count(values, present, lambda a: np.percentile(a, 75, axis=1))
+        iqr = q3 - q1
+        lower = q1 - iqr_multiplier * iqr
+        upper = q3 + iqr_multiplier * iqr
+        with np.errstate(invalid="ignore"):
+            inside = present & (lower[:, None] <= values) & (values <= upper[:, None])
+        trim = (n_present >= 4) & inside.any(axis=1)
+        used = np.where(trim[:, None], inside, present)
+
+    pct = _NEED_PERCENTILES.get(current_statistic_method)
+    if pct is not None:
+        need = _reduce_by_count(values, used, lambda a: np.percentile(a, pct, axis=1))
+    elif current_statistic_method == "中央値":
+        need = _reduce_by_count(values, used, lambda a: np.median(a, axis=1))
+    else:  # 平均値
+        need = _reduce_by_count(values, used, lambda a: np.mean(a, axis=1))
+
+    # データの中央値が小さい場合はNeedを上限2.0に制限
+    median_actual = _reduce_by_count(values, present, lambda a: np.median(a, axis=1))
+    need = np.where(median_actual < 2.0, np.minimum(need, 2.0), need)
+    need = need * adjustment_factor
+
+    if is_significant_holiday:
+        max_actual = np.where(present, values, -np.inf).max(axis=1, initial=-np.inf)
+        need = np.where(need > max_actual * 1.5, max_actual * 1.5, need)
+        zero_ratio = (present & (values == 0)).sum(axis=1) / np.maximum(n_present, 1)
+        need = np.where(zero_ratio > 0.5, need * (1 - zero_ratio * 0.5), need)
+
+    need = np.where(np.isnan(need), 0.0, np.round(need))
+    need[n_present == 0] = 0.0
+    return need
+
+
+def _dow_need_legacy(
+    data_for_dow_calc: pd.DataFrame,
+    day_of_week_idx: int,
+    dow_name: str,
+    current_statistic_method: str,
+    is_significant_holiday: bool,
+    *,
+    remove_outliers: bool,
+    iqr_multiplier: float,
+    adjustment_factor: float,
+    include_zero_days: bool,
+) -> pd.Series:
+    """従来の時間帯ループ版 (検証・ベンチマーク用)"""
+    needs: dict = {}
+    for time_slot_val, row_series_data in data_for_dow_calc.iterrows():
+        if include_zero_days:
+            values_at_slot_current = [0.0 if pd.isna(v) else float(v) for v in row_series_data]
+        else:
+            values_at_slot_current = row_series_data.dropna().astype(float).tolist()
+        analysis_logger.info(
+            f"[DEBUG_NEED_DETAIL] 処理中の時間帯: {time_slot_val} ({dow_name}), 元データ ({len(values_at_slot_current)}点): {values_at_slot_current}"
+        )
+
+        if not values_at_slot_current:
+            needs[time_slot_val] = 0
+            continue
+        values_for_stat_calc = values_at_slot_current
+        if day_of_week_idx == 6 and time_slot_val in ["09:00", "12:00", "15:00"]:
+            log.info(f"[SUNDAY_DETAIL] {time_slot_val} 時間帯:")
+            log.info(f"[SUNDAY_DETAIL]   元データ: {values_at_slot_current}")
+        # 統計値の計算前にデバッグ情報を出力
+        if day_of_week_idx == 6 or (day_of_week_idx == 1 and time_slot_val == "09:00"):
+            log.info(f"\n  [統計計算デバッグ] {dow_name} {time_slot_val}")
+            log.info(f"    元データ: {values_at_slot_current}")
+            log.info(f"    データ数: {len(values_at_slot_current)}")
+
+        if remove_outliers and len(values_at_slot_current) >= 4:
+            q1_val = np.percentile(values_at_slot_current, 25)
+            q3_val = np.percentile(values_at_slot_current, 75)
+            iqr_val = q3_val - q1_val
+            lower_bound_val = q1_val - iqr_multiplier * iqr_val
+            upper_bound_val = q3_val + iqr_multiplier * iqr_val
+            values_filtered_outlier = [
+                x_val
+                for x_val in values_at_slot_current
+                if lower_bound_val <= x_val <= upper_bound_val
+            ]
+            # デバッグ: 外れ値除去の詳細
+            if day_of_week_idx == 6 and time_slot_val in ["09:00", "12:00", "15:00"]:
+                log.info(f"[SUNDAY_DETAIL]   外れ値除去後: {values_filtered_outlier}")
+
+            analysis_logger.info(
+                f"[DEBUG_NEED_DETAIL] 外れ値除去実行前 (Q1:{q1_val:.1f}, Q3:{q3_val:.1f}, IQR:{iqr_val:.1f}), フィルタリング後 ({len(values_filtered_outlier)}点): {values_filtered_outlier}"
+            )
+
+            if not values_filtered_outlier:
+                log.debug(
+                    f"  曜日 {day_of_week_idx}, 時間帯 {time_slot_val}: 外れ値除去後データなし。元のリストで計算します。"
+                )
+            else:
+                values_for_stat_calc = values_filtered_outlier
+        need_calculated_val = 0.0
+        if values_for_stat_calc:
+            # 決定された統計手法に基づいて計算
+            if current_statistic_method == "10パーセンタイル":
+                need_calculated_val = np.percentile(values_for_stat_calc, 10)
+            elif current_statistic_method == "25パーセンタイル":
+                need_calculated_val = np.percentile(values_for_stat_calc, 25)
+            elif current_statistic_method == "中央値":
+                need_calculated_val = np.median(values_for_stat_calc)
+            elif current_statistic_method == "75パーセンタイル":
+                need_calculated_val = np.percentile(values_for_stat_calc, 75)
+            elif current_statistic_method == "90パーセンタイル":
+                need_calculated_val = np.percentile(values_for_stat_calc, 90)
+            else:  # 平均値
+                need_calculated_val = np.mean(values_for_stat_calc)
+        analysis_logger.info(
+            f"[DEBUG_NEED_DETAIL] 統計手法({current_statistic_method})適用後のNeed仮値: {need_calculated_val:.2f}"
+        )
+
+        # データの中央値が小さい場合はNeedを上限2.0に制限
+        if values_at_slot_current and np.median(values_at_slot_current) < 2.0:
+            need_calculated_val = min(need_calculated_val, 2.0)
+            analysis_logger.info(
+                f"  [NEED_CAP] 曜日 {day_of_week_idx}, 時間帯 {time_slot_val}: "
+                f"実績中央値が2未満のためNeedを {need_calculated_val:.1f} に制限しました。"
+            )
+            analysis_logger.info(
+                f"[DEBUG_NEED_DETAIL] Need上限適用判定: 元データ中央値={np.median(values_at_slot_current):.1f}。制限後Need={need_calculated_val:.2f}"
+            )
+
+        # 調整係数の適用
+        need_calculated_val *= adjustment_factor
+
+        # 実データが少ない場合の特殊処理
+        if is_significant_holiday:
+            # データが少ない場合は、実際の最大値を上限として設定
+            max_actual_val = max(values_at_slot_current) if values_at_slot_current else 0
+            if need_calculated_val > max_actual_val * 1.5:  # 実際の最大値の1.5倍を上限
+                original_need = need_calculated_val
+                need_calculated_val = max_actual_val * 1.5
+                log.info(f"[STATS_FIX] {dow_name} {time_slot_val}: Need値を {original_need:.2f} → {need_calculated_val:.2f} に制限（実データ考慮）")
+
+            # さらに、0が多いデータでは0により近い値に調整
+            zero_ratio = values_at_slot_current.count(0) / len(values_at_slot_current) if values_at_slot_current else 1
+            if zero_ratio > 0.5:  # 50%以上が0の場合
+                need_calculated_val *= (1 - zero_ratio * 0.5)  # 0の比率に応じて減算
+                log.info(f"[STATS_FIX] {dow_name} {time_slot_val}: 0データ比率{zero_ratio:.2f}により調整 → {need_calculated_val:.2f}")
+
+        final_need = round(need_calculated_val) if not pd.isna(need_calculated_val) else 0
+        needs[time_slot_val] = final_need
+        log.debug(
+            f"  曜日 {day_of_week_idx}, 時間帯 {time_slot_val}: 元データ長 {len(row_series_data.dropna())} -> 外れ値除去後 {len(values_for_stat_calc)} -> Need {needs[time_slot_val]}"
+        )
+
+    return pd.Series(needs, dtype=float).reindex(data_for_dow_calc.index)
+
+
 def calculate_pattern_based_need(
     actual_staff_by_slot_and_date: pd.DataFrame,
     ref_start_date: dt.date,
@@ -574,7 +822,15 @@ def calculate_pattern_based_need(
     adjustment_factor: float = 1.0,
     include_zero_days: bool = True,
     all_dates_in_period: list[dt.date] | None = None,
+    engine: str = "numpy",
 ) -> pd.DataFrame:
+    """曜日 × 時間帯の need を実績から算出する。
+
+    ``engine="numpy"`` (既定) は曜日ごとに全時間帯を配列演算で一括計算し、
+    ``"legacy"`` は従来の時間帯ループで計算する。両者の結果は一致する。
+    """
+    if engine not in NEED_ENGINES:
+        raise ValueError(f"未知の need エンジンです: {engine} (選択肢: {NEED_ENGINES})")
     # 修正箇所: logger.info -> log.info など、ロガー名を 'log' に統一
     log.info(
         f"[heatmap.calculate_pattern_based_need] 参照期間: {ref_start_date} - {ref_end_date}, 手法: {statistic_method}, 外れ値除去: {remove_outliers}"
@@ -712,106 +968,29 @@ def calculate_pattern_based_need(
         else:
             current_statistic_method = statistic_method
 
-        for time_slot_val, row_series_data in data_for_dow_calc.iterrows():
-            if include_zero_days:
-                values_at_slot_current = [0.0 if pd.isna(v) else float(v) for v in row_series_data]
-            else:
-                values_at_slot_current = row_series_data.dropna().astype(float).tolist()
-            analysis_logger.info(
-                f"[DEBUG_NEED_DETAIL] 処理中の時間帯: {time_slot_val} ({dow_name}), 元データ ({len(values_at_slot_current)}点): {values_at_slot_current}"
-            )
-
-            if not values_at_slot_current:
-                dow_need_df_calculated.loc[time_slot_val, day_of_week_idx] = 0
-                continue
-            values_for_stat_calc = values_at_slot_current
-            if day_of_week_idx == 6 and time_slot_val in ["09:00", "12:00", "15:00"]:
-                log.info(f"[SUNDAY_DETAIL] {time_slot_val} 時間帯:")
-                log.info(f"[SUNDAY_DETAIL]   元データ: {values_at_slot_current}")
-            # 統計値の計算前にデバッグ情報を出力
-            if day_of_week_idx == 6 or (day_of_week_idx == 1 and time_slot_val == "09:00"):
-                log.info(f"\n  [統計計算デバッグ] {dow_name} {time_slot_val}")
-                log.info(f"    元データ: {values_at_slot_current}")
-                log.info(f"    データ数: {len(values_at_slot_current)}")
-
-            if remove_outliers and len(values_at_slot_current) >= 4:
-                q1_val = np.percentile(values_at_slot_current, 25)
-                q3_val = np.percentile(values_at_slot_current, 75)
-                iqr_val = q3_val - q1_val
-                lower_bound_val = q1_val - iqr_multiplier * iqr_val
-                upper_bound_val = q3_val + iqr_multiplier * iqr_val
-                values_filtered_outlier = [
-                    x_val
-                    for x_val in values_at_slot_current
-                    if lower_bound_val <= x_val <= upper_bound_val
-                ]
-                # デバッグ: 外れ値除去の詳細
-                if day_of_week_idx == 6 and time_slot_val in ["09:00", "12:00", "15:00"]:
-                    log.info(f"[SUNDAY_DETAIL]   外れ値除去後: {values_filtered_outlier}")
-
-                analysis_logger.info(
-                    f"[DEBUG_NEED_DETAIL] 外れ値除去実行前 (Q1:{q1_val:.1f}, Q3:{q3_val:.1f}, IQR:{iqr_val:.1f}), フィルタリング後 ({len(values_filtered_outlier)}点): {values_filtered_outlier}"
-                )
-
-                if not values_filtered_outlier:
-                    log.debug(
-                        f"  曜日 {day_of_week_idx}, 時間帯 {time_slot_val}: 外れ値除去後データなし。元のリストで計算します。"
-                    )
-                else:
-                    values_for_stat_calc = values_filtered_outlier
-            need_calculated_val = 0.0
-            if values_for_stat_calc:
-                # 決定された統計手法に基づいて計算
-                if current_statistic_method == "10パーセンタイル":
-                    need_calculated_val = np.percentile(values_for_stat_calc, 10)
-                elif current_statistic_method == "25パーセンタイル":
-                    need_calculated_val = np.percentile(values_for_stat_calc, 25)
-                elif current_statistic_method == "中央値":
-                    need_calculated_val = np.median(values_for_stat_calc)
-                elif current_statistic_method == "75パーセンタイル":
-                    need_calculated_val = np.percentile(values_for_stat_calc, 75)
-                elif current_statistic_method == "90パーセンタイル":
-                    need_calculated_val = np.percentile(values_for_stat_calc, 90)
-                else:  # 平均値
-                    need_calculated_val = np.mean(values_for_stat_calc)
-            analysis_logger.info(
-                f"[DEBUG_NEED_DETAIL] 統計手法({current_statistic_method})適用後のNeed仮値: {need_calculated_val:.2f}"
+        if engine == "legacy":
+            dow_need_df_calculated[day_of_week_idx] = _dow_need_legacy(
+                data_for_dow_calc,
+                day_of_week_idx,
+                dow_name,
+                current_statistic_method,
+                is_significant_holiday,
+                remove_outliers=remove_outliers,
+                iqr_multiplier=iqr_multiplier,
+                adjustment_factor=adjustment_factor,
+                include_zero_days=include_zero_days,
             )
-
-            # データの中央値が小さい場合はNeedを上限2.0に制限
-            if values_at_slot_current and np.median(values_at_slot_current) < 2.0:
-                need_calculated_val = min(need_calculated_val, 2.0)
-                analysis_logger.info(
-                    f"  [NEED_CAP] 曜日 {day_of_week_idx}, 時間帯 {time_slot_val}: "
-                    f"実績中央値が2未満のためNeedを {need_calculated_val:.1f} に制限しました。"
-                )
-                analysis_logger.info(
-                    f"[DEBUG_NEED_DETAIL] Need上限適用判定: 元データ中央値={np.median(values_at_slot_current):.1f}。制限後Need={need_calculated_val:.2f}"
-                )
-
-            # 調整係数の適用
-            need_calculated_val *= adjustment_factor
-            
-            # 実データが少ない場合の特殊処理
-            if is_significant_holiday:
-                # データが少ない場合は、実際の最大値を上限として設定
-                max_actual_val = max(values_at_slot_current) if values_at_slot_current else 0
-                if need_calculated_val > max_actual_val * 1.5:  # 実際の最大値の1.5倍を上限
-                    original_need = need_calculated_val
-                    need_calculated_val = max_actual_val * 1.5
-                    log.info(f"[STATS_FIX] {dow_name} {time_slot_val}: Need値を {original_need:.2f} → {need_calculated_val:.2f} に制限（実データ考慮）")
-                
-                # さらに、0が多いデータでは0により近い値に調整
-                zero_ratio = values_at_slot_current.count(0) / len(values_at_slot_current) if values_at_slot_current else 1
-                if zero_ratio > 0.5:  # 50%以上が0の場合
-                    need_calculated_val *= (1 - zero_ratio * 0.5)  # 0の比率に応じて減算
-                    log.info(f"[STATS_FIX] {dow_name} {time_slot_val}: 0データ比率{zero_ratio:.2f}により調整 → {need_calculated_val:.2f}")
-            
-            final_need = round(need_calculated_val) if not pd.isna(need_calculated_val) else 0
-            dow_need_df_calculated.loc[time_slot_val, day_of_week_idx] = final_need
-            log.debug(
-                f"  曜日 {day_of_week_idx}, 時間帯 {time_slot_val}: 元データ長 {len(row_series_data.dropna())} -> 外れ値除去後 {len(values_for_stat_calc)} -> Need {dow_need_df_calculated.loc[time_slot_val, day_of_week_idx]}"
+        else:
+            dow_need_df_calculated[day_of_week_idx] = _dow_need_numpy(
+                data_for_dow_calc.to_numpy(dtype=float),
+                current_statistic_method,
+                is_significant_holiday,
+                remove_outliers=remove_outliers,
+                iqr_multiplier=iqr_multiplier,
+                adjustment_factor=adjustment_factor,
+                include_zero_days=include_zero_days,
             )
+            log.debug(f"[NEED_DEBUG] {dow_name}: {len(data_for_dow_calc)} 時間帯を一括計算しました")
 
     # 全曜日の計算完了後、サマリーを出力
     log.info("[NEED_DEBUG] ========== Need計算完了サマリー ==========")
@@ -885,12 +1064,15 @@ def build_heatmap(
     min_method: str = "p25",
     max_method: str = "p75",
     holidays: set[dt.date] | None = None,
-) -> None:
+    export_excel: bool = False,
+) -> Dict[str, pd.DataFrame]:
     holidays_set = set(holidays or [])
+    # 書き出したフレーム (ファイル名 → DataFrame)。後続段へメモリ上で渡す
+    heat_frames: Dict[str, pd.DataFrame] = {}
 
     if long_df.empty:
         log.warning("[heatmap.build_heatmap] 入力DataFrame (long_df) が空です。")
-        return
+        return heat_frames
     required_long_df_cols = {
         "ds",
         "staff",
@@ -912,7 +1094,7 @@ def build_heatmap(
             summary_columns=SUMMARY5,
             estimated_holidays=[d.isoformat() for d in sorted(list(holidays or set()))],
         )
-        return
+        return heat_frames
 
     # 重要: 休暇レコードの統計を先に収集
     leave_stats = {}
@@ -933,15 +1115,15 @@ def build_heatmap(
         and "ds" in long_df.columns
         and "parsed_slots_count" in long_df.columns
     ):
-        long_df_for_holiday_check = long_df.copy()
-        if not pd.api.types.is_datetime64_any_dtype(long_df_for_holiday_check["ds"]):
-            long_df_for_holiday_check["ds"] = pd.to_datetime(
-                long_df_for_holiday_check["ds"], errors="coerce"
+        valid_ds_long_df = long_df
+        if not pd.api.types.is_datetime64_any_dtype(valid_ds_long_df["ds"]):
+            valid_ds_long_df = valid_ds_long_df.assign(
+                ds=pd.to_datetime(valid_ds_long_df["ds"], errors="coerce")
             )
-        valid_ds_long_df = long_df_for_holiday_check.dropna(subset=["ds"])
+        valid_ds_long_df = valid_ds_long_df.dropna(subset=["ds"])
         if not valid_ds_long_df.empty:
-            min_date_val = valid_ds_long_df["ds"].dt.date.min()
-            max_date_val = valid_ds_long_df["ds"].dt.date.max()
+            min_date_val = valid_ds_long_df["ds"].min().date()
+            max_date_val = valid_ds_long_df["ds"].max().date()
             if (
                 pd.NaT not in [min_date_val, max_date_val]
                 and isinstance(min_date_val, dt.date)
@@ -968,24 +1150,12 @@ def build_heatmap(
             else:
                 log.warning("[heatmap.build_heatmap] 有効な日付範囲を決定できません。")
             if all_dates_in_period_list:
-                for current_date_val_iter in all_dates_in_period_list:
-                    df_for_current_date_iter = valid_ds_long_df[
-                        valid_ds_long_df["ds"].dt.date == current_date_val_iter
-                    ]
-                    if df_for_current_date_iter.empty:
-                        estimated_holidays_set.add(current_date_val_iter)
-                        log.debug(
-                            f"施設休業日(推定): {current_date_val_iter} (勤務記録なし)"
-                        )
-                        continue
-
-                    # 修正: 通常勤務のレコードのみで判定
-                    work_records_today = _filter_work_records(df_for_current_date_iter)
-                    if work_records_today.empty:
-                        estimated_holidays_set.add(current_date_val_iter)
-                        log.debug(
-                            f"施設休業日(推定): {current_date_val_iter} (通常勤務なし)"
-                        )
+                # 通常勤務のない日を正規化日付の 1 回の集計で判定
+                estimated_holidays_set = estimate_closed_days(
+                    valid_ds_long_df,
+                    all_dates_in_period_list[0],
+                    all_dates_in_period_list[-1],
+                )
             if estimated_holidays_set:
                 log.info(
                     f"[heatmap.build_heatmap] 推定された休業日 ({len(estimated_holidays_set)}日): {sorted(list(estimated_holidays_set))}"
@@ -1022,6 +1192,7 @@ def build_heatmap(
         fp_all_empty_path = out_dir_path / "heat_ALL.parquet"
         try:
             empty_pivot.to_parquet(fp_all_empty_path)
+            heat_frames[fp_all_empty_path.name] = empty_pivot
         except Exception as e_empty_write:
             log.error(f"空のheat_ALL.parquetの書き込みに失敗: {e_empty_write}")
         all_unique_roles_val = (
@@ -1036,7 +1207,7 @@ def build_heatmap(
             estimated_holidays=[d.isoformat() for d in sorted(list(holidays or set()))],
             leave_statistics=leave_stats,  # 休暇統計を追加
         )
-        return
+        return heat_frames
 
     df_for_heatmap_actuals["time"] = pd.to_datetime(
         df_for_heatmap_actuals["ds"], errors="coerce"
@@ -1052,50 +1223,14 @@ def build_heatmap(
     role_col_name = "role"
     log.info("[heatmap.build_heatmap] 全体ヒートマップ作成開始。")
 
-    pivot_data_all_actual_staff = pd.DataFrame(index=time_index_labels)
-    if not df_for_heatmap_actuals.empty:
-        if len(df_for_heatmap_actuals) > 50000:
-            log.info(
-                "[heatmap.build_heatmap] Large dataset detected, using chunked processing"
-            )
-            chunk_size = 10000
-            pivot_chunks = []
-
-            for i in range(0, len(df_for_heatmap_actuals), chunk_size):
-                chunk = df_for_heatmap_actuals.iloc[i : i + chunk_size]
-                chunk_pivot = chunk.drop_duplicates(
-                    subset=["date_lbl", "time", staff_col_name]
-                ).pivot_table(
-                    index="time",
-                    columns="date_lbl",
-                    values=staff_col_name,
-                    aggfunc="nunique",
-                    fill_value=0,
-                )
-                pivot_chunks.append(chunk_pivot)
-
-            if pivot_chunks:
-                pivot_data_all_actual_staff = pd.concat(pivot_chunks, axis=1)
-                pivot_data_all_actual_staff = pivot_data_all_actual_staff.groupby(
-                    level=0, axis=1
-                ).sum()
-                pivot_data_all_actual_staff = pivot_data_all_actual_staff.reindex(
-                    index=time_index_labels, fill_value=0
-                )
-        else:
-            pivot_data_all_actual_staff = (
-                df_for_heatmap_actuals.drop_duplicates(
-                    subset=["date_lbl", "time", staff_col_name]
-                )
-                .pivot_table(
-                    index="time",
-                    columns="date_lbl",
-                    values=staff_col_name,
-                    aggfunc="nunique",
-                    fill_value=0,
-                )
-                .reindex(index=time_index_labels, fill_value=0)
-            )
+    # 全体・職種別・雇用形態別の在籍人数を 1 パスで集計し、以降はキューブから切り出す
+    occupancy_cube = build_occupancy_cube(
+        df_for_heatmap_actuals,
+        time_index_labels,
+        dims=(role_col_name, "employment"),
+        staff_col=staff_col_name,
+    )
+    pivot_data_all_actual_staff = occupancy_cube.frame(ALL_GROUP)
 
     # Ensure all dates in the period are present as columns, filling missing ones with 0
     pivot_data_all_actual_staff = pivot_data_all_actual_staff.reindex(
@@ -1226,6 +1361,7 @@ def build_heatmap(
     need_all_final_for_summary.to_parquet(
         out_dir_path / "need_per_date_slot.parquet"
     )
+    heat_frames["need_per_date_slot.parquet"] = need_all_final_for_summary
     log.info("Need per date/slot data saved to need_per_date_slot.parquet.")
 
     upper_s_representative = (
@@ -1284,6 +1420,7 @@ def build_heatmap(
     fp_all_path = out_dir_path / "heat_ALL.parquet"
     try:
         pivot_to_excel_all.to_parquet(fp_all_path)
+        heat_frames[fp_all_path.name] = pivot_to_excel_all
         log.info(
             "[heatmap.build_heatmap] 全体ヒートマップ (heat_ALL.parquet) 作成完了。"
         )
@@ -1293,57 +1430,14 @@ def build_heatmap(
             exc_info=True,
         )
 
-    fp_all_xlsx_path = out_dir_path / "heat_ALL.xlsx"
-    try:
-        save_df_xlsx(pivot_to_excel_all, fp_all_xlsx_path, sheet_name="heat_ALL")
-    except Exception as e_xlsx_all:
-        log.error(
-            f"[heatmap.build_heatmap] heat_ALL.xlsx 作成エラー: {e_xlsx_all}",
-            exc_info=True,
-        )
-
-    try:
-        log.info(f"{fp_all_xlsx_path.name} に書式を設定します。")
-        wb = openpyxl.load_workbook(fp_all_xlsx_path)
-        ws = wb.active
-
-        data_columns = pivot_to_excel_all.columns.drop(SUMMARY5, errors="ignore")
-
-        _apply_conditional_formatting_to_worksheet(ws, data_columns)
-        _apply_holiday_column_styling(ws, data_columns, holidays_set, _parse_as_date)
-
-        wb.save(fp_all_xlsx_path)
-        log.info(f"書式設定を {fp_all_xlsx_path.name} に保存しました。")
-    except Exception as e:
-        log.error(f"{fp_all_xlsx_path.name} への書式設定中にエラー: {e}", exc_info=True)
-
-    unique_roles_list_final_loop = sorted(
-        list(set(df_for_heatmap_actuals[role_col_name]))
-    )
+    unique_roles_list_final_loop = occupancy_cube.groups(role_col_name)
     log.info(
         f"[heatmap.build_heatmap] 職種別ヒートマップ作成開始。対象: {unique_roles_list_final_loop}"
     )
     for role_item_final_loop in unique_roles_list_final_loop:
         role_safe_name_final_loop = safe_sheet(str(role_item_final_loop))
         log.debug(f"職種 '{role_item_final_loop}' 開始...")
-        df_role_subset = df_for_heatmap_actuals[
-            df_for_heatmap_actuals[role_col_name] == role_item_final_loop
-        ]
-        pivot_data_role_actual = pd.DataFrame(index=time_index_labels)
-        if not df_role_subset.empty:
-            pivot_data_role_actual = (
-                df_role_subset.drop_duplicates(
-                    subset=["date_lbl", "time", staff_col_name]
-                )
-                .pivot_table(
-                    index="time",
-                    columns="date_lbl",
-                    values=staff_col_name,
-                    aggfunc="nunique",
-                    fill_value=0,
-                )
-                .reindex(index=time_index_labels, fill_value=0)
-            )
+        pivot_data_role_actual = occupancy_cube.frame(role_col_name, role_item_final_loop)
         pivot_data_role_final = pivot_data_role_actual.reindex(
             columns=all_date_labels_in_period_str, fill_value=0
         )
@@ -1423,9 +1517,9 @@ def build_heatmap(
                     need_df_role_final[date_str_col_map] = 0
 
         # 職種別の詳細Needデータを保存
-        need_df_role_final.to_parquet(
-            out_dir_path / f"need_per_date_slot_role_{role_safe_name_final_loop}.parquet"
-        )
+        need_fp_role = out_dir_path / f"need_per_date_slot_role_{role_safe_name_final_loop}.parquet"
+        need_df_role_final.to_parquet(need_fp_role)
+        heat_frames[need_fp_role.name] = need_df_role_final
         log.info(f"Role-specific need data saved to need_per_date_slot_role_{role_safe_name_final_loop}.parquet")
 
         need_r_series = need_df_role_final.mean(axis=1).round()
@@ -1472,6 +1566,7 @@ def build_heatmap(
         fp_role = out_dir_path / f"heat_{role_safe_name_final_loop}.parquet"
         try:
             pivot_to_excel_role.to_parquet(fp_role)
+            heat_frames[fp_role.name] = pivot_to_excel_role
             log.info(f"職種 '{role_item_final_loop}' ヒートマップ作成完了。")
         except Exception as e_role_write:
             log.error(
@@ -1479,63 +1574,18 @@ def build_heatmap(
                 exc_info=True,
             )
 
-        fp_role_xlsx = out_dir_path / f"heat_{role_safe_name_final_loop}.xlsx"
-        try:
-            save_df_xlsx(
-                pivot_to_excel_role,
-                fp_role_xlsx,
-                sheet_name=f"heat_{role_safe_name_final_loop}",
-            )
-        except Exception as e_role_xlsx:
-            log.error(
-                f"heat_{role_safe_name_final_loop}.xlsx 作成エラー: {e_role_xlsx}",
-                exc_info=True,
-            )
-
-        try:
-            log.info(f"{fp_role_xlsx.name} に書式を設定します。")
-            wb = openpyxl.load_workbook(fp_role_xlsx)
-            ws = wb.active
-            data_columns = pivot_to_excel_role.columns.drop(SUMMARY5, errors="ignore")
-            _apply_conditional_formatting_to_worksheet(ws, data_columns)
-            _apply_holiday_column_styling(
-                ws, data_columns, holidays_set, _parse_as_date
-            )
-            wb.save(fp_role_xlsx)
-        except Exception as e:
-            log.error(f"{fp_role_xlsx.name} への書式設定中にエラー: {e}", exc_info=True)
-
     # ── Employment heatmaps ───────────────────────────────────────────────
     employment_col_name = "employment"
-    unique_employments_list_final_loop = (
-        sorted(list(set(df_for_heatmap_actuals[employment_col_name])))
-        if employment_col_name in df_for_heatmap_actuals.columns
-        else []
-    )
+    unique_employments_list_final_loop = occupancy_cube.groups(employment_col_name)
     log.info(
         f"[heatmap.build_heatmap] 雇用形態別ヒートマップ作成開始。対象: {unique_employments_list_final_loop}"
     )
     for emp_item_final_loop in unique_employments_list_final_loop:
         emp_safe_name_final_loop = safe_sheet(str(emp_item_final_loop))
         log.debug(f"雇用形態 '{emp_item_final_loop}' 開始...")
-        df_emp_subset = df_for_heatmap_actuals[
-            df_for_heatmap_actuals[employment_col_name] == emp_item_final_loop
-        ]
-        pivot_data_emp_actual = pd.DataFrame(index=time_index_labels)
-        if not df_emp_subset.empty:
-            pivot_data_emp_actual = (
-                df_emp_subset.drop_duplicates(
-                    subset=["date_lbl", "time", staff_col_name]
-                )
-                .pivot_table(
-                    index="time",
-                    columns="date_lbl",
-                    values=staff_col_name,
-                    aggfunc="nunique",
-                    fill_value=0,
-                )
-                .reindex(index=time_index_labels, fill_value=0)
-            )
+        pivot_data_emp_actual = occupancy_cube.frame(
+            employment_col_name, emp_item_final_loop
+        )
         pivot_data_emp_final = pivot_data_emp_actual.reindex(
             columns=all_date_labels_in_period_str, fill_value=0
         )
@@ -1617,9 +1667,9 @@ def build_heatmap(
                     need_df_emp_final[date_str_col_map] = 0
 
         # 雇用形態別の詳細Needデータを保存
-        need_df_emp_final.to_parquet(
-            out_dir_path / f"need_per_date_slot_emp_{emp_safe_name_final_loop}.parquet"
-        )
+        need_fp_emp = out_dir_path / f"need_per_date_slot_emp_{emp_safe_name_final_loop}.parquet"
+        need_df_emp_final.to_parquet(need_fp_emp)
+        heat_frames[need_fp_emp.name] = need_df_emp_final
         log.info(f"Employment-specific need data saved to need_per_date_slot_emp_{emp_safe_name_final_loop}.parquet")
 
         need_e_series = need_df_emp_final.mean(axis=1).round()
@@ -1653,6 +1703,7 @@ def build_heatmap(
         fp_emp = out_dir_path / f"heat_emp_{emp_safe_name_final_loop}.parquet"
         try:
             pivot_to_excel_emp.to_parquet(fp_emp)
+            heat_frames[fp_emp.name] = pivot_to_excel_emp
             log.info(f"雇用形態 '{emp_item_final_loop}' ヒートマップ作成完了。")
         except Exception as e_emp_write:
             log.error(
@@ -1660,32 +1711,6 @@ def build_heatmap(
                 exc_info=True,
             )
 
-        fp_emp_xlsx = out_dir_path / f"heat_emp_{emp_safe_name_final_loop}.xlsx"
-        try:
-            save_df_xlsx(
-                pivot_to_excel_emp,
-                fp_emp_xlsx,
-                sheet_name=f"heat_emp_{emp_safe_name_final_loop}",
-            )
-        except Exception as e_emp_xlsx:
-            log.error(
-                f"heat_emp_{emp_safe_name_final_loop}.xlsx 作成エラー: {e_emp_xlsx}",
-                exc_info=True,
-            )
-
-        try:
-            log.info(f"{fp_emp_xlsx.name} に書式を設定します。")
-            wb = openpyxl.load_workbook(fp_emp_xlsx)
-            ws = wb.active
-            data_columns = pivot_to_excel_emp.columns.drop(SUMMARY5, errors="ignore")
-            _apply_conditional_formatting_to_worksheet(ws, data_columns)
-            _apply_holiday_column_styling(
-                ws, data_columns, holidays_set, _parse_as_date
-            )
-            wb.save(fp_emp_xlsx)
-        except Exception as e:
-            log.error(f"{fp_emp_xlsx.name} への書式設定中にエラー: {e}", exc_info=True)
-
     all_unique_roles_from_orig_long_df_meta = (
         sorted(list(set(long_df["role"]))) if "role" in long_df.columns else []
     )
@@ -1721,7 +1746,12 @@ def build_heatmap(
         leave_statistics=leave_stats,  # 休暇統計をメタデータに追加
     )
     validate_need_calculation(need_all_final_for_summary, pivot_data_all_final)
-    
+
+    # 書式付き Excel はダウンロード時の出力段で作る (後続処理は parquet を読む)
+    excel_files: List[Path] = []
+    if export_excel:
+        excel_files = export_heatmap_excel(out_dir_path, holidays_set)
+
     # タイムスタンプ付きのヒートマップ生成ログを作成
     try:
         # 統計情報を収集
@@ -1732,18 +1762,14 @@ def build_heatmap(
         # 生成されたファイルリスト
         generated_files = []
         generated_files.append(f"heat_ALL.parquet ({fp_all_path.stat().st_size} bytes)")
-        generated_files.append(f"heat_ALL.xlsx ({fp_all_xlsx_path.stat().st_size} bytes)")
         
         # 職種別ファイル
         for role_item in unique_roles_list_final_loop:
             role_safe_name = safe_sheet(str(role_item))
             role_parquet = out_dir_path / f"heat_{role_safe_name}.parquet"
-            role_excel = out_dir_path / f"heat_{role_safe_name}.xlsx"
             role_need = out_dir_path / f"need_per_date_slot_role_{role_safe_name}.parquet"
             if role_parquet.exists():
                 generated_files.append(f"heat_{role_safe_name}.parquet ({role_parquet.stat().st_size} bytes)")
-            if role_excel.exists():
-                generated_files.append(f"heat_{role_safe_name}.xlsx ({role_excel.stat().st_size} bytes)")
             if role_need.exists():
                 generated_files.append(f"need_per_date_slot_role_{role_safe_name}.parquet ({role_need.stat().st_size} bytes)")
         
@@ -1751,15 +1777,16 @@ def build_heatmap(
         for emp_item in unique_employments_list_final_loop:
             emp_safe_name = safe_sheet(str(emp_item))
             emp_parquet = out_dir_path / f"heat_emp_{emp_safe_name}.parquet"
-            emp_excel = out_dir_path / f"heat_emp_{emp_safe_name}.xlsx"
             emp_need = out_dir_path / f"need_per_date_slot_emp_{emp_safe_name}.parquet"
             if emp_parquet.exists():
                 generated_files.append(f"heat_emp_{emp_safe_name}.parquet ({emp_parquet.stat().st_size} bytes)")
-            if emp_excel.exists():
-                generated_files.append(f"heat_emp_{emp_safe_name}.xlsx ({emp_excel.stat().st_size} bytes)")
             if emp_need.exists():
                 generated_files.append(f"need_per_date_slot_emp_{emp_safe_name}.parquet ({emp_need.stat().st_size} bytes)")
         
+        # 書式付き Excel (export_excel=True のときだけこの実行で書かれる)
+        for fp_xlsx in (fp for fp in excel_files if fp.exists()):
+            generated_files.append(f"{fp_xlsx.name} ({fp_xlsx.stat().st_size} bytes)")
+
         # メタデータファイル
         meta_file = out_dir_path / "heatmap.meta.json"
         if meta_file.exists():
@@ -1818,3 +1845,4 @@ def build_heatmap(
         log.error(f"[heatmap] タイムスタンプ付きログ生成エラー: {e}")
     
     log.info("[heatmap.build_heatmap] ヒートマップ生成処理完了。")
+    return heat_frames
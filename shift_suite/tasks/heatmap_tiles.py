@@ -0,0 +1,310 @@
+# shift_suite / tasks / heatmap_tiles.py
+"""
+shift_suite.tasks.heatmap_tiles  v1.0.0
+────────────────────────────────────────────────────────
+* ヒートマップ (heat_*.parquet) の多段解像度 (LOD) タイル
+    - 時間軸: slot → hour → band (3 時間帯、kpi_cube の slot_band と同じ区切り)
+    - 日付軸: day → week → month
+    - 各セルは元のセルの平均人数 (解像度を変えても単位は「人」のまま)
+* 解析時に :func:`build_heatmap_tiles` が ``heat_tiles/<ファイル名>.parquet``
+  へ 9 通りの解像度をまとめて書く (解像度の組ごとに row group を分ける)
+* 表示時は :func:`read_heatmap_tile` が表示範囲 (日付) に対して
+  セル数が ``max_cells`` 以内で最も細かい解像度を選び、その範囲だけを読む。
+  期間を切り捨てずに全履歴を一定のデータ量で表示できる
+* タイルの無いフレームは :func:`downsample_wide` でその場で同じ集約を行う
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .constants import SUMMARY5
+from .frame_cache import FrameCache
+from .kpi_cube import slot_band
+
+log = logging.getLogger(__name__)
+
+HEAT_TILES_DIR = "heat_tiles"
+TIME_LEVELS = ("slot", "hour", "band")
+DATE_LEVELS = ("day", "week", "month")
+DEFAULT_MAX_CELLS = 15000
+
+_META_KEY = b"shift_suite.heat_tiles"
+
+Levels = Tuple[str, str]
+
+
+def _check_levels(t_level: str, d_level: str) -> None:
+    if t_level not in TIME_LEVELS:
+        raise ValueError(f"t_level must be one of {TIME_LEVELS}: {t_level!r}")
+    if d_level not in DATE_LEVELS:
+        raise ValueError(f"d_level must be one of {DATE_LEVELS}: {d_level!r}")
+
+
+def _date_columns(df: pd.DataFrame) -> Tuple[List[Any], pd.DatetimeIndex]:
+    """横持ちフレームの日付列と、それを日付に直したもの (集計列は除く)"""
+    cols = [c for c in df.columns if str(c) not in SUMMARY5]
+    dates = pd.to_datetime(pd.Index(cols, dtype=object).astype(str), errors="coerce")
+    keep = ~dates.isna()
+    return [c for c, k in zip(cols, keep) if k], pd.DatetimeIndex(dates[keep])
+
+
+def time_bins(labels: Iterable[Any], level: str) -> List[str]:
+    """時刻ラベル ("HH:MM") を ``level`` の区切りのラベルに変換する"""
+    labels = [str(t) for t in labels]
+    if level == "slot":
+        return labels
+    hours = [int(t.split(":")[0]) for t in labels]
+    if level == "hour":
+        return [f"{h:02d}:00" for h in hours]
+    if level == "band":
+        return [slot_band(h) for h in hours]
+    raise ValueError(f"t_level must be one of {TIME_LEVELS}: {level!r}")
+
+
+def date_bins(dates: pd.DatetimeIndex, level: str) -> pd.DatetimeIndex:
+    """日付を ``level`` の区切り (週は月曜始まり) の先頭日に変換する"""
+    dates = pd.DatetimeIndex(dates).normalize()
+    if level == "day":
+        return dates
+    if level == "week":
+        return dates - pd.to_timedelta(dates.weekday, unit="D")
+    if level == "month":
+        return dates - pd.to_timedelta(dates.day - 1, unit="D")
+    raise ValueError(f"d_level must be one of {DATE_LEVELS}: {level!r}")
+
+
+def aggregate_wide(df: pd.DataFrame, t_level: str = "slot", d_level: str = "day") -> pd.DataFrame:
+    """``time × date`` のフレームを指定解像度のセル平均に集約する
+
+    列名は各区切りに含まれる最初の日付 (``YYYY-MM-DD``)。
+    欠けている日付は 0 人として平均する (ヒートマップ表示と同じ扱い)。
+    """
+    _check_levels(t_level, d_level)
+    cols, dates = _date_columns(df)
+    if not cols:
+        return pd.DataFrame(index=pd.Index(time_bins(df.index, t_level)).unique())
+    full = pd.date_range(dates.min(), dates.max(), freq="D")
+    values = (
+        df[cols]
+        .apply(pd.to_numeric, errors="coerce")
+        .set_axis(dates, axis=1)
+        .T.groupby(level=0).sum().T
+        .reindex(columns=full, fill_value=0)
+        .fillna(0)
+        .to_numpy(dtype=np.float64)
+    )
+    t_keys = pd.Index(time_bins(df.index, t_level))
+    t_codes, t_uniques = pd.factorize(t_keys)
+    d_codes, d_uniques = pd.factorize(date_bins(full, d_level))
+
+    # 時間方向 → 日付方向の順にワンホット行列で平均する
+    t_onehot = np.zeros((len(t_uniques), len(t_keys)))
+    t_onehot[t_codes, np.arange(len(t_keys))] = 1.0
+    d_onehot = np.zeros((len(full), len(d_uniques)))
+    d_onehot[np.arange(len(full)), d_codes] = 1.0
+    sums = t_onehot @ values @ d_onehot
+    counts = t_onehot.sum(axis=1)[:, None] * d_onehot.sum(axis=0)[None, :]
+
+    first_day = pd.Series(full).groupby(d_codes).min()
+    return pd.DataFrame(
+        (sums / counts).astype(np.float32),
+        index=pd.Index(t_uniques, name=df.index.name or "time"),
+        columns=[d.strftime("%Y-%m-%d") for d in first_day],
+    )
+
+
+def _n_date_bins(start: pd.Timestamp, end: pd.Timestamp, level: str) -> int:
+    if end < start:
+        return 0
+    return int(date_bins(pd.date_range(start, end, freq="D"), level).nunique())
+
+
+def choose_levels(
+    n_times: Mapping[str, int],
+    start: Any,
+    end: Any,
+    *,
+    max_cells: int = DEFAULT_MAX_CELLS,
+) -> Levels:
+    """``[start, end]`` の表示にセル数 ``max_cells`` 以内で最も細かい解像度を選ぶ
+
+    ``n_times`` は時間軸の各解像度の行数。収まる組が無ければ最も粗い組を返す。
+    セル数が同じなら日付方向が細かい組を優先する。
+    """
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    best: Levels = (TIME_LEVELS[-1], DATE_LEVELS[-1])
+    best_cells = -1
+    for d_level in DATE_LEVELS:
+        n_days = _n_date_bins(start, end, d_level)
+        for t_level in TIME_LEVELS:
+            cells = int(n_times.get(t_level, 0)) * n_days
+            if best_cells < cells <= max_cells:
+                best, best_cells = (t_level, d_level), cells
+    return best
+
+
+def downsample_wide(df: pd.DataFrame, max_cells: int = DEFAULT_MAX_CELLS) -> Tuple[pd.DataFrame, Levels]:
+    """タイルの無いフレームを ``max_cells`` 以内の解像度に集約する (全期間を保つ)"""
+    cols, dates = _date_columns(df)
+    if not cols or len(df.index) * len(cols) <= max_cells:
+        return df, ("slot", "day")
+    n_times = {lvl: len(set(time_bins(df.index, lvl))) for lvl in TIME_LEVELS}
+    levels = choose_levels(n_times, dates.min(), dates.max(), max_cells=max_cells)
+    return aggregate_wide(df, *levels), levels
+
+
+# ── タイルの書き出し ─────────────────────────────────────────────────────
+def tile_path(out_dir: Path | str, key: str) -> Path:
+    """``key`` (``heat_ALL`` / ``heat_介護`` など、拡張子なし) のタイルファイル"""
+    return Path(out_dir) / HEAT_TILES_DIR / f"{Path(key).stem}.parquet"
+
+
+def _to_long(wide: pd.DataFrame, t_level: str, d_level: str) -> pd.DataFrame:
+    long = wide.rename_axis(index="time", columns="period").stack().rename("value").reset_index()
+    long.insert(0, "t_level", t_level)
+    long.insert(1, "d_level", d_level)
+    long["time"] = long["time"].astype(str)
+    long["period"] = pd.to_datetime(long["period"]).astype("datetime64[ms]")
+    long["value"] = long["value"].astype(np.float32)
+    return long
+
+
+def write_heatmap_tiles(df: pd.DataFrame, fp: Path | str) -> Path:
+    """1 枚のヒートマップの全解像度を ``fp`` に書く"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fp = Path(fp)
+    fp.parent.mkdir(parents=True, exist_ok=True)
+    _, dates = _date_columns(df)
+    meta = {
+        "n_times": {lvl: len(set(time_bins(df.index, lvl))) for lvl in TIME_LEVELS},
+        "start": dates.min().strftime("%Y-%m-%d") if len(dates) else None,
+        "end": dates.max().strftime("%Y-%m-%d") if len(dates) else None,
+    }
+    writer = None
+    try:
+        for d_level in DATE_LEVELS:
+            for t_level in TIME_LEVELS:
+                table = pa.Table.from_pandas(
+                    _to_long(aggregate_wide(df, t_level, d_level), t_level, d_level), preserve_index=False
+                )
+                if writer is None:
+                    schema = table.schema.with_metadata(
+                        {**(table.schema.metadata or {}), _META_KEY: json.dumps(meta).encode()}
+                    )
+                    writer = pq.ParquetWriter(fp, schema)
+                writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    return fp
+
+
+def build_heatmap_tiles(
+    out_dir: Path | str, frames: Mapping[str, pd.DataFrame] | None = None
+) -> List[Path]:
+    """``heat_*.parquet`` ごとに LOD タイルを書く
+
+    ``frames`` (``{ファイル名: DataFrame}``) を渡すとファイルを読み直さない。
+    """
+    out_dir = Path(out_dir)
+    if frames is None:
+        frames = {fp.name: fp for fp in sorted(out_dir.glob("heat_*.parquet"))}
+    written: List[Path] = []
+    for name, frame in frames.items():
+        if not name.startswith("heat_"):
+            continue
+        df = pd.read_parquet(frame) if isinstance(frame, Path) else frame
+        if df is None or df.empty:
+            continue
+        written.append(write_heatmap_tiles(df, tile_path(out_dir, name)))
+    log.info(f"[heat_tiles] {len(written)} 件のヒートマップタイルを書き出しました: {out_dir / HEAT_TILES_DIR}")
+    return written
+
+
+# ── タイルの読み込み ─────────────────────────────────────────────────────
+def tile_info(fp: Path | str) -> Dict[str, Any]:
+    """タイルファイルのメタデータ (時間軸の行数と日付範囲)。スキーマのみ読む"""
+    import pyarrow.parquet as pq
+
+    meta = pq.read_schema(fp).metadata or {}
+    return json.loads(meta[_META_KEY])
+
+
+def read_heatmap_tile(
+    out_dir: Path | str,
+    key: str,
+    *,
+    start: Any = None,
+    end: Any = None,
+    max_cells: int = DEFAULT_MAX_CELLS,
+    levels: Levels | None = None,
+    cache: FrameCache | None = None,
+) -> Tuple[pd.DataFrame, Levels] | None:
+    """表示範囲 ``[start, end]`` の横持ちフレームを適切な解像度で読む
+
+    ``levels`` を省略すると :func:`choose_levels` で選ぶ。
+    タイルが無ければ None (呼び出し側は元ファイルへフォールバックする)。
+    """
+    fp = tile_path(out_dir, key)
+    if not fp.exists():
+        return None
+    info = tile_info(fp)
+    if info.get("start") is None:
+        return pd.DataFrame(), ("slot", "day")
+    lo = max(pd.Timestamp(start), pd.Timestamp(info["start"])) if start is not None else pd.Timestamp(info["start"])
+    hi = min(pd.Timestamp(end), pd.Timestamp(info["end"])) if end is not None else pd.Timestamp(info["end"])
+    lo, hi = lo.normalize(), hi.normalize()
+    if levels is None:
+        levels = choose_levels(info["n_times"], lo, hi, max_cells=max_cells)
+    _check_levels(*levels)
+    t_level, d_level = levels
+    # 区切りが表示範囲の開始日をまたぐ場合もその区切りを含める
+    lo_bin = date_bins(pd.DatetimeIndex([lo]), d_level)[0]
+
+    def _read(target: Path) -> pd.DataFrame:
+        long = pd.read_parquet(
+            target,
+            columns=["time", "period", "value"],
+            filters=[
+                ("t_level", "==", t_level),
+                ("d_level", "==", d_level),
+                ("period", ">=", lo_bin),
+                ("period", "<=", hi),
+            ],
+        )
+        order = pd.unique(long["time"])
+        wide = long.pivot(index="time", columns="period", values="value").reindex(order)
+        wide.columns = [pd.Timestamp(c).strftime("%Y-%m-%d") for c in wide.columns]
+        return wide
+
+    if cache is None:
+        return _read(fp), levels
+    variant = f"heat_tile:{t_level}:{d_level}:{lo_bin.date()}:{hi.date()}"
+    return cache.get_or_read(fp, variant, _read), levels
+
+
+def viewport_from_relayout(relayout: Mapping[str, Any] | None) -> Tuple[Any, Any] | None:
+    """Plotly の ``relayoutData`` から x 軸 (日付) の表示範囲を取り出す
+
+    ``(start, end)`` を返す。全体表示に戻した場合は ``(None, None)``、
+    x 軸と関係ない変更 (autosize など) は None。
+    """
+    if not relayout:
+        return None
+    if "xaxis.range[0]" in relayout and "xaxis.range[1]" in relayout:
+        return relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]
+    if "xaxis.range" in relayout:
+        lo, hi = relayout["xaxis.range"][:2]
+        return lo, hi
+    if relayout.get("xaxis.autorange"):
+        return None, None
+    return None
@@ -0,0 +1,103 @@
+# shift_suite / tasks / holiday_detection.py
+"""
+shift_suite.tasks.holiday_detection  v1.0.0
+────────────────────────────────────────────────────────
+* 休業日 (通常勤務のレコードが 1 件もない日) の推定と、休日判定の共通関数
+    - :func:`estimate_closed_days` は正規化日付で 1 回だけ集計する
+      (日付ごとに long_df をフィルタしない)
+    - :func:`holiday_mask` は日付列を休日集合と一括照合する
+    - :func:`load_meta_holidays` は heatmap.meta.json に記録された休日を読む
+* heatmap / shortage / forecast / leave_analyzer が同じ判定を共有する
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+import logging
+from pathlib import Path
+from typing import Iterable, Set
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HOLIDAY_TYPE = "通常勤務"
+
+
+def _day_array(values) -> np.ndarray:
+    """日付・日時・文字列の並びを ``datetime64[D]`` 配列に変換 (不正値は NaT)"""
+    return pd.to_datetime(pd.Series(values), errors="coerce").to_numpy().astype("datetime64[D]")
+
+
+def work_days(long_df: pd.DataFrame) -> np.ndarray:
+    """Return the sorted unique days (``datetime64[D]``) that have normal work.
+
+    A record counts as work when ``holiday_type`` is the default type and
+    ``parsed_slots_count > 0``, the same rule as ``heatmap._filter_work_records``.
+    """
+    if long_df.empty or "ds" not in long_df.columns:
+        return np.array([], dtype="datetime64[D]")
+    mask = np.ones(len(long_df), dtype=bool)
+    if "holiday_type" in long_df.columns:
+        mask &= (long_df["holiday_type"] == DEFAULT_HOLIDAY_TYPE).to_numpy()
+    if "parsed_slots_count" in long_df.columns:
+        mask &= (long_df["parsed_slots_count"] > 0).to_numpy()
+    days = _day_array(long_df["ds"].to_numpy()[mask])
+    return np.unique(days[~np.isnat(days)])
+
+
+def estimate_closed_days(
+    long_df: pd.DataFrame,
+    start: dt.date | None = None,
+    end: dt.date | None = None,
+) -> Set[dt.date]:
+    """Estimate closed days between ``start`` and ``end`` (inclusive).
+
+    Every calendar day in the range without a normal work record is treated
+    as closed, whether it has no records at all or only leave records.  The
+    range defaults to the first and last day found in ``long_df["ds"]``.
+    """
+    if long_df.empty or "ds" not in long_df.columns:
+        return set()
+    if start is None or end is None:
+        all_days = _day_array(long_df["ds"])
+        all_days = all_days[~np.isnat(all_days)]
+        if all_days.size == 0:
+            return set()
+        start = start or all_days.min().astype(dt.date)
+        end = end or all_days.max().astype(dt.date)
+    if start > end:
+        return set()
+    period = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    closed = period[~np.isin(period, work_days(long_df))]
+    log.debug(f"[holiday_detection] {start} - {end}: 推定休業日 {len(closed)} 日")
+    return set(closed.astype(dt.date).tolist())
+
+
+def holiday_mask(dates: Iterable, holidays: Iterable[dt.date] | None) -> np.ndarray:
+    """``dates`` の各要素が ``holidays`` に含まれるかの bool 配列"""
+    days = _day_array(list(dates) if not isinstance(dates, (pd.Series, pd.Index, np.ndarray)) else dates)
+    if not holidays:
+        return np.zeros(len(days), dtype=bool)
+    holiday_days = _day_array(list(holidays))
+    return np.isin(days, holiday_days[~np.isnat(holiday_days)])
+
+
+def load_meta_holidays(out_dir: Path | str) -> Set[dt.date]:
+    """heatmap.meta.json の ``estimated_holidays`` を日付集合で返す (なければ空)
+
+    このキーには build_heatmap に渡された ``holidays`` が入る。
+    :func:`estimate_closed_days` で推定した休業日は含まない。
+    """
+    meta_fp = Path(out_dir) / "heatmap.meta.json"
+    if not meta_fp.exists():
+        return set()
+    try:
+        meta = json.loads(meta_fp.read_text(encoding="utf-8"))
+    except Exception as e:
+        log.warning(f"[holiday_detection] heatmap.meta.json 解析エラー: {e}")
+        return set()
+    days = _day_array(meta.get("estimated_holidays", []))
+    return set(days[~np.isnat(days)].astype(dt.date).tolist())
@@ -1,5 +1,5 @@
 # shift_suite / tasks / io_excel.py
-# v2.8.0 (休暇コード明示的処理対応版)
+# v2.9.0 (列指向 ingest エンジン対応版)
 # =============================================================================
 # (中略：目的、主要修正などは適宜更新)
 # =============================================================================
@@ -9,13 +9,18 @@ from __future__ import annotations
 import datetime as dt
 import logging
 import re
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
 
 from ..logger_config import configure_logging
 from .utils import _parse_as_date
+from .long_df_schema import compact_long_df
+from .shift_intervals import INTERVAL_COLUMNS, compact_intervals
+from .workbook_session import WorkbookSession, open_workbook
 
 configure_logging()
 log = logging.getLogger(__name__)
@@ -173,12 +178,14 @@ def _is_leave_code(code: str) -> bool:
 
 
 def load_shift_patterns(
-    xlsx: Path, sheet_name: str = "勤務区分", slot_minutes: int = SLOT_MINUTES
+    xlsx: Path | WorkbookSession,
+    sheet_name: str = "勤務区分",
+    slot_minutes: int = SLOT_MINUTES,
 ) -> Tuple[pd.DataFrame, Dict[str, List[str]]]:
     # (v2.7.1案のロジックを流用)
     log.info(f"勤務区分シート読み込み開始: {sheet_name}")
     try:
-        raw = pd.read_excel(xlsx, sheet_name=sheet_name, dtype=str).fillna("")
+        raw = open_workbook(xlsx).read_sheet(sheet_name, dtype=str).fillna("")
     except FileNotFoundError as e:
         log.error("Excel file not found: %s", e)
         raise
@@ -318,21 +325,459 @@ def _excel_cell_to_row_col(cell: str) -> tuple[int, int] | None:
     return int(row_txt) - 1, col - 1
 
 
+INGEST_ENGINES = ("columnar", "legacy")
+_EMPTY_CODE_TOKENS = {"", "nan", "NaN"}
+
+
+@dataclass
+class _CodeSlotTable:
+    """勤務コード → スロットオフセット表 (columnar エンジン用)
+
+    ``offsets[ptr[i]:ptr[i] + n_records[i]]`` がコード ``codes[i]`` の
+    日付 0:00 からの分オフセット (日付またぎ分は +1440 済み)。
+    インデックス 0 は空セル用の疑似コード ``""``。
+    """
+
+    codes: np.ndarray
+    holiday_type: np.ndarray
+    slots_count: np.ndarray
+    n_records: np.ndarray
+    ptr: np.ndarray
+    offsets: np.ndarray
+    index: Dict[str, int]
+
+
+def _build_code_slot_table(
+    wt_df: pd.DataFrame,
+    code2slots: Dict[str, List[str]],
+    code_to_start_time: Dict[str, dt.time | None],
+) -> _CodeSlotTable:
+    """Precompute per-code slot offsets so cells can be expanded with NumPy."""
+    # 休暇タイプ・スロット数は従来どおり wt_df の最初の行を採用
+    first_rows = wt_df.drop_duplicates("code", keep="first").set_index("code")
+
+    codes: list[str] = [""]
+    holiday_types: list[str] = [DEFAULT_HOLIDAY_TYPE]
+    slots_counts: list[int] = [0]
+    offsets_per_code: list[list[int]] = [[0]]
+    for code, slots in code2slots.items():
+        wt_row = first_rows.loc[code] if code in first_rows.index else None
+        if wt_row is None:
+            holiday_type, slots_count = DEFAULT_HOLIDAY_TYPE, 0
+        else:
+            holiday_type = wt_row["holiday_type"]
+            slots_count = 0 if wt_row.get("is_leave_code", False) else wt_row["parsed_slots_count"]
+
+        offsets = [0]
+        if slots:
+            start = code_to_start_time.get(code)
+            start_min = start.hour * 60 + start.minute if start else None
+            offsets = []
+            for t_slot in slots:
+                hh, mm = t_slot.split(":")
+                minute = int(hh) * 60 + int(mm)
+                # 日付またぎ判定: 開始時刻より前のスロットは翌日扱い
+                if start_min is not None and minute < start_min:
+                    minute += 24 * 60
+                offsets.append(minute)
+
+        codes.append(code)
+        holiday_types.append(holiday_type)
+        slots_counts.append(int(slots_count))
+        offsets_per_code.append(offsets)
+
+    n_records = np.array([len(o) for o in offsets_per_code], dtype=np.int64)
+    ptr = np.concatenate(([0], np.cumsum(n_records)[:-1])).astype(np.int64)
+    return _CodeSlotTable(
+        codes=np.array(codes, dtype=object),
+        holiday_type=np.array(holiday_types, dtype=object),
+        slots_count=np.array(slots_counts, dtype=np.int64),
+        n_records=n_records,
+        ptr=ptr,
+        offsets=np.array([m for o in offsets_per_code for m in o], dtype=np.int64),
+        index={code: i for i, code in enumerate(codes)},
+    )
+
+
+def _normalize_values(values: np.ndarray) -> np.ndarray:
+    """Apply :func:`_normalize` once per distinct value of ``values``."""
+    ids, uniques = pd.factorize(values.ravel(), use_na_sentinel=False)
+    normalized = np.array([_normalize(str(u)) for u in uniques], dtype=object)
+    return normalized[ids].reshape(values.shape) if len(uniques) else np.full(values.shape, "", dtype=object)
+
+
+def _read_shift_sheet(
+    book: WorkbookSession,
+    sheet_name_actual: str,
+    header_row: int,
+    year_val: int | None,
+    month_val: int | None,
+) -> Tuple[pd.DataFrame, List[str], Dict[str, dt.date]] | None:
+    """Read one shift sheet and resolve its date columns.
+
+    Returns ``(df_sheet, date_cols_candidate, date_col_map)`` or ``None`` when
+    the sheet should be skipped.
+    """
+    try:
+        log.info(f"シート処理開始: {sheet_name_actual}")
+        df_sheet = book.read_sheet(
+            sheet_name_actual, header=header_row, dtype=str
+        ).fillna("")
+        log.info(f"シート shape: {df_sheet.shape}")
+        log.debug(f"列名マッピング前: {df_sheet.columns.tolist()}")
+    except FileNotFoundError as e:
+        log.error(
+            "Excel file not found while reading sheet '%s': %s",
+            sheet_name_actual,
+            e,
+        )
+        raise
+    except pd.errors.EmptyDataError as e:
+        log.warning("シート '%s' が空です: %s", sheet_name_actual, e)
+        return None
+    except Exception as e:
+        log.warning(f"シート '{sheet_name_actual}' の読み込みに失敗しました: {e}")
+        return None
+
+    df_sheet.columns = [
+        SHEET_COL_ALIAS.get(_normalize(str(c)), _normalize(str(c)))
+        for c in df_sheet.columns
+    ]
+    log.debug(f"列名マッピング後: {df_sheet.columns.tolist()}")
+
+    if not {"staff", "role"}.issubset(df_sheet.columns):
+        log.error(
+            f"シート '{sheet_name_actual}' に ‘staff’ (氏名) または ‘role’ (職種) 列が見つかりません。"
+        )
+        raise ValueError(
+            f"シート '{sheet_name_actual}' に ‘staff’ (氏名) または ‘role’ (職種) 列が見つかりません。"
+        )
+
+    date_cols_candidate = [
+        c
+        for c in df_sheet.columns
+        if c not in ("staff", "role", "employment")
+        and not str(c).startswith("Unnamed:")
+    ]
+    if not date_cols_candidate:
+        log.warning(
+            f"シート '{sheet_name_actual}' に日付データ列が見つかりませんでした。"
+        )
+        return None
+    log.info(f"日付列候補: {len(date_cols_candidate)}個 - {date_cols_candidate}")
+
+    date_col_map: Dict[str, dt.date] = {}
+    for c in date_cols_candidate:
+        parsed_dt: dt.date | None = None
+        if year_val is not None and month_val is not None:
+            parsed_dt = _parse_day_with_year_month(str(c), year_val, month_val)
+            if parsed_dt:
+                date_col_map[str(c)] = parsed_dt
+                continue
+            parsed_dt = _parse_as_date(str(c))
+            if parsed_dt:
+                date_col_map[str(c)] = parsed_dt
+            else:
+                if not str(c).startswith("Unnamed:"):
+                    log.warning(
+                        f"シート '{sheet_name_actual}' の日付列パースに失敗しました: 元の列名='{c}'"
+                    )
+
+    log.debug(f"日付列マッピング結果: {len(date_col_map)}個成功")
+    for col, date in date_col_map.items():
+        log.debug(f"  {col} → {date}")
+
+    return df_sheet, date_cols_candidate, date_col_map
+
+
+def _sheet_records_legacy(
+    df_sheet: pd.DataFrame,
+    date_cols_candidate: List[str],
+    date_col_map: Dict[str, dt.date],
+    sheet_name_actual: str,
+    wt_df: pd.DataFrame,
+    code2slots: Dict[str, List[str]],
+    code_to_start_time: Dict[str, dt.time | None],
+    unknown_codes: set[str],
+) -> list[dict]:
+    """旧エンジン: 1 セル・1 スロットずつ dict を生成する (比較・検証用)"""
+    records: list[dict] = []
+    for _, row_data in df_sheet.iterrows():
+        staff = _normalize(row_data.get("staff", ""))
+        role = _normalize(row_data.get("role", ""))
+        employment = _normalize(row_data.get("employment", ""))
+
+        if (
+            staff in DOW_TOKENS
+            or role in DOW_TOKENS
+            or (staff == "" and role == "")
+        ):
+            continue
+
+        for col_name_original_str in date_cols_candidate:
+            shift_code_raw = row_data.get(col_name_original_str, "")
+            code_val = _normalize(str(shift_code_raw))
+
+            if code_val in _EMPTY_CODE_TOKENS:
+                date_val_parsed_dt_date = date_col_map.get(
+                    str(col_name_original_str)
+                )
+                if date_val_parsed_dt_date is not None:
+                    record_datetime_for_zero_slot = dt.datetime.combine(
+                        date_val_parsed_dt_date, dt.time(0, 0)
+                    )
+                    records.append(
+                        {
+                            "ds": record_datetime_for_zero_slot,
+                            "staff": staff,
+                            "role": role,
+                            "employment": employment,
+                            "code": "",
+                            "holiday_type": DEFAULT_HOLIDAY_TYPE,
+                            "parsed_slots_count": 0,
+                        }
+                    )
+                continue
+            if code_val in DOW_TOKENS:
+                continue
+            if code_val not in code2slots:
+                if code_val not in unknown_codes:
+                    log.warning(
+                        f"シート '{sheet_name_actual}', スタッフ '{staff}', 日付列 '{col_name_original_str}' で未知の勤務コード '{code_val}' が見つかりました。"
+                    )
+                    unknown_codes.add(code_val)
+                continue
+
+            date_val_parsed_dt_date = date_col_map.get(str(col_name_original_str))
+            if date_val_parsed_dt_date is None:
+                continue
+
+            current_code_slots_list = code2slots.get(code_val, [])
+            wt_row_series = (
+                wt_df[wt_df["code"] == code_val].iloc[0]
+                if not wt_df[wt_df["code"] == code_val].empty
+                else None
+            )
+            holiday_type_for_record = (
+                wt_row_series["holiday_type"]
+                if wt_row_series is not None
+                else DEFAULT_HOLIDAY_TYPE
+            )
+
+            if wt_row_series is not None and wt_row_series.get("is_leave_code", False):
+                parsed_slots_count_for_record = 0
+            else:
+                parsed_slots_count_for_record = (
+                    wt_row_series["parsed_slots_count"]
+                    if wt_row_series is not None
+                    else 0
+                )
+
+            if not current_code_slots_list:
+                record_datetime_for_zero_slot = dt.datetime.combine(
+                    date_val_parsed_dt_date, dt.time(0, 0)
+                )
+                records.append(
+                    {
+                        "ds": record_datetime_for_zero_slot,
+                        "staff": staff,
+                        "role": role,
+                        "employment": employment,
+                        "code": code_val,
+                        "holiday_type": holiday_type_for_record,
+                    # COMPREHENSIVE_FIX: 単位一貫性の明確化
+                    # parsed_slots_count = 1 は「このスロット(30分)に1人存在」を意味
+                    # 合計労働時間 = sum(parsed_slots_count) * slot_hours
+                        "parsed_slots_count": parsed_slots_count_for_record,
+                    }
+                )
+                continue
+
+            shift_start_time = code_to_start_time.get(code_val)
+
+            for t_slot_val in current_code_slots_list:
+                try:
+                    slot_time = dt.datetime.strptime(t_slot_val, "%H:%M").time()
+
+                    # 日付またぎ判定
+                    current_date = date_val_parsed_dt_date
+                    if shift_start_time and slot_time < shift_start_time:
+                        current_date += dt.timedelta(days=1)
+
+                    record_datetime = dt.datetime.combine(
+                        current_date,
+                        slot_time,
+                    )
+                    records.append(
+                        {
+                            "ds": record_datetime,
+                            "staff": staff,
+                            "role": role,
+                            "employment": employment,
+                            "code": code_val,
+                            "holiday_type": holiday_type_for_record,
+                            "parsed_slots_count": parsed_slots_count_for_record,
+                        }
+                    )
+                except ValueError as e_time:
+                    log.error(
+                        f"時刻スロット '{t_slot_val}' のパース中にエラー (スタッフ: {staff}, 日付: {date_val_parsed_dt_date}, コード: {code_val}): {e_time}"
+                    )
+                    continue
+    return records
+
+
+def _sheet_frame_columnar(
+    df_sheet: pd.DataFrame,
+    date_cols_candidate: List[str],
+    date_col_map: Dict[str, dt.date],
+    sheet_name_actual: str,
+    table: _CodeSlotTable,
+    unknown_codes: set[str],
+    *,
+    as_intervals_slot_minutes: int | None = None,
+) -> pd.DataFrame | None:
+    """列指向エンジン: シートを一度だけ melt し、NumPy でスロット展開する
+
+    行・列・スロットの生成順は旧エンジンと同一 (行優先) なので、
+    最終的な ``sort_values("ds")`` 後の結果も行単位で一致する。
+    ``as_intervals_slot_minutes`` を指定するとスロット展開せず、
+    1 セル 1 行の勤務区間テーブルを同じ行優先順で返す。
+    """
+    n_rows = len(df_sheet)
+
+    def _meta_col(name: str) -> np.ndarray:
+        if name not in df_sheet.columns:
+            return np.full(n_rows, "", dtype=object)
+        return _normalize_values(df_sheet[name].to_numpy(dtype=object))
+
+    staff = _meta_col("staff")
+    role = _meta_col("role")
+    employment = _meta_col("employment")
+    dow = list(DOW_TOKENS)
+    skip = np.isin(staff, dow) | np.isin(role, dow) | ((staff == "") & (role == ""))
+    keep = np.flatnonzero(~skip)
+    if keep.size == 0:
+        return None
+    staff, role, employment = staff[keep], role[keep], employment[keep]
+
+    n_cols = len(date_cols_candidate)
+    cells = df_sheet[date_cols_candidate].to_numpy(dtype=object)[keep].ravel()
+
+    # 正規化 → コード表インデックス (-1: 未知コード, -2: 曜日トークン)
+    cell_ids, uniques = pd.factorize(cells, use_na_sentinel=False)
+    unique_codes = [_normalize(str(u)) for u in uniques]
+    unique_idx = np.empty(len(unique_codes), dtype=np.int64)
+    for i, code_val in enumerate(unique_codes):
+        if code_val in _EMPTY_CODE_TOKENS:
+            unique_idx[i] = 0
+        elif code_val in DOW_TOKENS:
+            unique_idx[i] = -2
+        else:
+            unique_idx[i] = table.index.get(code_val, -1)
+    code_idx = unique_idx[cell_ids]
+
+    unknown_pos = np.flatnonzero(code_idx == -1)
+    if unknown_pos.size:
+        _, first_seen = np.unique(cell_ids[unknown_pos], return_index=True)
+        for pos in unknown_pos[np.sort(first_seen)]:
+            code_val = unique_codes[cell_ids[pos]]
+            if code_val not in unknown_codes:
+                log.warning(
+                    f"シート '{sheet_name_actual}', スタッフ '{staff[pos // n_cols]}', 日付列 '{date_cols_candidate[pos % n_cols]}' で未知の勤務コード '{code_val}' が見つかりました。"
+                )
+                unknown_codes.add(code_val)
+
+    col_dates = np.array(
+        [date_col_map.get(str(c)) or np.datetime64("NaT") for c in date_cols_candidate],
+        dtype="datetime64[ns]",
+    )
+    cell_dates = np.tile(col_dates, keep.size)
+    valid = np.flatnonzero((code_idx >= 0) & ~np.isnat(cell_dates))
+    if valid.size == 0:
+        return None
+
+    valid_codes = code_idx[valid]
+    n_records = table.n_records[valid_codes]
+    if as_intervals_slot_minutes is not None:
+        valid_rows = valid // n_cols
+        start = cell_dates[valid] + table.offsets[table.ptr[valid_codes]].astype("timedelta64[m]")
+        return pd.DataFrame(
+            {
+                "staff": staff[valid_rows],
+                "role": role[valid_rows],
+                "employment": employment[valid_rows],
+                "date": cell_dates[valid],
+                "code": table.codes[valid_codes],
+                "start": start,
+                "end": start + (n_records * as_intervals_slot_minutes).astype("timedelta64[m]"),
+                "holiday_type": table.holiday_type[valid_codes],
+                "parsed_slots_count": table.slots_count[valid_codes],
+            }
+        )
+
+    total = int(n_records.sum())
+    cell_rep = np.repeat(valid, n_records)
+    code_rep = np.repeat(valid_codes, n_records)
+    within = np.arange(total, dtype=np.int64) - np.repeat(
+        np.cumsum(n_records) - n_records, n_records
+    )
+    offsets = table.offsets[table.ptr[code_rep] + within]
+    row_rep = cell_rep // n_cols
+
+    return pd.DataFrame(
+        {
+            "ds": cell_dates[cell_rep] + offsets.astype("timedelta64[m]"),
+            "staff": staff[row_rep],
+            "role": role[row_rep],
+            "employment": employment[row_rep],
+            "code": table.codes[code_rep],
+            "holiday_type": table.holiday_type[code_rep],
+            "parsed_slots_count": table.slots_count[code_rep],
+        }
+    )
+
+
 def ingest_excel(
-    excel_path: Path,
+    excel_path: Path | WorkbookSession,
     *,
     shift_sheets: List[str],
     header_row: int = 0,
     slot_minutes: int = SLOT_MINUTES,
     year_month_cell_location: str | None = None,
+    engine: str = "columnar",
+    compact: bool = True,
+    as_intervals: bool = False,
 ) -> Tuple[pd.DataFrame, pd.DataFrame, set[str]]:
     """Parse shift Excel file and return long format dataframe.
 
     Returns a tuple of ``(long_df, wt_df, unknown_codes)`` where
     ``unknown_codes`` contains any shift codes found in the sheets that are not
     defined in the pattern sheet.
+
+    ``engine`` selects the slot expansion strategy: ``"columnar"`` (default)
+    melts each sheet once and expands slots with NumPy, ``"legacy"`` keeps the
+    original per-row loop for verification.  Both produce identical output.
+
+    ``excel_path`` may also be an open :class:`WorkbookSession`; otherwise the
+    shared session from :func:`open_workbook` is used so the pattern sheet,
+    the year-month cell and every shift sheet come from a single parse.
+
+    With ``compact=True`` (default) ``long_df`` uses the canonical compact
+    schema of :mod:`.long_df_schema` (category string columns, ``int16``
+    slot counts, ``datetime64[s]`` timestamps).
+
+    With ``as_intervals=True`` the first element is the shift interval table
+    of :mod:`.shift_intervals` (one row per worked cell) instead of per-slot
+    rows; :func:`.shift_intervals.expand_intervals` turns it back into the
+    identical ``long_df``.  Only the ``"columnar"`` engine supports it.
     """
-    wt_df, code2slots = load_shift_patterns(excel_path, slot_minutes=slot_minutes)
+    if engine not in INGEST_ENGINES:
+        raise ValueError(f"未知の ingest エンジンです: {engine} (選択肢: {INGEST_ENGINES})")
+    if as_intervals and engine != "columnar":
+        raise ValueError("as_intervals=True は columnar エンジンでのみ利用できます")
+    book = open_workbook(excel_path)
+    wt_df, code2slots = load_shift_patterns(book, slot_minutes=slot_minutes)
     if wt_df.empty:
         log.error("勤務区分情報 (wt_df) が空です。処理を続行できません。")
         raise ValueError("勤務区分情報が読み込めませんでした。")
@@ -349,9 +794,8 @@ def ingest_excel(
             if rc is None:
                 raise ValueError(f"Invalid cell: {year_month_cell_location}")
             row, col = rc
-            ym_df = pd.read_excel(
-                excel_path,
-                sheet_name=shift_sheets[0],
+            ym_df = book.read_sheet(
+                shift_sheets[0],
                 header=None,
                 skiprows=row,
                 nrows=1,
@@ -393,237 +837,116 @@ def ingest_excel(
         else:
             code_to_start_time[code] = None
 
-    for sheet_name_actual in shift_sheets:
-        try:
-            log.info(f"シート処理開始: {sheet_name_actual}")
-            df_sheet = pd.read_excel(
-                excel_path,
-                sheet_name=sheet_name_actual,
-                header=header_row,
-                dtype=str,
-            ).fillna("")
-            log.info(f"シート shape: {df_sheet.shape}")
-            log.debug(f"列名マッピング前: {df_sheet.columns.tolist()}")
-        except FileNotFoundError as e:
-            log.error(
-                "Excel file not found while reading sheet '%s': %s",
-                sheet_name_actual,
-                e,
-            )
-            raise
-        except pd.errors.EmptyDataError as e:
-            log.warning("シート '%s' が空です: %s", sheet_name_actual, e)
-            continue
-        except Exception as e:
-            log.warning(f"シート '{sheet_name_actual}' の読み込みに失敗しました: {e}")
-            continue
-
-        df_sheet.columns = [
-            SHEET_COL_ALIAS.get(_normalize(str(c)), _normalize(str(c)))
-            for c in df_sheet.columns
-        ]
-        log.debug(f"列名マッピング後: {df_sheet.columns.tolist()}")
-
-        if not {"staff", "role"}.issubset(df_sheet.columns):
-            log.error(
-                f"シート '{sheet_name_actual}' に ‘staff’ (氏名) または ‘role’ (職種) 列が見つかりません。"
-            )
-            raise ValueError(
-                f"シート '{sheet_name_actual}' に ‘staff’ (氏名) または ‘role’ (職種) 列が見つかりません。"
-            )
+    code_table = (
+        _build_code_slot_table(wt_df, code2slots, code_to_start_time)
+        if engine == "columnar"
+        else None
+    )
+    frames: list[pd.DataFrame] = []
 
-        date_cols_candidate = [
-            c
-            for c in df_sheet.columns
-            if c not in ("staff", "role", "employment")
-            and not str(c).startswith("Unnamed:")
-        ]
-        if not date_cols_candidate:
-            log.warning(
-                f"シート '{sheet_name_actual}' に日付データ列が見つかりませんでした。"
-            )
+    for sheet_name_actual in shift_sheets:
+        sheet = _read_shift_sheet(
+            book, sheet_name_actual, header_row, year_val, month_val
+        )
+        if sheet is None:
             continue
-        log.info(f"日付列候補: {len(date_cols_candidate)}個 - {date_cols_candidate}")
-
-        date_col_map: Dict[str, dt.date] = {}
-        for c in date_cols_candidate:
-            parsed_dt: dt.date | None = None
-            if year_val is not None and month_val is not None:
-                parsed_dt = _parse_day_with_year_month(str(c), year_val, month_val)
-                if parsed_dt:
-                    date_col_map[str(c)] = parsed_dt
-                    continue
-                parsed_dt = _parse_as_date(str(c))
-                if parsed_dt:
-                    date_col_map[str(c)] = parsed_dt
-                else:
-                    if not str(c).startswith("Unnamed:"):
-                        log.warning(
-                            f"シート '{sheet_name_actual}' の日付列パースに失敗しました: 元の列名='{c}'"
-                        )
-
-
-        log.debug(f"日付列マッピング結果: {len(date_col_map)}個成功")
-        for col, date in date_col_map.items():
-            log.debug(f"  {col} → {date}")
-
+        df_sheet, date_cols_candidate, date_col_map = sheet
         all_dates_from_headers.update(date_col_map.values())
 
-        for _, row_data in df_sheet.iterrows():
-            staff = _normalize(row_data.get("staff", ""))
-            role = _normalize(row_data.get("role", ""))
-            employment = _normalize(row_data.get("employment", ""))
-
-            if (
-                staff in DOW_TOKENS
-                or role in DOW_TOKENS
-                or (staff == "" and role == "")
-            ):
-                continue
-
-            for col_name_original_str in date_cols_candidate:
-                shift_code_raw = row_data.get(col_name_original_str, "")
-                code_val = _normalize(str(shift_code_raw))
-
-                if code_val in ("", "nan", "NaN"):
-                    date_val_parsed_dt_date = date_col_map.get(
-                        str(col_name_original_str)
-                    )
-                    if date_val_parsed_dt_date is not None:
-                        record_datetime_for_zero_slot = dt.datetime.combine(
-                            date_val_parsed_dt_date, dt.time(0, 0)
-                        )
-                        records.append(
-                            {
-                                "ds": record_datetime_for_zero_slot,
-                                "staff": staff,
-                                "role": role,
-                                "employment": employment,
-                                "code": "",
-                                "holiday_type": DEFAULT_HOLIDAY_TYPE,
-                                "parsed_slots_count": 0,
-                            }
-                        )
-                    continue
-                if code_val in DOW_TOKENS:
-                    continue
-                if code_val not in code2slots:
-                    if code_val not in unknown_codes:
-                        log.warning(
-                            f"シート '{sheet_name_actual}', スタッフ '{staff}', 日付列 '{col_name_original_str}' で未知の勤務コード '{code_val}' が見つかりました。"
-                        )
-                        unknown_codes.add(code_val)
-                    continue
-
-                date_val_parsed_dt_date = date_col_map.get(str(col_name_original_str))
-                if date_val_parsed_dt_date is None:
-                    continue
-
-                current_code_slots_list = code2slots.get(code_val, [])
-                wt_row_series = (
-                    wt_df[wt_df["code"] == code_val].iloc[0]
-                    if not wt_df[wt_df["code"] == code_val].empty
-                    else None
-                )
-                holiday_type_for_record = (
-                    wt_row_series["holiday_type"]
-                    if wt_row_series is not None
-                    else DEFAULT_HOLIDAY_TYPE
+        if code_table is None:
+            records.extend(
+                _sheet_records_legacy(
+                    df_sheet,
+                    date_cols_candidate,
+                    date_col_map,
+                    sheet_name_actual,
+                    wt_df,
+                    code2slots,
+                    code_to_start_time,
+                    unknown_codes,
                 )
-
-                if wt_row_series is not None and wt_row_series.get("is_leave_code", False):
-                    parsed_slots_count_for_record = 0
-                else:
-                    parsed_slots_count_for_record = (
-                        wt_row_series["parsed_slots_count"]
-                        if wt_row_series is not None
-                        else 0
-                    )
-
-                if not current_code_slots_list:
-                    record_datetime_for_zero_slot = dt.datetime.combine(
-                        date_val_parsed_dt_date, dt.time(0, 0)
-                    )
-                    records.append(
-                        {
-                            "ds": record_datetime_for_zero_slot,
-                            "staff": staff,
-                            "role": role,
-                            "employment": employment,
-                            "code": code_val,
-                            "holiday_type": holiday_type_for_record,
-                        # COMPREHENSIVE_FIX: 単位一貫性の明確化
-                        # parsed_slots_count = 1 は「このスロット(30分)に1人存在」を意味
-                        # 合計労働時間 = sum(parsed_slots_count) * slot_hours
-                            "parsed_slots_count": parsed_slots_count_for_record,
-                        }
-                    )
-                    continue
-
-                shift_start_time = code_to_start_time.get(code_val)
-
-                for t_slot_val in current_code_slots_list:
-                    try:
-                        slot_time = dt.datetime.strptime(t_slot_val, "%H:%M").time()
-                        
-                        # 日付またぎ判定
-                        current_date = date_val_parsed_dt_date
-                        if shift_start_time and slot_time < shift_start_time:
-                            current_date += dt.timedelta(days=1)
-
-                        record_datetime = dt.datetime.combine(
-                            current_date,
-                            slot_time,
-                        )
-                        records.append(
-                            {
-                                "ds": record_datetime,
-                                "staff": staff,
-                                "role": role,
-                                "employment": employment,
-                                "code": code_val,
-                                "holiday_type": holiday_type_for_record,
-                                "parsed_slots_count": parsed_slots_count_for_record,
-                            }
-                        )
-                    except ValueError as e_time:
-                        log.error(
-                            f"時刻スロット '{t_slot_val}' のパース中にエラー (スタッフ: {staff}, 日付: {date_val_parsed_dt_date}, コード: {code_val}): {e_time}"
-                        )
-                        continue
+            )
+        else:
+            sheet_frame = _sheet_frame_columnar(
+                df_sheet,
+                date_cols_candidate,
+                date_col_map,
+                sheet_name_actual,
+                code_table,
+                unknown_codes,
+                as_intervals_slot_minutes=slot_minutes if as_intervals else None,
+            )
+            if sheet_frame is not None:
+                frames.append(sheet_frame)
 
     # Ensure at least one record exists for all parsed dates
-    processed_dates = {r["ds"].date() for r in records}
-    for d in sorted(all_dates_from_headers):
-        if d not in processed_dates:
-            records.append(
-                {
-                    "ds": dt.datetime.combine(d, dt.time(0, 0)),
-                    "staff": "",
-                    "role": "",
-                    "employment": "",
-                    "code": "",
-                    "holiday_type": DEFAULT_HOLIDAY_TYPE,
-                    "parsed_slots_count": 0,
-                }
+    if code_table is None:
+        processed_dates = {r["ds"].date() for r in records}
+    elif as_intervals:
+        # 1 区間は高々 2 暦日にまたがるため、先頭日と最終日で網羅できる
+        processed_dates = set()
+        for part in frames:
+            last_slot = part["end"].to_numpy() - np.timedelta64(slot_minutes, "m")
+            for arr in (part["start"].to_numpy(), last_slot):
+                processed_dates.update(np.unique(arr.astype("datetime64[D]")).astype(object))
+    else:
+        processed_dates = set()
+        for part in frames:
+            processed_dates.update(
+                np.unique(part["ds"].to_numpy().astype("datetime64[D]")).astype(object)
             )
+    missing_date_records = [
+        {
+            "ds": dt.datetime.combine(d, dt.time(0, 0)),
+            "staff": "",
+            "role": "",
+            "employment": "",
+            "code": "",
+            "holiday_type": DEFAULT_HOLIDAY_TYPE,
+            "parsed_slots_count": 0,
+        }
+        for d in sorted(all_dates_from_headers)
+        if d not in processed_dates
+    ]
 
     if unknown_codes:
         log.warning(
             f"処理中に以下の未知の勤務コードが見つかりました (これらは無視されます): {sorted(list(unknown_codes))}"
         )
 
-    if not records:
+    if as_intervals:
+        if missing_date_records:
+            missing_df = pd.DataFrame(missing_date_records).rename(columns={"ds": "start"})
+            missing_df["date"] = missing_df["start"]
+            missing_df["end"] = missing_df["start"] + pd.Timedelta(minutes=slot_minutes)
+            frames.append(missing_df[list(INTERVAL_COLUMNS)])
+        intervals_df = (
+            pd.concat(frames, ignore_index=True)
+            if frames
+            else pd.DataFrame(columns=list(INTERVAL_COLUMNS))
+        )
+        log.info(f"合計 {len(intervals_df)} 件の勤務区間レコードを生成しました。")
+        if compact:
+            intervals_df = compact_intervals(intervals_df)
+        return intervals_df, wt_df, unknown_codes
+
+    if code_table is None:
+        records.extend(missing_date_records)
+        final_long_df = pd.DataFrame(records)
+    else:
+        if missing_date_records:
+            frames.append(pd.DataFrame(missing_date_records))
+        final_long_df = (
+            pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        )
+
+    if final_long_df.empty:
         # 休日のみのデータでも処理を継続するように修正
         log.warning(
             "通常のシフトレコードが見つかりませんでしたが、休日データとして処理を継続します。"
         )
-        # 空のレコードでも処理を継続
-        if not records:
-            records = []
 
-    log.info(f"合計 {len(records)} 件の長形式レコードを生成しました。")
-    final_long_df = pd.DataFrame(records)
+    log.info(f"合計 {len(final_long_df)} 件の長形式レコードを生成しました。")
     if not final_long_df.empty:
         final_long_df["ds"] = pd.to_datetime(final_long_df["ds"])
         final_long_df = final_long_df.sort_values("ds").reset_index(drop=True)
@@ -644,6 +967,9 @@ def ingest_excel(
 
     # Note: RestExclusion filter removed to preserve leave/holiday data for analysis
 
+    if compact:
+        final_long_df = compact_long_df(final_long_df)
+
     return final_long_df, wt_df, unknown_codes
 
 
@@ -663,6 +989,9 @@ if __name__ == "__main__":
     p.add_argument("--header", type=int, default=2, help="ヘッダー開始行 (1-indexed)")
     p.add_argument("--slot", type=int, default=SLOT_MINUTES, help="スロット長 (分)")
     p.add_argument("--ymcell", type=str, help="年月情報セル位置 (例: A1)")
+    p.add_argument(
+        "--engine", choices=INGEST_ENGINES, default="columnar", help="展開エンジン"
+    )
     a = p.parse_args()
     try:
         log.info(
@@ -674,6 +1003,7 @@ if __name__ == "__main__":
             header_row=a.header,
             slot_minutes=a.slot,
             year_month_cell_location=a.ymcell,
+            engine=a.engine,
         )
         if unknown_codes:
             log.warning("Unknown shift codes found: %s", sorted(unknown_codes))
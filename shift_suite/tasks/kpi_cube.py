@@ -0,0 +1,386 @@
+# shift_suite / tasks / kpi_cube.py
+"""
+shift_suite.tasks.kpi_cube  v1.0.0
+────────────────────────────────────────────────────────
+* 解析時に 1 シナリオ 1 ファイル (``kpi_cube.parquet``) の KPI キューブを書く
+    - 次元: role × employment × month × weekday × slot_band
+    - 時間帯の量 (need_h / staff_h / lack_h / excess_h / コスト):
+        職種別 (employment=全体)・雇用形態別 (role=全体)・全体 (両方=全体) の
+        ヒートマップと Need ファイルから、不足分析と同じカーネル
+        (:func:`shortage_kernel.group_slot_arrays`) で集計する。
+        role × employment の交差は Need が定義されないため staff_h のみ
+        (long_df の勤務レコードから)
+    - 職員単位の量 (疲労・公平性): fatigue_score.parquet / fairness_after.parquet
+      があれば職員の主な職種・雇用形態に割り当てて合計と人数で持つ
+      (month / weekday / slot_band は 全体)
+* 概要タブ・サマリー・レポートは :func:`load_kpi_cube` + :func:`overview_kpis`
+  / :func:`breakdown` で、ファイル 1 つの読み込みだけで KPI を得る
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .constants import DEFAULT_SLOT_MINUTES
+from .frame_cache import FrameCache
+
+log = logging.getLogger(__name__)
+
+KPI_CUBE_FILE = "kpi_cube.parquet"
+
+# 集約済み (その次元で区切らない) ことを表す値
+ALL = "全体"
+CUBE_DIMS = ("role", "employment", "month", "weekday", "slot_band")
+SLOT_MEASURES = ("need_h", "staff_h", "lack_h", "excess_h", "days")
+COST_MEASURES = (
+    "estimated_excess_cost",
+    "estimated_lack_cost_if_temporary_staff",
+    "estimated_lack_penalty_cost",
+)
+STAFF_MEASURES = ("staff_count", "fatigue_sum", "fatigue_n", "fatigue_high_n", "fairness_sum", "fairness_n")
+
+WEEKDAY_LABELS = ("月", "火", "水", "木", "金", "土", "日")
+# 時間帯の幅 (時間): 00-03, 03-06, ... 21-24
+SLOT_BAND_HOURS = 3
+# 高疲労とみなす fatigue_score (0-100)
+FATIGUE_HIGH_THRESHOLD = 80.0
+
+
+def slot_band(hour: int) -> str:
+    start = (int(hour) // SLOT_BAND_HOURS) * SLOT_BAND_HOURS
+    return f"{start:02d}-{start + SLOT_BAND_HOURS:02d}"
+
+
+def _day_keys(dates: Sequence[str]) -> tuple[pd.Index, np.ndarray]:
+    """日付列 → ``(month, weekday)`` の組と各日付の組番号"""
+    ts = pd.to_datetime(pd.Index(dates))
+    keys = pd.MultiIndex.from_arrays(
+        [ts.strftime("%Y-%m"), [WEEKDAY_LABELS[d] for d in ts.weekday]]
+    )
+    codes, uniques = pd.factorize(keys, sort=True)
+    return uniques, codes
+
+
+def _onehot(codes: np.ndarray, n: int) -> np.ndarray:
+    out = np.zeros((len(codes), n))
+    out[np.arange(len(codes)), codes] = 1
+    return out
+
+
+def _slot_rows(
+    groups: Iterable,
+    *,
+    key: str,
+    time_labels: Sequence[str],
+    holidays: Iterable | None,
+    slot_hours: float,
+) -> pd.DataFrame:
+    """1 種類のグループ (職種 / 雇用形態 / 全体) の時間帯の量をキューブ行にする"""
+    from .shortage_kernel import group_slot_arrays
+
+    names, dates, arrays = group_slot_arrays(groups, key=key, time_labels=time_labels, holidays=holidays)
+    if not names:
+        return pd.DataFrame()
+    bands, band_codes = np.unique([slot_band(t.split(":")[0]) for t in time_labels], return_inverse=True)
+    day_keys, day_codes = _day_keys(dates)
+    band_hot = _onehot(band_codes, len(bands))
+    day_hot = _onehot(day_codes, len(day_keys))
+
+    # (G, S, D) → (G, band, day_key)
+    totals = {
+        f"{name}_h": np.einsum("sb,gsd,dk->gbk", band_hot, arrays[name], day_hot) * slot_hours
+        for name in ("need", "staff", "lack", "excess")
+    }
+    days = arrays["valid"].astype(float) @ day_hot  # (G, day_key)
+    g_idx, b_idx, k_idx = np.nonzero(np.broadcast_to(days[:, None, :] > 0, totals["need_h"].shape))
+    frame = pd.DataFrame(
+        {
+            key: np.asarray(names, dtype=object)[g_idx],
+            "month": day_keys.get_level_values(0)[k_idx],
+            "weekday": day_keys.get_level_values(1)[k_idx],
+            "slot_band": bands[b_idx],
+            **{m: v[g_idx, b_idx, k_idx] for m, v in totals.items()},
+            "days": days[g_idx, k_idx],
+        }
+    )
+    return frame
+
+
+def _work_records(long_df: pd.DataFrame) -> pd.DataFrame:
+    mask = (long_df.get("holiday_type", "通常勤務") == "通常勤務") & (long_df.get("parsed_slots_count", 0) > 0)
+    return long_df.loc[mask, ["ds", "role", "employment"]]
+
+
+def _cross_staff_rows(long_df: pd.DataFrame, slot_hours: float) -> pd.DataFrame:
+    """role × employment の staff_h (long_df の勤務レコード数 × スロット時間)"""
+    work = _work_records(long_df)
+    if work.empty:
+        return pd.DataFrame()
+    ds = pd.to_datetime(work["ds"])
+    keys = pd.DataFrame(
+        {
+            "role": work["role"].astype(str).to_numpy(),
+            "employment": work["employment"].astype(str).to_numpy(),
+            "month": ds.dt.strftime("%Y-%m").to_numpy(),
+            "weekday": np.asarray(WEEKDAY_LABELS, dtype=object)[ds.dt.weekday.to_numpy()],
+            "slot_band": [slot_band(h) for h in ds.dt.hour.to_numpy()],
+        }
+    )
+    out = keys.groupby(list(CUBE_DIMS), sort=True).size().rename("staff_h").reset_index()
+    out["staff_h"] = out["staff_h"] * slot_hours
+    return out
+
+
+def _staff_groups(long_df: pd.DataFrame) -> pd.DataFrame:
+    """職員ごとの主な (最も多く出現する) 職種・雇用形態"""
+    work = _work_records(long_df).assign(staff=long_df["staff"])
+    if work.empty:
+        work = long_df[["staff", "role", "employment"]]
+    counts = (
+        work.astype({"staff": str, "role": str, "employment": str})
+        .value_counts(["staff", "role", "employment"])
+        .reset_index()
+    )
+    return counts.drop_duplicates("staff").set_index("staff")[["role", "employment"]]
+
+
+def _read_staff_scores(out_dir: Path) -> pd.DataFrame:
+    """``staff`` を index とした fatigue_score / fairness_score (あるものだけ)"""
+    parts: List[pd.Series] = []
+    fatigue_fp = out_dir / "fatigue_score.parquet"
+    if fatigue_fp.exists():
+        try:
+            fat = pd.read_parquet(fatigue_fp)
+            if "staff" in fat.columns:
+                fat = fat.set_index("staff")
+            if "fatigue_score" in fat.columns:
+                parts.append(pd.to_numeric(fat["fatigue_score"], errors="coerce").rename("fatigue_score"))
+        except Exception as e:
+            log.warning(f"[kpi_cube] fatigue_score.parquet の読み込みエラー: {e}")
+    fairness_fp = out_dir / "fairness_after.parquet"
+    if fairness_fp.exists():
+        try:
+            fair = pd.read_parquet(fairness_fp)
+            if {"staff", "fairness_score"}.issubset(fair.columns):
+                parts.append(
+                    pd.to_numeric(fair.set_index("staff")["fairness_score"], errors="coerce").rename("fairness_score")
+                )
+        except Exception as e:
+            log.warning(f"[kpi_cube] fairness_after.parquet の読み込みエラー: {e}")
+    if not parts:
+        return pd.DataFrame()
+    scores = pd.concat([p.groupby(level=0).mean() for p in parts], axis=1)
+    scores.index = scores.index.astype(str)
+    return scores
+
+
+def _staff_rows(long_df: pd.DataFrame, scores: pd.DataFrame) -> pd.DataFrame:
+    """職員単位の量を role × employment と各周辺 (全体) の行にする"""
+    staff = _staff_groups(long_df)
+    if staff.empty:
+        return pd.DataFrame()
+    staff = staff.join(scores, how="left") if not scores.empty else staff
+    fatigue = staff.get("fatigue_score", pd.Series(np.nan, index=staff.index))
+    fairness = staff.get("fairness_score", pd.Series(np.nan, index=staff.index))
+    values = pd.DataFrame(
+        {
+            "role": staff["role"],
+            "employment": staff["employment"],
+            "staff_count": 1.0,
+            "fatigue_sum": fatigue.fillna(0),
+            "fatigue_n": fatigue.notna().astype(float),
+            "fatigue_high_n": (fatigue > FATIGUE_HIGH_THRESHOLD).astype(float),
+            "fairness_sum": fairness.fillna(0),
+            "fairness_n": fairness.notna().astype(float),
+        }
+    )
+    frames = [
+        values.groupby(["role", "employment"], sort=True)[list(STAFF_MEASURES)].sum().reset_index(),
+        values.groupby("role", sort=True)[list(STAFF_MEASURES)].sum().reset_index().assign(employment=ALL),
+        values.groupby("employment", sort=True)[list(STAFF_MEASURES)].sum().reset_index().assign(role=ALL),
+        values[list(STAFF_MEASURES)].sum().to_frame().T.assign(role=ALL, employment=ALL),
+    ]
+    return pd.concat(frames, ignore_index=True).assign(month=ALL, weekday=ALL, slot_band=ALL)
+
+
+def _compact(cube: pd.DataFrame) -> pd.DataFrame:
+    measures = [*SLOT_MEASURES, *COST_MEASURES, *STAFF_MEASURES]
+    for col in measures:
+        if col not in cube.columns:
+            cube[col] = np.nan
+    cube = cube[[*CUBE_DIMS, *measures]]
+    return cube.astype({d: "category" for d in CUBE_DIMS} | {m: "float32" for m in measures})
+
+
+def build_kpi_cube(
+    out_dir: Path | str,
+    *,
+    long_df: pd.DataFrame | None = None,
+    heatmap_frames: Mapping[str, pd.DataFrame] | None = None,
+    slot_minutes: int = DEFAULT_SLOT_MINUTES,
+    wage_direct: float = 0.0,
+    wage_temp: float = 0.0,
+    penalty_per_lack: float = 0.0,
+) -> Path:
+    """Build ``kpi_cube.parquet`` for a scenario output directory.
+
+    ``heatmap_frames`` (from ``build_heatmap``) avoids re-reading the heatmap
+    and need files; ``long_df`` defaults to ``intermediate_data.parquet``.
+    Costs use the same wages as :func:`shortage.add_cost_estimates`.
+    """
+    # 読み込み側 (ダッシュボード) の import を軽く保つため構築時にだけ読む
+    from .holiday_detection import load_meta_holidays
+    from .long_df_schema import read_long_df
+    from .shortage import _frame_paths, _group_frames, add_cost_estimates
+    from .utils import gen_labels
+
+    out_dir_path = Path(out_dir)
+    if long_df is None:
+        long_fp = out_dir_path / "intermediate_data.parquet"
+        long_df = read_long_df(long_fp) if long_fp.exists() else pd.DataFrame()
+
+    time_labels = gen_labels(slot_minutes)
+    slot_hours = slot_minutes / 60.0
+    holidays = load_meta_holidays(out_dir_path)
+    common = dict(time_labels=time_labels, holidays=holidays, slot_hours=slot_hours)
+
+    role_paths = [
+        fp
+        for fp in _frame_paths(out_dir_path, "heat_*.parquet", heatmap_frames)
+        if fp.name != "heat_ALL.parquet" and not fp.name.startswith("heat_emp_")
+    ]
+    emp_paths = _frame_paths(out_dir_path, "heat_emp_*.parquet", heatmap_frames)
+    all_paths = _frame_paths(out_dir_path, "heat_ALL.parquet", heatmap_frames)
+
+    slot_frames = [
+        _slot_rows(
+            _group_frames(out_dir_path, role_paths, "heat_", "need_per_date_slot_role_", heatmap_frames),
+            key="role",
+            **common,
+        ).assign(employment=ALL),
+        _slot_rows(
+            _group_frames(out_dir_path, emp_paths, "heat_emp_", "need_per_date_slot_emp_", heatmap_frames),
+            key="employment",
+            **common,
+        ).assign(role=ALL),
+        # 全体の Need は need_per_date_slot.parquet (接頭辞の後ろが空)
+        _slot_rows(
+            _group_frames(out_dir_path, all_paths, "heat_ALL", "need_per_date_slot", heatmap_frames),
+            key="role",
+            **common,
+        ).assign(role=ALL, employment=ALL),
+    ]
+    parts = [
+        add_cost_estimates(f, wage_direct=wage_direct, wage_temp=wage_temp, penalty_per_lack=penalty_per_lack)
+        for f in slot_frames
+        if not f.empty
+    ]
+    if not long_df.empty and {"ds", "role", "employment"}.issubset(long_df.columns):
+        parts.append(_cross_staff_rows(long_df, slot_hours))
+        if "staff" in long_df.columns:
+            parts.append(_staff_rows(long_df, _read_staff_scores(out_dir_path)))
+    parts = [p for p in parts if not p.empty]
+    cube = _compact(pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=list(CUBE_DIMS)))
+
+    fp = out_dir_path / KPI_CUBE_FILE
+    cube.to_parquet(fp, index=False)
+    log.info(f"[kpi_cube] KPI キューブを保存しました: {fp.name} ({len(cube)} 行)")
+    return fp
+
+
+def load_kpi_cube(out_dir: Path | str, *, cache: FrameCache | None = None) -> pd.DataFrame | None:
+    """``kpi_cube.parquet`` を読む (なければ ``None``)"""
+    fp = Path(out_dir) / KPI_CUBE_FILE
+    if not fp.exists():
+        return None
+    try:
+        return cache.read_parquet(fp) if cache is not None else pd.read_parquet(fp)
+    except Exception as e:
+        log.warning(f"[kpi_cube] {fp} の読み込みエラー: {e}")
+        return None
+
+
+def _select(cube: pd.DataFrame, *, role: str | None, employment: str | None, staff_level: bool) -> pd.DataFrame:
+    """``role`` / ``employment`` に一致する行 (``None`` は 全体 以外のすべて)"""
+    mask = (cube["month"] == ALL) if staff_level else (cube["month"] != ALL)
+    for col, value in (("role", role), ("employment", employment)):
+        mask &= (cube[col] != ALL) if value is None else (cube[col] == value)
+    return cube[mask]
+
+
+def breakdown(cube: pd.DataFrame, by: str = "role", *, dims: Sequence[str] = ()) -> pd.DataFrame:
+    """職種別 (``by="role"``) / 雇用形態別の KPI 表 (``dims`` でさらに月・曜日・時間帯に分ける)
+
+    職員単位の量 (疲労・公平性・人数) は ``dims`` を指定しないときだけ付く。
+    """
+    if by not in ("role", "employment"):
+        raise ValueError(f"by は role / employment のいずれかです: {by}")
+    other = "employment" if by == "role" else "role"
+    keys = [by, *dims]
+    slot = _select(cube, **{by: None, other: ALL}, staff_level=False)
+    out = slot.groupby(keys, observed=True)[[*SLOT_MEASURES[:-1], *COST_MEASURES]].sum()
+    if not dims:
+        staff = _select(cube, **{by: None, other: ALL}, staff_level=True)
+        staff_sum = staff.groupby(by, observed=True)[list(STAFF_MEASURES)].sum()
+        out = out.join(_staff_means(staff_sum), how="outer")
+    return out.reset_index()
+
+
+def _staff_means(staff_sum: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "staff_count": staff_sum["staff_count"],
+            "avg_fatigue_score": staff_sum["fatigue_sum"] / staff_sum["fatigue_n"].where(staff_sum["fatigue_n"] > 0),
+            "high_fatigue_count": staff_sum["fatigue_high_n"],
+            "fairness_score": staff_sum["fairness_sum"] / staff_sum["fairness_n"].where(staff_sum["fairness_n"] > 0),
+        }
+    )
+
+
+def overview_kpis(cube: pd.DataFrame) -> Dict[str, Any]:
+    """概要タブの KPI (不足・過剰は職種別の合計、全体行の不足は ``facility_lack_hours``)
+
+    コストは :data:`COST_MEASURES` の各列を別々に返す (人件費の総額ではない)。
+    """
+    roles = _select(cube, role=None, employment=ALL, staff_level=False)
+    facility = _select(cube, role=ALL, employment=ALL, staff_level=False)
+    staff = _select(cube, role=ALL, employment=ALL, staff_level=True)
+
+    def _sum(df: pd.DataFrame, col: str) -> float:
+        return float(df[col].sum()) if not df.empty else 0.0
+
+    # 日数は時間帯ごとに同じ値が入るので 1 つの時間帯だけ数える
+    n_days = 0.0
+    if not facility.empty:
+        first_band = facility["slot_band"].astype(str).min()
+        n_days = _sum(facility[facility["slot_band"] == first_band], "days")
+    means = _staff_means(staff[list(STAFF_MEASURES)].sum().to_frame().T) if not staff.empty else None
+
+    def _mean(col: str) -> float:
+        if means is None:
+            return 0.0
+        value = means[col].iloc[0]
+        return float(value) if pd.notna(value) else 0.0
+
+    total_lack = _sum(roles, "lack_h")
+    costs = {col: _sum(roles, col) for col in COST_MEASURES}
+    return {
+        "total_shortage_hours": total_lack,
+        "total_excess_hours": _sum(roles, "excess_h"),
+        "total_need_hours": _sum(roles, "need_h"),
+        "total_staff_hours": _sum(facility, "staff_h"),
+        "facility_lack_hours": _sum(facility, "lack_h"),
+        "days": n_days,
+        "avg_daily_shortage": total_lack / n_days if n_days else 0.0,
+        "avg_fatigue_score": _mean("avg_fatigue_score"),
+        "high_fatigue_count": int(_mean("high_fatigue_count")),
+        "fairness_score": _mean("fairness_score"),
+        "total_staff": int(_mean("staff_count")),
+        # 派遣換算と不足ペナルティは同じ不足の別の見積もりなので合算しない
+        **costs,
+    }
@@ -1,11 +1,17 @@
 # shift_suite/tasks/leave_analyzer.py
 from __future__ import annotations
 
+import datetime as dt
 import logging
-from typing import Dict, List, Literal, Optional, Union  # Union を追加
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Literal, Optional, Tuple, Union  # Union を追加
 
+import numpy as np
 import pandas as pd
 
+from .holiday_detection import holiday_mask
+from .shift_intervals import interval_days, is_interval_table
+
 log = logging.getLogger(__name__)
 if not log.handlers:  # ログハンドラが重複しないように設定
     ch = logging.StreamHandler()
@@ -34,12 +40,83 @@ def _is_full_day_leave(parsed_slots_count_val: Union[int, float]) -> bool:
     return pd.isna(parsed_slots_count_val) or parsed_slots_count_val == 0
 
 
+def _full_day_leave_mask(long_df: pd.DataFrame) -> np.ndarray:
+    """:func:`_is_full_day_leave` の行ごとの判定をまとめて行う"""
+    if "parsed_slots_count" not in long_df.columns:
+        return np.ones(len(long_df), dtype=bool)
+    slots = pd.to_numeric(long_df["parsed_slots_count"], errors="coerce")
+    return (slots.isna() | (slots == 0)).to_numpy()
+
+
+DAILY_LEAVE_COLUMNS = ["date", "staff", "leave_type", "leave_day_flag"]
+STAFF_LEAVE_LIST_COLUMNS = ["staff", "role", "leave_type", "leave_date"]
+# 終日の場合に取得日数として数える休暇タイプ
+_COUNTED_LEAVE_TYPES = (LEAVE_TYPE_REQUESTED, LEAVE_TYPE_PAID)
+
+DAY_NAME_MAP_JP = {
+    "Monday": "月曜日",
+    "Tuesday": "火曜日",
+    "Wednesday": "水曜日",
+    "Thursday": "木曜日",
+    "Friday": "金曜日",
+    "Saturday": "土曜日",
+    "Sunday": "日曜日",
+}
+DAYS_OF_WEEK_JP = list(DAY_NAME_MAP_JP.values())
+MONTH_PERIODS = ["月初(1-10日)", "月中(11-20日)", "月末(21-末日)"]
+
+
+def _month_period(dates: pd.Series) -> pd.Categorical:
+    """日付を月初 (1-10日) / 月中 (11-20日) / 月末 (21日-) に分ける"""
+    day = dates.dt.day.to_numpy()
+    idx = np.where(day <= 10, 0, np.where(day <= 20, 1, 2))
+    return pd.Categorical.from_codes(idx, categories=MONTH_PERIODS, ordered=True)
+
+
+def _day_of_week_jp(dates: pd.Series) -> pd.Categorical:
+    return pd.Categorical.from_codes(
+        dates.dt.dayofweek.to_numpy(), categories=DAYS_OF_WEEK_JP, ordered=True
+    )
+
+
+def _daily_leave_frame(
+    long_df: pd.DataFrame, mask: np.ndarray, dates: pd.Series
+) -> pd.DataFrame:
+    """``mask`` の行を (日付, 職員, 休暇タイプ) で 1 行にまとめる"""
+    daily = pd.DataFrame(
+        {
+            "date": dates[mask].to_numpy(),
+            "staff": long_df["staff"].to_numpy()[mask],
+            "leave_type": long_df["holiday_type"].to_numpy()[mask],
+        }
+    ).drop_duplicates()
+    if daily.empty:
+        return pd.DataFrame(columns=DAILY_LEAVE_COLUMNS)
+    daily["leave_day_flag"] = 1
+    return daily.sort_values(by=["date", "staff", "leave_type"]).reset_index(drop=True)
+
+
+def _staff_leave_list_frame(long_df: pd.DataFrame, mask: np.ndarray, dates: pd.Series) -> pd.DataFrame:
+    if not mask.any():
+        return pd.DataFrame(columns=STAFF_LEAVE_LIST_COLUMNS)
+    cols = [c for c in ("staff", "role", "holiday_type") if c in long_df.columns]
+    rows = long_df.loc[mask, cols].reindex(columns=["staff", "role", "holiday_type"])
+    rows = rows.assign(leave_date=dates[mask].dt.date.to_numpy())
+    return (
+        rows.drop_duplicates()
+        .sort_values(by=["staff", "role", "holiday_type", "leave_date"])
+        .reset_index(drop=True)
+    )
+
+
 # --- Core Analysis Functions ---
 
 
 def get_daily_leave_counts(
     long_df: pd.DataFrame,
     target_leave_types: Optional[List[str]] = None,
+    *,
+    closed_days: Optional[Iterable[dt.date]] = None,
 ) -> pd.DataFrame:
     """
     日別・職員別・休暇タイプ別の休暇取得「日数」（1日単位）を集計する。
@@ -47,7 +124,12 @@ def get_daily_leave_counts(
     - 有給休暇: 終日有給(parsed_slots_count=0)の場合に1日としてカウント。
                一部勤務・一部有給(P有など parsed_slots_count > 0)は、
                ここでは有給休暇日数としてはカウントしない。
+    long_df の代わりに勤務区間テーブル (shift_intervals) も受け付ける。
+    closed_days (holiday_detection.estimate_closed_days の結果など) を
+    渡すと、休業日に付いた休暇コードは取得日数から除外する。
     """
+    if is_interval_table(long_df):
+        long_df = interval_days(long_df).rename(columns={"day_start": "ds"})
     if target_leave_types is None:
         target_leave_types = [
             LEAVE_TYPE_REQUESTED,
@@ -65,47 +147,18 @@ def get_daily_leave_counts(
         log.error("long_dfにholiday_type列が存在しません。休暇分析を実行できません。")
         return pd.DataFrame(columns=["date", "staff", "leave_type", "leave_day_flag"])
 
-    leave_df = long_df[long_df["holiday_type"].isin(target_leave_types)].copy()
-    if leave_df.empty:
+    # 希望休・有給とも終日 (parsed_slots_count == 0) の場合のみ 1 日として数える。
+    # 一部勤務・一部有給 (P有など) は有給日数に含めない
+    counted = [t for t in target_leave_types if t in _COUNTED_LEAVE_TYPES]
+    mask = long_df["holiday_type"].isin(counted).to_numpy() & _full_day_leave_mask(long_df)
+    if closed_days:
+        mask &= ~holiday_mask(long_df["ds"], closed_days)
+    if not mask.any():
         log.info("対象となる休暇タイプレコードが見つかりませんでした。")
-        return pd.DataFrame(columns=["date", "staff", "leave_type", "leave_day_flag"])
+        return pd.DataFrame(columns=DAILY_LEAVE_COLUMNS)
 
-    leave_df["date"] = leave_df["ds"].dt.normalize()  # 日付部分のみに正規化
-
-    # 休暇日フラグ（その日にそのタイプの休暇を取得したか）を立てる
-    processed_records = []
-    for _, row in leave_df.iterrows():
-        is_target_leave = False
-        if row["holiday_type"] == LEAVE_TYPE_REQUESTED:
-            # 希望休は parsed_slots_count == 0 であることを前提とする
-            if _is_full_day_leave(row["parsed_slots_count"]):
-                is_target_leave = True
-        elif row["holiday_type"] == LEAVE_TYPE_PAID:
-            # 有給は parsed_slots_count == 0 (終日有給) の場合のみカウント
-            if _is_full_day_leave(row["parsed_slots_count"]):
-                is_target_leave = True
-
-        if is_target_leave:
-            processed_records.append(
-                {
-                    "date": row["date"],
-                    "staff": row["staff"],
-                    "leave_type": row["holiday_type"],
-                    "leave_day_flag": 1,  # 休暇取得日としてフラグを立てる
-                }
-            )
-
-    if not processed_records:
-        return pd.DataFrame(columns=["date", "staff", "leave_type", "leave_day_flag"])
-
-    # 日付と職員と休暇タイプで重複を除去（例：long_dfが時間スロットごとなので、1日の休暇は複数行になるため）
-    daily_leave_df = pd.DataFrame(processed_records).drop_duplicates(
-        subset=["date", "staff", "leave_type"]
-    )
-
-    return daily_leave_df.sort_values(by=["date", "staff", "leave_type"]).reset_index(
-        drop=True
-    )
+    # long_df は時間スロットごとなので、(日付, 職員, 休暇タイプ) で 1 行にまとめる
+    return _daily_leave_frame(long_df, mask, long_df["ds"].dt.normalize())
 
 
 def summarize_leave_by_day_count(
@@ -136,50 +189,13 @@ def summarize_leave_by_day_count(
     df_to_agg["date"] = pd.to_datetime(df_to_agg["date"])
 
     if period == "dayofweek":
-        df_to_agg["period_unit"] = df_to_agg["date"].dt.day_name()
-        days_of_week = [
-            "Monday",
-            "Tuesday",
-            "Wednesday",
-            "Thursday",
-            "Friday",
-            "Saturday",
-            "Sunday",
-        ]
-        # 日本語対応
-        day_name_map_jp = {
-            "Monday": "月曜日",
-            "Tuesday": "火曜日",
-            "Wednesday": "水曜日",
-            "Thursday": "木曜日",
-            "Friday": "金曜日",
-            "Saturday": "土曜日",
-            "Sunday": "日曜日",
-        }
-        days_of_week_jp = [day_name_map_jp[d] for d in days_of_week]
-        df_to_agg["period_unit"] = pd.Categorical(
-            df_to_agg["period_unit"].map(day_name_map_jp),
-            categories=days_of_week_jp,
-            ordered=True,
-        )
+        # 日本語の曜日 (月曜日〜日曜日の順)
+        df_to_agg["period_unit"] = _day_of_week_jp(df_to_agg["date"])
 
     elif period == "month":
         df_to_agg["period_unit"] = df_to_agg["date"].dt.to_period("M").astype(str)
     elif period == "month_period":
-
-        def get_month_period(day_val: int) -> str:
-            if day_val <= 10:
-                return "月初(1-10日)"
-            elif day_val <= 20:
-                return "月中(11-20日)"
-            else:
-                return "月末(21-末日)"
-
-        df_to_agg["period_unit"] = df_to_agg["date"].dt.day.apply(get_month_period)
-        month_periods_order = ["月初(1-10日)", "月中(11-20日)", "月末(21-末日)"]
-        df_to_agg["period_unit"] = pd.Categorical(
-            df_to_agg["period_unit"], categories=month_periods_order, ordered=True
-        )
+        df_to_agg["period_unit"] = _month_period(df_to_agg["date"])
     elif period == "date":  # 日別の集計
         df_to_agg["period_unit"] = df_to_agg["date"]
     else:
@@ -187,7 +203,7 @@ def summarize_leave_by_day_count(
         return pd.DataFrame()
 
     summary = (
-        df_to_agg.groupby(["period_unit", "leave_type"])["leave_day_flag"]
+        df_to_agg.groupby(["period_unit", "leave_type"], observed=False)["leave_day_flag"]
         .sum()
         .reset_index(name="total_leave_days")
     )
@@ -390,29 +406,8 @@ def get_staff_leave_list(
     if "holiday_type" not in long_df.columns:
         return pd.DataFrame(columns=["staff", "role", "leave_type", "leave_date"])
 
-    leave_df = long_df[
-        long_df["holiday_type"].isin(target_leave_types)
-        & (
-            long_df.apply(
-                lambda row: _is_full_day_leave(row["parsed_slots_count"]), axis=1
-            )
-        )
-    ].copy()
-
-    if leave_df.empty:
-        return pd.DataFrame(columns=["staff", "role", "leave_type", "leave_date"])
-
-    leave_df["leave_date"] = leave_df["ds"].dt.date
-
-    # staff, role, holiday_type, leave_date でユニークなリストを作成
-    staff_leave_list_df = (
-        leave_df[["staff", "role", "holiday_type", "leave_date"]]
-        .drop_duplicates()
-        .sort_values(by=["staff", "role", "holiday_type", "leave_date"])
-        .reset_index(drop=True)
-    )
-
-    return staff_leave_list_df
+    mask = long_df["holiday_type"].isin(target_leave_types).to_numpy() & _full_day_leave_mask(long_df)
+    return _staff_leave_list_frame(long_df, mask, pd.to_datetime(long_df["ds"]))
 
 
 def approval_rate_by_staff(long_df: pd.DataFrame) -> pd.Series:
@@ -425,20 +420,20 @@ def approval_rate_by_staff(long_df: pd.DataFrame) -> pd.Series:
 
     if "leave_requested" in df.columns:
         total_req = (
-            df[df["leave_requested"] == 1].groupby("staff")["date"].nunique()
+            df[df["leave_requested"] == 1].groupby("staff", observed=True)["date"].nunique()
         )
         approved = (
             df[df["holiday_type"] == LEAVE_TYPE_REQUESTED]
-            .groupby("staff")["date"].nunique()
+            .groupby("staff", observed=True)["date"].nunique()
         )
         rate = approved / total_req.replace(0, pd.NA)
         return rate.fillna(0)
 
     approved = (
         df[df["holiday_type"] == LEAVE_TYPE_REQUESTED]
-        .groupby("staff")["date"].nunique()
+        .groupby("staff", observed=True)["date"].nunique()
     )
-    total_days = df.groupby("staff")["date"].nunique()
+    total_days = df.groupby("staff", observed=True)["date"].nunique()
     return (approved / total_days.replace(0, pd.NA)).fillna(0)
 
 
@@ -453,43 +448,8 @@ def leave_ratio_by_period_and_weekday(daily_summary_df: pd.DataFrame) -> pd.Data
     df = daily_summary_df.copy()
     df["date"] = pd.to_datetime(df["date"])
 
-    def get_month_period(day_val: int) -> str:
-        if day_val <= 10:
-            return "月初(1-10日)"
-        if day_val <= 20:
-            return "月中(11-20日)"
-        return "月末(21-末日)"
-
-    df["month_period"] = df["date"].dt.day.apply(get_month_period)
-    month_order = ["月初(1-10日)", "月中(11-20日)", "月末(21-末日)"]
-    df["month_period"] = pd.Categorical(
-        df["month_period"], categories=month_order, ordered=True
-    )
-
-    day_name_map = {
-        "Monday": "月曜日",
-        "Tuesday": "火曜日",
-        "Wednesday": "水曜日",
-        "Thursday": "木曜日",
-        "Friday": "金曜日",
-        "Saturday": "土曜日",
-        "Sunday": "日曜日",
-    }
-    dow_order = [
-        day_name_map[d]
-        for d in [
-            "Monday",
-            "Tuesday",
-            "Wednesday",
-            "Thursday",
-            "Friday",
-            "Saturday",
-            "Sunday",
-        ]
-    ]
-    df["dayofweek"] = pd.Categorical(
-        df["date"].dt.day_name().map(day_name_map), categories=dow_order, ordered=True
-    )
+    df["month_period"] = _month_period(df["date"])
+    df["dayofweek"] = _day_of_week_jp(df["date"])
 
     grouped = (
         df.groupby(["month_period", "dayofweek", "leave_type"], observed=False)[
@@ -505,6 +465,161 @@ def leave_ratio_by_period_and_weekday(daily_summary_df: pd.DataFrame) -> pd.Data
     )
 
 
+# --- 休暇分析タブ用の一括集計 ---
+LEAVE_SUMMARY_PERIODS = ("dayofweek", "month", "month_period", "date")
+# 休暇分析タブ (app.py) が表示する集計: 結果キー → (休暇タイプ, 集計単位)
+_TAB_SUMMARIES = {
+    "summary_dow_requested": (LEAVE_TYPE_REQUESTED, "dayofweek"),
+    "summary_month_period_requested": (LEAVE_TYPE_REQUESTED, "month_period"),
+    "summary_month_requested": (LEAVE_TYPE_REQUESTED, "month"),
+    "summary_dow_paid": (LEAVE_TYPE_PAID, "dayofweek"),
+    "summary_month_paid": (LEAVE_TYPE_PAID, "month"),
+}
+
+
+@dataclass
+class LeaveAnalysis:
+    """All leave summaries for one ``long_df``, built from a single scan.
+
+    ``summaries[(leave_type, period)]`` equals
+    ``summarize_leave_by_day_count(daily_leave_df[leave_type == ...], period)``.
+    """
+
+    target_leave_types: List[str]
+    daily_leave_df: pd.DataFrame
+    daily_summary: pd.DataFrame
+    staff_balance_daily: pd.DataFrame
+    staff_leave_list: pd.DataFrame
+    leave_ratio_breakdown: pd.DataFrame
+    concentration_requested: pd.DataFrame
+    concentration_both: pd.DataFrame
+    summaries: Dict[Tuple[str, str], pd.DataFrame] = field(default_factory=dict)
+
+    @property
+    def empty(self) -> bool:
+        return self.daily_leave_df.empty
+
+    def summary(self, leave_type: str, period: str) -> pd.DataFrame:
+        return self.summaries.get((leave_type, period), pd.DataFrame())
+
+    def results(self) -> Dict[str, pd.DataFrame]:
+        """休暇分析タブの結果 dict (``st.session_state.leave_analysis_results`` のキー)"""
+        results = {
+            "daily_leave_df": self.daily_leave_df,
+            "daily_summary": self.daily_summary,
+            "staff_balance_daily": self.staff_balance_daily,
+            "staff_leave_list": self.staff_leave_list,
+            "leave_ratio_breakdown": self.leave_ratio_breakdown,
+            "concentration_both": self.concentration_both,
+        }
+        if LEAVE_TYPE_REQUESTED in self.target_leave_types:
+            results["concentration_requested"] = self.concentration_requested
+        for key, (leave_type, period) in _TAB_SUMMARIES.items():
+            if leave_type in self.target_leave_types:
+                results[key] = self.summary(leave_type, period)
+        return results
+
+
+def analyze_leave(
+    long_df: pd.DataFrame,
+    target_leave_types: Optional[List[str]] = None,
+    *,
+    concentration_threshold: int = 3,
+    closed_days: Optional[Iterable[dt.date]] = None,
+) -> LeaveAnalysis:
+    """休暇分析タブの全集計を long_df の 1 回の走査から作る
+
+    スロット行に対する処理は、日付の正規化と 2 つのマスクの計算だけ。
+    対象は勤務日 (``parsed_slots_count > 0``) と終日休暇である。
+    以降の集計は (日付, 職員, 休暇タイプ) 単位の小さな表から行う。
+    曜日別・月別・月内期間別・日別・職員別の集計と、集中日の分析が含まれる。
+    """
+    if is_interval_table(long_df):
+        long_df = interval_days(long_df).rename(columns={"day_start": "ds"})
+    if target_leave_types is None:
+        target_leave_types = [LEAVE_TYPE_REQUESTED, LEAVE_TYPE_PAID, LEAVE_TYPE_OTHER]
+    target_leave_types = list(target_leave_types)
+
+    empty = pd.DataFrame()
+    if long_df.empty or not {"ds", "staff", "holiday_type"}.issubset(long_df.columns):
+        log.warning("入力されたlong_dfが空、または ds / staff / holiday_type 列がありません。")
+        return LeaveAnalysis(
+            target_leave_types, pd.DataFrame(columns=DAILY_LEAVE_COLUMNS), empty, empty,
+            pd.DataFrame(columns=STAFF_LEAVE_LIST_COLUMNS), empty, empty, empty,
+        )
+
+    # ── long_df の走査 (1 回) ──
+    ds = pd.to_datetime(long_df["ds"])
+    dates = ds.dt.normalize()
+    full_day = _full_day_leave_mask(long_df)
+    leave_mask = long_df["holiday_type"].isin(target_leave_types).to_numpy() & full_day
+    counted = leave_mask & long_df["holiday_type"].isin(_COUNTED_LEAVE_TYPES).to_numpy()
+    if closed_days:
+        counted &= ~holiday_mask(ds, closed_days)
+    if "parsed_slots_count" in long_df.columns:
+        worked = (pd.to_numeric(long_df["parsed_slots_count"], errors="coerce") > 0).to_numpy()
+    else:
+        worked = np.zeros(len(long_df), dtype=bool)
+
+    daily = _daily_leave_frame(long_df, counted, dates)
+    staff_leave_list = _staff_leave_list_frame(long_df, leave_mask, ds)
+    total_staff = (
+        pd.DataFrame({"date": dates.to_numpy()[worked], "staff": long_df["staff"].to_numpy()[worked]})
+        .drop_duplicates()
+        .groupby("date")
+        .size()
+    )
+
+    # ── (日付, 休暇タイプ) 別の取得者数 ──
+    counts = daily.groupby(["date", "leave_type"]).size().reset_index(name="leave_day_flag")
+    daily_summary = summarize_leave_by_day_count(counts, period="date")
+
+    summaries: Dict[Tuple[str, str], pd.DataFrame] = {}
+    for leave_type in counts["leave_type"].unique():
+        per_type = counts[counts["leave_type"] == leave_type]
+        for period in LEAVE_SUMMARY_PERIODS:
+            summaries[(leave_type, period)] = summarize_leave_by_day_count(per_type, period=period)
+
+    staff_balance = total_staff.reset_index(name="total_staff")
+    applicants = counts.groupby("date")["leave_day_flag"].sum()
+    staff_balance["leave_applicants_count"] = (
+        staff_balance["date"].map(applicants).fillna(0).astype(int)
+    )
+    staff_balance["non_leave_staff"] = staff_balance["total_staff"] - staff_balance["leave_applicants_count"]
+    staff_balance["leave_ratio"] = staff_balance["leave_applicants_count"] / staff_balance["total_staff"]
+
+    requested_summary = summaries.get((LEAVE_TYPE_REQUESTED, "date"), pd.DataFrame())
+    if requested_summary.empty:
+        concentration_requested = pd.DataFrame()
+    else:
+        concentration_requested = analyze_leave_concentration(
+            requested_summary,
+            leave_type_to_analyze=LEAVE_TYPE_REQUESTED,
+            concentration_threshold=concentration_threshold,
+            daily_leave_df=daily[daily["leave_type"] == LEAVE_TYPE_REQUESTED],
+        )
+
+    if daily_summary.empty:
+        ratio_breakdown = concentration_both = pd.DataFrame()
+    else:
+        ratio_breakdown = leave_ratio_by_period_and_weekday(daily_summary)
+        concentration_both = analyze_both_leave_concentration(
+            daily_summary, concentration_threshold=concentration_threshold
+        )
+
+    return LeaveAnalysis(
+        target_leave_types=target_leave_types,
+        daily_leave_df=daily,
+        daily_summary=daily_summary,
+        staff_balance_daily=staff_balance,
+        staff_leave_list=staff_leave_list,
+        leave_ratio_breakdown=ratio_breakdown,
+        concentration_requested=concentration_requested,
+        concentration_both=concentration_both,
+        summaries=summaries,
+    )
+
+
 # --- CLI実行のためのダミーコード (app.pyから呼び出す際は不要) ---
 if __name__ == "__main__":
     log.setLevel(logging.DEBUG)
@@ -18,6 +18,7 @@ try:
     from .constants import SLOT_HOURS
 except ImportError:
     SLOT_HOURS = 0.5
+from .staff_days import StaffDayMatrix, staff_day_matrix
 
 log = logging.getLogger(__name__)
 
@@ -95,9 +96,9 @@ class LightweightAnomalyDetector:
             log.warning("[AnomalyDetector] 入力データが空です")
             return []
         
-        # データの前処理
-        work_records = long_df[long_df['parsed_slots_count'] > 0].copy()
-        if work_records.empty:
+        # スタッフ × 日の行列 (勤務日・時間・開始終了) を一度だけ作り、各検知で共有する
+        matrix = staff_day_matrix(long_df)
+        if not matrix.worked.any():
             log.warning("[AnomalyDetector] 有効な勤務レコードがありません")
             return []
         
@@ -106,19 +107,19 @@ class LightweightAnomalyDetector:
         try:
             # 1. 労働時間異常の検知（最優先・軽量）
             log.info("[AnomalyDetector] 労働時間異常検知開始")
-            anomalies.extend(self._detect_excessive_hours(work_records))
+            anomalies.extend(self._detect_excessive_hours(matrix))
             
             # 2. 連続勤務異常の検知（法令遵守）
             log.info("[AnomalyDetector] 連続勤務異常検知開始")
-            anomalies.extend(self._detect_continuous_work_violations(work_records))
+            anomalies.extend(self._detect_continuous_work_violations(matrix))
             
             # 3. 夜勤頻度異常の検知（健康管理）
             log.info("[AnomalyDetector] 夜勤頻度異常検知開始")
-            anomalies.extend(self._detect_night_shift_anomalies(work_records))
+            anomalies.extend(self._detect_night_shift_anomalies(matrix))
             
             # 4. 勤務間インターバル違反（軽量版）
             log.info("[AnomalyDetector] 勤務間インターバル違反検知開始")
-            anomalies.extend(self._detect_interval_violations(work_records))
+            anomalies.extend(self._detect_interval_violations(matrix))
             
         except Exception as e:
             log.error(f"[AnomalyDetector] 異常検知中にエラー: {e}")
@@ -127,153 +128,112 @@ class LightweightAnomalyDetector:
         log.info(f"[AnomalyDetector] 異常検知完了: {len(anomalies)}件の異常を検知")
         return sorted(anomalies, key=lambda x: self._get_severity_priority(x.severity))
     
-    def _detect_excessive_hours(self, work_df: pd.DataFrame) -> List[AnomalyResult]:
+    def _detect_excessive_hours(self, matrix: StaffDayMatrix) -> List[AnomalyResult]:
         """過度な労働時間の検知（O(n)）"""
         anomalies = []
         
-        # 個人別の月間労働時間を計算
-        work_df['year_month'] = work_df['ds'].dt.to_period('M')
-        monthly_hours = work_df.groupby(['staff', 'year_month'])['parsed_slots_count'].sum() * SLOT_HOURS
+        # 個人別の月間労働時間を計算（勤務のあった月のみ）
+        months = matrix.dates.to_period('M')
+        monthly_hours = (
+            pd.DataFrame(matrix.hours.T, index=months, columns=matrix.staff)
+            .groupby(level=0).sum()
+            .T.stack()
+        )
+        monthly_hours = monthly_hours[monthly_hours > 0].sort_index()
         
         # 全体平均を基準とした異常検知
         overall_mean = monthly_hours.mean()
         threshold = overall_mean * self.thresholds["excessive_hours_multiplier"]
         
-        for (staff, month), hours in monthly_hours.items():
-            if hours > threshold:
-                severity = self._calculate_severity(hours, threshold, overall_mean * 2)
-                anomalies.append(AnomalyResult(
-                    anomaly_type="過度な労働時間",
-                    severity=severity,
-                    staff=staff,
-                    description=f"{month}の労働時間が異常に多い ({hours:.1f}時間)",
-                    value=hours,
-                    expected_range=(0, threshold),
-                    date_range=(str(month.start_time.date()), str(month.end_time.date()))
-                ))
+        for (staff, month), hours in monthly_hours[monthly_hours > threshold].items():
+            severity = self._calculate_severity(hours, threshold, overall_mean * 2)
+            anomalies.append(AnomalyResult(
+                anomaly_type="過度な労働時間",
+                severity=severity,
+                staff=staff,
+                description=f"{month}の労働時間が異常に多い ({hours:.1f}時間)",
+                value=hours,
+                expected_range=(0, threshold),
+                date_range=(str(month.start_time.date()), str(month.end_time.date()))
+            ))
         
         return anomalies
     
-    def _detect_continuous_work_violations(self, work_df: pd.DataFrame) -> List[AnomalyResult]:
-        """連続勤務日数違反の検知（O(n log n)）"""
+    def _detect_continuous_work_violations(self, matrix: StaffDayMatrix) -> List[AnomalyResult]:
+        """連続勤務日数違反の検知（O(n)）"""
         anomalies = []
+        limit = self.thresholds["continuous_work_days"]
         
-        for staff, group in work_df.groupby('staff'):
-            # 日付でソートして連続勤務を検出
-            work_dates = group['ds'].dt.date.unique()
-            work_dates.sort()
-            
-            if len(work_dates) < 2:
-                continue
-            
-            continuous_days = 1
-            start_date = work_dates[0]
-            
-            for i in range(1, len(work_dates)):
-                if (work_dates[i] - work_dates[i-1]).days == 1:
-                    continuous_days += 1
-                else:
-                    # 連続勤務期間の終了をチェック
-                    if continuous_days > self.thresholds["continuous_work_days"]:
-                        severity = self._calculate_severity(
-                            continuous_days, 
-                            self.thresholds["continuous_work_days"], 
-                            self.thresholds["continuous_work_days"] + 5
-                        )
-                        anomalies.append(AnomalyResult(
-                            anomaly_type="連続勤務違反",
-                            severity=severity,
-                            staff=staff,
-                            description=f"{continuous_days}日間の連続勤務を検出",
-                            value=continuous_days,
-                            expected_range=(0, self.thresholds["continuous_work_days"]),
-                            date_range=(str(start_date), str(work_dates[i-1]))
-                        ))
-                    
-                    continuous_days = 1
-                    start_date = work_dates[i]
-            
-            # 最後の連続勤務期間もチェック
-            if continuous_days > self.thresholds["continuous_work_days"]:
-                severity = self._calculate_severity(
-                    continuous_days, 
-                    self.thresholds["continuous_work_days"], 
-                    self.thresholds["continuous_work_days"] + 5
-                )
-                anomalies.append(AnomalyResult(
-                    anomaly_type="連続勤務違反",
-                    severity=severity,
-                    staff=staff,
-                    description=f"{continuous_days}日間の連続勤務を検出",
-                    value=continuous_days,
-                    expected_range=(0, self.thresholds["continuous_work_days"]),
-                    date_range=(str(start_date), str(work_dates[-1]))
-                ))
+        streaks = matrix.streaks()
+        streaks = streaks[streaks["length"] > limit].sort_values(["staff", "start"])
+        for row in streaks.itertuples(index=False):
+            continuous_days = int(row.length)
+            severity = self._calculate_severity(continuous_days, limit, limit + 5)
+            anomalies.append(AnomalyResult(
+                anomaly_type="連続勤務違反",
+                severity=severity,
+                staff=row.staff,
+                description=f"{continuous_days}日間の連続勤務を検出",
+                value=continuous_days,
+                expected_range=(0, limit),
+                date_range=(str(row.start.date()), str(row.end.date()))
+            ))
         
         return anomalies
     
-    def _detect_night_shift_anomalies(self, work_df: pd.DataFrame) -> List[AnomalyResult]:
+    def _detect_night_shift_anomalies(self, matrix: StaffDayMatrix) -> List[AnomalyResult]:
         """夜勤頻度異常の検知（O(n)）"""
         anomalies = []
         
-        for staff, group in work_df.groupby('staff'):
-            total_shifts = len(group)
-            night_shifts = group[group['code'].str.contains('夜', na=False)].shape[0]
-            night_shift_ratio = night_shifts / total_shifts if total_shifts > 0 else 0
-            
-            if night_shift_ratio > self.thresholds["night_shift_frequency"]:
-                severity = self._calculate_severity(
-                    night_shift_ratio, 
-                    self.thresholds["night_shift_frequency"], 
-                    0.6
-                )
-                anomalies.append(AnomalyResult(
-                    anomaly_type="夜勤頻度過多",
-                    severity=severity,
-                    staff=staff,
-                    description=f"夜勤頻度が高すぎます ({night_shift_ratio:.1%})",
-                    value=night_shift_ratio,
-                    expected_range=(0, self.thresholds["night_shift_frequency"])
-                ))
+        # 勤務時間に占める「夜」を含む勤務コードの日の割合
+        night_code = np.append(np.asarray(matrix.codes.astype(str).str.contains('夜'), dtype=bool), False)
+        total_slots = matrix.slots.sum(axis=1)
+        night_slots = np.where(night_code[matrix.code], matrix.slots, 0).sum(axis=1)
+        ratios = pd.Series(night_slots / np.maximum(total_slots, 1), index=matrix.staff).sort_index()
+        
+        for staff, night_shift_ratio in ratios[ratios > self.thresholds["night_shift_frequency"]].items():
+            severity = self._calculate_severity(
+                night_shift_ratio, 
+                self.thresholds["night_shift_frequency"], 
+                0.6
+            )
+            anomalies.append(AnomalyResult(
+                anomaly_type="夜勤頻度過多",
+                severity=severity,
+                staff=staff,
+                description=f"夜勤頻度が高すぎます ({night_shift_ratio:.1%})",
+                value=night_shift_ratio,
+                expected_range=(0, self.thresholds["night_shift_frequency"])
+            ))
         
         return anomalies
     
-    def _detect_interval_violations(self, work_df: pd.DataFrame) -> List[AnomalyResult]:
-        """勤務間インターバル違反の検知（軽量版）（O(n log n)）"""
+    def _detect_interval_violations(self, matrix: StaffDayMatrix) -> List[AnomalyResult]:
+        """勤務間インターバル違反の検知（O(n)）
+
+        勤務日の終了から次の勤務日の開始までが閾値未満の回数を数える。
+        """
         anomalies = []
         
-        for staff, group in work_df.groupby('staff'):
-            # 日付でソートして勤務間インターバルを計算
-            sorted_group = group.sort_values('ds')
-            
-            violations = 0
-            total_intervals = 0
-            
-            for i in range(1, len(sorted_group)):
-                prev_end = sorted_group.iloc[i-1]['ds']
-                curr_start = sorted_group.iloc[i]['ds']
-                
-                # 簡易的な間隔計算（実際の終了時間は推定）
-                interval_hours = (curr_start - prev_end).total_seconds() / 3600
-                
-                if 0 < interval_hours < self.thresholds["interval_violation_hours"]:
-                    violations += 1
-                
-                total_intervals += 1
+        rest = matrix.rest_hours().dropna(subset=["rest_hours"])
+        rest["violation"] = (rest["rest_hours"] > 0) & (rest["rest_hours"] < self.thresholds["interval_violation_hours"])
+        counts = rest.groupby("staff", sort=True)["violation"].agg(["sum", "size"])
+        
+        for staff, (violations, total_intervals) in counts.iterrows():
+            if violations == 0:
+                continue
+            violation_rate = violations / total_intervals
             
-            if violations > 0 and total_intervals > 0:
-                violation_rate = violations / total_intervals
-                
-                if violation_rate > 0.1:  # 10%以上の違反率
-                    severity = self._calculate_severity(violation_rate, 0.1, 0.3)
-                    anomalies.append(AnomalyResult(
-                        anomaly_type="勤務間インターバル違反",
-                        severity=severity,
-                        staff=staff,
-                        description=f"勤務間インターバル違反が多発 ({violations}/{total_intervals})",
-                        value=violation_rate,
-                        expected_range=(0, 0.1)
-                    ))
+            if violation_rate > 0.1:  # 10%以上の違反率
+                severity = self._calculate_severity(violation_rate, 0.1, 0.3)
+                anomalies.append(AnomalyResult(
+                    anomaly_type="勤務間インターバル違反",
+                    severity=severity,
+                    staff=staff,
+                    description=f"勤務間インターバル違反が多発 ({violations}/{total_intervals})",
+                    value=violation_rate,
+                    expected_range=(0, 0.1)
+                ))
         
         return anomalies
     
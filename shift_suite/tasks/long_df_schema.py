@@ -0,0 +1,141 @@
+# shift_suite / tasks / long_df_schema.py
+"""
+shift_suite.tasks.long_df_schema  v1.0.0
+────────────────────────────────────────────────────────
+* ``long_df`` (ingest_excel の出力) の標準コンパクトスキーマ
+    - staff / role / employment / code / holiday_type : ``category``
+      (Parquet 上は Arrow dictionary 列)
+    - parsed_slots_count : ``int16``
+    - ds : ``datetime64[s]``
+* 1 スロット 1 行で同じ文字列が繰り返されるため、object 文字列列を
+  辞書エンコードするだけでセッションあたりのメモリが大きく減る
+* カテゴリ列で groupby する場合は ``observed=True`` を指定すること
+  (未指定だと未出現カテゴリの組合せまで展開される)
+* Parquet 保存時は (role, ds) で安定ソートし、職種ごとに別の row group に
+  書く (min/max 統計付き)。職種・期間で絞る読み込み
+  (:mod:`parquet_query`) は該当 row group だけを読む
+* カテゴリ列を前提にしない旧来の解析器へ渡すときは :func:`object_long_df`
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+LONG_DF_CATEGORY_COLUMNS: tuple[str, ...] = (
+    "staff",
+    "role",
+    "employment",
+    "code",
+    "holiday_type",
+)
+LONG_DF_SLOT_DTYPE = "int16"
+LONG_DF_DS_DTYPE = "datetime64[s]"
+# 保存時の並び順と 1 row group の最大行数
+LONG_DF_SORT_KEYS: tuple[str, ...] = ("role", "ds")
+LONG_DF_ROW_GROUP_ROWS = 65536
+
+
+def compact_long_df(
+    long_df: pd.DataFrame, *, category_columns: Iterable[str] = LONG_DF_CATEGORY_COLUMNS
+) -> pd.DataFrame:
+    """Return ``long_df`` converted to the canonical compact schema.
+
+    Columns that are missing are ignored and columns already in the target
+    dtype are left untouched, so the call is cheap to repeat.
+    """
+    if long_df.empty:
+        return long_df
+    converted: Dict[str, pd.Series] = {}
+    for col in category_columns:
+        if col in long_df.columns and not isinstance(
+            long_df[col].dtype, pd.CategoricalDtype
+        ):
+            converted[col] = long_df[col].astype("category")
+    if "parsed_slots_count" in long_df.columns and long_df["parsed_slots_count"].dtype != LONG_DF_SLOT_DTYPE:
+        slots = pd.to_numeric(long_df["parsed_slots_count"], errors="coerce").fillna(0)
+        converted["parsed_slots_count"] = slots.astype(LONG_DF_SLOT_DTYPE)
+    if "ds" in long_df.columns and long_df["ds"].dtype != LONG_DF_DS_DTYPE:
+        converted["ds"] = pd.to_datetime(long_df["ds"], errors="coerce").astype(
+            LONG_DF_DS_DTYPE
+        )
+    if not converted:
+        return long_df
+    return long_df.assign(**converted)
+
+
+def object_long_df(
+    long_df: pd.DataFrame, *, category_columns: Iterable[str] = LONG_DF_CATEGORY_COLUMNS
+) -> pd.DataFrame:
+    """カテゴリ列を object に戻した ``long_df`` (:func:`compact_long_df` の逆)
+
+    observed を指定せずに複数列で groupby する旧来の解析器は、カテゴリ列だと
+    未出現の組合せまで展開して NaN の群を受け取るため、その入力に使う。
+    """
+    converted = {
+        col: long_df[col].astype(object)
+        for col in category_columns
+        if col in long_df.columns and isinstance(long_df[col].dtype, pd.CategoricalDtype)
+    }
+    return long_df.assign(**converted) if converted else long_df
+
+
+def is_compact_long_df(long_df: pd.DataFrame) -> bool:
+    """``long_df`` が標準コンパクトスキーマかどうか"""
+    for col in LONG_DF_CATEGORY_COLUMNS:
+        if col in long_df.columns and not isinstance(long_df[col].dtype, pd.CategoricalDtype):
+            return False
+    if "parsed_slots_count" in long_df.columns and long_df["parsed_slots_count"].dtype != LONG_DF_SLOT_DTYPE:
+        return False
+    if "ds" in long_df.columns and long_df["ds"].dtype != LONG_DF_DS_DTYPE:
+        return False
+    return True
+
+
+def long_df_memory_bytes(long_df: pd.DataFrame) -> int:
+    """文字列の実体も含めたメモリ使用量 (bytes)"""
+    return int(long_df.memory_usage(deep=True).sum())
+
+
+def read_long_df(
+    path: Path | str, columns: Sequence[str] | None = None
+) -> pd.DataFrame:
+    """Read a persisted ``long_df`` and normalise it to the compact schema.
+
+    Files written before the compact schema (object columns) are converted
+    on load, so every consumer sees the same dtypes.
+    """
+    return compact_long_df(pd.read_parquet(path, columns=list(columns) if columns else None))
+
+
+def write_long_df(long_df: pd.DataFrame, path: Path | str) -> Path:
+    """``long_df`` をコンパクトスキーマ (Arrow dictionary 列) で Parquet 保存
+
+    行は :data:`LONG_DF_SORT_KEYS` で安定ソートし、職種が変わるところで
+    row group を区切る (1 職種が :data:`LONG_DF_ROW_GROUP_ROWS` を超える
+    場合はさらに分割)。
+    """
+    target = Path(path)
+    df = compact_long_df(long_df)
+    keys = [k for k in LONG_DF_SORT_KEYS if k in df.columns]
+    if keys and not df.empty:
+        df = df.sort_values(keys, kind="stable", na_position="last").reset_index(drop=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    bounds = [0, len(df)]
+    if "role" in df.columns and not df.empty:
+        codes = (
+            df["role"].cat.codes.to_numpy()
+            if isinstance(df["role"].dtype, pd.CategoricalDtype)
+            else pd.factorize(df["role"])[0]
+        )
+        bounds = [0, *(np.flatnonzero(codes[1:] != codes[:-1]) + 1).tolist(), len(df)]
+    with pq.ParquetWriter(target, table.schema, write_statistics=True) as writer:
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            writer.write_table(table.slice(start, stop - start), row_group_size=LONG_DF_ROW_GROUP_ROWS)
+    return target
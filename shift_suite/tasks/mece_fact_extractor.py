@@ -24,6 +24,7 @@ import numpy as np
 
 from .constants import STATISTICAL_THRESHOLDS, DEFAULT_SLOT_MINUTES
 from .utils import validate_and_convert_slot_minutes, safe_slot_calculation
+from .staff_days import staff_day_matrix
 
 log = logging.getLogger(__name__)
 
@@ -178,35 +179,27 @@ class MECEFactExtractor:
             "跨ぎ制約": []
         }
         
-        # スタッフ別の連続勤務パターン分析
-        for staff in long_df['staff'].unique():
-            if not staff:
+        # スタッフ別の連続勤務パターン分析 (スタッフ × 日の行列の連勤から)
+        matrix = staff_day_matrix(long_df, self.slot_minutes)
+        runs = matrix.streaks().groupby("staff", sort=False)["length"]
+        run_stats = pd.DataFrame({"max": runs.max(), "mean": runs.mean(), "count": runs.size()})
+        worked_slots = pd.Series(matrix.slots.sum(axis=1), index=matrix.staff)
+        
+        for staff in matrix.staff:
+            if not staff or staff not in run_stats.index:
                 continue
-                
-            staff_df = long_df[
-                (long_df['staff'] == staff) & 
-                (long_df['parsed_slots_count'] > 0)
-            ].sort_values('ds')
-            
-            if len(staff_df) < self.sample_size_minimum:
+            if worked_slots[staff] < self.sample_size_minimum:
                 continue
             
-            # 連続勤務日数の分析
-            staff_df['date'] = staff_df['ds'].dt.date
-            consecutive_days = self._calculate_consecutive_days(staff_df['date'].unique())
-            
-            if consecutive_days:
-                max_consecutive = max(consecutive_days)
-                avg_consecutive = np.mean(consecutive_days)
-                
-                facts["連続勤務制約"].append({
-                    "スタッフ": staff,
-                    "最大連続勤務日数": max_consecutive,
-                    "平均連続勤務日数": round(avg_consecutive, 1),
-                    "制約種別": "実績ベース上限",
-                    "事実性": "実績確認済み",
-                    "確信度": min(1.0, len(consecutive_days) / 10)
-                })
+            stats = run_stats.loc[staff]
+            facts["連続勤務制約"].append({
+                "スタッフ": staff,
+                "最大連続勤務日数": int(stats["max"]),
+                "平均連続勤務日数": round(float(stats["mean"]), 1),
+                "制約種別": "実績ベース上限",
+                "事実性": "実績確認済み",
+                "確信度": min(1.0, int(stats["count"]) / 10)
+            })
         
         return facts
     
@@ -474,25 +467,6 @@ class MECEFactExtractor:
         
         return facts
     
-    def _calculate_consecutive_days(self, dates: np.ndarray) -> List[int]:
-        """連続勤務日数の計算"""
-        if len(dates) == 0:
-            return []
-        
-        dates = sorted(dates)
-        consecutive_runs = []
-        current_run = 1
-        
-        for i in range(1, len(dates)):
-            if (dates[i] - dates[i-1]).days == 1:
-                current_run += 1
-            else:
-                consecutive_runs.append(current_run)
-                current_run = 1
-        
-        consecutive_runs.append(current_run)
-        return consecutive_runs
-    
     def _format_for_human_confirmation(self, facility_facts: Dict) -> Dict[str, Any]:
         """人間確認用のMECE構造化フォーマット"""
         formatted = {
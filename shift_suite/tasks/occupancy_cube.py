@@ -0,0 +1,131 @@
+# shift_suite / tasks / occupancy_cube.py
+"""
+shift_suite.tasks.occupancy_cube  v1.0.0
+────────────────────────────────────────────────────────
+* 勤務レコードから (グループ × 時間帯 × 日付) の在籍人数キューブを 1 パスで作る
+    - グループ軸: "ALL" (全体) と職種・雇用形態などの任意の列
+    - 値: そのセルに勤務していたスタッフのユニーク数
+      (``drop_duplicates`` + ``pivot_table(aggfunc="nunique")`` と同値)
+* build_heatmap は職種・雇用形態ごとに long_df を再フィルタ・再ピボット
+  していたが、キューブから切り出すだけでよくなる
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger(__name__)
+
+ALL_GROUP = "ALL"
+
+
+def _factorize_sorted(values: pd.Series) -> tuple[np.ndarray, list]:
+    """NaN を -1 とした昇順コードと、観測された値のリスト"""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), sort=True)
+    return codes.astype(np.int64), list(uniques)
+
+
+@dataclass
+class OccupancyCube:
+    """Unique-staff counts per ``(group, time, date)`` for several groupings."""
+
+    time_labels: pd.Index
+    date_labels: List[str]
+    keys: Dict[str, list] = field(default_factory=dict)
+    counts: Dict[str, np.ndarray] = field(default_factory=dict)
+    present: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def groups(self, dim: str) -> list:
+        """``dim`` で観測されたキー (昇順)"""
+        return list(self.keys.get(dim, []))
+
+    def frame(
+        self, dim: str = ALL_GROUP, key=None, *, dates: Sequence[str] | None = None
+    ) -> pd.DataFrame:
+        """Slice one group as a ``time × date`` frame.
+
+        Without ``dates`` only the dates on which the group has any record are
+        returned, matching a ``pivot_table`` over the filtered rows.  With
+        ``dates`` the columns are reindexed to that list and filled with 0.
+        """
+        if dim == ALL_GROUP:
+            g = 0
+        else:
+            try:
+                g = self.keys[dim].index(key)
+            except (KeyError, ValueError):
+                g = -1
+        if g < 0:
+            block = np.zeros((len(self.time_labels), 0), dtype=np.int64)
+            cols: List[str] = []
+        else:
+            mask = self.present[dim][g]
+            block = self.counts[dim][g][:, mask]
+            cols = [d for d, m in zip(self.date_labels, mask) if m]
+        df = pd.DataFrame(block, index=self.time_labels, columns=pd.Index(cols, name="date_lbl"))
+        if dates is not None:
+            df = df.reindex(columns=list(dates), fill_value=0)
+        return df
+
+
+def build_occupancy_cube(
+    work_df: pd.DataFrame,
+    time_labels: Iterable[str],
+    *,
+    dims: Sequence[str] = ("role", "employment"),
+    staff_col: str = "staff",
+    time_col: str = "time",
+    date_col: str = "date_lbl",
+) -> OccupancyCube:
+    """Count unique staff per ``(group, time, date)`` for ALL and each of ``dims``.
+
+    ``work_df`` must already carry ``time`` (``HH:MM``) and ``date_lbl``
+    (``YYYY-MM-DD``) columns.  Rows whose time is not in ``time_labels`` still
+    mark their date as present but are not counted, like a pivot followed by
+    ``reindex(index=time_labels)``.
+    """
+    time_index = pd.Index(time_labels, name="time")
+    date_codes, date_labels = _factorize_sorted(work_df[date_col])
+    cube = OccupancyCube(time_labels=time_index, date_labels=[str(d) for d in date_labels])
+    if work_df.empty:
+        cube.keys[ALL_GROUP] = [ALL_GROUP]
+        cube.counts[ALL_GROUP] = np.zeros((1, len(time_index), 0), dtype=np.int64)
+        cube.present[ALL_GROUP] = np.zeros((1, 0), dtype=bool)
+        return cube
+
+    t_codes = time_index.get_indexer(work_df[time_col].to_numpy()).astype(np.int64)
+    staff_codes, staff_keys = _factorize_sorted(work_df[staff_col])
+    n_t, n_d, n_s = len(time_index), len(date_labels), max(len(staff_keys), 1)
+
+    def _count(group_codes: np.ndarray, n_g: int) -> tuple[np.ndarray, np.ndarray]:
+        ok = (group_codes >= 0) & (date_codes >= 0) & (staff_codes >= 0)
+        present = np.zeros((n_g, n_d), dtype=bool)
+        present[group_codes[ok], date_codes[ok]] = True
+        ok &= t_codes >= 0
+        cell = (group_codes[ok] * n_t + t_codes[ok]) * n_d + date_codes[ok]
+        # (セル, スタッフ) の組をユニーク化してからセルごとに数える
+        pairs = np.unique(cell * n_s + staff_codes[ok])
+        counts = np.bincount(pairs // n_s, minlength=n_g * n_t * n_d)
+        return counts.reshape(n_g, n_t, n_d).astype(np.int64), present
+
+    cube.keys[ALL_GROUP] = [ALL_GROUP]
+    cube.counts[ALL_GROUP], cube.present[ALL_GROUP] = _count(
+        np.zeros(len(work_df), dtype=np.int64), 1
+    )
+    for dim in dims:
+        if dim not in work_df.columns:
+            continue
+        group_codes, group_keys = _factorize_sorted(work_df[dim])
+        cube.keys[dim] = group_keys
+        cube.counts[dim], cube.present[dim] = _count(group_codes, len(group_keys))
+    log.debug(
+        f"[occupancy_cube] {len(work_df)} 行 → "
+        + ", ".join(f"{d}:{len(k)}" for d, k in cube.keys.items())
+        + f" × {n_t} 時間帯 × {n_d} 日"
+    )
+    return cube
@@ -0,0 +1,260 @@
+# shift_suite / tasks / parquet_query.py
+"""
+shift_suite.tasks.parquet_query  v1.0.0
+────────────────────────────────────────────────────────
+* ダッシュボード用の絞り込み読み込み (述語と列を Parquet 読み込みに渡す)
+    - 縦持ち (long_df / intermediate_data.parquet):
+      職種・雇用形態・期間の述語をフッターの row group 統計 (min/max) で
+      評価し、該当しうる row group だけを読んでから行を絞る
+      (write_long_df が (role, ds) 順・職種ごとに保存)。
+      pyarrow.dataset は dictionary 列 (category) の統計で row group を
+      間引かないため、row group の選択はここで行う
+    - 横持ち (heat_*.parquet / need_per_date_slot*.parquet):
+      スキーマだけを見て期間内の日付列を選び、その列だけを読む
+* ``cache`` に FrameCache を渡すと (ファイル署名, 述語, 列) 単位でキャッシュする
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from .constants import SUMMARY5
+from .frame_cache import FrameCache
+from .long_df_schema import compact_long_df
+from .utils import _parse_as_date
+
+log = logging.getLogger(__name__)
+
+DateLike = str | dt.date | dt.datetime | pd.Timestamp
+
+
+def _as_list(values: str | Iterable[str] | None) -> List[str] | None:
+    if values is None:
+        return None
+    return [values] if isinstance(values, str) else [str(v) for v in values]
+
+
+def _timestamp_scalar(value: DateLike, typ: pa.DataType) -> pa.Scalar:
+    ts = pd.Timestamp(value)
+    if pa.types.is_timestamp(typ):
+        if typ.tz is not None and ts.tzinfo is None:
+            ts = ts.tz_localize(typ.tz)
+        return pa.scalar(ts.to_pydatetime(), type=typ)
+    if pa.types.is_date(typ):
+        return pa.scalar(ts.date(), type=typ)
+    return pa.scalar(ts.isoformat())
+
+
+def build_filter(
+    schema: pa.Schema,
+    *,
+    roles: str | Iterable[str] | None = None,
+    employments: str | Iterable[str] | None = None,
+    start: DateLike | None = None,
+    end: DateLike | None = None,
+    date_column: str = "ds",
+) -> pc.Expression | None:
+    """Build a dataset filter for role / employment / ``[start, end]`` date predicates.
+
+    ``end`` is inclusive of the whole day when given as a date (``2024-04-30``
+    keeps rows up to ``2024-04-30 23:59``).  Predicates on columns missing from
+    ``schema`` are ignored.
+    """
+    expr: pc.Expression | None = None
+
+    def _and(e: pc.Expression) -> None:
+        nonlocal expr
+        expr = e if expr is None else expr & e
+
+    for col, values in (("role", _as_list(roles)), ("employment", _as_list(employments))):
+        if values is not None and col in schema.names:
+            _and(pc.field(col).isin(values))
+    if date_column in schema.names:
+        typ = schema.field(date_column).type
+        if start is not None:
+            _and(pc.field(date_column) >= _timestamp_scalar(start, typ))
+        if end is not None:
+            end_ts = pd.Timestamp(end)
+            if end_ts == end_ts.normalize() and pa.types.is_timestamp(typ):
+                _and(pc.field(date_column) < _timestamp_scalar(end_ts + pd.Timedelta(days=1), typ))
+            else:
+                _and(pc.field(date_column) <= _timestamp_scalar(end_ts, typ))
+    return expr
+
+
+def _variant(kind: str, **params: Any) -> str:
+    return kind + ":" + repr(sorted((k, v) for k, v in params.items() if v is not None))
+
+
+def query_long_df(
+    path: Path | str,
+    *,
+    roles: str | Iterable[str] | None = None,
+    employments: str | Iterable[str] | None = None,
+    start: DateLike | None = None,
+    end: DateLike | None = None,
+    columns: Sequence[str] | None = None,
+    cache: FrameCache | None = None,
+) -> pd.DataFrame:
+    """Read the rows of a persisted ``long_df`` matching the predicates.
+
+    Only the requested ``columns`` and the row groups whose statistics can
+    match are read; the result uses the compact long_df schema.
+    """
+    fp = Path(path)
+
+    def _read(target: Path) -> pd.DataFrame:
+        pf = pq.ParquetFile(target)
+        schema = pf.schema_arrow
+        expr = build_filter(schema, roles=roles, employments=employments, start=start, end=end)
+        groups = matching_row_groups(pf, roles=roles, employments=employments, start=start, end=end)
+        cols = [c for c in columns if c in schema.names] if columns is not None else None
+        read_cols = None
+        if cols is not None:
+            # 述語に使う列も読んでから落とす
+            used = [c for c in ("role", "employment", "ds") if c in schema.names]
+            read_cols = list(dict.fromkeys([*cols, *used]))
+        table = pf.read_row_groups(groups, columns=read_cols, use_pandas_metadata=True)
+        if expr is not None:
+            table = table.filter(expr)
+        if cols is not None:
+            table = table.select(cols)
+        return compact_long_df(table.to_pandas())
+
+    if cache is None:
+        return _read(fp)
+    key = _variant(
+        "long_df",
+        roles=_as_list(roles),
+        employments=_as_list(employments),
+        start=str(start) if start is not None else None,
+        end=str(end) if end is not None else None,
+        columns=list(columns) if columns is not None else None,
+    )
+    return cache.get_or_read(fp, key, _read)
+
+
+def wide_date_columns(
+    path: Path | str, *, start: DateLike | None = None, end: DateLike | None = None
+) -> List[str]:
+    """横持ちファイルの日付列のうち ``[start, end]`` に入るもの (スキーマのみ読む)"""
+    names = pq.read_schema(path).names
+    lo = pd.Timestamp(start).date() if start is not None else None
+    hi = pd.Timestamp(end).date() if end is not None else None
+    out: List[str] = []
+    for name in names:
+        if name in SUMMARY5:
+            continue
+        day = _parse_as_date(name)
+        if day is None:
+            continue
+        if (lo is None or day >= lo) and (hi is None or day <= hi):
+            out.append(name)
+    return out
+
+
+def read_wide_slice(
+    path: Path | str,
+    *,
+    start: DateLike | None = None,
+    end: DateLike | None = None,
+    extra_columns: Sequence[str] = SUMMARY5,
+    cache: FrameCache | None = None,
+) -> pd.DataFrame:
+    """Read a ``time × date`` file keeping only dates in ``[start, end]``.
+
+    ``extra_columns`` (the heatmap summary columns by default) are kept when
+    present.  The time index is restored from the pandas metadata.
+    """
+    fp = Path(path)
+    names = set(pq.read_schema(fp).names)
+    cols = wide_date_columns(fp, start=start, end=end) + [c for c in extra_columns if c in names]
+    if cache is not None:
+        return cache.read_parquet(fp, columns=cols)
+    return pd.read_parquet(fp, columns=cols)
+
+
+def _day_bounds(start: DateLike | None, end: DateLike | None) -> Tuple[pd.Timestamp | None, pd.Timestamp | None, bool]:
+    """``(下限, 上限, 上限を含むか)``。日付だけの ``end`` はその日の終わりまで"""
+    lo = pd.Timestamp(start) if start is not None else None
+    if end is None:
+        return lo, None, True
+    hi = pd.Timestamp(end)
+    if hi == hi.normalize():
+        return lo, hi + pd.Timedelta(days=1), False
+    return lo, hi, True
+
+
+def _overlaps(stat_min: Any, stat_max: Any, lo: Any, hi: Any, hi_inclusive: bool = True) -> bool:
+    if lo is not None and stat_max < lo:
+        return False
+    if hi is not None and (stat_min > hi or (not hi_inclusive and stat_min >= hi)):
+        return False
+    return True
+
+
+def matching_row_groups(
+    pf: pq.ParquetFile,
+    *,
+    roles: str | Iterable[str] | None = None,
+    employments: str | Iterable[str] | None = None,
+    start: DateLike | None = None,
+    end: DateLike | None = None,
+) -> List[int]:
+    """Indices of the row groups whose min/max statistics can satisfy the predicates.
+
+    Row groups without statistics for a predicate column are always kept.
+    """
+    md = pf.metadata
+    col_index: Dict[str, int] = {md.schema.column(i).name: i for i in range(md.num_columns)}
+    value_sets = {
+        col: sorted(values)
+        for col, values in (("role", _as_list(roles)), ("employment", _as_list(employments)))
+        if values is not None and col in col_index
+    }
+    lo, hi, hi_inclusive = _day_bounds(start, end)
+    check_ds = "ds" in col_index and (lo is not None or hi is not None)
+
+    def _stats(rg, col: str):
+        st = rg.column(col_index[col]).statistics
+        return (st.min, st.max) if st is not None and st.has_min_max else None
+
+    groups: List[int] = []
+    for i in range(md.num_row_groups):
+        rg = md.row_group(i)
+        keep = True
+        for col, values in value_sets.items():
+            mm = _stats(rg, col)
+            if mm is not None and not any(mm[0] <= v <= mm[1] for v in values):
+                keep = False
+                break
+        if keep and check_ds:
+            mm = _stats(rg, "ds")
+            if mm is not None:
+                try:
+                    keep = _overlaps(
+                        pd.Timestamp(mm[0]),
+                        pd.Timestamp(mm[1]),
+                        lo,
+                        hi,
+                        hi_inclusive,
+                    )
+                except (TypeError, ValueError):
+                    keep = True
+        if keep:
+            groups.append(i)
+    return groups
+
+
+def row_groups_read(path: Path | str, **predicates: Any) -> tuple[int, int]:
+    """``(読まれる row group 数, 全 row group 数)``: 述語による間引きの確認用"""
+    pf = pq.ParquetFile(path)
+    return len(matching_row_groups(pf, **predicates)), pf.metadata.num_row_groups
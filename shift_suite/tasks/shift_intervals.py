@@ -0,0 +1,164 @@
+# shift_suite / tasks / shift_intervals.py
+"""
+shift_suite.tasks.shift_intervals  v1.0.0
+────────────────────────────────────────────────────────
+* 勤務区間テーブル (1 セル = 1 行) と、スロット単位 ``long_df`` への遅延展開
+    - 列: staff / role / employment / date / code / start / end /
+      holiday_type / parsed_slots_count
+    - ``start`` は区間の先頭スロット、``end`` は排他的終端
+      (= 最終スロット + slot_minutes)
+    - 時刻を持たない休暇コード等は ``[date 0:00, date 0:00 + slot)`` の
+      1 スロット区間として保持する (long_df と同じ扱い)
+* ``ingest_excel(..., as_intervals=True)`` が直接このテーブルを返す。
+  スロット単位の占有が必要なヒートマップ系だけ :func:`expand_intervals`
+  で展開すればよく、日単位・区間単位の分析は区間のまま処理できる
+* ingest 順の区間テーブルを展開した結果は ``ingest_excel`` の
+  ``long_df`` と行順まで一致する
+"""
+
+from __future__ import annotations
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .constants import DEFAULT_SLOT_MINUTES
+from .long_df_schema import compact_long_df
+
+log = logging.getLogger(__name__)
+
+INTERVAL_COLUMNS: tuple[str, ...] = (
+    "staff",
+    "role",
+    "employment",
+    "date",
+    "code",
+    "start",
+    "end",
+    "holiday_type",
+    "parsed_slots_count",
+)
+LONG_DF_COLUMNS: tuple[str, ...] = (
+    "ds",
+    "staff",
+    "role",
+    "employment",
+    "code",
+    "holiday_type",
+    "parsed_slots_count",
+)
+_RUN_KEYS = ["staff", "role", "employment", "code", "holiday_type", "parsed_slots_count"]
+
+
+def is_interval_table(df: pd.DataFrame) -> bool:
+    """``df`` が区間テーブル (``start`` / ``end`` 列あり, ``ds`` 列なし) か"""
+    return {"start", "end"}.issubset(df.columns) and "ds" not in df.columns
+
+
+def compact_intervals(intervals: pd.DataFrame) -> pd.DataFrame:
+    """区間テーブルを long_df と同じコンパクトスキーマに揃える"""
+    converted = compact_long_df(intervals)
+    dt_cols = {
+        c: "datetime64[s]"
+        for c in ("date", "start", "end")
+        if c in converted.columns and converted[c].dtype != "datetime64[s]"
+    }
+    return converted.astype(dt_cols) if dt_cols else converted
+
+
+def intervals_from_long_df(
+    long_df: pd.DataFrame, slot_minutes: int = DEFAULT_SLOT_MINUTES
+) -> pd.DataFrame:
+    """Collapse a per-slot ``long_df`` into contiguous shift intervals.
+
+    Consecutive slots of the same staff / code / holiday type are merged into
+    one ``[start, end)`` interval.  Use this for ``long_df`` files persisted
+    before the interval table existed; fresh data should come straight from
+    ``ingest_excel(..., as_intervals=True)``.
+    """
+    if long_df.empty:
+        return pd.DataFrame(columns=list(INTERVAL_COLUMNS))
+    keys = [k for k in _RUN_KEYS if k in long_df.columns]
+    group_id = long_df.groupby(keys, observed=True, sort=False, dropna=False).ngroup().to_numpy()
+    ds = pd.to_datetime(long_df["ds"]).to_numpy().astype("datetime64[s]")
+    order = np.lexsort((ds, group_id))
+    gid_sorted, ds_sorted = group_id[order], ds[order]
+
+    step = np.timedelta64(slot_minutes * 60, "s")
+    new_run = np.ones(len(order), dtype=bool)
+    new_run[1:] = (gid_sorted[1:] != gid_sorted[:-1]) | (ds_sorted[1:] - ds_sorted[:-1] != step)
+    run_starts = np.flatnonzero(new_run)
+    run_ends = np.append(run_starts[1:], len(order)) - 1
+
+    first_rows = order[run_starts]
+    intervals = long_df.iloc[first_rows][keys].reset_index(drop=True)
+    start = ds_sorted[run_starts]
+    intervals["start"] = start
+    intervals["end"] = ds_sorted[run_ends] + step
+    intervals["date"] = start.astype("datetime64[D]").astype("datetime64[s]")
+    intervals = intervals.sort_values(["start", "staff"], kind="stable").reset_index(drop=True)
+    cols = [c for c in INTERVAL_COLUMNS if c in intervals.columns]
+    return compact_intervals(intervals[cols])
+
+
+def expand_intervals(
+    intervals: pd.DataFrame,
+    slot_minutes: int = DEFAULT_SLOT_MINUTES,
+    *,
+    compact: bool = True,
+) -> pd.DataFrame:
+    """Materialise per-slot ``long_df`` rows from an interval table.
+
+    Rows are generated in interval order and then sorted by ``ds`` exactly as
+    ``ingest_excel`` does, so expanding the ingest-ordered table reproduces
+    its ``long_df`` row for row.
+    """
+    if intervals.empty:
+        return pd.DataFrame(columns=list(LONG_DF_COLUMNS))
+    step = np.timedelta64(slot_minutes * 60, "s")
+    start = pd.to_datetime(intervals["start"]).to_numpy().astype("datetime64[s]")
+    end = pd.to_datetime(intervals["end"]).to_numpy().astype("datetime64[s]")
+    n_slots = np.maximum((end - start) // step, 1).astype(np.int64)
+
+    rep = np.repeat(np.arange(len(intervals)), n_slots)
+    within = np.arange(int(n_slots.sum()), dtype=np.int64) - np.repeat(
+        np.cumsum(n_slots) - n_slots, n_slots
+    )
+    data = {"ds": start[rep] + within * step}
+    for col in LONG_DF_COLUMNS[1:]:
+        if col in intervals.columns:
+            data[col] = intervals[col].take(rep).reset_index(drop=True)
+    long_df = pd.DataFrame(data)
+    long_df = long_df.sort_values("ds").reset_index(drop=True)
+    log.debug(f"区間 {len(intervals)} 件を {len(long_df)} スロット行に展開しました")
+    return compact_long_df(long_df) if compact else long_df
+
+
+def interval_days(intervals: pd.DataFrame) -> pd.DataFrame:
+    """Split intervals at midnight: one row per (interval, calendar day).
+
+    Adds ``day`` (the calendar day), ``day_start`` and ``day_end`` (the part
+    of the interval falling on that day).  Per-day minima / maxima computed on
+    this frame equal the ones computed on the expanded ``long_df``.
+    """
+    if intervals.empty:
+        return intervals.assign(day=[], day_start=[], day_end=[])
+    start = pd.to_datetime(intervals["start"]).to_numpy().astype("datetime64[s]")
+    end = pd.to_datetime(intervals["end"]).to_numpy().astype("datetime64[s]")
+    one_day = np.timedelta64(1, "D")
+    first_day = start.astype("datetime64[D]")
+    # 排他的終端なので 1 秒戻した時刻の日付が最終日
+    last_day = (np.maximum(end, start + np.timedelta64(1, "s")) - np.timedelta64(1, "s")).astype("datetime64[D]")
+    n_days = (last_day - first_day).astype(np.int64) + 1
+
+    rep = np.repeat(np.arange(len(intervals)), n_days)
+    within = np.arange(int(n_days.sum()), dtype=np.int64) - np.repeat(
+        np.cumsum(n_days) - n_days, n_days
+    )
+    day = (first_day[rep] + within * one_day).astype("datetime64[s]")
+    out = intervals.take(rep).reset_index(drop=True)
+    out["day"] = day
+    out["day_start"] = np.maximum(start[rep], day)
+    out["day_end"] = np.minimum(end[rep], day + one_day)
+    return out
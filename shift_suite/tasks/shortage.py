@@ -9,8 +9,9 @@ shortage.py – v2.7.0 (最終修正版)
 from __future__ import annotations
 
 import datetime as dt
+from fnmatch import fnmatch
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Set, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Set, Tuple
 
 import json
 
@@ -19,6 +20,8 @@ import pandas as pd
 
 from .. import config
 from .constants import SUMMARY5  # 🔧 修正: 動的値使用
+from .holiday_detection import holiday_mask, load_meta_holidays
+from .shortage_kernel import SHORTAGE_ENGINES, group_shortage_rows, sum_need_frames
 from .utils import _parse_as_date, gen_labels, log, save_df_parquet, write_meta
 
 # 不足分析専用ログ
@@ -538,6 +541,115 @@ def detect_period_dependency_risk(period_days, total_shortage):
 
 
 
+def _frame_paths(
+    out_dir_path: Path, pattern: str, frames: Mapping[str, pd.DataFrame] | None
+) -> List[Path]:
+    """``pattern`` に合うヒートマップ系ファイル (メモリ上のフレームを優先)"""
+    if frames is not None:
+        return [out_dir_path / name for name in sorted(frames) if fnmatch(name, pattern)]
+    return sorted(out_dir_path.glob(pattern))
+
+
+def _has_frame(fp: Path, frames: Mapping[str, pd.DataFrame] | None) -> bool:
+    return (frames is not None and fp.name in frames) or fp.exists()
+
+
+def _read_frame(fp: Path, frames: Mapping[str, pd.DataFrame] | None) -> pd.DataFrame:
+    """メモリ上にあればそのコピー、なければ parquet を読む"""
+    if frames is not None and fp.name in frames:
+        return frames[fp.name].copy()
+    return pd.read_parquet(fp)
+
+
+def _group_frames(
+    out_dir_path: Path,
+    heat_paths: Iterable[Path],
+    heat_prefix: str,
+    need_prefix: str,
+    frames: Mapping[str, pd.DataFrame] | None,
+) -> Iterator[Tuple[str, pd.DataFrame | None, pd.DataFrame | None]]:
+    """group_shortage_rows 用に ``(名前, ヒートマップ, Need)`` を順に返す
+
+    読み込みに失敗したヒートマップは ``None``、Need ファイルがない/読めない
+    場合も ``None`` (ヒートマップの need 列で按分計算) とする。カーネルは
+    フレームを書き換えないため、メモリ上のフレームはコピーせずに渡す。
+    """
+
+    def _load(fp: Path) -> pd.DataFrame:
+        if frames is not None and fp.name in frames:
+            return frames[fp.name]
+        return pd.read_parquet(fp)
+
+    for fp in heat_paths:
+        name = fp.stem.replace(heat_prefix, "")
+        try:
+            heat_df = _load(fp)
+        except Exception as e:
+            log.warning(f"[shortage] ヒートマップ '{fp.name}' の読み込みエラー: {e}")
+            heat_df = None
+        safe_name = name.replace(" ", "_").replace("/", "_").replace("\\", "_")
+        need_fp = out_dir_path / f"{need_prefix}{safe_name}.parquet"
+        need_df = None
+        if _has_frame(need_fp, frames):
+            try:
+                need_df = _load(need_fp)
+            except Exception as e:
+                log.warning(f"[shortage] {name}: Needファイル読み込みエラー: {e}. 按分計算を使用します。")
+        else:
+            log.warning(f"[shortage] {name}: Needファイルが見つかりません（{need_fp}）。按分計算を使用します。")
+        yield name, heat_df, need_df
+
+
+COST_SUMMARY_FILES = ("shortage_role_summary.parquet", "shortage_employment_summary.parquet")
+
+
+def add_cost_estimates(
+    summary_df: pd.DataFrame,
+    *,
+    wage_direct: float = 0.0,
+    wage_temp: float = 0.0,
+    penalty_per_lack: float = 0.0,
+) -> pd.DataFrame:
+    """過剰・不足時間 (``excess_h`` / ``lack_h``) から概算コスト列を付ける"""
+    return summary_df.assign(
+        estimated_excess_cost=lambda d: d.get("excess_h", 0) * wage_direct,
+        estimated_lack_cost_if_temporary_staff=lambda d: d.get("lack_h", 0)
+        * wage_temp,
+        estimated_lack_penalty_cost=lambda d: d.get("lack_h", 0) * penalty_per_lack,
+    )
+
+
+def refresh_cost_estimates(
+    out_dir: Path | str,
+    *,
+    wage_direct: float = 0.0,
+    wage_temp: float = 0.0,
+    penalty_per_lack: float = 0.0,
+) -> List[Path]:
+    """Recompute the cost columns of the role / employment summaries in place.
+
+    Only the wage-dependent columns change, so a new wage does not require
+    re-running :func:`shortage_and_brief`.
+    """
+    updated: List[Path] = []
+    for name in COST_SUMMARY_FILES:
+        fp = Path(out_dir) / name
+        if not fp.exists():
+            continue
+        summary_df = pd.read_parquet(fp)
+        if summary_df.empty:
+            continue
+        add_cost_estimates(
+            summary_df,
+            wage_direct=wage_direct,
+            wage_temp=wage_temp,
+            penalty_per_lack=penalty_per_lack,
+        ).to_parquet(fp, index=False)
+        updated.append(fp)
+    log.info(f"[shortage] コスト列を再計算しました: {[p.name for p in updated]}")
+    return updated
+
+
 def shortage_and_brief(
     out_dir: Path | str,
     slot: int,
@@ -548,6 +660,8 @@ def shortage_and_brief(
     wage_temp: float = 0.0,
     penalty_per_lack: float = 0.0,
     auto_detect_slot: bool = True,
+    heatmap_frames: Mapping[str, pd.DataFrame] | None = None,
+    engine: str = "numpy",
 ) -> Tuple[Path, Path] | None:
     """Run shortage analysis and KPI summary.
 
@@ -568,7 +682,17 @@ def shortage_and_brief(
         Penalty or opportunity cost per hour of shortage.
     auto_detect_slot:
         Enable automatic slot interval detection from data.
+    heatmap_frames:
+        Frames returned by ``build_heatmap`` keyed by file name
+        (``heat_ALL.parquet`` etc.).  When given they are used instead of
+        re-reading the heatmap and need files from ``out_dir``.
+    engine:
+        ``"numpy"`` (default) computes the role / employment KPIs for all
+        groups at once with :mod:`shortage_kernel`; ``"legacy"`` keeps the
+        original per-group loop.
     """
+    if engine not in SHORTAGE_ENGINES:
+        raise ValueError(f"未知の shortage エンジンです: {engine} (選択肢: {SHORTAGE_ENGINES})")
     out_dir_path = Path(out_dir)
     time_labels = gen_labels(slot)
     # 動的スロット設定: app.pyからのslot（分）を時間に変換
@@ -579,7 +703,7 @@ def shortage_and_brief(
     log.info("[shortage] v2.7.0 処理開始")
 
     try:
-        heat_all_df = pd.read_parquet(out_dir_path / "heat_ALL.parquet")
+        heat_all_df = _read_frame(out_dir_path / "heat_ALL.parquet", heatmap_frames)
     except FileNotFoundError:
         log.error("[shortage] heat_ALL.parquet が見つかりません。処理を中断します。")
         return None
@@ -595,34 +719,30 @@ def shortage_and_brief(
     need_per_date_slot_df = pd.DataFrame()
     
     # 🔧 CRITICAL FIX: 統計手法別のNeedファイルを統合して正しく読み込む
-    need_role_files = list(out_dir_path.glob("need_per_date_slot_role_*.parquet"))
+    need_role_files = _frame_paths(out_dir_path, "need_per_date_slot_role_*.parquet", heatmap_frames)
     
     if need_role_files:
         log.info(f"[shortage] ★★★ 統計手法対応: {len(need_role_files)}個の職種別Needファイルを統合します ★★★")
         
         # 全ての職種を公平に集計（複合職種も独立した職種として扱う）
-        combined_need_df = pd.DataFrame()
-        
+        role_need_frames = []
         for need_file in need_role_files:
             try:
-                role_need_df = pd.read_parquet(need_file)
-                if combined_need_df.empty:
-                    combined_need_df = role_need_df.copy()
-                else:
-                    # 同じ時間帯・日付での需要を合計
-                    combined_need_df = combined_need_df.add(role_need_df, fill_value=0)
+                role_need_df = _read_frame(need_file, heatmap_frames)
+                role_need_frames.append(role_need_df)
                 log.debug(f"[shortage] 統合: {need_file.name} (形状: {role_need_df.shape})")
             except Exception as e:
                 log.warning(f"[shortage] {need_file.name} の読み込みエラー: {e}")
-        
-        need_per_date_slot_df = combined_need_df
+
+        # 同じ時間帯・日付での需要を合計
+        need_per_date_slot_df = sum_need_frames(role_need_frames)
         log.info(f"[shortage] ★★★ 統計手法対応Need統合完了: 形状 {need_per_date_slot_df.shape} ★★★")
     else:
         # フォールバック: 従来の固定ファイル
         need_per_date_slot_fp = out_dir_path / "need_per_date_slot.parquet"
-        if need_per_date_slot_fp.exists():
+        if _has_frame(need_per_date_slot_fp, heatmap_frames):
             try:
-                need_per_date_slot_df = pd.read_parquet(need_per_date_slot_fp)
+                need_per_date_slot_df = _read_frame(need_per_date_slot_fp, heatmap_frames)
                 log.warning(
                     "[shortage] ⚠️ 職種別Needファイルが見つからないため、固定ファイルを使用 ⚠️"
                 )
@@ -660,22 +780,10 @@ def shortage_and_brief(
     # heatmap.meta.jsonから休業日情報を取得
     meta_fp = out_dir_path / "heatmap.meta.json"
     if meta_fp.exists():
-        try:
-            meta = json.loads(meta_fp.read_text(encoding="utf-8"))
-            estimated_holidays_set.update(
-                {
-                    d
-                    for d in (
-                        _parse_as_date(h) for h in meta.get("estimated_holidays", [])
-                    )
-                    if d
-                }
-            )
-            log.info(
-                f"[SHORTAGE_DEBUG] heatmap.meta.json から読み込んだ休業日数: {len(estimated_holidays_set)}"
-            )
-        except Exception as e_meta:
-            log.warning(f"[shortage] heatmap.meta.json 解析エラー: {e_meta}")
+        estimated_holidays_set.update(load_meta_holidays(out_dir_path))
+        log.info(
+            f"[SHORTAGE_DEBUG] heatmap.meta.json から読み込んだ休業日数: {len(estimated_holidays_set)}"
+        )
 
     # 全体のNeed DataFrameを構築
     if not need_per_date_slot_df.empty:
@@ -897,9 +1005,7 @@ def shortage_and_brief(
         parsed_date_list_all = [
             _parse_as_date(c) for c in staff_actual_data_all_df.columns
         ]
-        holiday_mask_all = [
-            d in estimated_holidays_set if d else False for d in parsed_date_list_all
-        ]
+        holiday_mask_all = holiday_mask(parsed_date_list_all, estimated_holidays_set).tolist()
         if any(holiday_mask_all):
             for col, is_h in zip(upper_df_all.columns, holiday_mask_all, strict=True):
                 if is_h:
@@ -984,116 +1090,127 @@ def shortage_and_brief(
     monthly_role_rows: List[Dict[str, Any]] = []
     processed_role_names_list = []
 
-    for fp_role_heatmap_item in out_dir_path.glob("heat_*.xlsx"):
-        if fp_role_heatmap_item.name == "heat_ALL.xlsx":
-            continue
+    if engine == "legacy":
+        for fp_role_heatmap_item in _frame_paths(out_dir_path, "heat_*.parquet", heatmap_frames):
+            if fp_role_heatmap_item.name == "heat_ALL.parquet":
+                continue
         
-        # 雇用形態別ファイル(heat_emp_*)は職種別処理から除外
-        if fp_role_heatmap_item.name.startswith("heat_emp_"):
-            log.info(f"[shortage] スキップ: {fp_role_heatmap_item.name} (雇用形態別データのため職種処理から除外)")
-            continue
-
-        role_name_current = fp_role_heatmap_item.stem.replace("heat_", "")
-        processed_role_names_list.append(role_name_current)
-        log.debug(
-            f"--- shortage_role.xlsx 計算デバッグ (職種: {role_name_current}) ---"
-        )
+            # 雇用形態別ファイル(heat_emp_*)は職種別処理から除外
+            if fp_role_heatmap_item.name.startswith("heat_emp_"):
+                log.info(f"[shortage] スキップ: {fp_role_heatmap_item.name} (雇用形態別データのため職種処理から除外)")
+                continue
 
-        try:
-            role_heat_current_df = pd.read_excel(fp_role_heatmap_item, index_col=0)
-        except Exception as e_role_heat:
-            log.warning(
-                f"[shortage] 職種別ヒートマップ '{fp_role_heatmap_item.name}' の読み込みエラー: {e_role_heat}"
-            )
-            role_kpi_rows.append(
-                {
-                    "role": role_name_current,
-                    "need_h": 0,
-                    "staff_h": 0,
-                    "lack_h": 0,
-                    "working_days_considered": 0,
-                    "note": "heatmap read error",
-                }
+            role_name_current = fp_role_heatmap_item.stem.replace("heat_", "")
+            processed_role_names_list.append(role_name_current)
+            log.debug(
+                f"--- shortage_role.xlsx 計算デバッグ (職種: {role_name_current}) ---"
             )
-            continue
 
-        if "need" not in role_heat_current_df.columns:
-            log.warning(
-                f"[shortage] 職種 '{role_name_current}' のヒートマップに 'need' 列が不足。KPI計算スキップ。"
-            )
-            role_kpi_rows.append(
-                {
-                    "role": role_name_current,
-                    "need_h": 0,
-                    "staff_h": 0,
-                    "lack_h": 0,
-                    "working_days_considered": 0,
-                    "note": "missing need column",
-                }
-            )
-            continue
-        role_need_per_time_series_orig_for_role = (
-            role_heat_current_df["need"]
-            .reindex(index=time_labels)
-            .fillna(0)
-            .clip(lower=0)
-        )
+            try:
+                role_heat_current_df = _read_frame(fp_role_heatmap_item, heatmap_frames)
+            except Exception as e_role_heat:
+                log.warning(
+                    f"[shortage] 職種別ヒートマップ '{fp_role_heatmap_item.name}' の読み込みエラー: {e_role_heat}"
+                )
+                role_kpi_rows.append(
+                    {
+                        "role": role_name_current,
+                        "need_h": 0,
+                        "staff_h": 0,
+                        "lack_h": 0,
+                        "working_days_considered": 0,
+                        "note": "heatmap read error",
+                    }
+                )
+                continue
 
-        role_date_columns_list = [
-            str(col)
-            for col in role_heat_current_df.columns
-            if col not in SUMMARY5 and _parse_as_date(str(col)) is not None
-        ]
-        if not role_date_columns_list:
-            log.warning(
-                f"[shortage] 職種 '{role_name_current}' のヒートマップに日付列がありません。KPI計算をスキップします。"
-            )
-            role_kpi_rows.append(
-                {
-                    "role": role_name_current,
-                    "need_h": 0,
-                    "staff_h": 0,
-                    "lack_h": 0,
-                    "working_days_considered": 0,
-                    "note": "no date columns",
-                }
+            if "need" not in role_heat_current_df.columns:
+                log.warning(
+                    f"[shortage] 職種 '{role_name_current}' のヒートマップに 'need' 列が不足。KPI計算スキップ。"
+                )
+                role_kpi_rows.append(
+                    {
+                        "role": role_name_current,
+                        "need_h": 0,
+                        "staff_h": 0,
+                        "lack_h": 0,
+                        "working_days_considered": 0,
+                        "note": "missing need column",
+                    }
+                )
+                continue
+            role_need_per_time_series_orig_for_role = (
+                role_heat_current_df["need"]
+                .reindex(index=time_labels)
+                .fillna(0)
+                .clip(lower=0)
             )
-            continue
 
-        role_staff_actual_data_df = (
-            role_heat_current_df[role_date_columns_list]
-            .copy()
-            .reindex(index=time_labels)
-            .fillna(0)
-        )
+            role_date_columns_list = [
+                str(col)
+                for col in role_heat_current_df.columns
+                if col not in SUMMARY5 and _parse_as_date(str(col)) is not None
+            ]
+            if not role_date_columns_list:
+                log.warning(
+                    f"[shortage] 職種 '{role_name_current}' のヒートマップに日付列がありません。KPI計算をスキップします。"
+                )
+                role_kpi_rows.append(
+                    {
+                        "role": role_name_current,
+                        "need_h": 0,
+                        "staff_h": 0,
+                        "lack_h": 0,
+                        "working_days_considered": 0,
+                        "note": "no date columns",
+                    }
+                )
+                continue
 
-        parsed_role_dates = [
-            _parse_as_date(c) for c in role_staff_actual_data_df.columns
-        ]
-        holiday_mask_role = [
-            d in estimated_holidays_set if d else False for d in parsed_role_dates
-        ]
+            role_staff_actual_data_df = (
+                role_heat_current_df[role_date_columns_list]
+                .copy()
+                .reindex(index=time_labels)
+                .fillna(0)
+            )
 
-        # need_df_role の構築ロジックを修正 - 職種別実際のNeedファイルを使用
-        log.info(f"[shortage] {role_name_current}: 職種別の実際のNeedファイルから正確な計算を行います。")
+            parsed_role_dates = [
+                _parse_as_date(c) for c in role_staff_actual_data_df.columns
+            ]
+            holiday_mask_role = holiday_mask(parsed_role_dates, estimated_holidays_set).tolist()
+
+            # need_df_role の構築ロジックを修正 - 職種別実際のNeedファイルを使用
+            log.info(f"[shortage] {role_name_current}: 職種別の実際のNeedファイルから正確な計算を行います。")
         
-        # 職種別詳細Needファイルを読み込み
-        role_safe_name = role_name_current.replace(' ', '_').replace('/', '_').replace('\\', '_')
-        role_need_file = out_dir_path / f"need_per_date_slot_role_{role_safe_name}.parquet"
+            # 職種別詳細Needファイルを読み込み
+            role_safe_name = role_name_current.replace(' ', '_').replace('/', '_').replace('\\', '_')
+            role_need_file = out_dir_path / f"need_per_date_slot_role_{role_safe_name}.parquet"
         
-        if role_need_file.exists():
-            try:
-                need_df_role = pd.read_parquet(role_need_file)
-                # インデックスと列を適切に調整
-                need_df_role = need_df_role.reindex(index=time_labels, fill_value=0)
-                # 実績データと同じ列（日付）に調整
-                common_columns = set(need_df_role.columns).intersection(set(role_staff_actual_data_df.columns))
-                if common_columns:
-                    need_df_role = need_df_role[sorted(common_columns)]
-                    role_staff_actual_data_df = role_staff_actual_data_df[sorted(common_columns)]
-                    log.info(f"[shortage] {role_name_current}: 職種別Needファイルから正確なデータを読み込み（{len(common_columns)}日分）")
-                else:
-                    log.warning(f"[shortage] {role_name_current}: 職種別Needファイルと実績データの日付列が一致しません。按分計算を使用します。")
+            if _has_frame(role_need_file, heatmap_frames):
+                try:
+                    need_df_role = _read_frame(role_need_file, heatmap_frames)
+                    # インデックスと列を適切に調整
+                    need_df_role = need_df_role.reindex(index=time_labels, fill_value=0)
+                    # 実績データと同じ列（日付）に調整
+                    common_columns = set(need_df_role.columns).intersection(set(role_staff_actual_data_df.columns))
+                    if common_columns:
+                        need_df_role = need_df_role[sorted(common_columns)]
+                        role_staff_actual_data_df = role_staff_actual_data_df[sorted(common_columns)]
+                        log.info(f"[shortage] {role_name_current}: 職種別Needファイルから正確なデータを読み込み（{len(common_columns)}日分）")
+                    else:
+                        log.warning(f"[shortage] {role_name_current}: 職種別Needファイルと実績データの日付列が一致しません。按分計算を使用します。")
+                        # フォールバック: 按分計算
+                        need_df_role = pd.DataFrame(
+                            np.repeat(
+                                role_need_per_time_series_orig_for_role.values[:, np.newaxis],
+                                len(role_staff_actual_data_df.columns),
+                                axis=1,
+                            ),
+                            index=role_need_per_time_series_orig_for_role.index,
+                            columns=role_staff_actual_data_df.columns,
+                        )
+                except Exception as e:
+                    log.warning(f"[shortage] {role_name_current}: 職種別Needファイル読み込みエラー: {e}. 按分計算を使用します。")
                     # フォールバック: 按分計算
                     need_df_role = pd.DataFrame(
                         np.repeat(
@@ -1104,8 +1221,8 @@ def shortage_and_brief(
                         index=role_need_per_time_series_orig_for_role.index,
                         columns=role_staff_actual_data_df.columns,
                     )
-            except Exception as e:
-                log.warning(f"[shortage] {role_name_current}: 職種別Needファイル読み込みエラー: {e}. 按分計算を使用します。")
+            else:
+                log.warning(f"[shortage] {role_name_current}: 職種別Needファイルが見つかりません（{role_need_file}）。按分計算を使用します。")
                 # フォールバック: 按分計算
                 need_df_role = pd.DataFrame(
                     np.repeat(
@@ -1116,183 +1233,187 @@ def shortage_and_brief(
                     index=role_need_per_time_series_orig_for_role.index,
                     columns=role_staff_actual_data_df.columns,
                 )
-        else:
-            log.warning(f"[shortage] {role_name_current}: 職種別Needファイルが見つかりません（{role_need_file}）。按分計算を使用します。")
-            # フォールバック: 按分計算
-            need_df_role = pd.DataFrame(
-                np.repeat(
-                    role_need_per_time_series_orig_for_role.values[:, np.newaxis],
-                    len(role_staff_actual_data_df.columns),
-                    axis=1,
-                ),
-                index=role_need_per_time_series_orig_for_role.index,
-                columns=role_staff_actual_data_df.columns,
-            )
-
-        # 休業日のNeedを0にする処理 (これは修正後も必要)
-        if any(holiday_mask_role):
-            for c, is_h in zip(need_df_role.columns, holiday_mask_role, strict=True):
-                if is_h:
-                    need_df_role[c] = 0
-
-        working_cols_role = [
-            c
-            for c, is_h in zip(
-                role_staff_actual_data_df.columns, holiday_mask_role, strict=True
-            )
-            if not is_h and _parse_as_date(c)
-        ]
-        num_working_days_for_current_role = len(working_cols_role)
 
-        # 修正された need_df_role を使って lack と excess を計算する
-        role_lack_count_for_specific_role_df = (
-            need_df_role - role_staff_actual_data_df
-        ).clip(lower=0)
-
-        role_excess_count_for_specific_role_df = None
-        if "upper" in role_heat_current_df.columns:
-            role_upper_per_time_series_orig_for_role = (
-                role_heat_current_df["upper"]
-                .reindex(index=time_labels)
-                .fillna(0)
-                .clip(lower=0)
-            )
-            upper_df_role = pd.DataFrame(
-                np.repeat(
-                    role_upper_per_time_series_orig_for_role.values[:, np.newaxis],
-                    len(role_staff_actual_data_df.columns),
-                    axis=1,
-                ),
-                index=role_upper_per_time_series_orig_for_role.index,
-                columns=role_staff_actual_data_df.columns,
-            )
+            # 休業日のNeedを0にする処理 (これは修正後も必要)
             if any(holiday_mask_role):
-                for c, is_h in zip(
-                    upper_df_role.columns, holiday_mask_role, strict=True
-                ):
+                for c, is_h in zip(need_df_role.columns, holiday_mask_role, strict=True):
                     if is_h:
-                        upper_df_role[c] = 0
-            role_excess_count_for_specific_role_df = (
-                role_staff_actual_data_df - upper_df_role
+                        need_df_role[c] = 0
+
+            working_cols_role = [
+                c
+                for c, is_h in zip(
+                    role_staff_actual_data_df.columns, holiday_mask_role, strict=True
+                )
+                if not is_h and _parse_as_date(c)
+            ]
+            num_working_days_for_current_role = len(working_cols_role)
+
+            # 修正された need_df_role を使って lack と excess を計算する
+            role_lack_count_for_specific_role_df = (
+                need_df_role - role_staff_actual_data_df
             ).clip(lower=0)
-        else:
-            log.debug(
-                f"[shortage] '{role_name_current}' ヒートマップに 'upper' 列がないため excess 計算をスキップ"
-            )
 
-        # サマリー用の合計時間も、修正された need_df_role から計算する
-        total_need_hours_for_role = need_df_role[working_cols_role].sum().sum() * slot_hours
-        # staff_h は全日の実績で計算（休業日も実績0として含まれる）
-        total_staff_hours_for_role = role_staff_actual_data_df.sum().sum() * slot_hours
-        # lack_h は休業日のneed=0を考慮したlackの合計
-        # 修正: 人数不足 × スロット時間 = 時間不足の正しい計算
-        total_lack_hours_for_role = (
-            (role_lack_count_for_specific_role_df * slot_hours).sum().sum()
-        )
-        # excess_h は休業日のupper=0を考慮したexcessの合計
-        # 修正: 人数過剰 × スロット時間 = 時間過剰の正しい計算
-        total_excess_hours_for_role = (
-            (role_excess_count_for_specific_role_df * slot_hours).sum().sum()
-            if role_excess_count_for_specific_role_df is not None
-            else 0
-        )
-        # 計算結果検証用: need_h - staff_h との差分がlack_hと一致するか確認
-        expected_lack_h = max(total_need_hours_for_role - total_staff_hours_for_role, 0)
-        if abs(expected_lack_h - total_lack_hours_for_role) > slot_hours:
-            log.debug(
-                f"[shortage] mismatch for {role_name_current}: "
-                f"need_h={total_need_hours_for_role:.1f}, "
-                f"staff_h={total_staff_hours_for_role:.1f}, "
-                f"computed lack_h={total_lack_hours_for_role:.1f}, "
-                f"expected lack_h={expected_lack_h:.1f}"
-            )
-            try:
-                daily_need_h = (need_df_role.sum() * slot_hours).rename("need_h")
-                daily_staff_h = (role_staff_actual_data_df.sum() * slot_hours).rename(
-                    "staff_h"
+            role_excess_count_for_specific_role_df = None
+            if "upper" in role_heat_current_df.columns:
+                role_upper_per_time_series_orig_for_role = (
+                    role_heat_current_df["upper"]
+                    .reindex(index=time_labels)
+                    .fillna(0)
+                    .clip(lower=0)
                 )
-                # 修正: 人数不足 × スロット時間 = 時間不足の正しい計算
-                daily_lack_h = (
-                    (role_lack_count_for_specific_role_df * slot_hours).sum()
-                ).rename("lack_h")
-                daily_debug_df = pd.concat(
-                    [daily_need_h, daily_staff_h, daily_lack_h], axis=1
-                ).assign(diff_h=lambda d: d["need_h"] - d["staff_h"])
-                log.debug(
-                    f"[shortage] daily summary for {role_name_current} (first 7 days):\n"
-                    f"{daily_debug_df.head(7).to_string()}"
+                upper_df_role = pd.DataFrame(
+                    np.repeat(
+                        role_upper_per_time_series_orig_for_role.values[:, np.newaxis],
+                        len(role_staff_actual_data_df.columns),
+                        axis=1,
+                    ),
+                    index=role_upper_per_time_series_orig_for_role.index,
+                    columns=role_staff_actual_data_df.columns,
                 )
-            except Exception as e_daily:
+                if any(holiday_mask_role):
+                    for c, is_h in zip(
+                        upper_df_role.columns, holiday_mask_role, strict=True
+                    ):
+                        if is_h:
+                            upper_df_role[c] = 0
+                role_excess_count_for_specific_role_df = (
+                    role_staff_actual_data_df - upper_df_role
+                ).clip(lower=0)
+            else:
                 log.debug(
-                    f"[shortage] daily debug summary failed for {role_name_current}: {e_daily}"
+                    f"[shortage] '{role_name_current}' ヒートマップに 'upper' 列がないため excess 計算をスキップ"
                 )
 
-        # 月別不足h・過剰h集計
-        try:
-            lack_by_date = role_lack_count_for_specific_role_df.sum()
-            lack_by_date.index = pd.to_datetime(lack_by_date.index)
-            lack_month = (
-                lack_by_date.groupby(lack_by_date.index.to_period("M")).sum()
-                * slot_hours
+            # サマリー用の合計時間も、修正された need_df_role から計算する
+            total_need_hours_for_role = need_df_role[working_cols_role].sum().sum() * slot_hours
+            # staff_h は全日の実績で計算（休業日も実績0として含まれる）
+            total_staff_hours_for_role = role_staff_actual_data_df.sum().sum() * slot_hours
+            # lack_h は休業日のneed=0を考慮したlackの合計
+            # 修正: 人数不足 × スロット時間 = 時間不足の正しい計算
+            total_lack_hours_for_role = (
+                (role_lack_count_for_specific_role_df * slot_hours).sum().sum()
             )
-            excess_month = pd.Series(dtype=float)
-            if role_excess_count_for_specific_role_df is not None:
-                excess_by_date = role_excess_count_for_specific_role_df.sum()
-                excess_by_date.index = pd.to_datetime(excess_by_date.index)
-                excess_month = (
-                    excess_by_date.groupby(excess_by_date.index.to_period("M")).sum()
-                    * slot_hours
-                )
-            month_keys: Dict[str, Dict[str, int]] = {}
-            for mon, val in lack_month.items():
-                month_keys.setdefault(
-                    str(mon),
-                    {
-                        "role": role_name_current,
-                        "month": str(mon),
-                        "lack_h": 0,
-                        "excess_h": 0,
-                    },
+            # excess_h は休業日のupper=0を考慮したexcessの合計
+            # 修正: 人数過剰 × スロット時間 = 時間過剰の正しい計算
+            total_excess_hours_for_role = (
+                (role_excess_count_for_specific_role_df * slot_hours).sum().sum()
+                if role_excess_count_for_specific_role_df is not None
+                else 0
+            )
+            # 計算結果検証用: need_h - staff_h との差分がlack_hと一致するか確認
+            expected_lack_h = max(total_need_hours_for_role - total_staff_hours_for_role, 0)
+            if abs(expected_lack_h - total_lack_hours_for_role) > slot_hours:
+                log.debug(
+                    f"[shortage] mismatch for {role_name_current}: "
+                    f"need_h={total_need_hours_for_role:.1f}, "
+                    f"staff_h={total_staff_hours_for_role:.1f}, "
+                    f"computed lack_h={total_lack_hours_for_role:.1f}, "
+                    f"expected lack_h={expected_lack_h:.1f}"
                 )
-                month_keys[str(mon)]["lack_h"] = int(round(val))
-            for mon, val in excess_month.items():
-                month_keys.setdefault(
-                    str(mon),
-                    {
-                        "role": role_name_current,
-                        "month": str(mon),
-                        "lack_h": 0,
-                        "excess_h": 0,
-                    },
+                try:
+                    daily_need_h = (need_df_role.sum() * slot_hours).rename("need_h")
+                    daily_staff_h = (role_staff_actual_data_df.sum() * slot_hours).rename(
+                        "staff_h"
+                    )
+                    # 修正: 人数不足 × スロット時間 = 時間不足の正しい計算
+                    daily_lack_h = (
+                        (role_lack_count_for_specific_role_df * slot_hours).sum()
+                    ).rename("lack_h")
+                    daily_debug_df = pd.concat(
+                        [daily_need_h, daily_staff_h, daily_lack_h], axis=1
+                    ).assign(diff_h=lambda d: d["need_h"] - d["staff_h"])
+                    log.debug(
+                        f"[shortage] daily summary for {role_name_current} (first 7 days):\n"
+                        f"{daily_debug_df.head(7).to_string()}"
+                    )
+                except Exception as e_daily:
+                    log.debug(
+                        f"[shortage] daily debug summary failed for {role_name_current}: {e_daily}"
+                    )
+
+            # 月別不足h・過剰h集計
+            try:
+                lack_by_date = role_lack_count_for_specific_role_df.sum()
+                lack_by_date.index = pd.to_datetime(lack_by_date.index)
+                lack_month = (
+                    lack_by_date.groupby(lack_by_date.index.to_period("M")).sum()
+                    * slot_hours
                 )
-                month_keys[str(mon)]["excess_h"] = int(round(val))
-            monthly_role_rows.extend(month_keys.values())
-        except Exception as e_month:
-            log.debug(f"月別不足/過剰集計エラー ({role_name_current}): {e_month}")
-
-        # 🔧 デバッグ: 異常値チェック
-        if total_lack_hours_for_role > 10000:
-            log.warning(f"⚠️ [shortage] 異常な不足時間検出: {role_name_current}")
-            log.warning(f"  total_lack_hours_for_role: {total_lack_hours_for_role:.0f}時間")
-            log.warning(f"  slot_hours: {slot_hours:.2f}")
+                excess_month = pd.Series(dtype=float)
+                if role_excess_count_for_specific_role_df is not None:
+                    excess_by_date = role_excess_count_for_specific_role_df.sum()
+                    excess_by_date.index = pd.to_datetime(excess_by_date.index)
+                    excess_month = (
+                        excess_by_date.groupby(excess_by_date.index.to_period("M")).sum()
+                        * slot_hours
+                    )
+                month_keys: Dict[str, Dict[str, int]] = {}
+                for mon, val in lack_month.items():
+                    month_keys.setdefault(
+                        str(mon),
+                        {
+                            "role": role_name_current,
+                            "month": str(mon),
+                            "lack_h": 0,
+                            "excess_h": 0,
+                        },
+                    )
+                    month_keys[str(mon)]["lack_h"] = int(round(val))
+                for mon, val in excess_month.items():
+                    month_keys.setdefault(
+                        str(mon),
+                        {
+                            "role": role_name_current,
+                            "month": str(mon),
+                            "lack_h": 0,
+                            "excess_h": 0,
+                        },
+                    )
+                    month_keys[str(mon)]["excess_h"] = int(round(val))
+                monthly_role_rows.extend(month_keys.values())
+            except Exception as e_month:
+                log.debug(f"月別不足/過剰集計エラー ({role_name_current}): {e_month}")
+
+            # 🔧 デバッグ: 異常値チェック
+            if total_lack_hours_for_role > 10000:
+                log.warning(f"⚠️ [shortage] 異常な不足時間検出: {role_name_current}")
+                log.warning(f"  total_lack_hours_for_role: {total_lack_hours_for_role:.0f}時間")
+                log.warning(f"  slot_hours: {slot_hours:.2f}")
         
-        role_kpi_rows.append(
-            {
-                "role": role_name_current,
-                "need_h": int(round(total_need_hours_for_role)),
-                "staff_h": int(round(total_staff_hours_for_role)),
-                "lack_h": int(round(total_lack_hours_for_role)),
-                "excess_h": int(round(total_excess_hours_for_role)),
-                "working_days_considered": num_working_days_for_current_role,
-            }
-        )
-        log.debug(
-            f"  Role: {role_name_current}, Need(h): {total_need_hours_for_role:.1f} (on {num_working_days_for_current_role} working days), "
-            f"Staff(h): {total_staff_hours_for_role:.1f}, Lack(h): {total_lack_hours_for_role:.1f}, Excess(h): {total_excess_hours_for_role:.1f}"
-        )
-        log.debug(
-            f"--- shortage_role.xlsx 計算デバッグ (職種: {role_name_current}) 終了 ---"
+            role_kpi_rows.append(
+                {
+                    "role": role_name_current,
+                    "need_h": int(round(total_need_hours_for_role)),
+                    "staff_h": int(round(total_staff_hours_for_role)),
+                    "lack_h": int(round(total_lack_hours_for_role)),
+                    "excess_h": int(round(total_excess_hours_for_role)),
+                    "working_days_considered": num_working_days_for_current_role,
+                }
+            )
+            log.debug(
+                f"  Role: {role_name_current}, Need(h): {total_need_hours_for_role:.1f} (on {num_working_days_for_current_role} working days), "
+                f"Staff(h): {total_staff_hours_for_role:.1f}, Lack(h): {total_lack_hours_for_role:.1f}, Excess(h): {total_excess_hours_for_role:.1f}"
+            )
+            log.debug(
+                f"--- shortage_role.xlsx 計算デバッグ (職種: {role_name_current}) 終了 ---"
+            )
+    else:
+        role_heat_paths = [
+            fp
+            for fp in _frame_paths(out_dir_path, "heat_*.parquet", heatmap_frames)
+            if fp.name != "heat_ALL.parquet" and not fp.name.startswith("heat_emp_")
+        ]
+        role_kpi_rows, monthly_role_rows = group_shortage_rows(
+            _group_frames(
+                out_dir_path, role_heat_paths, "heat_", "need_per_date_slot_role_", heatmap_frames
+            ),
+            key="role",
+            time_labels=time_labels,
+            holidays=estimated_holidays_set,
+            slot_hours=slot_hours,
         )
+        processed_role_names_list = [row["role"] for row in role_kpi_rows]
 
     # 按分計算は使用しないため、role_shortagesは使わない
     role_shortages = {}
@@ -1311,11 +1432,11 @@ def shortage_and_brief(
         role_summary_df = role_summary_df.sort_values(
             "lack_h", ascending=False, na_position="last"
         ).reset_index(drop=True)
-        role_summary_df = role_summary_df.assign(
-            estimated_excess_cost=lambda d: d.get("excess_h", 0) * wage_direct,
-            estimated_lack_cost_if_temporary_staff=lambda d: d.get("lack_h", 0)
-            * wage_temp,
-            estimated_lack_penalty_cost=lambda d: d.get("lack_h", 0) * penalty_per_lack,
+        role_summary_df = add_cost_estimates(
+            role_summary_df,
+            wage_direct=wage_direct,
+            wage_temp=wage_temp,
+            penalty_per_lack=penalty_per_lack,
         )
 
     monthly_role_df = pd.DataFrame(monthly_role_rows)
@@ -1357,103 +1478,112 @@ def shortage_and_brief(
     monthly_emp_rows: List[Dict[str, Any]] = []
     processed_emp_names_list = []
 
-    for fp_emp_heatmap_item in out_dir_path.glob("heat_emp_*.xlsx"):
-        emp_name_current = fp_emp_heatmap_item.stem.replace("heat_emp_", "")
-        processed_emp_names_list.append(emp_name_current)
-        log.debug(
-            f"--- shortage_employment.xlsx 計算デバッグ (雇用形態: {emp_name_current}) ---"
-        )
-        try:
-            emp_heat_current_df = pd.read_excel(fp_emp_heatmap_item, index_col=0)
-        except Exception as e_emp_heat:
-            log.warning(
-                f"[shortage] 雇用形態別ヒートマップ '{fp_emp_heatmap_item.name}' の読み込みエラー: {e_emp_heat}"
-            )
-            emp_kpi_rows.append(
-                {
-                    "employment": emp_name_current,
-                    "need_h": 0,
-                    "staff_h": 0,
-                    "lack_h": 0,
-                    "working_days_considered": 0,
-                    "note": "heatmap read error",
-                }
+    if engine == "legacy":
+        for fp_emp_heatmap_item in _frame_paths(out_dir_path, "heat_emp_*.parquet", heatmap_frames):
+            emp_name_current = fp_emp_heatmap_item.stem.replace("heat_emp_", "")
+            processed_emp_names_list.append(emp_name_current)
+            log.debug(
+                f"--- shortage_employment.xlsx 計算デバッグ (雇用形態: {emp_name_current}) ---"
             )
-            continue
+            try:
+                emp_heat_current_df = _read_frame(fp_emp_heatmap_item, heatmap_frames)
+            except Exception as e_emp_heat:
+                log.warning(
+                    f"[shortage] 雇用形態別ヒートマップ '{fp_emp_heatmap_item.name}' の読み込みエラー: {e_emp_heat}"
+                )
+                emp_kpi_rows.append(
+                    {
+                        "employment": emp_name_current,
+                        "need_h": 0,
+                        "staff_h": 0,
+                        "lack_h": 0,
+                        "working_days_considered": 0,
+                        "note": "heatmap read error",
+                    }
+                )
+                continue
 
-        if "need" not in emp_heat_current_df.columns:
-            log.warning(
-                f"[shortage] 雇用形態 '{emp_name_current}' のヒートマップに 'need' 列が不足。KPI計算スキップ。"
-            )
-            emp_kpi_rows.append(
-                {
-                    "employment": emp_name_current,
-                    "need_h": 0,
-                    "staff_h": 0,
-                    "lack_h": 0,
-                    "working_days_considered": 0,
-                    "note": "missing need column",
-                }
-            )
-            continue
+            if "need" not in emp_heat_current_df.columns:
+                log.warning(
+                    f"[shortage] 雇用形態 '{emp_name_current}' のヒートマップに 'need' 列が不足。KPI計算スキップ。"
+                )
+                emp_kpi_rows.append(
+                    {
+                        "employment": emp_name_current,
+                        "need_h": 0,
+                        "staff_h": 0,
+                        "lack_h": 0,
+                        "working_days_considered": 0,
+                        "note": "missing need column",
+                    }
+                )
+                continue
 
-        emp_need_series = (
-            emp_heat_current_df["need"]
-            .reindex(index=time_labels)
-            .fillna(0)
-            .clip(lower=0)
-        )
-        emp_date_columns = [
-            str(c)
-            for c in emp_heat_current_df.columns
-            if c not in SUMMARY5 and _parse_as_date(str(c)) is not None
-        ]
-        if not emp_date_columns:
-            log.warning(
-                f"[shortage] 雇用形態 '{emp_name_current}' のヒートマップに日付列がありません。KPI計算をスキップします。"
-            )
-            emp_kpi_rows.append(
-                {
-                    "employment": emp_name_current,
-                    "need_h": 0,
-                    "staff_h": 0,
-                    "lack_h": 0,
-                    "working_days_considered": 0,
-                    "note": "no date columns",
-                }
+            emp_need_series = (
+                emp_heat_current_df["need"]
+                .reindex(index=time_labels)
+                .fillna(0)
+                .clip(lower=0)
             )
-            continue
+            emp_date_columns = [
+                str(c)
+                for c in emp_heat_current_df.columns
+                if c not in SUMMARY5 and _parse_as_date(str(c)) is not None
+            ]
+            if not emp_date_columns:
+                log.warning(
+                    f"[shortage] 雇用形態 '{emp_name_current}' のヒートマップに日付列がありません。KPI計算をスキップします。"
+                )
+                emp_kpi_rows.append(
+                    {
+                        "employment": emp_name_current,
+                        "need_h": 0,
+                        "staff_h": 0,
+                        "lack_h": 0,
+                        "working_days_considered": 0,
+                        "note": "no date columns",
+                    }
+                )
+                continue
 
-        emp_staff_df = (
-            emp_heat_current_df[emp_date_columns]
-            .copy()
-            .reindex(index=time_labels)
-            .fillna(0)
-        )
-        parsed_emp_dates = [_parse_as_date(c) for c in emp_staff_df.columns]
-        holiday_mask_emp = [
-            d in estimated_holidays_set if d else False for d in parsed_emp_dates
-        ]
-        # need_df_emp の構築ロジックを修正 - 雇用形態別実際のNeedファイルを使用
-        log.info(f"[shortage] {emp_name_current}: 雇用形態別の実際のNeedファイルから正確な計算を行います。")
+            emp_staff_df = (
+                emp_heat_current_df[emp_date_columns]
+                .copy()
+                .reindex(index=time_labels)
+                .fillna(0)
+            )
+            parsed_emp_dates = [_parse_as_date(c) for c in emp_staff_df.columns]
+            holiday_mask_emp = holiday_mask(parsed_emp_dates, estimated_holidays_set).tolist()
+            # need_df_emp の構築ロジックを修正 - 雇用形態別実際のNeedファイルを使用
+            log.info(f"[shortage] {emp_name_current}: 雇用形態別の実際のNeedファイルから正確な計算を行います。")
         
-        # 雇用形態別詳細Needファイルを読み込み
-        emp_safe_name = emp_name_current.replace(' ', '_').replace('/', '_').replace('\\', '_')
-        emp_need_file = out_dir_path / f"need_per_date_slot_emp_{emp_safe_name}.parquet"
+            # 雇用形態別詳細Needファイルを読み込み
+            emp_safe_name = emp_name_current.replace(' ', '_').replace('/', '_').replace('\\', '_')
+            emp_need_file = out_dir_path / f"need_per_date_slot_emp_{emp_safe_name}.parquet"
         
-        if emp_need_file.exists():
-            try:
-                need_df_emp = pd.read_parquet(emp_need_file)
-                # インデックスと列を適切に調整
-                need_df_emp = need_df_emp.reindex(index=time_labels, fill_value=0)
-                # 実績データと同じ列（日付）に調整
-                common_columns = set(need_df_emp.columns).intersection(set(emp_staff_df.columns))
-                if common_columns:
-                    need_df_emp = need_df_emp[sorted(common_columns)]
-                    emp_staff_df = emp_staff_df[sorted(common_columns)]
-                    log.info(f"[shortage] {emp_name_current}: 雇用形態別Needファイルから正確なデータを読み込み（{len(common_columns)}日分）")
-                else:
-                    log.warning(f"[shortage] {emp_name_current}: 雇用形態別Needファイルと実績データの日付列が一致しません。按分計算を使用します。")
+            if _has_frame(emp_need_file, heatmap_frames):
+                try:
+                    need_df_emp = _read_frame(emp_need_file, heatmap_frames)
+                    # インデックスと列を適切に調整
+                    need_df_emp = need_df_emp.reindex(index=time_labels, fill_value=0)
+                    # 実績データと同じ列（日付）に調整
+                    common_columns = set(need_df_emp.columns).intersection(set(emp_staff_df.columns))
+                    if common_columns:
+                        need_df_emp = need_df_emp[sorted(common_columns)]
+                        emp_staff_df = emp_staff_df[sorted(common_columns)]
+                        log.info(f"[shortage] {emp_name_current}: 雇用形態別Needファイルから正確なデータを読み込み（{len(common_columns)}日分）")
+                    else:
+                        log.warning(f"[shortage] {emp_name_current}: 雇用形態別Needファイルと実績データの日付列が一致しません。按分計算を使用します。")
+                        # フォールバック: 按分計算
+                        need_df_emp = pd.DataFrame(
+                            np.repeat(
+                                emp_need_series.values[:, np.newaxis], len(emp_staff_df.columns), axis=1
+                            ),
+                            index=emp_need_series.index,
+                            columns=emp_staff_df.columns,
+                        )
+                except Exception as e:
+                    log.warning(f"[shortage] {emp_name_current}: 雇用形態別Needファイル読み込みエラー: {e}. 按分計算を使用します。")
                     # フォールバック: 按分計算
                     need_df_emp = pd.DataFrame(
                         np.repeat(
@@ -1462,8 +1592,8 @@ def shortage_and_brief(
                         index=emp_need_series.index,
                         columns=emp_staff_df.columns,
                     )
-            except Exception as e:
-                log.warning(f"[shortage] {emp_name_current}: 雇用形態別Needファイル読み込みエラー: {e}. 按分計算を使用します。")
+            else:
+                log.warning(f"[shortage] {emp_name_current}: 雇用形態別Needファイルが見つかりません（{emp_need_file}）。按分計算を使用します。")
                 # フォールバック: 按分計算
                 need_df_emp = pd.DataFrame(
                     np.repeat(
@@ -1472,132 +1602,136 @@ def shortage_and_brief(
                     index=emp_need_series.index,
                     columns=emp_staff_df.columns,
                 )
-        else:
-            log.warning(f"[shortage] {emp_name_current}: 雇用形態別Needファイルが見つかりません（{emp_need_file}）。按分計算を使用します。")
-            # フォールバック: 按分計算
-            need_df_emp = pd.DataFrame(
-                np.repeat(
-                    emp_need_series.values[:, np.newaxis], len(emp_staff_df.columns), axis=1
-                ),
-                index=emp_need_series.index,
-                columns=emp_staff_df.columns,
-            )
 
-        if any(holiday_mask_emp):
-            for c, is_h in zip(need_df_emp.columns, holiday_mask_emp, strict=True):
-                if is_h:
-                    need_df_emp[c] = 0
-
-        working_cols_emp = [
-            c
-            for c, is_h in zip(emp_staff_df.columns, holiday_mask_emp, strict=True)
-            if not is_h and _parse_as_date(c)
-        ]
-        num_working_days_for_current_emp = len(working_cols_emp)
-
-        lack_count_emp_df = (need_df_emp - emp_staff_df).clip(lower=0)
-
-        # excess_count_emp_dfの計算に誤りがあったため修正 (needではなくupperと比較)
-        excess_count_emp_df = pd.DataFrame()
-        if "upper" in emp_heat_current_df.columns:
-             upper_series_emp = emp_heat_current_df["upper"].reindex(index=time_labels).fillna(0).clip(lower=0)
-             upper_df_emp = pd.DataFrame(
-                 np.repeat(
-                     upper_series_emp.values[:, np.newaxis], len(emp_staff_df.columns), axis=1
-                 ),
-                 index=upper_series_emp.index,
-                 columns=emp_staff_df.columns,
-             )
-             if any(holiday_mask_emp):
-                 for c, is_h in zip(upper_df_emp.columns, holiday_mask_emp, strict=True):
-                     if is_h:
-                         upper_df_emp[c] = 0
-             excess_count_emp_df = (emp_staff_df - upper_df_emp).clip(lower=0)
-
-
-        # サマリー用の合計時間も、修正された need_df_emp から計算する
-        total_need_hours_for_emp = need_df_emp[working_cols_emp].sum().sum() * slot_hours
-        total_staff_hours_for_emp = emp_staff_df.sum().sum() * slot_hours
-        # 修正: 人数不足 × スロット時間 = 時間不足の正しい計算
-        total_lack_hours_for_emp = (lack_count_emp_df * slot_hours).sum().sum()
-        # 修正: 人数過剰 × スロット時間 = 時間過剰の正しい計算  
-        total_excess_hours_for_emp = (
-            (excess_count_emp_df * slot_hours).sum().sum()
-            if not excess_count_emp_df.empty
-            else 0
-        )
-
-        try:
-            lack_by_date = lack_count_emp_df.sum()
-            lack_by_date.index = pd.to_datetime(lack_by_date.index)
-            lack_month = (
-                lack_by_date.groupby(lack_by_date.index.to_period("M")).sum()
-                * slot_hours
+            if any(holiday_mask_emp):
+                for c, is_h in zip(need_df_emp.columns, holiday_mask_emp, strict=True):
+                    if is_h:
+                        need_df_emp[c] = 0
+
+            working_cols_emp = [
+                c
+                for c, is_h in zip(emp_staff_df.columns, holiday_mask_emp, strict=True)
+                if not is_h and _parse_as_date(c)
+            ]
+            num_working_days_for_current_emp = len(working_cols_emp)
+
+            lack_count_emp_df = (need_df_emp - emp_staff_df).clip(lower=0)
+
+            # excess_count_emp_dfの計算に誤りがあったため修正 (needではなくupperと比較)
+            excess_count_emp_df = pd.DataFrame()
+            if "upper" in emp_heat_current_df.columns:
+                 upper_series_emp = emp_heat_current_df["upper"].reindex(index=time_labels).fillna(0).clip(lower=0)
+                 upper_df_emp = pd.DataFrame(
+                     np.repeat(
+                         upper_series_emp.values[:, np.newaxis], len(emp_staff_df.columns), axis=1
+                     ),
+                     index=upper_series_emp.index,
+                     columns=emp_staff_df.columns,
+                 )
+                 if any(holiday_mask_emp):
+                     for c, is_h in zip(upper_df_emp.columns, holiday_mask_emp, strict=True):
+                         if is_h:
+                             upper_df_emp[c] = 0
+                 excess_count_emp_df = (emp_staff_df - upper_df_emp).clip(lower=0)
+
+
+            # サマリー用の合計時間も、修正された need_df_emp から計算する
+            total_need_hours_for_emp = need_df_emp[working_cols_emp].sum().sum() * slot_hours
+            total_staff_hours_for_emp = emp_staff_df.sum().sum() * slot_hours
+            # 修正: 人数不足 × スロット時間 = 時間不足の正しい計算
+            total_lack_hours_for_emp = (lack_count_emp_df * slot_hours).sum().sum()
+            # 修正: 人数過剰 × スロット時間 = 時間過剰の正しい計算  
+            total_excess_hours_for_emp = (
+                (excess_count_emp_df * slot_hours).sum().sum()
+                if not excess_count_emp_df.empty
+                else 0
             )
-            excess_month = pd.Series(dtype=float)
-            if not excess_count_emp_df.empty:
-                excess_by_date = excess_count_emp_df.sum()
-                excess_by_date.index = pd.to_datetime(excess_by_date.index)
-                excess_month = (
-                    excess_by_date.groupby(excess_by_date.index.to_period("M")).sum()
+
+            try:
+                lack_by_date = lack_count_emp_df.sum()
+                lack_by_date.index = pd.to_datetime(lack_by_date.index)
+                lack_month = (
+                    lack_by_date.groupby(lack_by_date.index.to_period("M")).sum()
                     * slot_hours
                 )
-            month_keys: Dict[str, Dict[str, int]] = {}
-            for mon, val in lack_month.items():
-                month_keys.setdefault(
-                    str(mon),
-                    {
-                        "employment": emp_name_current,
-                        "month": str(mon),
-                        "lack_h": 0,
-                        "excess_h": 0,
-                    },
-                )
-                month_keys[str(mon)]["lack_h"] = int(round(val))
-            for mon, val in excess_month.items():
-                month_keys.setdefault(
-                    str(mon),
-                    {
-                        "employment": emp_name_current,
-                        "month": str(mon),
-                        "lack_h": 0,
-                        "excess_h": 0,
-                    },
-                )
-                month_keys[str(mon)]["excess_h"] = int(round(val))
-            monthly_emp_rows.extend(month_keys.values())
-        except Exception as e_month_emp:
-            log.debug(f"月別不足/過剰集計エラー ({emp_name_current}): {e_month_emp}")
-
-        emp_kpi_rows.append(
-            {
-                "employment": emp_name_current,
-                "need_h": int(round(total_need_hours_for_emp)),
-                "staff_h": int(round(total_staff_hours_for_emp)),
-                "lack_h": int(round(total_lack_hours_for_emp)),
-                "excess_h": int(round(total_excess_hours_for_emp)),
-                "working_days_considered": num_working_days_for_current_emp,
-            }
-        )
-        log.debug(
-            f"  Employment: {emp_name_current}, Need(h): {total_need_hours_for_emp:.1f} (on {num_working_days_for_current_emp} working days), "
-            f"Staff(h): {total_staff_hours_for_emp:.1f}, Lack(h): {total_lack_hours_for_emp:.1f}, Excess(h): {total_excess_hours_for_emp:.1f}"
-        )
-        log.debug(
-            f"--- shortage_employment.xlsx 計算デバッグ (雇用形態: {emp_name_current}) 終了 ---"
-        )
+                excess_month = pd.Series(dtype=float)
+                if not excess_count_emp_df.empty:
+                    excess_by_date = excess_count_emp_df.sum()
+                    excess_by_date.index = pd.to_datetime(excess_by_date.index)
+                    excess_month = (
+                        excess_by_date.groupby(excess_by_date.index.to_period("M")).sum()
+                        * slot_hours
+                    )
+                month_keys: Dict[str, Dict[str, int]] = {}
+                for mon, val in lack_month.items():
+                    month_keys.setdefault(
+                        str(mon),
+                        {
+                            "employment": emp_name_current,
+                            "month": str(mon),
+                            "lack_h": 0,
+                            "excess_h": 0,
+                        },
+                    )
+                    month_keys[str(mon)]["lack_h"] = int(round(val))
+                for mon, val in excess_month.items():
+                    month_keys.setdefault(
+                        str(mon),
+                        {
+                            "employment": emp_name_current,
+                            "month": str(mon),
+                            "lack_h": 0,
+                            "excess_h": 0,
+                        },
+                    )
+                    month_keys[str(mon)]["excess_h"] = int(round(val))
+                monthly_emp_rows.extend(month_keys.values())
+            except Exception as e_month_emp:
+                log.debug(f"月別不足/過剰集計エラー ({emp_name_current}): {e_month_emp}")
 
+            emp_kpi_rows.append(
+                {
+                    "employment": emp_name_current,
+                    "need_h": int(round(total_need_hours_for_emp)),
+                    "staff_h": int(round(total_staff_hours_for_emp)),
+                    "lack_h": int(round(total_lack_hours_for_emp)),
+                    "excess_h": int(round(total_excess_hours_for_emp)),
+                    "working_days_considered": num_working_days_for_current_emp,
+                }
+            )
+            log.debug(
+                f"  Employment: {emp_name_current}, Need(h): {total_need_hours_for_emp:.1f} (on {num_working_days_for_current_emp} working days), "
+                f"Staff(h): {total_staff_hours_for_emp:.1f}, Lack(h): {total_lack_hours_for_emp:.1f}, Excess(h): {total_excess_hours_for_emp:.1f}"
+            )
+            log.debug(
+                f"--- shortage_employment.xlsx 計算デバッグ (雇用形態: {emp_name_current}) 終了 ---"
+            )
+    else:
+        emp_kpi_rows, monthly_emp_rows = group_shortage_rows(
+            _group_frames(
+                out_dir_path,
+                _frame_paths(out_dir_path, "heat_emp_*.parquet", heatmap_frames),
+                "heat_emp_",
+                "need_per_date_slot_emp_",
+                heatmap_frames,
+            ),
+            key="employment",
+            time_labels=time_labels,
+            holidays=estimated_holidays_set,
+            slot_hours=slot_hours,
+        )
+        processed_emp_names_list = [row["employment"] for row in emp_kpi_rows]
 
     emp_summary_df = pd.DataFrame(emp_kpi_rows)
     if not emp_summary_df.empty:
         emp_summary_df = emp_summary_df.sort_values(
             "lack_h", ascending=False, na_position="last"
         ).reset_index(drop=True)
-        emp_summary_df = emp_summary_df.assign(
-            estimated_excess_cost=lambda d: d.get("excess_h", 0) * wage_direct,
-            estimated_lack_cost_if_temporary_staff=lambda d: d.get("lack_h", 0)
-            * wage_temp,
-            estimated_lack_penalty_cost=lambda d: d.get("lack_h", 0) * penalty_per_lack,
+        emp_summary_df = add_cost_estimates(
+            emp_summary_df,
+            wage_direct=wage_direct,
+            wage_temp=wage_temp,
+            penalty_per_lack=penalty_per_lack,
         )
 
     monthly_emp_df = pd.DataFrame(monthly_emp_rows)
@@ -0,0 +1,276 @@
+# shift_suite / tasks / shortage_kernel.py
+"""
+shift_suite.tasks.shortage_kernel  v1.0.0
+────────────────────────────────────────────────────────
+* 職種・雇用形態ごとの不足/過剰 KPI を (グループ × 時間帯 × 日付) の
+  3 次元配列で一括計算する
+    - need / staff / upper をグループ方向に積み上げ、休業日マスク・
+      lack / excess・合計時間・月次集計を全グループまとめて 1 回の配列演算で行う
+    - 出力行 (KPI 行・月次行) は従来のグループ別ループと同じ形式
+* 職種別 Need ファイルの合算 (``DataFrame.add`` の繰り返し) も 1 回の加算にまとめる
+* ``group_slot_arrays`` は同じ (グループ × 時間帯 × 日付) 配列をそのまま返す
+  (KPI キューブの集計用)
+* shortage_and_brief から ``engine="numpy"`` (既定) で使われる
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import logging
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .constants import SUMMARY5
+from .holiday_detection import holiday_mask
+from .utils import _parse_as_date
+
+log = logging.getLogger(__name__)
+
+SHORTAGE_ENGINES = ("numpy", "legacy")
+
+# 異常値として警告する不足時間 (時間)
+_LACK_WARN_HOURS = 10000
+
+
+def sum_need_frames(frames: Sequence[pd.DataFrame]) -> pd.DataFrame:
+    """Sum need frames cell-wise, like chained ``add(fill_value=0)``.
+
+    Frames are aligned on the union of their index and columns; a cell that is
+    missing in every frame stays ``NaN``.
+    """
+    if not frames:
+        return pd.DataFrame()
+    index, columns = frames[0].index, frames[0].columns
+    for df in frames[1:]:
+        if not df.index.equals(index):
+            index = index.union(df.index)
+        if not df.columns.equals(columns):
+            columns = columns.union(df.columns)
+    aligned = [
+        df if df.index.equals(index) and df.columns.equals(columns) else df.reindex(index=index, columns=columns)
+        for df in frames
+    ]
+    stacked = np.stack([df.to_numpy() for df in aligned])
+    if stacked.dtype.kind == "f":
+        missing = np.isnan(stacked)
+        total = np.where(missing, 0, stacked).sum(axis=0)
+        total[missing.all(axis=0)] = np.nan
+    elif stacked.dtype.kind in "iub":
+        total = stacked.sum(axis=0)
+    else:
+        # 数値以外が混在する場合は従来どおり pandas に任せる
+        out = frames[0].copy()
+        for df in frames[1:]:
+            out = out.add(df, fill_value=0)
+        return out
+    return pd.DataFrame(total, index=index, columns=columns)
+
+
+def _error_row(key: str, name: str, note: str) -> Dict[str, Any]:
+    return {
+        key: name,
+        "need_h": 0,
+        "staff_h": 0,
+        "lack_h": 0,
+        "working_days_considered": 0,
+        "note": note,
+    }
+
+
+def _stack_groups(
+    groups: Iterable[Tuple[str, pd.DataFrame | None, pd.DataFrame | None]],
+    *,
+    key: str,
+    time_labels: Sequence[str],
+    holidays: Iterable[dt.date] | None,
+) -> Tuple[List[Dict[str, Any]], List[int], List[str], Dict[str, np.ndarray]]:
+    """グループを (G, S, D) 配列に積み上げ、休業日マスクと lack / excess まで計算する
+
+    戻り値は ``(kpi_rows, row_indices, dates, arrays)``。``kpi_rows`` には
+    計算できなかったグループのエラー行と、計算対象グループの仮の行
+    (``row_indices`` が配列のグループ順に対応) が ``groups`` の順に入る。
+    """
+    labels = pd.Index(time_labels)
+    # グループ間で日付列はほぼ共通なので列名ごとの日付判定を使い回す
+    parsed: Dict[str, dt.date | None] = {}
+
+    def _as_date(col: Any) -> dt.date | None:
+        text = str(col)
+        if text not in parsed:
+            parsed[text] = _parse_as_date(text)
+        return parsed[text]
+
+    kpi_rows: List[Dict[str, Any]] = []
+    prepared: List[Tuple[int, np.ndarray, np.ndarray, np.ndarray | None, List[str]]] = []
+    date_pos: Dict[str, int] = {}
+
+    for name, heat_df, need_df in groups:
+        if heat_df is None:
+            kpi_rows.append(_error_row(key, name, "heatmap read error"))
+            continue
+        if "need" not in heat_df.columns:
+            log.warning(f"[shortage] {key} '{name}' のヒートマップに 'need' 列が不足。KPI計算スキップ。")
+            kpi_rows.append(_error_row(key, name, "missing need column"))
+            continue
+        date_cols = [
+            str(c) for c in heat_df.columns if c not in SUMMARY5 and _as_date(c) is not None
+        ]
+        if not date_cols:
+            log.warning(f"[shortage] {key} '{name}' のヒートマップに日付列がありません。KPI計算をスキップします。")
+            kpi_rows.append(_error_row(key, name, "no date columns"))
+            continue
+
+        staff_df = heat_df[date_cols].reindex(index=labels).fillna(0)
+        need = None
+        if need_df is not None:
+            common = sorted(set(need_df.columns).intersection(staff_df.columns))
+            if common:
+                # Need ファイルの欠損セルは lack / need_h に寄与しないため 0 と同値
+                need = need_df.reindex(index=labels, fill_value=0)[common].fillna(0).to_numpy(dtype=float)
+                staff_df = staff_df[common]
+            else:
+                log.warning(f"[shortage] {name}: Needファイルと実績データの日付列が一致しません。按分計算を使用します。")
+        staff = staff_df.to_numpy(dtype=float)
+        if need is None:
+            need_series = heat_df["need"].reindex(index=labels).fillna(0).clip(lower=0)
+            need = np.broadcast_to(need_series.to_numpy(dtype=float)[:, None], staff.shape)
+        upper = None
+        if "upper" in heat_df.columns:
+            upper = heat_df["upper"].reindex(index=labels).fillna(0).clip(lower=0).to_numpy(dtype=float)
+
+        cols = [str(c) for c in staff_df.columns]
+        for c in cols:
+            date_pos.setdefault(c, len(date_pos))
+        prepared.append((len(kpi_rows), need, staff, upper, cols))
+        kpi_rows.append({key: name})
+
+    if not prepared:
+        return kpi_rows, [], [], {}
+
+    # ── 全グループを (G, S, D) に積み上げて一括計算 ─────────────────────
+    dates = list(date_pos)
+    n_groups, n_slots, n_dates = len(prepared), len(labels), len(dates)
+    need_arr = np.zeros((n_groups, n_slots, n_dates))
+    staff_arr = np.zeros((n_groups, n_slots, n_dates))
+    upper_arr = np.zeros((n_groups, n_slots, n_dates))
+    valid = np.zeros((n_groups, n_dates), dtype=bool)
+    has_upper = np.zeros(n_groups, dtype=bool)
+    for g, (_, need, staff, upper, cols) in enumerate(prepared):
+        pos = np.fromiter((date_pos[c] for c in cols), dtype=np.int64, count=len(cols))
+        need_arr[g][:, pos] = need
+        staff_arr[g][:, pos] = staff
+        valid[g, pos] = True
+        if upper is not None:
+            upper_arr[g][:, pos] = upper[:, None]
+            has_upper[g] = True
+
+    is_holiday = holiday_mask([_as_date(d) for d in dates], holidays)
+    need_arr[:, :, is_holiday] = 0
+    upper_arr[:, :, is_holiday] = 0
+
+    lack_arr = np.clip(need_arr - staff_arr, 0, None)
+    excess_arr = np.clip(staff_arr - upper_arr, 0, None)
+    excess_arr[~has_upper] = 0
+    arrays = {
+        "need": need_arr,
+        "staff": staff_arr,
+        "lack": lack_arr,
+        "excess": excess_arr,
+        "valid": valid,
+        "working": valid & ~is_holiday,
+        "has_upper": has_upper,
+    }
+    return kpi_rows, [p[0] for p in prepared], dates, arrays
+
+
+def group_slot_arrays(
+    groups: Iterable[Tuple[str, pd.DataFrame | None, pd.DataFrame | None]],
+    *,
+    key: str,
+    time_labels: Sequence[str],
+    holidays: Iterable[dt.date] | None,
+) -> Tuple[List[str], List[str], Dict[str, np.ndarray]]:
+    """Return ``(names, dates, arrays)`` with the per-slot group arrays.
+
+    ``arrays`` holds ``need`` / ``staff`` / ``lack`` / ``excess`` shaped
+    ``(group, time slot, date)`` with the same holiday handling as
+    :func:`group_shortage_rows`; groups that cannot be computed are left out.
+    """
+    kpi_rows, row_indices, dates, arrays = _stack_groups(
+        groups, key=key, time_labels=time_labels, holidays=holidays
+    )
+    return [kpi_rows[i][key] for i in row_indices], dates, arrays
+
+
+def group_shortage_rows(
+    groups: Iterable[Tuple[str, pd.DataFrame | None, pd.DataFrame | None]],
+    *,
+    key: str,
+    time_labels: Sequence[str],
+    holidays: Iterable[dt.date] | None,
+    slot_hours: float,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Return ``(kpi_rows, monthly_rows)`` for every group in one pass.
+
+    ``groups`` yields ``(name, heat_df, need_df)``.  ``heat_df`` is the group's
+    heatmap (``None`` when it could not be read) and ``need_df`` the matching
+    ``need_per_date_slot_*`` frame (``None`` to spread the heatmap ``need``
+    column over every date).  ``key`` is the name column of the rows
+    (``"role"`` / ``"employment"``).  Rows keep the order of ``groups``.
+    """
+    kpi_rows, row_indices, dates, arrays = _stack_groups(
+        groups, key=key, time_labels=time_labels, holidays=holidays
+    )
+    if not row_indices:
+        return kpi_rows, []
+
+    need_arr, staff_arr, lack_arr, excess_arr = (arrays[k] for k in ("need", "staff", "lack", "excess"))
+    valid, working, has_upper = arrays["valid"], arrays["working"], arrays["has_upper"]
+    n_dates = len(dates)
+    # 範囲外 (valid=False) のセルは need=staff=upper=0 なので寄与しない
+    need_daily = need_arr.sum(axis=1)
+    lack_daily = lack_arr.sum(axis=1)
+    excess_daily = excess_arr.sum(axis=1)
+    need_h = (need_daily * working).sum(axis=1) * slot_hours
+    staff_h = staff_arr.sum(axis=(1, 2)) * slot_hours
+    lack_h = lack_daily.sum(axis=1) * slot_hours
+    excess_h = excess_daily.sum(axis=1) * slot_hours
+
+    month_codes, months = pd.factorize(pd.to_datetime(pd.Index(dates)).to_period("M"), sort=True)
+    onehot = np.zeros((n_dates, len(months)))
+    onehot[np.arange(n_dates), month_codes] = 1
+    lack_month = lack_daily @ onehot * slot_hours
+    excess_month = excess_daily @ onehot * slot_hours
+    month_present = (valid @ onehot) > 0
+
+    monthly_rows: List[Dict[str, Any]] = []
+    for g, row_idx in enumerate(row_indices):
+        name = kpi_rows[row_idx][key]
+        if lack_h[g] > _LACK_WARN_HOURS:
+            log.warning(f"⚠️ [shortage] 異常な不足時間検出: {name}")
+            log.warning(f"  total_lack_hours: {lack_h[g]:.0f}時間")
+            log.warning(f"  slot_hours: {slot_hours:.2f}")
+        kpi_rows[row_idx] = {
+            key: name,
+            "need_h": int(round(need_h[g])),
+            "staff_h": int(round(staff_h[g])),
+            "lack_h": int(round(lack_h[g])),
+            "excess_h": int(round(excess_h[g])),
+            "working_days_considered": int(working[g].sum()),
+        }
+        log.debug(
+            f"  {key}: {name}, Need(h): {need_h[g]:.1f} (on {int(working[g].sum())} working days), "
+            f"Staff(h): {staff_h[g]:.1f}, Lack(h): {lack_h[g]:.1f}, Excess(h): {excess_h[g]:.1f}"
+        )
+        for m in np.flatnonzero(month_present[g]):
+            monthly_rows.append(
+                {
+                    key: name,
+                    "month": str(months[m]),
+                    "lack_h": int(round(lack_month[g, m])),
+                    "excess_h": int(round(excess_month[g, m])) if has_upper[g] else 0,
+                }
+            )
+    return kpi_rows, monthly_rows
@@ -0,0 +1,289 @@
+# shift_suite / tasks / staff_days.py
+"""
+shift_suite.tasks.staff_days  v1.0.0
+────────────────────────────────────────────────────────
+* スタッフ × 暦日の特徴量行列 (:class:`StaffDayMatrix`)
+    - 勤務スロット数 / 勤務開始・終了 (0:00 からの時間) / 夜間スロット数 /
+      その日の勤務コード / 休暇種別を (スタッフ数, 日数) の配列で持つ
+    - 日付は全スタッフ共通の連続した暦日 (データの最初の日〜最後の日)
+    - 連勤は :meth:`StaffDayMatrix.run_lengths` (その日で終わる連勤の長さ) と
+      :meth:`StaffDayMatrix.streaks` (連勤の開始日・終了日・日数) で得る
+* 疲労・離職・MECE 事実抽出・異常検知がスタッフごとに long_df を絞り込んで
+  日次集計していた処理をまとめたもの。:func:`staff_day_matrix` は同じ
+  DataFrame に対しては 1 回だけ作る (実行中の各分析で共有する)
+* long_df (スロット行) と勤務区間テーブルの両方を受け付ける。
+  区間テーブルから作った行列は、展開した long_df から作ったものと一致する
+* 「勤務」は ``parsed_slots_count > 0`` の行、「夜間」は
+  ``NIGHT_START_HOUR``〜``NIGHT_END_HOUR`` に始まるスロット。
+  その日の勤務コードはその日のスロットが最も多いコード (同数なら早く始まるほう)
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .constants import DEFAULT_SLOT_MINUTES, NIGHT_END_HOUR, NIGHT_START_HOUR
+from .shift_intervals import interval_days, is_interval_table
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HOLIDAY_TYPE = "通常勤務"
+
+_NIGHT_KEYWORDS = ("夜", "夜勤", "night", "準夜", "深夜")
+_DAY_KEYWORDS = ("日", "日勤", "day", "早番", "朝")
+_LATE_KEYWORDS = ("遅", "遅番", "late", "夕")
+
+
+def time_category(code: object) -> str:
+    """勤務コードから時間帯カテゴリ (night / day / late / other) を判定"""
+    if pd.isna(code):
+        return "other"
+    code_str = str(code).lower()
+    if any(k in code_str for k in _NIGHT_KEYWORDS):
+        return "night"
+    if any(k in code_str for k in _DAY_KEYWORDS):
+        return "day"
+    if any(k in code_str for k in _LATE_KEYWORDS):
+        return "late"
+    return "other"
+
+
+def _run_lengths(mask: np.ndarray) -> np.ndarray:
+    """行ごとに、各列で終わる True の連続長 (False の列は 0)"""
+    n_cols = mask.shape[1]
+    idx = np.broadcast_to(np.arange(n_cols), mask.shape)
+    last_break = np.maximum.accumulate(np.where(mask, -1, idx), axis=1)
+    return np.where(mask, idx - last_break, 0).astype(np.int32)
+
+
+@dataclass(frozen=True)
+class StaffDayMatrix:
+    """Per-staff, per-calendar-day work features as dense ``(staff, day)`` arrays.
+
+    ``code`` / ``leave`` hold indices into ``codes`` / ``leave_types``
+    (-1 = none).  ``start`` / ``end`` are hours from midnight of the day and
+    NaN on days without work.
+    """
+
+    staff: pd.Index
+    dates: pd.DatetimeIndex
+    slot_minutes: int
+    slots: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    night_slots: np.ndarray
+    code: np.ndarray
+    codes: pd.Index
+    leave: np.ndarray
+    leave_types: pd.Index
+
+    # ── 構築 ─────────────────────────────────────────────────────────
+    @classmethod
+    def from_frame(
+        cls, df: pd.DataFrame, slot_minutes: int = DEFAULT_SLOT_MINUTES, staff_col: str = "staff"
+    ) -> "StaffDayMatrix":
+        """long_df (``ds`` 列) または勤務区間テーブル (``start`` / ``end`` 列) から作る
+
+        スタッフは ``staff_col`` 列で識別する。
+        """
+        if df.empty:
+            empty = np.zeros((0, 0))
+            return cls(
+                pd.Index([], name="staff"), pd.DatetimeIndex([], name="date"), slot_minutes,
+                empty.astype(np.int32), empty, empty, empty.astype(np.int32),
+                empty.astype(np.int32), pd.Index([]), empty.astype(np.int32), pd.Index([]),
+            )
+        if is_interval_table(df):
+            pieces = interval_days(df)
+            day = pieces["day"].to_numpy().astype("datetime64[D]")
+            lo = ((pieces["day_start"].to_numpy() - pieces["day"].to_numpy()) // np.timedelta64(1, "m")).astype(np.int64)
+            hi = ((pieces["day_end"].to_numpy() - pieces["day"].to_numpy()) // np.timedelta64(1, "m")).astype(np.int64)
+            rows = pieces
+        else:
+            ds = pd.to_datetime(df["ds"]).to_numpy().astype("datetime64[m]")
+            day = ds.astype("datetime64[D]")
+            lo = (ds - day).astype(np.int64)
+            hi = lo + slot_minutes
+            rows = df
+        return cls._build(rows, day, lo, hi, slot_minutes, staff_col)
+
+    @classmethod
+    def _build(
+        cls,
+        rows: pd.DataFrame,
+        day: np.ndarray,
+        lo: np.ndarray,
+        hi: np.ndarray,
+        slot_minutes: int,
+        staff_col: str = "staff",
+    ) -> "StaffDayMatrix":
+        staff_codes, staff = pd.factorize(rows[staff_col])
+        first_day = day.min()
+        dates = pd.date_range(pd.Timestamp(first_day), pd.Timestamp(day.max()), freq="D", name="date")
+        n_staff, n_days = len(staff), len(dates)
+        cell = staff_codes.astype(np.int64) * n_days + (day - first_day).astype(np.int64)
+        size = n_staff * n_days
+
+        slot_counts = np.maximum(hi - lo, 0) // slot_minutes
+        worked = rows["parsed_slots_count"].to_numpy() > 0
+        night_start, night_end = NIGHT_START_HOUR * 60, NIGHT_END_HOUR * 60
+        night_minutes = np.maximum(np.minimum(hi, night_end) - lo, 0) + np.maximum(hi - np.maximum(lo, night_start), 0)
+
+        w_cell = cell[worked]
+        slots = np.bincount(w_cell, weights=slot_counts[worked], minlength=size)
+        night = np.bincount(w_cell, weights=night_minutes[worked] // slot_minutes, minlength=size)
+        start = np.full(size, np.inf)
+        end = np.full(size, -np.inf)
+        np.minimum.at(start, w_cell, lo[worked])
+        np.maximum.at(end, w_cell, hi[worked])
+
+        code_idx, codes = pd.factorize(rows["code"]) if "code" in rows.columns else (np.full(len(rows), -1), pd.Index([]))
+        code = np.full(size, -1, dtype=np.int32)
+        if worked.any():
+            # その日のスロットが最も多いコード (同数なら早く始まるほう)
+            per_code = pd.DataFrame(
+                {"cell": w_cell, "code": np.asarray(code_idx)[worked], "n": slot_counts[worked], "lo": lo[worked]}
+            ).groupby(["cell", "code"], sort=False).agg(n=("n", "sum"), lo=("lo", "min")).reset_index()
+            order = np.lexsort((per_code["lo"].to_numpy(), -per_code["n"].to_numpy(), per_code["cell"].to_numpy()))
+            cells = per_code["cell"].to_numpy()[order]
+            first = order[np.r_[True, cells[1:] != cells[:-1]]]
+            code[per_code["cell"].to_numpy()[first]] = per_code["code"].to_numpy()[first]
+
+        leave = np.full(size, -1, dtype=np.int32)
+        leave_types = pd.Index([])
+        if "holiday_type" in rows.columns:
+            holiday = rows["holiday_type"].astype(object).to_numpy()
+            on_leave = pd.notna(holiday) & (holiday != DEFAULT_HOLIDAY_TYPE)
+            if on_leave.any():
+                leave_idx, leave_types = pd.factorize(holiday[on_leave])
+                # 同じ日に複数あれば最初の行の種別
+                leave[cell[on_leave][::-1]] = leave_idx[::-1]
+
+        shape = (n_staff, n_days)
+        with np.errstate(invalid="ignore"):
+            start_h = np.where(np.isfinite(start), start / 60.0, np.nan)
+            end_h = np.where(np.isfinite(end), end / 60.0, np.nan)
+        return cls(
+            staff=pd.Index(np.asarray(staff), name="staff"),
+            dates=dates,
+            slot_minutes=int(slot_minutes),
+            slots=slots.astype(np.int32).reshape(shape),
+            start=start_h.reshape(shape),
+            end=end_h.reshape(shape),
+            night_slots=night.astype(np.int32).reshape(shape),
+            code=code.reshape(shape),
+            codes=pd.Index(np.asarray(codes)),
+            leave=leave.reshape(shape),
+            leave_types=pd.Index(np.asarray(leave_types)),
+        )
+
+    # ── 派生値 ───────────────────────────────────────────────────────
+    @property
+    def worked(self) -> np.ndarray:
+        return self.slots > 0
+
+    @property
+    def hours(self) -> np.ndarray:
+        return self.slots * (self.slot_minutes / 60.0)
+
+    @property
+    def weekend(self) -> np.ndarray:
+        """土日の列 (長さ = 日数)"""
+        return np.asarray(self.dates.weekday >= 5)
+
+    def code_category(self) -> np.ndarray:
+        """その日の勤務コードの時間帯カテゴリ (勤務のない日は ``"none"``)"""
+        cats = np.array([time_category(c) for c in self.codes] + ["none"], dtype=object)
+        return cats[self.code]
+
+    @property
+    def night(self) -> np.ndarray:
+        """その日の勤務コードが夜勤系か"""
+        return self.code_category() == "night"
+
+    def run_lengths(self, mask: np.ndarray | None = None) -> np.ndarray:
+        """各日で終わる連勤の長さ (``mask`` で勤務日の定義や期間を絞れる)"""
+        return _run_lengths(self.worked if mask is None else mask)
+
+    def streaks(self, mask: np.ndarray | None = None) -> pd.DataFrame:
+        """連勤 (連続勤務日) の一覧: staff / start / end / length"""
+        m = (self.worked if mask is None else mask).astype(np.int8)
+        pad = np.zeros((m.shape[0], 1), dtype=np.int8)
+        edges = np.diff(np.hstack([pad, m, pad]), axis=1)
+        rows, begin = np.nonzero(edges == 1)
+        _, stop = np.nonzero(edges == -1)
+        return pd.DataFrame(
+            {
+                "staff": self.staff.take(rows),
+                "start": self.dates.take(begin),
+                "end": self.dates.take(stop - 1),
+                "length": (stop - begin).astype(np.int64),
+            }
+        )
+
+    def daily(self) -> pd.DataFrame:
+        """勤務のある (スタッフ, 日) だけの縦持ちテーブル"""
+        s_idx, d_idx = np.nonzero(self.worked)
+        codes = np.append(np.asarray(self.codes, dtype=object), None)
+        return pd.DataFrame(
+            {
+                "staff": self.staff.take(s_idx),
+                "date": self.dates.take(d_idx),
+                "slots": self.slots[s_idx, d_idx],
+                "hours": self.hours[s_idx, d_idx],
+                "start": self.start[s_idx, d_idx],
+                "end": self.end[s_idx, d_idx],
+                "night_slots": self.night_slots[s_idx, d_idx],
+                "code": codes[self.code[s_idx, d_idx]],
+            }
+        )
+
+    def rest_hours(self) -> pd.DataFrame:
+        """勤務日の終了から次の勤務日の開始までの時間 (RestTimeAnalyzer.analyze と同じ形)"""
+        daily = self.daily()
+        start = daily["date"] + pd.to_timedelta(daily["start"], unit="h")
+        end = daily["date"] + pd.to_timedelta(daily["end"], unit="h")
+        next_start = start.groupby(daily["staff"].to_numpy()).shift(-1)
+        return pd.DataFrame(
+            {
+                "staff": daily["staff"],
+                "date": daily["date"].dt.date,
+                "rest_hours": (next_start - end).dt.total_seconds() / 3600.0,
+            }
+        )
+
+
+# ── 実行中の共有 ─────────────────────────────────────────────────────
+_MATRICES: Dict[Tuple[int, int, str], StaffDayMatrix] = {}
+_LOCK = threading.Lock()
+
+
+def staff_day_matrix(
+    df: pd.DataFrame, slot_minutes: int = DEFAULT_SLOT_MINUTES, staff_col: str = "staff"
+) -> StaffDayMatrix:
+    """``df`` の :class:`StaffDayMatrix` (同じ DataFrame オブジェクトには 1 回だけ作る)
+
+    DataFrame が破棄されると行列も捨てる。呼び出し側は ``df`` をその場で
+    書き換えないこと (書き換えた場合は ``StaffDayMatrix.from_frame`` を直接使う)。
+    スタッフを別の列で識別する場合は、列を付け替えたコピーを作らずに
+    ``staff_col`` で指定する (コピーは別の DataFrame として毎回作り直しになる)。
+    """
+    key = (id(df), int(slot_minutes), staff_col)
+    with _LOCK:
+        hit = _MATRICES.get(key)
+    if hit is not None:
+        return hit
+    matrix = StaffDayMatrix.from_frame(df, slot_minutes, staff_col)
+    with _LOCK:
+        if key not in _MATRICES:
+            _MATRICES[key] = matrix
+            weakref.finalize(df, _MATRICES.pop, key, None)
+    log.debug(f"[staff_days] {len(matrix.staff)} 人 × {len(matrix.dates)} 日の行列を作成しました")
+    return matrix
@@ -334,8 +334,8 @@ except ImportError:
 import warnings
 
 from .utils import log, save_df_parquet, write_meta
-from .constants import NIGHT_START_HOUR, NIGHT_END_HOUR, is_night_shift_time
-from .utils import validate_and_convert_slot_minutes, safe_slot_calculation
+from .utils import validate_and_convert_slot_minutes
+from .staff_days import staff_day_matrix
 
 # Log model availability
 if SKLEARN_AVAILABLE:
@@ -434,182 +434,125 @@ class TurnoverPredictionEngine:
         log.info(f"[TurnoverPredictionEngine] Initialized with model_type={model_type}, lookback={lookback_months}months")
     
     def extract_turnover_features(self, long_df: pd.DataFrame, staff_metadata: Optional[pd.DataFrame] = None) -> pd.DataFrame:
-        """離職リスク特徴量の抽出"""
-        features_list = []
-        
-        # 現在の日付を基準とする
-        current_date = pd.Timestamp.now()
-        
-        for staff in long_df['staff'].unique():
-            staff_df = long_df[long_df['staff'] == staff].copy()
-            
-            if len(staff_df) < 10:  # 最小限のデータ量チェック
+        """離職リスク特徴量の抽出
+
+        スタッフ × 日の行列 (:func:`staff_day_matrix`) から、各スタッフの最終勤務日を
+        起点にさかのぼる 1 か月ごとの窓で月次特徴量を作り、スタッフ単位に集計する。
+
+        月次窓は日単位の ``(month_start, month_end]`` (終端の日を含み、始端の日を含まない)。
+        旧実装はタイムスタンプ単位の ``[month_start, month_end)`` で、基準が最終勤務
+        スロットの時刻だったため最終勤務日はほぼ全体が直近の窓に入っていた。日単位で
+        同じ半開区間を取ると最終勤務日が直近の窓から落ちるため、端点を入れ替えている。
+        """
+        matrix = staff_day_matrix(long_df, self.slot_minutes)
+        worked = matrix.worked
+        if not worked.any():
+            return pd.DataFrame()
+
+        # 最小限のデータ量チェック (勤務スロット 10 未満は対象外)
+        eligible = np.flatnonzero(matrix.slots.sum(axis=1) >= 10)
+        if len(eligible) == 0:
+            return pd.DataFrame()
+        worked = worked[eligible]
+        slots = matrix.slots[eligible]
+        hours = matrix.hours[eligible]
+        start = matrix.start[eligible]
+        night_slots = matrix.night_slots[eligible]
+        weekend_slots = np.where(matrix.weekend, slots, 0)
+        code = matrix.code[eligible]
+        n_codes = len(matrix.codes) + 1
+
+        day_no = np.arange(len(matrix.dates))
+        last_day = len(matrix.dates) - 1 - np.argmax(worked[:, ::-1], axis=1)
+        end_dates = matrix.dates[last_day]
+
+        def _days(ts: pd.DatetimeIndex) -> np.ndarray:
+            return np.asarray((ts - matrix.dates[0]).days)
+
+        def _var(total: np.ndarray, total_sq: np.ndarray, n: np.ndarray) -> np.ndarray:
+            # 不偏分散 (1 件以下は 0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                var = (total_sq - total * total / n) / (n - 1)
+            return np.where(n > 1, np.maximum(var, 0), 0.0)
+
+        monthly_frames = []
+        for month_offset in range(self.lookback_months):
+            month_end = end_dates - pd.DateOffset(months=month_offset)
+            month_start = month_end - pd.DateOffset(months=1)
+            # 窓は日単位の (month_start, month_end] (docstring 参照)
+            in_window = (day_no > _days(month_start)[:, None]) & (day_no <= _days(month_end)[:, None])
+            wk = worked & in_window
+            work_days = wk.sum(axis=1)
+            present = work_days > 0
+            if not present.any():
                 continue
-            
-            # 時系列データの準備
-            staff_df['date'] = pd.to_datetime(staff_df['ds'])
-            staff_df = staff_df.sort_values('date')
-            
-            # 月次集計
-            monthly_data = []
-            end_date = staff_df['date'].max()
-            start_date = end_date - pd.DateOffset(months=self.lookback_months)
-            
-            for month_offset in range(self.lookback_months):
-                month_end = end_date - pd.DateOffset(months=month_offset)
-                month_start = month_end - pd.DateOffset(months=1)
-                
-                month_data = staff_df[
-                    (staff_df['date'] >= month_start) & 
-                    (staff_df['date'] < month_end)
-                ]
-                
-                if month_data.empty:
-                    continue
-                
-                # 基本勤務統計
-                # 修正: 動的スロット設定対応
-                total_hours = safe_slot_calculation(
-                    pd.Series([1] * len(month_data)), 
-                    self.slot_minutes, 
-                    "sum", 
-                    "extract_turnover_features"
-                )
-                work_days = month_data['date'].dt.date.nunique()
-                avg_hours_per_day = total_hours / work_days if work_days > 0 else 0
-                
-                # 勤務時間の不規則性
-                daily_hours = month_data.groupby(month_data['date'].dt.date).size() * SLOT_HOURS
-                hours_variance = daily_hours.var() if len(daily_hours) > 1 else 0
-                
-                # 勤務開始時刻の不規則性
-                start_times = month_data['date'].dt.hour + month_data['date'].dt.minute / 60
-                start_time_variance = start_times.var() if len(start_times) > 1 else 0
-                
-                # 夜勤比率（統一された定数を使用）
-                night_hours = month_data[
-                    (month_data['date'].dt.hour >= NIGHT_START_HOUR) | 
-                    (month_data['date'].dt.hour < NIGHT_END_HOUR)
-                ]
-                night_ratio = len(night_hours) / len(month_data) if len(month_data) > 0 else 0
-                
-                # 週末勤務比率
-                weekend_hours = month_data[month_data['date'].dt.weekday >= 5]
-                weekend_ratio = len(weekend_hours) / len(month_data) if len(month_data) > 0 else 0
-                
-                # 勤務コードの多様性
-                task_diversity = month_data['code'].nunique() if 'code' in month_data.columns else 1
-                
-                # 連続勤務パターン
-                work_dates = sorted(month_data['date'].dt.date.unique())
-                consecutive_days = self._calculate_max_consecutive_days(work_dates)
-                
-                # 休暇取得頻度（勤務がない日を休暇と仮定）
-                calendar_days = (month_end - month_start).days
-                rest_days = calendar_days - work_days
-                rest_ratio = rest_days / calendar_days if calendar_days > 0 else 0
-                
-                monthly_features = {
-                    'staff': staff,
+
+            total_slots = np.where(wk, slots, 0).sum(axis=1)
+            h = np.where(wk, hours, 0.0)
+            st = np.where(wk, start, 0.0)
+            # 勤務コードの多様性 (窓内の勤務日のコードの種類数)
+            s_idx, d_idx = np.nonzero(wk)
+            pairs = np.unique(s_idx.astype(np.int64) * n_codes + code[s_idx, d_idx] + 1)
+            task_diversity = np.bincount(pairs // n_codes, minlength=len(eligible))
+            calendar_days = np.asarray((month_end - month_start).days)
+            total_hours = total_slots * self.slot_hours
+            with np.errstate(invalid="ignore", divide="ignore"):
+                monthly = pd.DataFrame({
+                    'staff': matrix.staff[eligible],
                     'month': month_end.strftime('%Y-%m'),
                     'total_hours': total_hours,
                     'work_days': work_days,
-                    'avg_hours_per_day': avg_hours_per_day,
-                    'hours_variance': hours_variance,
-                    'start_time_variance': start_time_variance,
-                    'night_ratio': night_ratio,
-                    'weekend_ratio': weekend_ratio,
+                    'avg_hours_per_day': np.where(work_days > 0, total_hours / np.maximum(work_days, 1), 0),
+                    'hours_variance': _var(h.sum(axis=1), (h * h).sum(axis=1), work_days),
+                    'start_time_variance': _var(st.sum(axis=1), (st * st).sum(axis=1), work_days),
+                    'night_ratio': np.where(wk, night_slots, 0).sum(axis=1) / np.maximum(total_slots, 1),
+                    'weekend_ratio': np.where(wk, weekend_slots, 0).sum(axis=1) / np.maximum(total_slots, 1),
                     'task_diversity': task_diversity,
-                    'consecutive_days': consecutive_days,
-                    'rest_ratio': rest_ratio,
-                    'months_from_current': month_offset
-                }
-                
-                monthly_data.append(monthly_features)
-            
-            if monthly_data:
-                # スタッフレベルの集計特徴量
-                monthly_df = pd.DataFrame(monthly_data)
-                
-                # 傾向分析（時系列の傾向）
-                recent_3m = monthly_df[monthly_df['months_from_current'] < 3]
-                older_3m = monthly_df[monthly_df['months_from_current'] >= 3]
-                
-                if len(recent_3m) > 0 and len(older_3m) > 0:
-                    # 勤務時間の変化傾向
-                    hours_trend = recent_3m['total_hours'].mean() - older_3m['total_hours'].mean()
-                    
-                    # 不規則性の変化
-                    variance_trend = recent_3m['hours_variance'].mean() - older_3m['hours_variance'].mean()
-                    
-                    # 夜勤比率の変化
-                    night_trend = recent_3m['night_ratio'].mean() - older_3m['night_ratio'].mean()
-                else:
-                    hours_trend = 0
-                    variance_trend = 0
-                    night_trend = 0
-                
-                # 全期間の統計
-                staff_features = {
-                    'staff': staff,
-                    'avg_total_hours': monthly_df['total_hours'].mean(),
-                    'std_total_hours': monthly_df['total_hours'].std(),
-                    'avg_work_days': monthly_df['work_days'].mean(),
-                    'avg_hours_variance': monthly_df['hours_variance'].mean(),
-                    'avg_start_time_variance': monthly_df['start_time_variance'].mean(),
-                    'avg_night_ratio': monthly_df['night_ratio'].mean(),
-                    'avg_weekend_ratio': monthly_df['weekend_ratio'].mean(),
-                    'avg_task_diversity': monthly_df['task_diversity'].mean(),
-                    'max_consecutive_days': monthly_df['consecutive_days'].max(),
-                    'avg_rest_ratio': monthly_df['rest_ratio'].mean(),
-                    'hours_trend': hours_trend,
-                    'variance_trend': variance_trend,
-                    'night_trend': night_trend,
-                    'work_consistency': 1.0 / (monthly_df['hours_variance'].mean() + 1),  # 高いほど一貫性がある
-                    'schedule_stability': 1.0 / (monthly_df['start_time_variance'].mean() + 1)
-                }
-                
-                # 外部メタデータとの結合
-                if staff_metadata is not None and staff in staff_metadata.index:
-                    meta = staff_metadata.loc[staff]
-                    staff_features.update({
-                        'tenure_months': meta.get('tenure_months', 12),  # デフォルト1年
-                        'age_group': meta.get('age_group', 'unknown'),
-                        'employment_type': meta.get('employment_type', 'unknown'),
-                        'department': meta.get('department', 'unknown')
-                    })
-                else:
-                    # デフォルト値
-                    staff_features.update({
-                        'tenure_months': 12,
-                        'age_group': 'unknown',
-                        'employment_type': 'unknown',
-                        'department': 'unknown'
-                    })
-                
-                features_list.append(staff_features)
-        
-        if not features_list:
+                    'consecutive_days': matrix.run_lengths(wk).max(axis=1),
+                    'rest_ratio': np.where(calendar_days > 0, (calendar_days - work_days) / np.maximum(calendar_days, 1), 0),
+                    'months_from_current': month_offset,
+                })
+            monthly_frames.append(monthly[present])
+
+        if not monthly_frames:
             return pd.DataFrame()
-        
-        return pd.DataFrame(features_list)
-    
-    def _calculate_max_consecutive_days(self, work_dates: List[dt.date]) -> int:
-        """連続勤務日数の最大値を計算"""
-        if not work_dates:
-            return 0
-        
-        max_consecutive = 1
-        current_consecutive = 1
-        
-        for i in range(1, len(work_dates)):
-            if (work_dates[i] - work_dates[i-1]).days == 1:
-                current_consecutive += 1
-                max_consecutive = max(max_consecutive, current_consecutive)
+        monthly_df = pd.concat(monthly_frames, ignore_index=True)
+        by_staff = monthly_df.groupby('staff', sort=False)
+
+        # 傾向分析（直近 3 か月とそれ以前の差。どちらかが無ければ 0）
+        recent = monthly_df[monthly_df['months_from_current'] < 3].groupby('staff', sort=False)
+        older = monthly_df[monthly_df['months_from_current'] >= 3].groupby('staff', sort=False)
+        trend_cols = ['total_hours', 'hours_variance', 'night_ratio']
+        trends = (recent[trend_cols].mean() - older[trend_cols].mean()).reindex(by_staff.size().index).fillna(0)
+
+        mean = by_staff.mean(numeric_only=True)
+        features = pd.DataFrame({
+            'avg_total_hours': mean['total_hours'],
+            'std_total_hours': by_staff['total_hours'].std(),
+            'avg_work_days': mean['work_days'],
+            'avg_hours_variance': mean['hours_variance'],
+            'avg_start_time_variance': mean['start_time_variance'],
+            'avg_night_ratio': mean['night_ratio'],
+            'avg_weekend_ratio': mean['weekend_ratio'],
+            'avg_task_diversity': mean['task_diversity'],
+            'max_consecutive_days': by_staff['consecutive_days'].max(),
+            'avg_rest_ratio': mean['rest_ratio'],
+            'hours_trend': trends['total_hours'],
+            'variance_trend': trends['hours_variance'],
+            'night_trend': trends['night_ratio'],
+            'work_consistency': 1.0 / (mean['hours_variance'] + 1),  # 高いほど一貫性がある
+            'schedule_stability': 1.0 / (mean['start_time_variance'] + 1),
+        })
+
+        # 外部メタデータとの結合（無いスタッフはデフォルト値）
+        defaults = {'tenure_months': 12, 'age_group': 'unknown', 'employment_type': 'unknown', 'department': 'unknown'}
+        for col, default in defaults.items():
+            if staff_metadata is not None and col in staff_metadata.columns:
+                features[col] = staff_metadata[col].reindex(features.index).fillna(default)
             else:
-                current_consecutive = 1
-        
-        return max_consecutive
+                features[col] = default
+
+        return features.rename_axis('staff').reset_index()
     
     def generate_synthetic_labels(self, features_df: pd.DataFrame) -> pd.DataFrame:
         """離職ラベルの合成生成（実際のデータがない場合）"""
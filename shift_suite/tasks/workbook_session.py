@@ -0,0 +1,224 @@
+# shift_suite / tasks / workbook_session.py
+"""
+shift_suite.tasks.workbook_session  v1.0.0
+────────────────────────────────────────────────────────
+* 1 つの .xlsx を一度だけ開き、全シート・セル・ヘッダー参照を共有するセッション
+* 行データは read-only ストリーミング (python-calamine があれば優先、
+  なければ openpyxl ``read_only`` / ``values_only``) で各シート 1 回だけ読む
+* ``read_sheet`` は ``pd.read_excel`` と同じ TextParser を通すため、
+  ``header`` / ``nrows`` / ``dtype`` 指定時の結果は ``pd.read_excel`` と一致する
+* ``open_workbook`` はパス・mtime・サイズで共有されるため、インポート
+  ウィザードと ingest_excel が同じファイルを何度も解析しなくなる
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+log = logging.getLogger(__name__)
+
+WORKBOOK_BACKENDS = ("auto", "calamine", "openpyxl")
+_MAX_OPEN_WORKBOOKS = 4
+
+
+def _calamine_available() -> bool:
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _convert_openpyxl_value(value: Any) -> Any:
+    """pandas の openpyxl リーダーと同じセル変換 (values_only 版)"""
+    from openpyxl.cell.cell import ERROR_CODES
+
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        val = int(value)
+        return val if val == value else float(value)
+    if isinstance(value, str) and value in ERROR_CODES:
+        return np.nan
+    return value
+
+
+def _convert_calamine_value(value: Any) -> Any:
+    """pandas の calamine リーダーと同じセル変換"""
+    if isinstance(value, float):
+        val = int(value)
+        return val if val == value else value
+    if isinstance(value, dt.date):
+        return pd.Timestamp(value)
+    if isinstance(value, dt.timedelta):
+        return pd.Timedelta(value)
+    return value
+
+
+class WorkbookSession:
+    """Single-open, read-only view over one Excel workbook.
+
+    Each sheet is streamed at most once; subsequent ``read_sheet`` / ``cell`` /
+    ``columns`` calls are served from the cached rows.
+    """
+
+    def __init__(self, path: Path | str, *, backend: str = "auto") -> None:
+        if backend not in WORKBOOK_BACKENDS:
+            raise ValueError(f"未知のバックエンドです: {backend} (選択肢: {WORKBOOK_BACKENDS})")
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"Excel ファイルが見つかりません: {self.path}")
+        if backend == "auto":
+            backend = "calamine" if _calamine_available() else "openpyxl"
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._rows: Dict[str, List[list]] = {}
+        self.sheets_parsed = 0
+
+        if backend == "calamine":
+            from python_calamine import CalamineWorkbook
+
+            self._book = CalamineWorkbook.from_path(str(self.path))
+            self._sheet_names = list(self._book.sheet_names)
+        else:
+            from openpyxl import load_workbook
+
+            self._book = load_workbook(
+                self.path, read_only=True, data_only=True, keep_links=False
+            )
+            self._sheet_names = list(self._book.sheetnames)
+        log.debug(f"WorkbookSession open: {self.path.name} ({self.backend}, {len(self._sheet_names)} sheets)")
+
+    # ── context manager ─────────────────────────────────────
+    def __enter__(self) -> "WorkbookSession":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        close = getattr(self._book, "close", None)
+        if close is not None:
+            close()
+
+    # ── 参照 API ────────────────────────────────────────────
+    @property
+    def sheet_names(self) -> List[str]:
+        return list(self._sheet_names)
+
+    def rows(self, sheet_name: str) -> List[list]:
+        """Return the converted cell rows of ``sheet_name`` (cached)."""
+        with self._lock:
+            cached = self._rows.get(sheet_name)
+            if cached is None:
+                if sheet_name not in self._sheet_names:
+                    raise ValueError(f"Worksheet named '{sheet_name}' not found")
+                cached = self._stream_sheet(sheet_name)
+                self._rows[sheet_name] = cached
+                self.sheets_parsed += 1
+            return cached
+
+    def cell(self, sheet_name: str, row: int, col: int) -> Any:
+        """0-based ``(row, col)`` の値。範囲外は ``None``"""
+        rows = self.rows(sheet_name)
+        if row < 0 or col < 0 or row >= len(rows) or col >= len(rows[row]):
+            return None
+        value = rows[row][col]
+        return None if value == "" else value
+
+    def read_sheet(
+        self,
+        sheet_name: str,
+        *,
+        header: int | None = 0,
+        nrows: int | None = None,
+        dtype: Any = None,
+        skiprows: int | Sequence[int] | None = None,
+        usecols: Any = None,
+    ) -> pd.DataFrame:
+        """``pd.read_excel(path, sheet_name=...)`` equivalent served from cache."""
+        data = [list(r) for r in self.rows(sheet_name)]
+        if not data:
+            return pd.DataFrame()
+        try:
+            parser = TextParser(
+                data,
+                header=header,
+                dtype=dtype,
+                skiprows=skiprows,
+                nrows=nrows,
+                usecols=usecols,
+                skip_blank_lines=False,
+            )
+            return parser.read(nrows=nrows)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame()
+
+    def columns(self, sheet_name: str, header: int = 0) -> List[Any]:
+        """ヘッダー行 ``header`` から得られる列名リスト"""
+        return list(self.read_sheet(sheet_name, header=header, nrows=1).columns)
+
+    # ── 内部 ────────────────────────────────────────────────
+    def _stream_sheet(self, sheet_name: str) -> List[list]:
+        if self.backend == "calamine":
+            raw = self._book.get_sheet_by_name(sheet_name).to_python(
+                skip_empty_area=False
+            )
+            return [[_convert_calamine_value(v) for v in row] for row in raw]
+
+        ws = self._book[sheet_name]
+        ws.reset_dimensions()
+        data: List[list] = []
+        last_row_with_data = -1
+        for row_number, row in enumerate(ws.iter_rows(values_only=True)):
+            converted = [_convert_openpyxl_value(v) for v in row]
+            while converted and converted[-1] == "":
+                converted.pop()
+            if converted:
+                last_row_with_data = row_number
+            data.append(converted)
+        data = data[: last_row_with_data + 1]
+        if data:
+            width = max(len(r) for r in data)
+            data = [r + [""] * (width - len(r)) for r in data]
+        return data
+
+
+_open_workbooks: "OrderedDict[Path, tuple[int, int, WorkbookSession]]" = OrderedDict()
+_open_lock = threading.Lock()
+
+
+def open_workbook(path: Path | str | WorkbookSession) -> WorkbookSession:
+    """Return a shared :class:`WorkbookSession` for ``path``.
+
+    Sessions are reused while the file's mtime and size are unchanged, so every
+    caller in the import wizard and ``ingest_excel`` shares one parse.
+    """
+    if isinstance(path, WorkbookSession):
+        return path
+    p = Path(path).resolve()
+    stat = p.stat()
+    with _open_lock:
+        entry = _open_workbooks.get(p)
+        if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            _open_workbooks.move_to_end(p)
+            return entry[2]
+        if entry is not None:
+            entry[2].close()
+        session = WorkbookSession(p)
+        _open_workbooks[p] = (stat.st_mtime_ns, stat.st_size, session)
+        while len(_open_workbooks) > _MAX_OPEN_WORKBOOKS:
+            _, (_, _, old) = _open_workbooks.popitem(last=False)
+            old.close()
+        return session
@@ -0,0 +1,95 @@
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks.fairness import _jain_gini, fairness_cube, run_fairness
+
+
+def _long_df() -> pd.DataFrame:
+    rows = []
+
+    def work(staff: str, role: str, day: str, hour: int, slots: int, code: str) -> None:
+        start = pd.Timestamp(day) + pd.Timedelta(hours=hour)
+        for i in range(slots):
+            rows.append((start + pd.Timedelta(minutes=30 * i), staff, role, code, "通常勤務", 1))
+
+    # A: 金曜の夜勤 (22:00-翌2:00) + 土曜の日勤 11 時間
+    work("A", "介護", "2024-01-05", 22, 8, "夜")
+    work("A", "介護", "2024-01-06", 8, 22, "日")
+    # B: 平日の日勤 8 時間 × 2
+    work("B", "介護", "2024-01-08", 9, 16, "日")
+    work("B", "介護", "2024-01-09", 9, 16, "日")
+    # C: 看護の日勤 1 日
+    work("C", "看護", "2024-01-10", 9, 16, "日")
+    return pd.DataFrame(rows, columns=["ds", "staff", "role", "code", "holiday_type", "parsed_slots_count"])
+
+
+def test_run_fairness_counts_burdens_per_staff(tmp_path: pathlib.Path) -> None:
+    run_fairness(_long_df(), tmp_path, holidays=["2024-01-10"])
+    after = pd.read_parquet(tmp_path / "fairness_after.parquet").set_index("staff")
+
+    assert after.loc["A", "night_slots"] == 8 and after.loc["A", "total_slots"] == 30
+    # 夜勤の土曜 0:00-2:00 の 4 スロット + 土曜の日勤 22 スロット
+    assert after.loc["A", "weekend_slots"] == 26
+    # 長時間勤務は暦日単位: 土曜は 0:00-2:00 + 8:00-19:00 の 13 時間
+    assert after.loc["A", "long_shift_days"] == 1 and after.loc["A", "long_shift_slots"] == 26
+    assert after.loc["C", "holiday_slots"] == 16 and after.loc["B", "holiday_slots"] == 0
+
+    before = pd.read_parquet(tmp_path / "fairness_before.parquet").set_index("metric")["value"]
+    assert before["jain_index"] == before["jain_night_ratio"]
+    assert {"gini_night_ratio", "jain_long_shift_ratio"} <= set(before.index)
+    assert (tmp_path / "fairness_cube.parquet").exists()
+
+
+def test_fairness_cube_groups_by_dimension() -> None:
+    cube = fairness_cube(_long_df(), dimensions=("role", "month", "employment"))
+    night = cube[cube["burden"] == "night"].set_index(["dimension", "group"])
+
+    assert night.loc[("all", "全体"), "n_staff"] == 3
+    assert night.loc[("role", "介護"), "n_staff"] == 2
+    assert night.loc[("role", "看護"), "burden_slots"] == 0
+    assert night.loc[("role", "看護"), "jain"] == 1.0
+    assert set(cube["dimension"]) == {"all", "role", "month"}  # employment 列は無いので省略
+
+
+def test_jain_gini_match_definitions() -> None:
+    values = np.array([[1.0, 2.0, 3.0, 4.0], [0.0, 0.0, 5.0, 0.0]])
+    present = np.array([[True] * 4, [True, True, True, False]])
+    jain, gini = _jain_gini(values, present)
+    assert jain[0] == round(100 / (4 * 30), 3)
+    assert gini[0] == 0.25 and gini[1] == round(2 / 3, 3)
+
+
+def test_run_fairness_defaults_to_holidays_recorded_by_heatmap(tmp_path: pathlib.Path) -> None:
+    from shift_suite.tasks.utils import write_meta
+
+    # build_heatmap と同じく、渡された休日を estimated_holidays に記録する
+    write_meta(tmp_path / "heatmap.meta.json", slot=30, estimated_holidays=["2024-01-08"])
+    run_fairness(_long_df(), tmp_path)
+    after = pd.read_parquet(tmp_path / "fairness_after.parquet").set_index("staff")
+    assert after.loc["B", "holiday_slots"] == 16 and after.loc["C", "holiday_slots"] == 0
+
+    # meta が無ければ休日負担は 0
+    empty = tmp_path / "no_meta"
+    run_fairness(_long_df(), empty)
+    assert (pd.read_parquet(empty / "fairness_after.parquet")["holiday_slots"] == 0).all()
+
+
+def test_consecutive_leave_freq_with_other_staff_column(tmp_path: pathlib.Path) -> None:
+    df = _long_df()
+    # C: 1/10 の後 1/15 まで休み (48 時間以上の休息が 1 回)
+    extra = df[df["staff"] == "C"].assign(ds=lambda d: d["ds"] + pd.Timedelta(days=5))
+    df = pd.concat([df, extra], ignore_index=True)
+
+    run_fairness(df, tmp_path / "staff")
+    run_fairness(df.rename(columns={"staff": "name"}), tmp_path / "name")
+    by_staff = pd.read_parquet(tmp_path / "staff" / "fairness_after.parquet").set_index("staff")
+    by_name = pd.read_parquet(tmp_path / "name" / "fairness_after.parquet").set_index("name")
+
+    assert by_staff.loc["C", "consecutive_leave_freq"] > 0
+    pd.testing.assert_series_equal(
+        by_name["consecutive_leave_freq"], by_staff["consecutive_leave_freq"], check_names=False
+    )
@@ -0,0 +1,31 @@
+import pathlib
+import sys
+
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks import fingerprint
+from shift_suite.tasks.fingerprint import file_digest, files_digest, frame_digest
+
+
+def test_frame_digest_depends_on_content_not_only_shape() -> None:
+    a = pd.DataFrame({"staff": ["A", "B"], "slots": [1, 2]})
+    b = pd.DataFrame({"staff": ["A", "C"], "slots": [1, 2]})
+    assert frame_digest(a) == frame_digest(a.copy())
+    assert frame_digest(a) != frame_digest(b)
+    assert frame_digest(a) != frame_digest(a.astype({"slots": "int16"}))
+    assert frame_digest(a) != frame_digest(a.set_axis(["x", "y"]))
+    assert frame_digest(a["staff"]) != frame_digest(b["staff"])
+    assert frame_digest(pd.DataFrame({"x": [[1], [2]]})) != frame_digest(pd.DataFrame({"x": [[1], [3]]}))
+
+
+def test_file_digest_is_memoised_until_the_file_changes(tmp_path: pathlib.Path) -> None:
+    fp = tmp_path / "heat_ALL.parquet"
+    pd.DataFrame({"a": [1, 2]}).to_parquet(fp)
+    first = file_digest(fp)
+    assert fingerprint.file_signature(fp) in fingerprint._FILE_DIGESTS
+    assert file_digest(fp) == first
+
+    pd.DataFrame({"a": [1, 3]}).to_parquet(fp)
+    assert file_digest(fp) != first
+    assert files_digest([fp]) != files_digest([fp, tmp_path / "missing.parquet"])
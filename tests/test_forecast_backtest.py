@@ -0,0 +1,68 @@
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks import forecast_backtest as fb
+
+
+def _write_series(out_dir: pathlib.Path, seed: int, days: int = 56) -> None:
+    out_dir.mkdir(parents=True)
+    ds = pd.date_range("2024-01-01", periods=days)
+    y = 50 + 10 * np.sin(np.arange(days) * 2 * np.pi / 7) + np.random.default_rng(seed).normal(0, 1, days)
+    pd.DataFrame({"ds": ds.strftime("%Y-%m-%d"), "y": y}).to_csv(out_dir / "demand_series.csv", index=False)
+
+
+def test_rolling_origins_end_at_series_tail() -> None:
+    assert fb.rolling_origins(50, horizon=7, initial=28, step=7) == [29, 36, 43]
+    assert fb.rolling_origins(50, horizon=7, initial=28, step=7, max_folds=1) == [43]
+    assert fb.rolling_origins(30, horizon=7, initial=28, step=7) == []
+
+
+def test_summary_metrics_for_known_errors() -> None:
+    errors = pd.DataFrame(
+        {
+            "source": "s", "model": "m", "fold": [0, 1], "horizon": 1,
+            "y": [10.0, 0.0], "yhat": [12.0, 0.0], "scale": [2.0, 2.0],
+            "fit_seconds": [0.1, 0.3], "predict_seconds": [0.0, 0.0], "error": None,
+        }
+    )
+    row = fb.summarize_errors(errors).iloc[0]
+    assert row["mape"] == 0.2  # 実績 0 の fold は除外
+    assert np.isclose(row["smape"], (2 * 2 / 22 + 0) / 2)
+    assert row["mase"] == 0.5 and row["n_folds"] == 2 and row["n_failed"] == 0
+    assert np.isclose(row["fit_seconds"], 0.2)
+
+
+def test_run_backtest_appends_comparable_runs(tmp_path: pathlib.Path) -> None:
+    _write_series(tmp_path / "fac_a" / "out", 1)
+    _write_series(tmp_path / "fac_b", 2)
+    bench = tmp_path / "bench.parquet"
+    opts = dict(horizon=7, step=7, initial=28, models=("ETS", "SeasonalNaive", "Naive"), max_workers=1)
+
+    first = fb.run_backtest([tmp_path / "fac_a", tmp_path / "fac_b"], bench, **opts)
+    assert set(first.summary["source"]) == {"fac_a/out", "fac_b"}
+    assert set(first.summary["horizon"]) == set(range(1, 8))
+    assert (first.summary["n_folds"] == 4).all()  # origin = 28, 35, 42, 49
+    board = first.leaderboard().set_index("model")
+    assert board.loc["SeasonalNaive", "mase"] < board.loc["Naive", "mase"]
+    assert fb.recommended_choice(first.summary) == "ets"
+
+    second = fb.run_backtest([tmp_path / "fac_a", tmp_path / "fac_b"], bench, **opts)
+    table = pd.read_parquet(bench)
+    assert set(table["run_id"]) == {first.run_id, second.run_id}
+    diff = fb.compare_runs(table, first.run_id, second.run_id, latency_tolerance=np.inf)
+    assert len(diff) == len(first.summary) and not diff["regressed"].any()
+
+
+def test_same_named_roots_stay_separate_series(tmp_path: pathlib.Path) -> None:
+    _write_series(tmp_path / "a" / "out", 1)
+    _write_series(tmp_path / "b" / "out", 2)
+    _write_series(tmp_path / "b" / "out" / "sub", 3)
+
+    sources = fb.discover_series([tmp_path / "a" / "out", tmp_path / "b" / "out"])
+    assert list(sources) == ["a/out", "b/out", "b/out/sub"]
+    # root が 1 つなら従来どおり root の名前から
+    assert list(fb.discover_series([tmp_path / "a" / "out"])) == ["out"]
@@ -0,0 +1,78 @@
+import os
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks.forecast_batch import REPORT_COLUMNS, demand_series_from_heatmaps, forecast_many, run_batch_forecast
+
+DATES = pd.date_range("2024-01-01", periods=42)
+TIMES = [f"{h:02d}:00" for h in range(24)]
+
+
+def _heat(scale: int) -> pd.DataFrame:
+    rng = np.random.default_rng(scale)
+    heat = pd.DataFrame(
+        rng.poisson(scale, (len(TIMES), len(DATES))),
+        index=TIMES,
+        columns=[d.strftime("%Y-%m-%d") for d in DATES],
+    )
+    heat["need"] = 1
+    heat["staff"] = 2
+    return heat
+
+
+def _frames() -> dict:
+    return {"heat_ALL.parquet": _heat(3), "heat_介護.parquet": _heat(2), "heat_emp_常勤.parquet": _heat(1)}
+
+
+def test_series_from_heatmaps() -> None:
+    frames = _frames()
+    series = demand_series_from_heatmaps(frames)
+    assert {"ALL", "role:介護", "employment:常勤", "band:00-03", "band:21-24"} <= set(series.columns)
+    assert len(series) == len(DATES)
+    heat = frames["heat_ALL.parquet"]
+    assert series["ALL"].iloc[0] == heat["2024-01-01"].sum()
+    bands = series.filter(like="band:").sum(axis=1)
+    assert np.allclose(bands, series["ALL"])
+
+
+def test_batch_forecast_writes_report_and_reuses_cache(tmp_path: pathlib.Path, monkeypatch) -> None:
+    # 既定のキャッシュは出力先の外 (出力先を作り直しても再適合しない)
+    monkeypatch.setenv("SHIFT_SUITE_CACHE_DIR", str(tmp_path / "cache"))
+    first = run_batch_forecast(tmp_path / "run1", _frames(), bands=False, periods=7, max_workers=1)
+    assert list(first.report.columns) == REPORT_COLUMNS
+    assert not first.report["cached"].any()
+    assert first.report["error"].isna().all()
+    assert first.wide().shape == (7, 3)
+    assert (tmp_path / "cache" / "forecast_cache").is_dir()
+
+    second = run_batch_forecast(tmp_path / "run2", _frames(), bands=False, periods=7, max_workers=1)
+    assert second.report["cached"].all()
+    pd.testing.assert_frame_equal(first.forecasts, second.forecasts)
+
+    # パラメータが変われば再適合する
+    third = run_batch_forecast(tmp_path / "run2", _frames(), bands=False, periods=5, max_workers=1)
+    assert not third.report["cached"].any()
+    saved = pd.read_parquet(tmp_path / "run2" / "forecast_batch.parquet")
+    assert len(saved) == 3 * 5
+
+
+def test_pooled_fits_match_inline_and_ets_only_runs_inline(tmp_path: pathlib.Path, monkeypatch) -> None:
+    from shift_suite.tasks import forecast, forecast_batch
+
+    series = demand_series_from_heatmaps(_frames(), bands=False)
+    inline = forecast_many(series, periods=7, max_workers=1)
+    pooled = forecast_many(series, periods=7, max_workers=2)
+    assert pooled.report["error"].isna().all()
+    pd.testing.assert_frame_equal(inline.forecasts, pooled.forecasts)
+
+    # ETS だけの適合はプロセスを起こさない
+    monkeypatch.delenv("SHIFT_SUITE_FORECAST_WORKERS", raising=False)
+    monkeypatch.setattr(forecast, "_HAS_PMDARIMA", False)
+    assert forecast_batch._default_workers(11) == 1
+    monkeypatch.setattr(forecast, "_HAS_PMDARIMA", True)
+    assert forecast_batch._default_workers(11, "ets") == 1
+    assert forecast_batch._default_workers(11) == min(11, os.cpu_count() or 1)
@@ -0,0 +1,44 @@
+import os
+import pathlib
+import sys
+
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks.frame_cache import FrameCache, frame_nbytes
+
+
+def _write(fp: pathlib.Path, df: pd.DataFrame, mtime_ns: int) -> None:
+    df.to_parquet(fp)
+    os.utime(fp, ns=(mtime_ns, mtime_ns))
+
+
+def test_rewritten_file_is_not_served_stale(tmp_path: pathlib.Path) -> None:
+    cache = FrameCache()
+    fp = tmp_path / "heat_ALL.parquet"
+    _write(fp, pd.DataFrame({"a": [1, 2], "b": [3, 4]}), 1_000_000_000)
+
+    assert list(cache.read_parquet(fp)["a"]) == [1, 2]
+    assert list(cache.read_parquet(fp, columns=["b"]).columns) == ["b"]
+    assert cache.get_stats()["hits"] == 1  # 列の切り出しは全列エントリから
+
+    _write(fp, pd.DataFrame({"a": [9, 9, 9], "b": [0, 0, 0]}), 2_000_000_000)
+    assert list(cache.read_parquet(fp)["a"]) == [9, 9, 9]
+    stats = cache.get_stats()
+    assert stats["invalidations"] == 1 and stats["size"] == 1
+
+
+def test_cache_is_bounded_by_bytes(tmp_path: pathlib.Path) -> None:
+    frames = [pd.DataFrame({"x": range(i * 1000, i * 1000 + 1000)}) for i in range(3)]
+    cache = FrameCache(max_bytes=frame_nbytes(frames[0]) * 2)
+    for i, df in enumerate(frames):
+        _write(tmp_path / f"f{i}.parquet", df, 1_000_000_000)
+        cache.read_parquet(tmp_path / f"f{i}.parquet")
+    stats = cache.get_stats()
+    assert stats["size"] == 2 and stats["evictions"] == 1
+    assert stats["bytes"] <= stats["max_bytes"]
+
+    # 返されたフレームへの列追加はキャッシュに影響しない
+    df = cache.read_parquet(tmp_path / "f2.parquet")
+    df["y"] = 1
+    assert "y" not in cache.read_parquet(tmp_path / "f2.parquet").columns
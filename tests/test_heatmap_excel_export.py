@@ -0,0 +1,45 @@
+import datetime as dt
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks.heatmap import build_heatmap, export_heatmap_excel
+
+
+def _long_df() -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    rows = []
+    for day in pd.date_range("2024-06-03", periods=14, freq="D"):
+        for staff, role, emp in [("A", "介護", "常勤"), ("B", "看護", "パート"), ("C", "介護", "パート")]:
+            if rng.random() < 0.2:
+                continue
+            for ds in pd.date_range(day + pd.Timedelta(hours=9), periods=16, freq="30min"):
+                rows.append((ds, staff, role, emp, "日", "通常勤務", 16))
+    return pd.DataFrame(
+        rows, columns=["ds", "staff", "role", "employment", "code", "holiday_type", "parsed_slots_count"]
+    )
+
+
+def test_heatmaps_are_parquet_only_until_exported(tmp_path: pathlib.Path) -> None:
+    build_heatmap(
+        _long_df(),
+        tmp_path,
+        30,
+        ref_start_date_for_need=dt.date(2024, 6, 3),
+        ref_end_date_for_need=dt.date(2024, 6, 16),
+        holidays={dt.date(2024, 6, 9)},
+    )
+    assert not list(tmp_path.glob("heat_*.xlsx"))
+    parquets = sorted(tmp_path.glob("heat_*.parquet"))
+    assert {p.stem for p in parquets} >= {"heat_ALL", "heat_介護", "heat_看護", "heat_emp_常勤"}
+
+    written = export_heatmap_excel(tmp_path)
+    assert sorted(p.stem for p in written) == [p.stem for p in parquets]
+    for fp in parquets:
+        from_parquet = pd.read_parquet(fp)
+        from_excel = pd.read_excel(fp.with_suffix(".xlsx"), index_col=0)
+        np.testing.assert_allclose(from_excel.to_numpy(float), from_parquet.to_numpy(float))
+        assert list(from_excel.columns.astype(str)) == list(from_parquet.columns.astype(str))
@@ -0,0 +1,66 @@
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks.heatmap_tiles import (
+    build_heatmap_tiles,
+    downsample_wide,
+    read_heatmap_tile,
+    tile_path,
+    viewport_from_relayout,
+)
+from shift_suite.tasks.utils import gen_labels
+
+DAYS = pd.date_range("2023-01-01", "2024-12-31").strftime("%Y-%m-%d")
+
+
+def _heat() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    labels = gen_labels(30)
+    staff = pd.DataFrame(rng.integers(0, 6, (len(labels), len(DAYS))), index=pd.Index(labels, name="time"), columns=DAYS)
+    return staff.assign(need=2, upper=4)
+
+
+def test_tiles_keep_full_period_within_cell_budget(tmp_path: pathlib.Path) -> None:
+    heat = _heat()
+    build_heatmap_tiles(tmp_path, {"heat_ALL.parquet": heat, "need_per_date_slot.parquet": heat})
+    assert tile_path(tmp_path, "heat_ALL").exists()
+    assert not tile_path(tmp_path, "need_per_date_slot").exists()
+
+    full, levels = read_heatmap_tile(tmp_path, "heat_ALL", max_cells=15000)
+    assert full.size <= 15000
+    assert levels != ("slot", "day")
+    assert full.columns[0] == DAYS[0] and full.columns[-1] <= DAYS[-1]
+
+    # 狭い範囲は元の解像度のまま
+    month, levels = read_heatmap_tile(tmp_path, "heat_ALL", start="2024-03-01", end="2024-03-31")
+    assert levels == ("slot", "day")
+    pd.testing.assert_frame_equal(
+        month, heat.loc[:, "2024-03-01":"2024-03-31"].astype("float32"), check_names=False
+    )
+
+    # 週 × 時間: 元のセルの平均
+    weekly, _ = read_heatmap_tile(
+        tmp_path, "heat_ALL", start="2024-03-04", end="2024-03-17", levels=("hour", "week")
+    )
+    assert list(weekly.columns) == ["2024-03-04", "2024-03-11"]
+    expected = heat.loc[["00:00", "00:30"], "2024-03-04":"2024-03-10"].to_numpy().mean()
+    assert np.isclose(weekly.loc["00:00", "2024-03-04"], expected)
+
+
+def test_downsample_and_viewport() -> None:
+    heat = _heat()
+    small, levels = downsample_wide(heat.iloc[:, :10])
+    assert levels == ("slot", "day") and small.shape == (48, 10)
+    aggregated, _ = downsample_wide(heat, max_cells=2000)
+    assert aggregated.size <= 2000
+
+    assert viewport_from_relayout({"xaxis.range[0]": "2024-01-01", "xaxis.range[1]": "2024-02-01"}) == (
+        "2024-01-01",
+        "2024-02-01",
+    )
+    assert viewport_from_relayout({"xaxis.autorange": True}) == (None, None)
+    assert viewport_from_relayout({"autosize": True}) is None
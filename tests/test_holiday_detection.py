@@ -0,0 +1,40 @@
+import datetime as dt
+import pathlib
+import sys
+
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks.holiday_detection import estimate_closed_days, holiday_mask
+from shift_suite.tasks.leave_analyzer import get_daily_leave_counts
+
+
+def _long_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "ds": pd.to_datetime(
+                ["2024-06-01 09:00", "2024-06-02 00:00", "2024-06-04 09:00", "2024-06-04 09:30"]
+            ),
+            "staff": ["A", "A", "B", "B"],
+            "holiday_type": ["通常勤務", "有給", "通常勤務", "通常勤務"],
+            "parsed_slots_count": [16, 0, 16, 16],
+        }
+    )
+
+
+def test_days_without_normal_work_are_closed() -> None:
+    long_df = _long_df()
+    assert estimate_closed_days(long_df) == {dt.date(2024, 6, 2), dt.date(2024, 6, 3)}
+    assert estimate_closed_days(long_df, dt.date(2024, 5, 31), dt.date(2024, 6, 1)) == {
+        dt.date(2024, 5, 31)
+    }
+
+
+def test_holiday_mask_and_leave_exclusion() -> None:
+    long_df = _long_df()
+    mask = holiday_mask(long_df["ds"], {dt.date(2024, 6, 2)})
+    assert mask.tolist() == [False, True, False, False]
+    assert holiday_mask(["2024-06-02", None], None).tolist() == [False, False]
+
+    assert len(get_daily_leave_counts(long_df)) == 1
+    assert get_daily_leave_counts(long_df, closed_days={dt.date(2024, 6, 2)}).empty
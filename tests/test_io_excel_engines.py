@@ -0,0 +1,80 @@
+import pathlib
+import sys
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks.analyzers.rest_time import RestTimeAnalyzer
+from shift_suite.tasks.io_excel import ingest_excel
+from shift_suite.tasks.leave_analyzer import get_daily_leave_counts
+from shift_suite.tasks.shift_intervals import expand_intervals
+
+
+def _write_workbook(path: pathlib.Path) -> None:
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "勤務区分"
+    ws.append(["記号", "開始", "終了", "備考"])
+    ws.append(["日", "09:00", "17:00", ""])
+    ws.append(["夜", "22:00", "07:00", ""])
+    ws.append(["明", "00:00", "00:00", ""])
+    ws.append(["早", "07:00", "", ""])
+    ws.append(["休", "", "", ""])
+    ws.append(["有", "", "", "有給"])
+
+    sh = wb.create_sheet("実績")
+    sh.append(["2024年6月"])
+    sh.append(["氏名", "職種", "雇用形態"] + [f"{d}日" for d in range(1, 8)] + ["備考欄"])
+    sh.append(["", "", "", "土", "日", "月", "火", "水", "木", "金", ""])
+    sh.append(["A", "介護", "常勤", "日", "夜", "", "休", "明", "有", "謎", ""])
+    sh.append(["B　太郎", "看護", "", "早", "", "日", "日", "夜", "夜", "nan", "x"])
+    sh.append(["C", "介護", "パート", "", "", "", "", "", "", "", ""])
+    wb.save(path)
+
+
+def test_columnar_engine_matches_legacy(tmp_path: pathlib.Path) -> None:
+    book = tmp_path / "shift.xlsx"
+    _write_workbook(book)
+    kwargs = dict(shift_sheets=["実績"], header_row=1, year_month_cell_location="A1")
+
+    legacy_df, legacy_wt, legacy_unknown = ingest_excel(book, engine="legacy", **kwargs)
+    fast_df, fast_wt, fast_unknown = ingest_excel(book, **kwargs)
+
+    assert len(legacy_df) > 0
+    pd.testing.assert_frame_equal(fast_df, legacy_df)
+    pd.testing.assert_frame_equal(fast_wt, legacy_wt)
+    assert fast_unknown == legacy_unknown == {"謎", "x"}
+    # 夜勤は翌日へ繰り越される
+    night = fast_df[(fast_df["staff"] == "A") & (fast_df["code"] == "夜")]
+    assert night["ds"].max() == pd.Timestamp("2024-06-03 06:30")
+
+
+def test_interval_table_expands_to_long_df(tmp_path: pathlib.Path) -> None:
+    book = tmp_path / "shift.xlsx"
+    _write_workbook(book)
+    kwargs = dict(shift_sheets=["実績"], header_row=1, year_month_cell_location="A1")
+
+    long_df, _, _ = ingest_excel(book, **kwargs)
+    intervals, _, _ = ingest_excel(book, as_intervals=True, **kwargs)
+
+    assert len(intervals) < len(long_df)
+    pd.testing.assert_frame_equal(expand_intervals(intervals), long_df)
+    night = intervals[(intervals["staff"] == "A") & (intervals["code"] == "夜")].iloc[0]
+    assert night["end"] == pd.Timestamp("2024-06-03 07:00")
+
+    pd.testing.assert_frame_equal(
+        RestTimeAnalyzer().analyze(intervals).reset_index(drop=True),
+        RestTimeAnalyzer().analyze(long_df).reset_index(drop=True),
+    )
+    pd.testing.assert_frame_equal(
+        get_daily_leave_counts(intervals), get_daily_leave_counts(long_df)
+    )
+
+
+def test_unknown_engine_rejected(tmp_path: pathlib.Path) -> None:
+    book = tmp_path / "shift.xlsx"
+    _write_workbook(book)
+    with pytest.raises(ValueError):
+        ingest_excel(book, shift_sheets=["実績"], engine="polars")
@@ -0,0 +1,90 @@
+import pathlib
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.jobs import CANCELLED, DONE, FAILED, JobExecutor, JobStore, register_job
+
+_RELEASE = threading.Event()
+_STARTED = threading.Event()
+
+
+def _sum_job(ctx, values):
+    ctx.progress(50, "集計中")
+    return {"total": sum(values)}
+
+
+def _blocking_job(ctx):
+    _STARTED.set()
+    _RELEASE.wait(5)
+    ctx.progress(50, "続行")
+    return {"unreachable": True}
+
+
+def _executor(tmp_path: pathlib.Path) -> JobExecutor:
+    register_job("test_sum", _sum_job)
+    register_job("test_block", _blocking_job)
+    return JobExecutor(JobStore(tmp_path / "jobs.sqlite3"), pool=ThreadPoolExecutor(max_workers=2))
+
+
+def test_submit_runs_job_and_dedupes(tmp_path: pathlib.Path) -> None:
+    ex = _executor(tmp_path)
+    job = ex.submit("test_sum", {"values": [1, 2, 3]}, dedupe_key="k")
+    ex.shutdown(wait=True)
+
+    done = ex.poll(job.id)
+    assert done.status == DONE and done.progress == 100
+    assert ex.result(job.id) == {"total": 6}
+    # 同じキーの成功済みジョブは再実行しない
+    assert ex.submit("test_sum", {"values": [9]}, dedupe_key="k").id == job.id
+
+
+def test_cancel_running_job_stops_at_next_progress(tmp_path: pathlib.Path) -> None:
+    _RELEASE.clear()
+    _STARTED.clear()
+    ex = _executor(tmp_path)
+    job = ex.submit("test_block")
+    assert _STARTED.wait(5)
+    ex.cancel(job.id)
+    _RELEASE.set()
+    ex.shutdown(wait=True)
+    assert ex.poll(job.id).status == CANCELLED
+
+
+def test_interrupted_jobs_are_failed_on_restart(tmp_path: pathlib.Path) -> None:
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    job = store.create("test_sum")
+    with store._connect() as con:
+        con.execute("UPDATE jobs SET owner = NULL WHERE id = ?", (job.id,))
+    assert store.recover_interrupted() == 1
+    assert store.get(job.id).status == FAILED
+
+
+def test_blueprint_job_on_compact_long_df_returns_rules_as_dicts(tmp_path: pathlib.Path) -> None:
+    import pandas as pd
+
+    from shift_suite.tasks.long_df_schema import write_long_df
+
+    rows = []
+    for s, weekdays in enumerate(((0, 1, 2), (3, 4), (5, 6), (0, 2, 4))):
+        for day in pd.date_range("2024-01-01", periods=28):
+            if day.weekday() not in weekdays:
+                continue
+            code, hour = ("夜", 22) if s == 2 else ("日", 9)
+            for i in range(16):
+                ds = day + pd.Timedelta(hours=hour, minutes=30 * i)
+                rows.append((ds, f"S{s}", ["介護", "看護"][s % 2], "常勤", code, "通常勤務", 1))
+    df = pd.DataFrame(rows, columns=["ds", "staff", "role", "employment", "code", "holiday_type", "parsed_slots_count"])
+    # 保存・読込を経たコンパクトスキーマ (カテゴリ列) の long_df で実行する
+    write_long_df(df, tmp_path / "intermediate_data.parquet")
+
+    ex = JobExecutor(JobStore(tmp_path / "jobs.sqlite3"), pool=ThreadPoolExecutor(max_workers=1))
+    job = ex.submit("blueprint", {"scenario_dir": str(tmp_path)})
+    ex.shutdown(wait=True)
+
+    assert ex.poll(job.id).status == DONE
+    result = ex.result(job.id)
+    rules = result["blueprint_analysis"]["rules"]
+    assert rules and isinstance(rules[0], dict)
+    assert {"staff_name", "rule_type", "confidence_score"} <= set(rules[0])
@@ -0,0 +1,86 @@
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks.kpi_cube import ALL, breakdown, build_kpi_cube, load_kpi_cube, overview_kpis
+from shift_suite.tasks.shortage_kernel import group_shortage_rows
+from shift_suite.tasks.utils import gen_labels
+
+SLOT = 60
+DATES = [f"2024-06-{d:02d}" for d in range(1, 11)]
+
+
+def _heat(rng: np.random.Generator, labels: list[str]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    staff = pd.DataFrame(rng.integers(0, 5, (len(labels), len(DATES))), index=labels, columns=DATES)
+    need = pd.DataFrame(rng.integers(0, 5, (len(labels), len(DATES))), index=labels, columns=DATES)
+    heat = staff.assign(need=need.mean(axis=1), upper=3)
+    return heat, need
+
+
+def _frames() -> dict[str, pd.DataFrame]:
+    rng = np.random.default_rng(0)
+    labels = gen_labels(SLOT)
+    frames = {}
+    for heat_name, need_name in (
+        ("heat_介護.parquet", "need_per_date_slot_role_介護.parquet"),
+        ("heat_看護.parquet", "need_per_date_slot_role_看護.parquet"),
+        ("heat_emp_常勤.parquet", "need_per_date_slot_emp_常勤.parquet"),
+        ("heat_ALL.parquet", "need_per_date_slot.parquet"),
+    ):
+        frames[heat_name], frames[need_name] = _heat(rng, labels)
+    return frames
+
+
+def _long_df() -> pd.DataFrame:
+    rows = [
+        {"ds": pd.Timestamp(f"{day} 09:00"), "staff": staff, "role": role, "employment": "常勤",
+         "holiday_type": "通常勤務", "parsed_slots_count": 8}
+        for day in DATES
+        for staff, role in (("A", "介護"), ("B", "看護"))
+    ]
+    return pd.DataFrame(rows)
+
+
+def test_cube_matches_shortage_kernel_and_overview(tmp_path: pathlib.Path) -> None:
+    frames = _frames()
+    pd.DataFrame({"fatigue_score": [90.0, 30.0]}, index=pd.Index(["A", "B"], name="staff")).to_parquet(
+        tmp_path / "fatigue_score.parquet"
+    )
+    build_kpi_cube(tmp_path, long_df=_long_df(), heatmap_frames=frames, slot_minutes=SLOT, wage_temp=2.0)
+    cube = load_kpi_cube(tmp_path)
+
+    kpi_rows, _ = group_shortage_rows(
+        (
+            (name, frames[f"heat_{name}.parquet"], frames[f"need_per_date_slot_role_{name}.parquet"])
+            for name in ("介護", "看護")
+        ),
+        key="role",
+        time_labels=gen_labels(SLOT),
+        holidays=None,
+        slot_hours=SLOT / 60,
+    )
+    expected = pd.DataFrame(kpi_rows).set_index("role")
+    roles = breakdown(cube, "role").set_index("role")
+    for col in ("need_h", "staff_h", "lack_h", "excess_h"):
+        np.testing.assert_allclose(roles.loc[expected.index, col], expected[col])
+    assert roles.loc["介護", "avg_fatigue_score"] == 90.0
+
+    by_band = breakdown(cube, "role", dims=["weekday", "slot_band"])
+    assert by_band["lack_h"].sum() == expected["lack_h"].sum()
+    assert set(by_band["slot_band"]) == {f"{h:02d}-{h + 3:02d}" for h in range(0, 24, 3)}
+
+    kpis = overview_kpis(cube)
+    assert kpis["total_shortage_hours"] == expected["lack_h"].sum()
+    assert kpis["estimated_lack_cost_if_temporary_staff"] == 2.0 * expected["lack_h"].sum()
+    # 同じ不足の別見積もり (派遣換算・ペナルティ) を合算した総額は出さない
+    assert "estimated_cost" not in kpis and "estimated_lack_penalty_cost" in kpis
+    assert kpis["days"] == len(DATES)
+    assert kpis["avg_fatigue_score"] == 60.0
+    assert kpis["high_fatigue_count"] == 1
+    assert kpis["total_staff"] == 2
+
+    cross = cube[(cube["role"] == "介護") & (cube["employment"] == "常勤") & (cube["month"] != ALL)]
+    assert cross["staff_h"].sum() == len(DATES) * SLOT / 60
@@ -0,0 +1,61 @@
+import pathlib
+import sys
+
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks import leave_analyzer as la
+
+
+def _long_df() -> pd.DataFrame:
+    rows = [
+        # (ds, staff, role, holiday_type, parsed_slots_count)
+        ("2024-06-03 00:00", "A", "介護", la.LEAVE_TYPE_REQUESTED, 0),
+        ("2024-06-03 00:30", "A", "介護", la.LEAVE_TYPE_REQUESTED, 0),
+        ("2024-06-03 00:00", "B", "介護", la.LEAVE_TYPE_REQUESTED, 0),
+        ("2024-06-03 09:00", "C", "看護", "通常勤務", 1),
+        ("2024-06-04 00:00", "B", "介護", la.LEAVE_TYPE_PAID, 0),
+        ("2024-06-04 09:00", "C", "看護", la.LEAVE_TYPE_PAID, 2),  # P有: 終日ではない
+        ("2024-06-04 09:00", "A", "介護", "通常勤務", 1),
+        ("2024-06-15 00:00", "C", "看護", la.LEAVE_TYPE_OTHER, 0),
+        ("2024-06-15 09:00", "A", "介護", "通常勤務", 1),
+    ]
+    df = pd.DataFrame(rows, columns=["ds", "staff", "role", "holiday_type", "parsed_slots_count"])
+    df["ds"] = pd.to_datetime(df["ds"])
+    return df
+
+
+def test_daily_leave_counts_full_day_requested_and_paid_only() -> None:
+    daily = la.get_daily_leave_counts(_long_df())
+    assert list(daily.columns) == la.DAILY_LEAVE_COLUMNS
+    assert daily[["staff", "leave_type"]].values.tolist() == [
+        ["A", la.LEAVE_TYPE_REQUESTED],
+        ["B", la.LEAVE_TYPE_REQUESTED],
+        ["B", la.LEAVE_TYPE_PAID],
+    ]
+    staff_list = la.get_staff_leave_list(_long_df())
+    assert (staff_list["holiday_type"] == la.LEAVE_TYPE_OTHER).sum() == 1
+
+
+def test_analyze_leave_matches_individual_summaries() -> None:
+    df = _long_df()
+    bundle = la.analyze_leave(df, concentration_threshold=2)
+    daily = la.get_daily_leave_counts(df)
+    requested = daily[daily["leave_type"] == la.LEAVE_TYPE_REQUESTED]
+
+    pd.testing.assert_frame_equal(bundle.daily_leave_df, daily)
+    for period in la.LEAVE_SUMMARY_PERIODS:
+        pd.testing.assert_frame_equal(
+            bundle.summary(la.LEAVE_TYPE_REQUESTED, period),
+            la.summarize_leave_by_day_count(requested, period=period),
+            check_dtype=False,
+        )
+
+    conc = bundle.concentration_requested
+    assert conc["is_concentrated"].tolist() == [True]
+    assert conc["staff_names"].iloc[0] == ["A", "B"]
+
+    balance = bundle.staff_balance_daily.set_index("date")
+    assert balance.loc["2024-06-04", "total_staff"] == 2  # A と P有の C
+    assert balance.loc["2024-06-04", "leave_applicants_count"] == 1
+    assert set(bundle.results()) >= {"summary_dow_requested", "summary_month_paid", "leave_ratio_breakdown"}
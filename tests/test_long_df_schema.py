@@ -0,0 +1,63 @@
+import pathlib
+import sys
+
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks.analyzers.rest_time import RestTimeAnalyzer
+from shift_suite.tasks.long_df_schema import (
+    compact_long_df,
+    is_compact_long_df,
+    read_long_df,
+    write_long_df,
+)
+
+
+def _object_long_df() -> pd.DataFrame:
+    rows = []
+    for day in range(1, 6):
+        for staff, role, code, start in (("A", "介護", "日", 9), ("B", "看護", "夜", 22)):
+            for slot in range(4):
+                rows.append(
+                    {
+                        "ds": pd.Timestamp(2024, 6, day, start) + pd.Timedelta(minutes=30 * slot),
+                        "staff": staff,
+                        "role": role,
+                        "employment": "常勤",
+                        "code": code,
+                        "holiday_type": "通常勤務",
+                        "parsed_slots_count": 16,
+                    }
+                )
+    return pd.DataFrame(rows)
+
+
+def test_compact_schema_roundtrip(tmp_path: pathlib.Path) -> None:
+    obj = _object_long_df()
+    compact = compact_long_df(obj)
+
+    assert is_compact_long_df(compact)
+    assert not is_compact_long_df(obj)
+    assert isinstance(compact["staff"].dtype, pd.CategoricalDtype)
+    assert compact["parsed_slots_count"].dtype == "int16"
+    assert compact_long_df(compact) is compact
+
+    path = write_long_df(obj, tmp_path / "long.parquet")
+    loaded = read_long_df(path)
+    assert is_compact_long_df(loaded)
+    # 保存時は (role, ds) の順に並ぶ
+    pd.testing.assert_frame_equal(
+        loaded.astype({"ds": "datetime64[ns]"}).astype(obj.dtypes.to_dict()),
+        obj.sort_values(["role", "ds"], kind="stable").reset_index(drop=True),
+    )
+
+
+def test_consumer_matches_object_schema() -> None:
+    obj = _object_long_df()
+    expected = RestTimeAnalyzer().analyze(obj)
+    actual = RestTimeAnalyzer().analyze(compact_long_df(obj))
+    pd.testing.assert_frame_equal(
+        actual.astype({"staff": object}).reset_index(drop=True),
+        expected.reset_index(drop=True),
+        check_dtype=False,
+    )
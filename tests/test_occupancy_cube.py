@@ -0,0 +1,46 @@
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks.occupancy_cube import ALL_GROUP, build_occupancy_cube
+from shift_suite.tasks.utils import gen_labels
+
+
+def _pivot(df: pd.DataFrame, labels) -> pd.DataFrame:
+    return (
+        df.drop_duplicates(subset=["date_lbl", "time", "staff"])
+        .pivot_table(index="time", columns="date_lbl", values="staff", aggfunc="nunique", fill_value=0)
+        .reindex(index=labels, fill_value=0)
+    )
+
+
+def test_cube_slices_match_per_group_pivots() -> None:
+    rng = np.random.default_rng(0)
+    n = 2000
+    ds = pd.Timestamp("2024-06-01") + pd.to_timedelta(rng.integers(0, 10 * 48, n) * 30, unit="m")
+    df = pd.DataFrame(
+        {
+            "staff": rng.choice([f"S{i}" for i in range(15)], n),
+            "role": rng.choice(["介護", "看護", "事務"], n),
+            "employment": rng.choice(["常勤", "パート"], n),
+            "time": ds.strftime("%H:%M"),
+            "date_lbl": ds.strftime("%Y-%m-%d"),
+        }
+    )
+    labels = pd.Index(gen_labels(30), name="time")
+    cube = build_occupancy_cube(df, labels)
+
+    pd.testing.assert_frame_equal(cube.frame(ALL_GROUP), _pivot(df, labels), check_names=False)
+    assert cube.groups("role") == ["事務", "介護", "看護"]
+    for dim in ("role", "employment"):
+        for key in cube.groups(dim):
+            expected = _pivot(df[df[dim] == key], labels)
+            pd.testing.assert_frame_equal(cube.frame(dim, key), expected, check_names=False)
+
+    dates = ["2024-05-31"] + cube.date_labels
+    padded = cube.frame("role", "介護", dates=dates)
+    assert list(padded.columns) == dates
+    assert padded["2024-05-31"].sum() == 0
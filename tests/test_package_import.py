@@ -0,0 +1,57 @@
+import json
+import pathlib
+import subprocess
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT))
+
+IMPORT_BUDGET_SEC = 1.0
+
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import shift_suite
+elapsed = time.perf_counter() - t0
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def _probe() -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_package_import_is_lazy_and_within_budget() -> None:
+    result = _probe()
+    loaded = result["modules"]
+    assert result["elapsed"] < IMPORT_BUDGET_SEC, result["elapsed"]
+    assert not [m for m in loaded if m.startswith("shift_suite.tasks")]
+    for heavy in ("pandas", "plotly", "torch", "dash", "statsmodels", "sklearn"):
+        assert heavy not in loaded
+
+
+def test_lazy_attributes_and_legacy_module_aliases() -> None:
+    import shift_suite
+    from shift_suite import build_heatmap, heatmap
+    import shift_suite.shortage as shortage_alias
+
+    assert build_heatmap is heatmap.build_heatmap
+    assert heatmap is sys.modules["shift_suite.tasks.heatmap"]
+    assert shortage_alias is sys.modules["shift_suite.tasks.shortage"]
+    assert not hasattr(shift_suite, "no_such_module")
+
+
+def test_legacy_alias_keeps_real_module_spec_and_reloads() -> None:
+    import importlib
+
+    import shift_suite.holiday_detection as alias
+    from shift_suite.tasks import holiday_detection
+
+    assert alias is holiday_detection
+    assert holiday_detection.__spec__.name == "shift_suite.tasks.holiday_detection"
+    holiday_detection.DEFAULT_HOLIDAY_TYPE = "changed"
+    assert importlib.reload(holiday_detection) is holiday_detection
+    assert holiday_detection.DEFAULT_HOLIDAY_TYPE == "通常勤務"
@@ -0,0 +1,70 @@
+import pathlib
+import sys
+
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks.frame_cache import FrameCache
+from shift_suite.tasks.long_df_schema import compact_long_df, write_long_df
+from shift_suite.tasks.parquet_query import query_long_df, read_wide_slice, row_groups_read
+
+
+def _long_df() -> pd.DataFrame:
+    rows = []
+    for day in range(1, 11):
+        for i, role in enumerate(("介護", "看護", "事務")):
+            for slot in range(4):
+                rows.append(
+                    {
+                        "ds": pd.Timestamp(2024, 6, day, 9) + pd.Timedelta(minutes=30 * slot),
+                        "staff": f"{role}{i}",
+                        "role": role,
+                        "employment": "常勤" if day % 2 else "パート",
+                        "code": "日",
+                        "holiday_type": "通常勤務",
+                        "parsed_slots_count": 16,
+                    }
+                )
+    return compact_long_df(pd.DataFrame(rows))
+
+
+def test_query_prunes_row_groups_and_matches_pandas_filter(tmp_path: pathlib.Path) -> None:
+    df = _long_df()
+    fp = tmp_path / "intermediate_data.parquet"
+    write_long_df(df, fp)
+
+    assert row_groups_read(fp) == (3, 3)
+    assert row_groups_read(fp, roles="看護") == (1, 3)
+
+    got = query_long_df(
+        fp, roles=["看護"], employments="常勤", start="2024-06-03", end="2024-06-07", columns=["ds", "staff"]
+    )
+    mask = (
+        (df["role"] == "看護")
+        & (df["employment"] == "常勤")
+        & (df["ds"] >= "2024-06-03")
+        & (df["ds"] < "2024-06-08")
+    )
+    expected = df.loc[mask, ["ds", "staff"]].reset_index(drop=True)
+    pd.testing.assert_frame_equal(
+        got.reset_index(drop=True), expected, check_categorical=False
+    )
+
+    cache = FrameCache()
+    query_long_df(fp, roles="看護", cache=cache)
+    query_long_df(fp, roles="看護", cache=cache)
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_read_wide_slice_keeps_dates_in_range_and_summary(tmp_path: pathlib.Path) -> None:
+    times = ["09:00", "09:30"]
+    heat = pd.DataFrame(
+        {"2024-06-01": [1, 2], "2024-06-02": [3, 4], "2024-06-03": [5, 6], "need": [1, 1]},
+        index=pd.Index(times, name="time"),
+    )
+    fp = tmp_path / "heat_ALL.parquet"
+    heat.to_parquet(fp)
+
+    got = read_wide_slice(fp, start="2024-06-02", end="2024-06-02")
+    assert list(got.columns) == ["2024-06-02", "need"]
+    assert list(got.index) == times
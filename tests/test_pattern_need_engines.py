@@ -0,0 +1,22 @@
+import pathlib
+import sys
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.perf.need import benchmark_need, make_synthetic_actuals
+from shift_suite.tasks.heatmap import calculate_pattern_based_need
+
+
+def test_numpy_need_engine_matches_legacy() -> None:
+    actuals = make_synthetic_actuals(days=28, seed=1) * 0.75
+    result = benchmark_need(actuals)
+    assert result["identical"], result["mismatches"]
+
+
+def test_unknown_need_engine_rejected() -> None:
+    actuals = make_synthetic_actuals(days=7)
+    with pytest.raises(ValueError):
+        calculate_pattern_based_need(
+            actuals, min(actuals.columns), max(actuals.columns), "平均値", True, engine="loop"
+        )
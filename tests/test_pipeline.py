@@ -0,0 +1,153 @@
+import pathlib
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.pipeline import Artifact, Pipeline, Stage
+
+
+def _toy_pipeline(calls: list) -> Pipeline:
+    def source(ctx):
+        calls.append("source")
+        return {"numbers": pd.DataFrame({"x": range(ctx.param("n", 3))})}
+
+    def double(ctx):
+        calls.append("double")
+        return {"doubled": ctx["numbers"].assign(x=lambda d: d["x"] * 2)}
+
+    def broken(ctx):
+        calls.append("broken")
+        raise RuntimeError("boom")
+
+    def after_broken(ctx):
+        calls.append("after_broken")
+        return {"unused": ctx["broken_out"]}
+
+    artifacts = [
+        Artifact("numbers", "numbers.parquet", load=pd.read_parquet, save=lambda df, fp: df.to_parquet(fp)),
+        Artifact("doubled", "doubled.parquet", load=pd.read_parquet, save=lambda df, fp: df.to_parquet(fp)),
+    ]
+    stages = [
+        Stage("double", double, inputs=("numbers",), outputs=("doubled",)),
+        Stage("source", source, outputs=("numbers",), params=("n",)),
+        Stage("broken", broken, inputs=("numbers",), outputs=("broken_out",), required=False),
+        Stage("after_broken", after_broken, inputs=("broken_out",), outputs=("unused",)),
+    ]
+    return Pipeline(stages, artifacts)
+
+
+def test_run_passes_artifacts_in_memory_and_persists(tmp_path: pathlib.Path) -> None:
+    calls: list = []
+    pipeline = _toy_pipeline(calls)
+    assert [s.name for s in pipeline.order(["double"])] == ["source", "double"]
+
+    result = pipeline.run(tmp_path, {"n": 4})
+    assert calls == ["source", "double", "broken"]
+    assert list(result["doubled"]["x"]) == [0, 2, 4, 6]
+    assert set(result.failed) == {"broken"} and result.skipped == ["after_broken"]
+    # 非同期保存は run の終了時に完了している
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "doubled.parquet"), result["doubled"])
+
+
+def test_initial_artifacts_skip_producers_and_standalone_loads_from_disk(tmp_path: pathlib.Path) -> None:
+    calls: list = []
+    pipeline = _toy_pipeline(calls)
+    numbers = pd.DataFrame({"x": [5, 6]})
+    result = pipeline.run(tmp_path, targets=["double"], initial={"numbers": numbers})
+    assert calls == ["double"]
+    assert not (tmp_path / "numbers.parquet").exists()
+    assert list(result["doubled"]["x"]) == [10, 12]
+
+    numbers.to_parquet(tmp_path / "numbers.parquet")
+    calls.clear()
+    out = pipeline.run_stage("double", tmp_path)
+    assert calls == ["double"]
+    assert list(out["doubled"]["x"]) == [10, 12]
+
+
+def test_duplicate_producers_and_cycles_are_rejected() -> None:
+    noop = lambda ctx: {}  # noqa: E731
+    with pytest.raises(ValueError):
+        Pipeline([Stage("a", noop, outputs=("x",)), Stage("b", noop, outputs=("x",))])
+    cyclic = Pipeline([Stage("a", noop, inputs=("y",), outputs=("x",)), Stage("b", noop, inputs=("x",), outputs=("y",))])
+    with pytest.raises(ValueError):
+        cyclic.order()
+
+
+def test_stage_cache_reruns_only_stages_whose_key_changed(tmp_path: pathlib.Path) -> None:
+    from shift_suite.pipeline import StageCache
+
+    calls: list = []
+
+    def base(ctx):
+        calls.append("base")
+        (ctx.out_dir / "base.txt").write_text(str(ctx.param("n")))
+        return {"base": ctx.param("n")}
+
+    def priced(ctx):
+        calls.append("priced")
+        return {"priced": ctx["base"] * ctx.param("wage")}
+
+    pipeline = Pipeline(
+        [
+            Stage("base", base, outputs=("base",), params=("n",)),
+            Stage("priced", priced, inputs=("base",), outputs=("priced",), params=("wage",)),
+        ]
+    )
+    cache = StageCache(tmp_path / "cache", version="test")
+
+    first = pipeline.run(tmp_path / "a", {"n": 3, "wage": 10}, cache=cache)
+    assert calls == ["base", "priced"] and first["priced"] == 30
+
+    calls.clear()
+    second = pipeline.run(tmp_path / "b", {"n": 3, "wage": 20}, cache=cache)
+    assert calls == ["priced"] and second.cached == ["base"]
+    assert second["priced"] == 60
+    assert (tmp_path / "b" / "base.txt").read_text() == "3"
+
+
+def test_optional_inputs_order_and_key_the_stage(tmp_path: pathlib.Path) -> None:
+    from shift_suite.pipeline import StageCache, default_pipeline
+
+    calls: list = []
+
+    def cube(ctx):
+        calls.append("cube")
+        fp = ctx.out_dir / "score.txt"
+        return {"cube": fp.read_text() if fp.exists() else "none"}
+
+    def score(ctx):
+        calls.append("score")
+        (ctx.out_dir / "score.txt").write_text(str(ctx.param("score")))
+        return {"score": ctx.param("score")}
+
+    # cube を先に宣言しても、同じ実行に score があれば score が先に動く
+    pipeline = Pipeline(
+        [
+            Stage("cube", cube, optional=("score",), outputs=("cube",)),
+            Stage("score", score, outputs=("score",), params=("score",), required=False),
+        ],
+        [Artifact("score", "score.txt")],
+    )
+    assert [s.name for s in pipeline.order(["cube"])] == ["cube"]
+    assert [s.name for s in pipeline.order(["cube", "score"])] == ["score", "cube"]
+
+    cache = StageCache(tmp_path / "cache", version="test")
+    first = pipeline.run(tmp_path / "a", {"score": 1}, targets=["cube"], cache=cache)
+    assert calls == ["cube"] and first["cube"] == "none"
+
+    # 温まったキャッシュに対して追加の段付きで再実行しても古い cube は使わない
+    calls.clear()
+    second = pipeline.run(tmp_path / "b", {"score": 1}, targets=["cube", "score"], cache=cache)
+    assert calls == ["score", "cube"] and second["cube"] == "1" and second.cached == []
+
+    calls.clear()
+    third = pipeline.run(tmp_path / "c", {"score": 2}, targets=["cube", "score"], cache=cache)
+    assert calls == ["score", "cube"] and third["cube"] == "2"
+
+    kpi = default_pipeline()
+    assert set(kpi.stages["kpi_cube"].optional) == {"fatigue", "fairness"}
+    names = [s.name for s in kpi.order(["kpi_cube", "fatigue"])]
+    assert names.index("fatigue") < names.index("kpi_cube") and "fairness" not in names
@@ -0,0 +1,77 @@
+import pathlib
+import sys
+
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.pipeline import run_scenarios
+from shift_suite.pipeline.scenarios import SHARED_LONG_DF, open_shared_long_df, share_long_df
+
+SLOT = 60
+SCENARIOS = {
+    "median_based": {"slot": SLOT, "heatmap": {"need_stat_method": "中央値"}},
+    "mean_based": {"slot": SLOT, "heatmap": {"need_stat_method": "平均値"}},
+}
+
+
+def _long_df() -> pd.DataFrame:
+    rows = [
+        {"ds": pd.Timestamp(f"2024-06-{day:02d} {hour:02d}:00"), "staff": staff, "role": role,
+         "employment": "常勤", "code": "日", "holiday_type": "通常勤務", "parsed_slots_count": 1}
+        for day in range(1, 15)
+        for hour in range(9, 17)
+        for staff, role in (("A", "介護"), ("B", "介護"), ("C", "看護"))
+        if not (staff == "B" and day % 3 == 0)
+    ]
+    return pd.DataFrame(rows)
+
+
+def test_shared_long_df_round_trip(tmp_path: pathlib.Path) -> None:
+    df = _long_df().astype({"role": "category"})
+    fp = share_long_df(df, tmp_path / SHARED_LONG_DF)
+    pd.testing.assert_frame_equal(open_shared_long_df(fp), df)
+
+
+def test_pool_and_inline_runs_write_the_same_outputs(tmp_path: pathlib.Path) -> None:
+    long_df = _long_df()
+    extra = tmp_path / "work_patterns.parquet"
+    pd.DataFrame({"code": ["日"]}).to_parquet(extra)
+
+    progress: list = []
+    inline = run_scenarios(
+        long_df, SCENARIOS, tmp_path / "inline", copy_files=[extra], max_workers=1,
+        on_progress=lambda key, stage: progress.append((key, stage)),
+    )
+    pooled = run_scenarios(long_df, SCENARIOS, tmp_path / "pool", max_workers=2)
+
+    assert list(inline) == list(SCENARIOS) and all(o.ok for o in inline.values())
+    assert ("median_based", "heatmap") in progress and ("mean_based", "shortage") in progress
+    assert (tmp_path / "inline" / "out_mean_based" / "work_patterns.parquet").exists()
+    assert not (tmp_path / "inline" / SHARED_LONG_DF).exists()
+    for key in SCENARIOS:
+        assert pooled[key].ok, pooled[key].error
+        for name in ("heat_ALL.parquet", "shortage_role_summary.parquet"):
+            pd.testing.assert_frame_equal(
+                pd.read_parquet(tmp_path / "pool" / f"out_{key}" / name),
+                pd.read_parquet(tmp_path / "inline" / f"out_{key}" / name),
+            )
+
+
+def test_wage_change_reuses_heatmap_and_shortage_from_cache(tmp_path: pathlib.Path) -> None:
+    from shift_suite.pipeline import StageCache
+
+    cache = StageCache(tmp_path / "cache", version="test")
+    targets = ("shortage", "shortage_kpi")
+
+    def _params(wage: float) -> dict:
+        return {key: {**p, "wages": {"wage_direct": wage}} for key, p in SCENARIOS.items()}
+
+    first = run_scenarios(_long_df(), _params(1500), tmp_path / "a", targets=targets, max_workers=1, cache=cache)
+    assert all(o.ok and not o.cached for o in first.values())
+
+    # 出力先が変わっても、賃金だけの変更なら heatmap / shortage は復元する
+    second = run_scenarios(_long_df(), _params(2000), tmp_path / "b", targets=targets, max_workers=1, cache=cache)
+    for key, outcome in second.items():
+        assert outcome.ok, outcome.error
+        assert {"heatmap", "shortage"} <= set(outcome.cached) and "shortage_kpi" not in outcome.cached
+        assert (tmp_path / "b" / f"out_{key}" / "shortage_role_summary.parquet").exists()
@@ -0,0 +1,19 @@
+import pathlib
+import sys
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.perf.shortage import benchmark_shortage, make_synthetic_heatmaps
+from shift_suite.tasks.shortage import shortage_and_brief
+
+
+def test_numpy_shortage_engine_matches_legacy(tmp_path: pathlib.Path) -> None:
+    heat_dir = make_synthetic_heatmaps(tmp_path / "heat", roles=4, employments=2, days=40)
+    result = benchmark_shortage(heat_dir)
+    assert result["identical"], result["mismatches"]
+
+
+def test_unknown_shortage_engine_rejected(tmp_path: pathlib.Path) -> None:
+    with pytest.raises(ValueError):
+        shortage_and_brief(tmp_path, 30, engine="loop")
@@ -0,0 +1,70 @@
+import pathlib
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks.analyzers.rest_time import RestTimeAnalyzer
+from shift_suite.tasks.staff_days import StaffDayMatrix, staff_day_matrix
+
+
+def _long_df() -> pd.DataFrame:
+    rows = []
+
+    def work(staff: str, day: str, hour: int, slots: int, code: str) -> None:
+        start = pd.Timestamp(day) + pd.Timedelta(hours=hour)
+        for i in range(slots):
+            rows.append((start + pd.Timedelta(minutes=30 * i), staff, code, "通常勤務", 1))
+
+    # A: 3 連勤 → 休み → 2 連勤 (最終日は夜勤)
+    for day in ("2024-01-01", "2024-01-02", "2024-01-03", "2024-01-05"):
+        work("A", day, 9, 16, "日")
+    work("A", "2024-01-06", 22, 4, "夜")
+    # B: 1 日だけ勤務 + 有給
+    work("B", "2024-01-02", 13, 8, "遅")
+    rows.append((pd.Timestamp("2024-01-03"), "B", "有", "有給", 0))
+    return pd.DataFrame(rows, columns=["ds", "staff", "code", "holiday_type", "parsed_slots_count"])
+
+
+def test_matrix_days_streaks_and_leave() -> None:
+    m = StaffDayMatrix.from_frame(_long_df())
+    a, b = m.staff.get_loc("A"), m.staff.get_loc("B")
+
+    assert m.worked[a].sum() == 5 and m.worked[b].sum() == 1
+    assert m.hours[a, 0] == 8.0 and m.start[a, 0] == 9.0 and m.end[a, 0] == 17.0
+    assert np.isnan(m.start[a, 3])  # 1/4 は休み
+    assert m.leave_types[m.leave[b, 2]] == "有給"
+
+    streaks = m.streaks()
+    assert streaks[streaks["staff"] == "A"]["length"].tolist() == [3, 2]
+    assert m.night[a, 5] and not m.night[a, 0]
+
+
+def test_rest_hours_matches_rest_time_analyzer() -> None:
+    df = _long_df()
+    expected = RestTimeAnalyzer().analyze(df[df["parsed_slots_count"] > 0])
+    got = staff_day_matrix(df).rest_hours()
+    merged = expected.merge(got, on=["staff", "date"], suffixes=("_old", "_new"))
+    assert len(merged) == len(expected)
+    assert np.allclose(merged["rest_hours_old"], merged["rest_hours_new"], equal_nan=True)
+
+
+def test_matrix_is_shared_per_frame() -> None:
+    df = _long_df()
+    assert staff_day_matrix(df) is staff_day_matrix(df)
+    assert staff_day_matrix(df.copy()) is not staff_day_matrix(df)
+
+
+def test_matrix_by_other_staff_column_is_shared() -> None:
+    from shift_suite.tasks.fatigue import _features
+
+    df = _long_df()
+    df["name"] = df["staff"].map({"A": "佐藤", "B": "鈴木"})
+    by_name = staff_day_matrix(df, 30, "name")
+    assert by_name is staff_day_matrix(df, 30, "name") and by_name is not staff_day_matrix(df, 30)
+    assert list(by_name.staff) == ["佐藤", "鈴木"]
+    # 疲労の特徴量は name 列のある long_df でも共有の行列を使う
+    feats = _features(df)
+    assert list(feats.index) == ["佐藤", "鈴木"]
+    assert staff_day_matrix(df, 30, "name") is by_name
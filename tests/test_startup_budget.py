@@ -0,0 +1,46 @@
+import importlib.util
+import pathlib
+import sys
+
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.perf.startup import APP_FRAMEWORKS, STARTUP_BUDGETS, cold_start, parse_importtime, subsystem
+
+
+def test_importtime_is_aggregated_by_subsystem() -> None:
+    rows = parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   shift_suite.tasks.utils\n"
+        "import time:      2000 |       2500 | pandas\n"
+    )
+    assert [r["module"] for r in rows] == ["shift_suite.tasks.utils", "pandas"]
+    assert rows[0]["depth"] == 1 and rows[1]["cumulative"] == pytest.approx(0.0025)
+    assert subsystem("shift_suite.tasks.heatmap") == "shift_suite.tasks.heatmap"
+    assert subsystem("pandas.core.frame") == "pandas" and subsystem("json.decoder") == "(stdlib)"
+
+
+@pytest.mark.parametrize("target", sorted(STARTUP_BUDGETS))
+def test_cold_start_within_budget(target: str) -> None:
+    framework = APP_FRAMEWORKS.get(target)
+    if framework and importlib.util.find_spec(framework) is None:
+        pytest.skip(f"{framework} not installed")
+    result = cold_start(target)
+    assert "error" not in result, result.get("error")
+    assert result["within_budget"], f"{target}: {result['wall']:.2f}s > {result['budget']:.1f}s"
+
+
+def test_failed_first_request_is_an_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    from shift_suite.perf import startup
+
+    probe = 'import json; print("STARTUP " + json.dumps({"import": 0.1, "first_request": 0.1, "%s": %s}))'
+    monkeypatch.setitem(startup.APP_FRAMEWORKS, "dash_app", "json")
+    monkeypatch.setitem(startup._PROBES, "dash_app", probe % ("status", "[200, 500]"))
+    result = cold_start("dash_app")
+    assert "500" in result["error"] and "within_budget" not in result
+
+    monkeypatch.setitem(startup._PROBES, "dash_app", probe % ("exceptions", "1"))
+    assert "例外" in cold_start("dash_app")["error"]
+
+    monkeypatch.setitem(startup._PROBES, "dash_app", probe % ("status", "[200, 200]"))
+    assert cold_start("dash_app")["within_budget"]
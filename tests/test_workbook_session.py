@@ -0,0 +1,43 @@
+import pathlib
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+from shift_suite.tasks.io_excel import ingest_excel
+from shift_suite.tasks.workbook_session import WorkbookSession, open_workbook
+from test_io_excel_engines import _write_workbook
+
+
+@pytest.mark.parametrize("backend", ["openpyxl", "calamine"])
+def test_read_sheet_matches_read_excel(tmp_path: pathlib.Path, backend: str) -> None:
+    if backend == "calamine":
+        pytest.importorskip("python_calamine")
+    book = tmp_path / "shift.xlsx"
+    _write_workbook(book)
+    session = WorkbookSession(book, backend=backend)
+
+    for kwargs in (
+        dict(dtype=str),
+        dict(header=1, dtype=str),
+        dict(header=None, nrows=5),
+        dict(header=None, skiprows=0, nrows=1, usecols=[0], dtype=str),
+    ):
+        for sheet in session.sheet_names:
+            expected = pd.read_excel(book, sheet_name=sheet, engine=backend, **kwargs)
+            pd.testing.assert_frame_equal(session.read_sheet(sheet, **kwargs), expected)
+
+
+def test_ingest_parses_each_sheet_once(tmp_path: pathlib.Path) -> None:
+    book = tmp_path / "shift.xlsx"
+    _write_workbook(book)
+    session = open_workbook(book)
+    assert open_workbook(book) is session
+
+    for _ in range(2):
+        ingest_excel(
+            book, shift_sheets=["実績"], header_row=1, year_month_cell_location="A1"
+        )
+    session.columns("実績", 1)
+    assert session.sheets_parsed == 2  # 勤務区分 + 実績